@@ -5,7 +5,6 @@ from functools import wraps
 from flask import request, session, jsonify, current_app, g
 import hashlib
 import secrets
-import jwt
 from datetime import datetime, timedelta
 import re
 from collections import defaultdict, deque
@@ -14,6 +13,10 @@ import hmac
 import base64
 import os
 
+import metrics
+from rate_limiter import get_rate_limiter
+from session_token_store import SessionTokenStore
+
 # Try to import cryptography, fallback if not available
 try:
     from cryptography.fernet import Fernet
@@ -21,6 +24,137 @@ try:
 except ImportError:
     HAS_CRYPTOGRAPHY = False
 
+# Request inspection patterns, compiled once into a single alternation.
+# The three SQL statements are in both lists, as they were in the two
+# original checks, so a hit on one of them counts for both results.
+_ATTACK_PATTERNS = [
+    r'<script', r'javascript:', r'vbscript:', r'onload=', r'onerror=',
+    r'\.\./\.\./.*etc/passwd', r'cmd\.exe', r'/bin/bash'
+]
+_SHARED_PATTERNS = [r'union\s+select', r'drop\s+table', r'insert\s+into']
+_SQL_ONLY_PATTERNS = [
+    r"delete\s+from", r"update\s+set", r"exec\s*\(",
+    r"sp_executesql", r"xp_cmdshell", r";\s*--",
+    r"'\s*or\s*'", r'"\s*or\s*"', r"1\s*=\s*1"
+]
+SUSPICIOUS_PATTERNS = _ATTACK_PATTERNS + _SHARED_PATTERNS
+SQL_INJECTION_PATTERNS = _SHARED_PATTERNS + _SQL_ONLY_PATTERNS
+_INSPECTION_RE = re.compile(
+    '(?P<attack>' + '|'.join(_ATTACK_PATTERNS) + ')'
+    '|(?P<shared>' + '|'.join(_SHARED_PATTERNS) + ')'
+    '|(?P<sql>' + '|'.join(_SQL_ONLY_PATTERNS) + ')',
+    re.IGNORECASE
+)
+
+# Fields carrying binary payloads (base64 photos) are never scanned
+# A whole value that is a base64 data URL (nothing else can hide in it)
+_DATA_URL_RE = re.compile(r'data:[\w/+.-]+;base64,[A-Za-z0-9+/=]+')
+DEFAULT_INSPECT_SKIP_FIELDS = ('verification_photo', 'photo', 'image', 'signature')
+DEFAULT_INSPECT_MAX_FIELD_BYTES = 4096
+
+
+def inspect_request_fields(fields, path='', max_field_bytes=DEFAULT_INSPECT_MAX_FIELD_BYTES,
+                           skip_fields=DEFAULT_INSPECT_SKIP_FIELDS):
+    """
+    Scan request fields once with the compiled inspection pattern.
+
+    Args:
+        fields: iterable of (name, value) pairs (args, form, JSON scalars).
+        path: request path, checked for attack patterns only.
+        max_field_bytes: characters inspected per field value.
+        skip_fields: field names never inspected.
+
+    Returns:
+        (suspicious, sql_injection) booleans: SUSPICIOUS_PATTERNS in the
+        path, field names or values; SQL_INJECTION_PATTERNS in values.
+        Values that are entirely a base64 data URL
+        ("data:<type>;base64,<base64>") are skipped like the named binary
+        fields; anything else starting with "data:" is scanned.
+    """
+    suspicious = sql_injection = False
+    if path:
+        suspicious = any(m.lastgroup != 'sql' for m in _INSPECTION_RE.finditer(path[:max_field_bytes]))
+
+    for name, value in fields:
+        if suspicious and sql_injection:
+            break
+        if name in skip_fields:
+            continue
+        text = value if isinstance(value, str) else str(value)
+        if text.startswith('data:') and _DATA_URL_RE.fullmatch(text):
+            continue
+        # Field names were part of the old str(request.form) scan as well
+        for is_value, chunk in ((False, name), (True, text[:max_field_bytes])):
+            for match in _INSPECTION_RE.finditer(chunk):
+                if match.lastgroup != 'sql':
+                    suspicious = True
+                if match.lastgroup != 'attack' and is_value:
+                    sql_injection = True
+    return suspicious, sql_injection
+
+
+def inspect_current_request(max_field_bytes=DEFAULT_INSPECT_MAX_FIELD_BYTES,
+                            skip_fields=DEFAULT_INSPECT_SKIP_FIELDS):
+    """
+    Scan args, form and JSON scalars once per request (result cached on g).
+
+    The scan time goes to the ``qr_request_inspection_seconds`` histogram.
+    """
+    cached = getattr(g, 'security_inspection', None)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
+    fields = list(request.args.items(multi=True)) + list(request.form.items(multi=True))
+    json_body = request.get_json(silent=True) if request.is_json else None
+    if isinstance(json_body, dict):
+        fields.extend(
+            (k, v) for k, v in json_body.items() if isinstance(v, (str, int, float))
+        )
+    suspicious, sql_injection = inspect_request_fields(fields, request.path, max_field_bytes, skip_fields)
+    elapsed = time.perf_counter() - started
+    metrics.observe('qr_request_inspection_seconds', elapsed, {'endpoint': request.endpoint or 'unmatched'})
+
+    g.security_inspection = {
+        'suspicious': suspicious,
+        'sql_injection': sql_injection,
+        'inspection_ms': round(elapsed * 1000, 3)
+    }
+    return g.security_inspection
+
+
+def init_request_inspection(app, logger_handler):
+    """
+    Refuse requests whose fields match the inspection patterns (403).
+
+    Registered by create_app() so every worker scans every request,
+    including ``/qr/<qr_url>/checkin``; SECURITY_INSPECTION_ENABLED=false
+    turns it off.
+    """
+    if not app.config.get('SECURITY_INSPECTION_ENABLED', True):
+        return
+    max_field_bytes = app.config.get('SECURITY_INSPECT_MAX_FIELD_BYTES', DEFAULT_INSPECT_MAX_FIELD_BYTES)
+    skip_fields = frozenset(app.config.get('SECURITY_INSPECT_SKIP_FIELDS', DEFAULT_INSPECT_SKIP_FIELDS))
+
+    @app.before_request
+    def inspect_request_patterns():
+        if request.endpoint == 'static':
+            return None
+        result = inspect_current_request(max_field_bytes, skip_fields)
+        if not (result['suspicious'] or result['sql_injection']):
+            return None
+        event_type = 'suspicious_request' if result['suspicious'] else 'sql_injection_attempt'
+        logger_handler.log_security_event(
+            event_type=event_type,
+            description=f"Request to {request.path} blocked by request inspection",
+            severity='HIGH',
+            additional_data={'ip': request.remote_addr, 'endpoint': request.endpoint, 'method': request.method}
+        )
+        if result['suspicious']:
+            return jsonify({'error': 'Request blocked for security reasons'}), 403
+        return jsonify({'error': 'Malicious request detected'}), 403
+
+
 class SecurityManager:
     """
     Advanced security manager for QR Attendance System
@@ -34,13 +168,26 @@ class SecurityManager:
         # Security tracking
         self.failed_attempts = defaultdict(lambda: deque(maxlen=10))
         self.suspicious_ips = defaultdict(int)
-        self.session_tokens = {}
+        
+        # Session security tokens live in a shared table (see session_token_store)
+        # so a session created on one worker validates on every worker
+        self.session_tokens = None
         
         # Security configuration
         self.max_failed_attempts = 5
         self.lockout_duration = 900  # 15 minutes
         self.session_timeout = 3600  # 1 hour
         
+        # Request inspection limits and timing
+        self.inspect_max_field_bytes = DEFAULT_INSPECT_MAX_FIELD_BYTES
+        self.inspect_skip_fields = frozenset(DEFAULT_INSPECT_SKIP_FIELDS)
+        self.inspection_stats = {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+        
+        # Failed-login lockout is decided by the shared rate limiter so every
+        # worker sees the same attempts; failed_attempts only feeds the status view
+        self.rate_limiter = None
+        self.auth_budget = None
+        
         if app:
             self.init_app(app, db, logger_handler)
     
@@ -50,6 +197,28 @@ class SecurityManager:
         self.db = db
         self.logger_handler = logger_handler
         
+        self.rate_limiter, budgets = get_rate_limiter(app)
+        self.auth_budget = budgets['auth']
+        
+        self.session_timeout = app.config.get('SESSION_TOKEN_TTL', self.session_timeout)
+        remember_lifetime = app.config.get('PERMANENT_SESSION_LIFETIME', timedelta(days=30))
+        if isinstance(remember_lifetime, timedelta):
+            remember_lifetime = remember_lifetime.total_seconds()
+        self.session_tokens = SessionTokenStore(
+            db,
+            ttl=self.session_timeout,
+            remember_ttl=int(remember_lifetime),
+            cache_size=app.config.get('SESSION_TOKEN_CACHE_SIZE', 10000),
+            recheck_seconds=app.config.get('SESSION_TOKEN_RECHECK_SECONDS', 30)
+        )
+        
+        self.inspect_max_field_bytes = app.config.get(
+            'SECURITY_INSPECT_MAX_FIELD_BYTES', DEFAULT_INSPECT_MAX_FIELD_BYTES
+        )
+        self.inspect_skip_fields = frozenset(app.config.get(
+            'SECURITY_INSPECT_SKIP_FIELDS', DEFAULT_INSPECT_SKIP_FIELDS
+        ))
+        
         # Generate encryption key for sensitive data
         self.setup_encryption()
         
@@ -130,18 +299,9 @@ class SecurityManager:
         user_agent = request.headers.get('User-Agent', '').lower()
         
         # Check for common attack patterns
-        suspicious_patterns = [
-            r'<script', r'javascript:', r'vbscript:', r'onload=', r'onerror=',
-            r'union\s+select', r'drop\s+table', r'insert\s+into',
-            r'\.\./\.\./.*etc/passwd', r'cmd\.exe', r'/bin/bash'
-        ]
-        
-        request_data = str(request.args) + str(request.form) + request.path
-        
-        for pattern in suspicious_patterns:
-            if re.search(pattern, request_data, re.IGNORECASE):
-                self.suspicious_ips[client_ip] += 1
-                return True
+        if self.inspect_request()['suspicious']:
+            self.suspicious_ips[client_ip] += 1
+            return True
         
         # Check for suspicious user agents
         bot_patterns = ['bot', 'crawler', 'spider', 'scraper', 'scanner']
@@ -172,22 +332,22 @@ class SecurityManager:
                 return False
             
             # Check if session token matches stored token
-            stored_token = self.session_tokens.get(user_id)
-            if not stored_token or not hmac.compare_digest(session_token, stored_token['token']):
+            stored_token = self.session_tokens.validate(user_id, session_token)
+            if not stored_token:
                 return False
             
             # Check session timeout - skip if "Remember Me" is enabled
             if not session.get('remember_me', False):
-                if time.time() - stored_token['created'] > self.session_timeout:
-                    del self.session_tokens[user_id]
+                if time.time() - stored_token['created_at'] > self.session_timeout:
+                    self.session_tokens.revoke(user_id)
                     return False
             
             # Check if session IP matches (optional security measure)
             if self.app.config.get('STRICT_SESSION_IP', False):
-                if stored_token['ip'] != self.get_client_ip():
+                if stored_token['ip_address'] != self.get_client_ip():
                     self.log_security_event('session_ip_mismatch', {
                         'user_id': user_id,
-                        'original_ip': stored_token['ip'],
+                        'original_ip': stored_token['ip_address'],
                         'current_ip': self.get_client_ip()
                     })
                     return False
@@ -201,41 +361,35 @@ class SecurityManager:
     
     def detect_sql_injection(self):
         """Detect potential SQL injection attempts"""
-        sql_patterns = [
-            r"union\s+select", r"drop\s+table", r"insert\s+into",
-            r"delete\s+from", r"update\s+set", r"exec\s*\(",
-            r"sp_executesql", r"xp_cmdshell", r";\s*--",
-            r"'\s*or\s*'", r'"\s*or\s*"', r"1\s*=\s*1"
-        ]
-        
-        # Check all request parameters
-        check_data = []
-        check_data.extend(request.args.values())
-        check_data.extend(request.form.values())
-        
-        if request.json:
-            check_data.extend(str(v) for v in request.json.values() if isinstance(v, (str, int, float)))
-        
-        for data in check_data:
-            data_str = str(data).lower()
-            for pattern in sql_patterns:
-                if re.search(pattern, data_str, re.IGNORECASE):
-                    return True
-        
-        return False
+        return self.inspect_request()['sql_injection']
+    
+    def inspect_request(self):
+        """
+        Scan args, form and JSON scalars once per request (result cached on g).
+        
+        Binary fields (verification_photo etc.) and data URLs are skipped and
+        each value is capped at inspect_max_field_bytes, so a multi-megabyte
+        photo check-in costs the same as any other form post.
+        """
+        if getattr(g, 'security_inspection', None) is not None:
+            return g.security_inspection
+        result = inspect_current_request(self.inspect_max_field_bytes, self.inspect_skip_fields)
+        
+        stats = self.inspection_stats
+        stats['count'] += 1
+        stats['total_ms'] += result['inspection_ms']
+        stats['max_ms'] = max(stats['max_ms'], result['inspection_ms'])
+        return result
     
     def is_auth_rate_limited(self):
         """Check if authentication endpoint is rate limited"""
         client_ip = self.get_client_ip()
-        current_time = time.time()
-        
-        # Clean old attempts
-        self.failed_attempts[client_ip] = deque([
-            attempt for attempt in self.failed_attempts[client_ip]
-            if current_time - attempt < 900  # Keep attempts from last 15 minutes
-        ], maxlen=10)
-        
-        return len(self.failed_attempts[client_ip]) >= self.max_failed_attempts
+        try:
+            return self.rate_limiter.is_blocked(f"auth:ip:{client_ip}", self.auth_budget)
+        except Exception as e:
+            if self.logger_handler:
+                self.logger_handler.logger.warning(f"Auth rate limiter unavailable: {e}")
+            return False
     
     def record_failed_attempt(self, identifier):
         """Record a failed authentication attempt"""
@@ -243,11 +397,18 @@ class SecurityManager:
         current_time = time.time()
         
         self.failed_attempts[client_ip].append(current_time)
+        try:
+            result = self.rate_limiter.hit(f"auth:ip:{client_ip}", self.auth_budget)
+            attempts = self.auth_budget.limit - result.remaining
+        except Exception as e:
+            if self.logger_handler:
+                self.logger_handler.logger.warning(f"Auth rate limiter unavailable: {e}")
+            attempts = len(self.failed_attempts[client_ip])
         
         self.log_security_event('authentication_failure', {
             'ip': client_ip,
             'identifier': identifier,
-            'attempts': len(self.failed_attempts[client_ip])
+            'attempts': attempts
         })
     
     def create_secure_session(self, user_id):
@@ -256,12 +417,13 @@ class SecurityManager:
         session_token = secrets.token_urlsafe(32)
         
         # Store session information
-        self.session_tokens[user_id] = {
-            'token': session_token,
-            'created': time.time(),
-            'ip': self.get_client_ip(),
-            'user_agent': request.headers.get('User-Agent', '')[:200]
-        }
+        self.session_tokens.issue(
+            user_id,
+            session_token,
+            ip_address=self.get_client_ip(),
+            user_agent=request.headers.get('User-Agent', ''),
+            remember_me=session.get('remember_me', False)
+        )
         
         # Set session data
         session['security_token'] = session_token
@@ -362,16 +524,20 @@ class SecurityManager:
                 )
                 
                 # Count active sessions
-                active_sessions = len([
-                    token for token in self.session_tokens.values()
-                    if current_time - token['created'] < self.session_timeout
-                ])
+                active_sessions = self.session_tokens.count_active()
                 
+                stats = self.inspection_stats
                 return jsonify({
                     'suspicious_ips': suspicious_count,
                     'recent_failed_attempts': recent_failures,
                     'active_sessions': active_sessions,
                     'rate_limited_ips': len(self.failed_attempts),
+                    'rate_limiter': self.rate_limiter.stats(),
+                    'request_inspection': {
+                        'requests': stats['count'],
+                        'avg_ms': round(stats['total_ms'] / stats['count'], 3) if stats['count'] else 0.0,
+                        'max_ms': round(stats['max_ms'], 3)
+                    },
                     'security_status': 'normal' if suspicious_count < 5 else 'elevated'
                 })
                 
@@ -387,9 +553,10 @@ class SecurityManager:
                 if not session.get('user_id') or session.get('role') != 'admin':
                     return jsonify({'error': 'Access denied'}), 403
                 
-                # Clear failed attempts
+                # Clear failed attempts (and every shared rate limit block)
                 cleared_ips = len(self.failed_attempts)
                 self.failed_attempts.clear()
+                self.rate_limiter.reset()
                 
                 # Clear suspicious IPs
                 cleared_suspicious = len(self.suspicious_ips)
@@ -26,7 +26,7 @@ from utils.template_helpers import register_template_helpers
 from logger_handler import log_database_operations
 from models import set_db
 from turnstile_utils import turnstile_utils
-from db_performance_optimization import initialize_performance_optimizations
+from db_performance_optimization import implement_caching_strategy
 from app_performance_middleware import PerformanceMonitor
 from utils.helpers import has_admin_privileges
 
@@ -49,6 +49,11 @@ def create_app() -> Flask:
     cfg = get_config()
     app.config.from_object(cfg)
 
+    # Client address from X-Forwarded-For when behind PROXY_FIX_X_FOR proxies
+    if app.config.get('PROXY_FIX_X_FOR'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
     # ------------------------------------------------------------------
     # Database initialization
     # ------------------------------------------------------------------
@@ -81,15 +86,57 @@ def create_app() -> Flask:
     from routes.statistics import bp as statistics_bp
     from routes.employees import bp as employees_bp
     from routes.time_attendance import bp as time_attendance_bp
+    from routes.exports import bp as exports_bp
 
     for bp in (auth_bp, dashboard_bp, users_bp, admin_bp, projects_bp,
                qr_codes_bp, attendance_bp, payroll_bp, statistics_bp,
-               employees_bp, time_attendance_bp):
+               employees_bp, time_attendance_bp, exports_bp):
         app.register_blueprint(bp)
 
+    from extensions import logger_handler as _lh
+
+    # Prometheus metrics (/metrics), aggregated across workers
+    from metrics import init_metrics
+    init_metrics(app, db)
+
+    # Request budgets per IP / employee / QR code, shared by every worker
+    # (RATE_LIMIT_BACKEND=sqlite), plus per-worker request timings
+    PerformanceMonitor(app, db, _lh)
+
+    # Attack-pattern scan of args/form/JSON on every request (403 on a hit)
+    from advanced_security_middleware import init_request_inspection
+    init_request_inspection(app, _lh)
+
+    # Per-request SQL counts, slow statements and N+1 detection
+    from query_profiler import QueryProfiler
+    QueryProfiler(app, db, _lh)
+
+    # Opt-in sampling profiler for PROFILING_ENDPOINTS
+    from request_profiler import RequestProfiler
+    RequestProfiler(app, _lh)
+
+    # Dashboard counters in summary tables, refreshed by one worker at a time
+    from dashboard_stats import DashboardStatsAggregator
+    DashboardStatsAggregator(app, db, _lh)
+
+    # Server-pushed check-in feed for dashboards (/api/dashboard/stream)
+    from realtime_feed import RealtimeFeed
+    RealtimeFeed(app, db, _lh)
+
+    # Periodic maintenance jobs (employee sync, log retention, TA archive, stats rebuild)
+    from job_scheduler import JobScheduler
+    JobScheduler(app, db, _lh)
+
+    # Background export jobs (worker pool + on-disk artifacts)
+    from export_jobs import export_job_manager
+    export_job_manager.init_app(app, _lh)
+
+    # flask db-upgrade / db-maintenance (one-shot schema and data steps)
+    from db_migrations import register_cli
+    register_cli(app, db, _lh)
+
     # Register location-logging routes (from location_logging.py)
     # Must be called after app is created; uses app, db, logger_handler directly.
-    from extensions import logger_handler as _lh
     create_location_logging_routes(app, db, _lh)
 
 
@@ -216,7 +263,8 @@ def create_app() -> Flask:
                         'duration': duration,
                         'endpoint': request.endpoint,
                         'method': request.method,
-                        'user': session.get('username', 'anonymous')
+                        'user': session.get('username', 'anonymous'),
+                        'profile_id': g.get('profile_id')
                     }
                 )
         if response.status_code >= 400:
@@ -251,97 +299,10 @@ def create_app() -> Flask:
 
 
 # ---------------------------------------------------------------------------
-# Database initialization helpers (called at startup)
+# Database initialization helpers (now migration steps, see db_migrations.py)
 # ---------------------------------------------------------------------------
+from db_migrations import create_tables, update_existing_qr_codes  # noqa: E402,F401
 
-@log_database_operations('database_initialization')
-def create_tables():
-    """Create database tables and default admin user with logging"""
-    from extensions import db as _db, logger_handler as lh
-    try:
-        _db.create_all()
-        from flask import current_app
-        from models.user import User
-        admin = User.query.filter_by(username='admin').first()
-        if not admin:
-            from config import Config as _Cfg
-            default_password = _Cfg.DEFAULT_ADMIN_PASSWORD
-            admin = User(
-                full_name='System Administrator',
-                email='admin@example.com',
-                username='admin',
-                role='admin'
-            )
-            admin.set_password(default_password)
-            _db.session.add(admin)
-            _db.session.commit()
-            if default_password == 'admin123':
-                print("⚠️  WARNING: Default admin password 'admin123' is in use. "
-                      "Set DEFAULT_ADMIN_PASSWORD in your .env file before going to production.")
-                lh.logger.warning(
-                    "Default admin user created with insecure default password. "
-                    "Set DEFAULT_ADMIN_PASSWORD environment variable."
-                )
-            else:
-                lh.logger.info("Default admin user created during initialization")
-        lh._create_log_table()
-    except Exception as e:
-        lh.log_database_error('database_initialization', e)
-        raise
-
-
-def update_existing_qr_codes():
-    """Update existing QR codes with missing URLs or images at startup.
-
-    Regenerates qr_url slugs without needing a request context.
-    For qr_code_image, constructs the base URL from FLASK_HOST/FLASK_PORT
-    config so this can run safely outside any HTTP request.
-    """
-    from extensions import db as _db, logger_handler as lh
-    from utils.helpers import generate_qr_code, get_qr_styling, generate_qr_url
-    from config import Config as _Cfg
-    try:
-        from models.qrcode import QRCode
-        qr_codes = QRCode.query.filter_by(active_status=True).all()
-        if not qr_codes:
-            return
-
-        # Build a base URL that does not require an active request context.
-        host = os.environ.get('FLASK_HOST', '0.0.0.0')
-        # 0.0.0.0 is a bind address, not a reachable hostname — default to localhost
-        if host in ('0.0.0.0', ''):
-            host = 'localhost'
-        port = os.environ.get('FLASK_PORT', '5000')
-        scheme = 'https' if _Cfg.SESSION_COOKIE_SECURE else 'http'
-        base_url = f"{scheme}://{host}:{port}/"
-
-        updated_count = 0
-        for qr_code in qr_codes:
-            if not qr_code.qr_url or not qr_code.qr_code_image:
-                try:
-                    if not qr_code.qr_url:
-                        qr_code.qr_url = generate_qr_url(qr_code.name, qr_code.id)
-                    if not qr_code.qr_code_image:
-                        qr_data = f"{base_url}qr/{qr_code.qr_url}"
-                        styling = get_qr_styling(qr_code)
-                        qr_code.qr_code_image = generate_qr_code(
-                            data=qr_data,
-                            fill_color=styling['fill_color'],
-                            back_color=styling['back_color'],
-                            box_size=styling['box_size'],
-                            border=styling['border'],
-                            error_correction=styling['error_correction']
-                        )
-                    updated_count += 1
-                except Exception as e:
-                    lh.log_flask_error('qr_code_update_error', f"Failed to update QR code {qr_code.id}: {str(e)}")
-                    continue
-        if updated_count > 0:
-            _db.session.commit()
-            lh.logger.info(f"Startup: updated {updated_count} QR codes with missing URLs/images")
-    except Exception as e:
-        lh.log_database_error('update_existing_qr_codes', e)
-        
 
 # ---------------------------------------------------------------------------
 # Entry point
@@ -350,20 +311,23 @@ def update_existing_qr_codes():
 app = create_app()
 
 if __name__ == '__main__':
+    from config import Config as _Cfg
     with app.app_context():
         try:
-            create_tables()
-            update_existing_qr_codes()
-
             from extensions import logger_handler
-            logger_handler.logger.info("Initializing performance optimizations")
-            cached_query = initialize_performance_optimizations(app, db, logger_handler)
-            performance_monitor = PerformanceMonitor(app, db, logger_handler)
+            from db_migrations import pending_migrations, run_migrations
+
+            # One-shot steps are tracked in schema_migrations; once applied
+            # this is a single SELECT (see db_migrations.py)
+            pending = [m[0] for m in pending_migrations(db)]
+            if pending and _Cfg.DB_MIGRATE_ON_START:
+                run_migrations(app, db, logger_handler)
+            elif pending:
+                logger_handler.logger.warning(
+                    f"Pending database migrations: {', '.join(pending)} - run 'flask --app app db-upgrade'"
+                )
 
-            if cached_query:
-                logger_handler.logger.info("Performance optimizations completed successfully")
-            else:
-                logger_handler.logger.warning("Performance optimizations completed with warnings")
+            implement_caching_strategy(app, db, logger_handler)
 
             logger_handler.logger.info("QR Attendance Management System started successfully")
 
@@ -371,10 +335,9 @@ if __name__ == '__main__':
             print(f"❌ Application startup failed: {e}")
             raise
 
-    from config import Config as _Cfg
     app.run(
         debug=_Cfg.DEBUG,
         host=_Cfg.FLASK_HOST,
         port=_Cfg.FLASK_PORT,
         threaded=_Cfg.THREADED
-    )
\ No newline at end of file
+    )
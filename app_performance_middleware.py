@@ -2,7 +2,7 @@
 # Advanced performance middleware for QR Attendance System
 
 from functools import wraps
-from flask import request, g, jsonify, current_app
+from flask import request, g, jsonify, current_app, session
 import time
 import threading
 import queue
@@ -12,6 +12,13 @@ import gc
 import psutil
 import os
 
+import metrics
+from query_profiler import current_request_query_count
+from rate_limiter import get_rate_limiter
+
+# Endpoints hit by employees scanning QR codes (budgeted per IP, employee and QR)
+SCAN_ENDPOINTS = ('qr_codes.qr_destination', 'qr_codes.qr_checkin', 'qr_codes.qr_get_locations')
+
 class PerformanceMonitor:
     """
     Advanced performance monitoring and optimization middleware
@@ -28,8 +35,9 @@ class PerformanceMonitor:
         self.error_rates = defaultdict(int)
         self.endpoint_stats = defaultdict(lambda: {'count': 0, 'total_time': 0, 'errors': 0})
         
-        # Rate limiting storage
-        self.rate_limit_storage = defaultdict(lambda: {'requests': deque(), 'blocked_until': None})
+        # Rate limiting (backend + budgets come from rate_limiter.get_rate_limiter)
+        self.rate_limiter = None
+        self.rate_limit_budgets = {}
         
         # Background task queue
         self.task_queue = queue.Queue()
@@ -43,6 +51,11 @@ class PerformanceMonitor:
         self.app = app
         self.db = db
         self.logger_handler = logger_handler
+        self.rate_limiter, self.rate_limit_budgets = get_rate_limiter(app)
+        if self.rate_limiter.backend == 'memory':
+            logger_handler.logger.warning(
+                "RATE_LIMIT_BACKEND=memory keeps budgets per process; use sqlite with several workers"
+            )
         
         # Register before/after request handlers
         app.before_request(self.before_request)
@@ -60,11 +73,16 @@ class PerformanceMonitor:
         g.request_id = f"{int(time.time())}-{threading.get_ident()}"
         
         # Rate limiting check
-        if self.is_rate_limited():
-            return jsonify({
+        limited = self.is_rate_limited()
+        if limited:
+            retry_after = max(1, int(round(limited.retry_after)))
+            response = jsonify({
                 'error': 'Rate limit exceeded',
-                'retry_after': 60
-            }), 429
+                'retry_after': retry_after
+            })
+            response.status_code = 429
+            response.headers['Retry-After'] = str(retry_after)
+            return response
         
         # Memory usage monitoring
         self.monitor_memory_usage()
@@ -107,32 +125,43 @@ class PerformanceMonitor:
             self.endpoint_stats[endpoint]['errors'] += 1
             self.error_rates[status_code] += 1
     
-    def is_rate_limited(self):
-        """Check if current request should be rate limited"""
+    def rate_limit_keys(self):
+        """(budget name, key) pairs the current request is charged against"""
         client_ip = request.environ.get('REMOTE_ADDR', 'unknown')
-        current_time = time.time()
-        
-        # Clean up old requests
-        client_data = self.rate_limit_storage[client_ip]
-        client_data['requests'] = deque([
-            req_time for req_time in client_data['requests'] 
-            if current_time - req_time < 60  # 1 minute window
-        ], maxlen=100)
-        
-        # Check if currently blocked
-        if client_data['blocked_until'] and current_time < client_data['blocked_until']:
-            return True
-        
-        # Add current request
-        client_data['requests'].append(current_time)
-        
-        # Check rate limit (100 requests per minute)
-        if len(client_data['requests']) > 100:
-            client_data['blocked_until'] = current_time + 300  # Block for 5 minutes
-            self.logger_handler.logger.warning(f"Rate limit exceeded for IP: {client_ip}")
-            return True
+        if request.endpoint in SCAN_ENDPOINTS:
+            keys = [('scan_ip', f"ip:{client_ip}")]
+            qr_url = (request.view_args or {}).get('qr_url')
+            if qr_url:
+                keys.append(('scan_qr', f"qr:{qr_url}"))
+            employee_id = request.form.get('employee_id', '').strip() if request.method == 'POST' else ''
+            if employee_id:
+                keys.append(('scan_employee', f"emp:{employee_id}"))
+            return keys
+        if request.blueprint == 'admin' or session.get('role') == 'admin':
+            return [('admin', f"ip:{client_ip}")]
+        return [('default', f"ip:{client_ip}")]
+    
+    def is_rate_limited(self):
+        """
+        Check if current request should be rate limited.
         
-        return False
+        Returns the denying RateLimitResult (truthy) or None.  Limiter
+        backend errors fail open so a locked SQLite file never blocks traffic.
+        """
+        for budget_name, key in self.rate_limit_keys():
+            budget = self.rate_limit_budgets[budget_name]
+            try:
+                result = self.rate_limiter.hit(f"{budget_name}:{key}", budget)
+            except Exception as e:
+                self.logger_handler.logger.warning(f"Rate limiter unavailable ({budget_name}): {e}")
+                return None
+            if not result.allowed:
+                self.logger_handler.logger.warning(
+                    f"Rate limit exceeded for {key} (budget {budget_name}: "
+                    f"{budget.limit}/{int(budget.window)}s)"
+                )
+                return result
+        return None
     
     def monitor_memory_usage(self):
         """Monitor application memory usage"""
@@ -217,14 +246,6 @@ class PerformanceMonitor:
                 if query['timestamp'] > cutoff_time
             ], maxlen=100)
             
-            # Clean rate limit storage
-            current_time = time.time()
-            for ip, data in list(self.rate_limit_storage.items()):
-                if not data['requests'] and (
-                    not data['blocked_until'] or current_time > data['blocked_until']
-                ):
-                    del self.rate_limit_storage[ip]
-            
             # Force garbage collection
             gc.collect()
             
@@ -240,6 +261,10 @@ class PerformanceMonitor:
         def performance_stats():
             """Get current performance statistics"""
             try:
+                # Admin only endpoint
+                if not session.get('user_id') or session.get('role') != 'admin':
+                    return jsonify({'error': 'Access denied'}), 403
+                
                 # Calculate average response times
                 recent_requests = [
                     req for req in self.request_times 
@@ -270,7 +295,10 @@ class PerformanceMonitor:
                     'slow_requests': len(self.slow_queries),
                     'memory_usage_mb': round(memory_info.rss / 1024 / 1024, 1),
                     'endpoint_performance': endpoint_performance,
-                    'error_rates': dict(self.error_rates)
+                    'error_rates': dict(self.error_rates),
+                    'rate_limiter': self.rate_limiter.stats(),
+                    # The fields above are this worker only; this one covers every worker
+                    'all_workers': metrics.endpoint_summary(metrics.collect())
                 })
                 
             except Exception as e:
@@ -281,6 +309,10 @@ class PerformanceMonitor:
         def slow_requests():
             """Get recent slow requests for analysis"""
             try:
+                # Admin only endpoint
+                if not session.get('user_id') or session.get('role') != 'admin':
+                    return jsonify({'error': 'Access denied'}), 403
+                
                 slow_request_list = [
                     {
                         'endpoint': req['endpoint'],
@@ -333,14 +365,16 @@ def optimize_database_queries():
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Enable query logging for this function
+            # Statement count comes from query_profiler's per-request counters
             query_start = time.time()
+            queries_before = current_request_query_count()
             
             result = func(*args, **kwargs)
             
             query_time = time.time() - query_start
             if query_time > 0.5:  # Queries taking more than 500ms
-                print(f"🐌 Slow query in {func.__name__}: {query_time:.3f}s")
+                query_count = current_request_query_count() - queries_before
+                print(f"🐌 Slow query in {func.__name__}: {query_time:.3f}s ({query_count} statements)")
             
             return result
         return wrapper
@@ -55,6 +55,76 @@ class Config:
     )
     SESSION_COOKIE_SAMESITE = os.environ.get('SESSION_COOKIE_SAMESITE', 'Lax')
 
+    # ------------------------------------------------------------------ #
+    # Rate limiting (see rate_limiter.py)
+    # ------------------------------------------------------------------ #
+    # 'sqlite' = shared by all workers on the host; 'memory' = per-process (single worker only)
+    RATE_LIMIT_BACKEND       = os.environ.get('RATE_LIMIT_BACKEND', 'sqlite')
+    RATE_LIMIT_SQLITE_PATH   = os.environ.get('RATE_LIMIT_SQLITE_PATH', '')  # default: UPLOAD_FOLDER/rate_limits.sqlite3
+    RATE_LIMIT_BLOCK_SECONDS = int(os.environ.get('RATE_LIMIT_BLOCK_SECONDS', '300'))  # per-IP budgets only
+    # Per-budget overrides as "<limit>/<window seconds>", e.g. RATE_LIMIT_SCAN_EMPLOYEE=10/60
+    RATE_LIMITS = {
+        name: os.environ[f'RATE_LIMIT_{name.upper()}']
+        for name in ('default', 'admin', 'scan_ip', 'scan_employee', 'scan_qr', 'auth')
+        if os.environ.get(f'RATE_LIMIT_{name.upper()}')
+    }
+    # Reverse proxies in front of the app that append X-Forwarded-For; without
+    # this, per-IP budgets behind a proxy all key on the proxy's address
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', '0'))
+
+    # ------------------------------------------------------------------ #
+    # Metrics (see metrics.py; scraped from /metrics)
+    # ------------------------------------------------------------------ #
+    METRICS_ENABLED        = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_DIR            = os.environ.get('METRICS_DIR', '')  # default: UPLOAD_FOLDER/metrics
+    METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', '5'))
+    METRICS_TOKEN          = os.environ.get('METRICS_TOKEN', '')  # "Authorization: Bearer <token>"; unset = loopback scrapes only
+
+    # ------------------------------------------------------------------ #
+    # Query profiling (see query_profiler.py)
+    # ------------------------------------------------------------------ #
+    DB_SLOW_QUERY_MS        = int(os.environ.get('DB_SLOW_QUERY_MS', '200'))
+    DB_N_PLUS_ONE_THRESHOLD = int(os.environ.get('DB_N_PLUS_ONE_THRESHOLD', '10'))  # same statement > N times per request
+    DB_SLOW_QUERY_LOG_SIZE  = int(os.environ.get('DB_SLOW_QUERY_LOG_SIZE', '100'))
+    DB_QUERY_HEADERS        = os.environ.get('DB_QUERY_HEADERS', 'false').lower() == 'true'  # always on in debug
+
+    # ------------------------------------------------------------------ #
+    # Sampling profiler (see request_profiler.py) - off unless enabled
+    # ------------------------------------------------------------------ #
+    PROFILING_ENABLED         = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_ENDPOINTS       = [
+        e.strip() for e in os.environ.get(
+            'PROFILING_ENDPOINTS',
+            'attendance.attendance_report,time_attendance.export_time_attendance,payroll.payroll_dashboard'
+        ).split(',') if e.strip()
+    ]
+    PROFILING_SAMPLE_RATE     = float(os.environ.get('PROFILING_SAMPLE_RATE', '0.1'))
+    PROFILING_INTERVAL_MS     = float(os.environ.get('PROFILING_INTERVAL_MS', '5'))
+    PROFILING_MIN_DURATION_MS = int(os.environ.get('PROFILING_MIN_DURATION_MS', '500'))
+    PROFILING_KEEP            = int(os.environ.get('PROFILING_KEEP', '50'))
+    PROFILING_DIR             = os.environ.get('PROFILING_DIR', '')  # default: UPLOAD_FOLDER/profiles
+
+    # ------------------------------------------------------------------ #
+    # Session security tokens (see session_token_store.py)
+    # ------------------------------------------------------------------ #
+    SESSION_TOKEN_TTL             = int(os.environ.get('SESSION_TOKEN_TTL', '3600'))
+    SESSION_TOKEN_CACHE_SIZE      = int(os.environ.get('SESSION_TOKEN_CACHE_SIZE', '10000'))
+    # How long a worker trusts its cached copy before re-reading the table
+    # (upper bound on how long a logout takes to reach other workers)
+    SESSION_TOKEN_RECHECK_SECONDS = int(os.environ.get('SESSION_TOKEN_RECHECK_SECONDS', '30'))
+
+    # ------------------------------------------------------------------ #
+    # Request inspection (advanced_security_middleware), run on every
+    # request by create_app(); matching requests get a 403
+    # ------------------------------------------------------------------ #
+    SECURITY_INSPECTION_ENABLED      = os.environ.get('SECURITY_INSPECTION_ENABLED', 'true').lower() == 'true'
+    SECURITY_INSPECT_MAX_FIELD_BYTES = int(os.environ.get('SECURITY_INSPECT_MAX_FIELD_BYTES', '4096'))
+    SECURITY_INSPECT_SKIP_FIELDS     = tuple(
+        f.strip() for f in os.environ.get(
+            'SECURITY_INSPECT_SKIP_FIELDS', 'verification_photo,photo,image,signature'
+        ).split(',') if f.strip()
+    )
+
     # ------------------------------------------------------------------ #
     # Application identity
     # ------------------------------------------------------------------ #
@@ -66,6 +136,84 @@ class Config:
     # ------------------------------------------------------------------ #
     UPLOAD_FOLDER   = os.environ.get('UPLOAD_FOLDER', '/tmp')
 
+    # ------------------------------------------------------------------ #
+    # Excel exports
+    # ------------------------------------------------------------------ #
+    # Stream TA exports through a write-only workbook spooled to disk
+    EXCEL_EXPORT_STREAMING = (
+        os.environ.get('EXCEL_EXPORT_STREAMING', 'true').lower() == 'true'
+    )
+    # Background export jobs (see export_jobs.py)
+    EXPORT_JOB_DIR        = os.environ.get('EXPORT_JOB_DIR', '')  # default: UPLOAD_FOLDER/export_jobs
+    EXPORT_JOB_WORKERS    = int(os.environ.get('EXPORT_JOB_WORKERS', '2'))
+    EXPORT_JOB_DEDUPE_TTL = int(os.environ.get('EXPORT_JOB_DEDUPE_TTL', '600'))    # seconds
+    EXPORT_JOB_RETENTION  = int(os.environ.get('EXPORT_JOB_RETENTION', '3600'))   # seconds
+    EXPORT_JOB_TIMEOUT    = int(os.environ.get('EXPORT_JOB_TIMEOUT', '1800'))     # seconds
+    # Export result cache keyed by params + role + data fingerprint (see export_cache.py)
+    EXPORT_CACHE_ENABLED     = os.environ.get('EXPORT_CACHE_ENABLED', 'true').lower() == 'true'
+    EXPORT_CACHE_DIR         = os.environ.get('EXPORT_CACHE_DIR', '')  # default: UPLOAD_FOLDER/export_cache
+    EXPORT_CACHE_TTL         = int(os.environ.get('EXPORT_CACHE_TTL', '86400'))   # seconds
+    EXPORT_CACHE_MAX_ENTRIES = int(os.environ.get('EXPORT_CACHE_MAX_ENTRIES', '200'))
+
+    # ------------------------------------------------------------------ #
+    # Dashboard stats (see dashboard_stats.py)
+    # ------------------------------------------------------------------ #
+    DASHBOARD_STATS_ENABLED = os.environ.get('DASHBOARD_STATS_ENABLED', 'true').lower() == 'true'
+    DASHBOARD_STATS_REFRESH_SECONDS      = float(os.environ.get('DASHBOARD_STATS_REFRESH_SECONDS', '5'))
+    DASHBOARD_STATS_SLOW_REFRESH_SECONDS = float(os.environ.get('DASHBOARD_STATS_SLOW_REFRESH_SECONDS', '600'))
+
+    # Realtime check-in feed (see realtime_feed.py)
+    REALTIME_FEED_ENABLED       = os.environ.get('REALTIME_FEED_ENABLED', 'true').lower() == 'true'
+    REALTIME_POLL_INTERVAL      = float(os.environ.get('REALTIME_POLL_INTERVAL', '0.5'))       # seconds
+    REALTIME_EVENT_RETENTION    = int(os.environ.get('REALTIME_EVENT_RETENTION', '3600'))      # seconds
+    REALTIME_STREAM_MAX_SECONDS = int(os.environ.get('REALTIME_STREAM_MAX_SECONDS', '300'))
+    REALTIME_HEARTBEAT_SECONDS  = int(os.environ.get('REALTIME_HEARTBEAT_SECONDS', '15'))
+    REALTIME_QUEUE_SIZE         = int(os.environ.get('REALTIME_QUEUE_SIZE', '100'))
+    REALTIME_REORDER_WINDOW     = float(os.environ.get('REALTIME_REORDER_WINDOW', '5'))        # seconds re-read for late commits
+
+    # ------------------------------------------------------------------ #
+    # Background jobs (see job_scheduler.py)
+    # ------------------------------------------------------------------ #
+    SCHEDULER_ENABLED        = os.environ.get('SCHEDULER_ENABLED', 'true').lower() == 'true'
+    SCHEDULER_POLL_SECONDS   = float(os.environ.get('SCHEDULER_POLL_SECONDS', '30'))
+    SCHEDULER_JITTER_SECONDS = float(os.environ.get('SCHEDULER_JITTER_SECONDS', '60'))
+    SCHEDULER_LOCK_FILE      = os.environ.get('SCHEDULER_LOCK_FILE', '')  # default: UPLOAD_FOLDER/scheduler.lock
+    # Job intervals; 0 disables a job
+    EMPLOYEE_SYNC_INTERVAL_MINUTES = float(os.environ.get('EMPLOYEE_SYNC_INTERVAL_MINUTES', '0'))
+    LOG_RETENTION_INTERVAL_HOURS   = float(os.environ.get('LOG_RETENTION_INTERVAL_HOURS', '24'))
+    LOG_RETENTION_DAYS             = int(os.environ.get('LOG_RETENTION_DAYS', '90'))
+    LOG_STATS_ROLLUP_MINUTES       = float(os.environ.get('LOG_STATS_ROLLUP_MINUTES', '5'))   # log_stats_hourly
+    TA_ARCHIVE_INTERVAL_HOURS      = float(os.environ.get('TA_ARCHIVE_INTERVAL_HOURS', '24'))
+    TA_ARCHIVE_DAYS                = int(os.environ.get('TA_ARCHIVE_DAYS', '0'))   # archive TA rows older than this; 0 = off
+    DASHBOARD_STATS_REBUILD_HOURS  = float(os.environ.get('DASHBOARD_STATS_REBUILD_HOURS', '24'))
+
+    # Retention purges (see utils/chunked_purge.py)
+    PURGE_BATCH_SIZE          = int(os.environ.get('PURGE_BATCH_SIZE', '5000'))         # keys per chunk / transaction
+    PURGE_SLEEP_SECONDS       = float(os.environ.get('PURGE_SLEEP_SECONDS', '0.05'))    # pause between chunks
+    PURGE_REQUEST_MAX_SECONDS = float(os.environ.get('PURGE_REQUEST_MAX_SECONDS', '20'))  # per admin API call
+
+    # Monthly log_events partitions (see log_partitions.py; MySQL only)
+    LOG_PARTITIONING                = os.environ.get('LOG_PARTITIONING', 'false').lower() == 'true'
+    LOG_PARTITION_MAINTENANCE_HOURS = float(os.environ.get('LOG_PARTITION_MAINTENANCE_HOURS', '24'))
+    LOG_PARTITION_MONTHS_AHEAD      = int(os.environ.get('LOG_PARTITION_MONTHS_AHEAD', '3'))
+    LOG_PARTITION_RETENTION_MONTHS  = int(os.environ.get('LOG_PARTITION_RETENTION_MONTHS', '12'))  # 0 = keep all
+
+    # Time attendance archive (see ta_archive.py; TA_ARCHIVE_DAYS turns it on)
+    TA_ARCHIVE_TARGET       = os.environ.get('TA_ARCHIVE_TARGET', 'table')    # 'table' or 'parquet'
+    TA_ARCHIVE_PARQUET_DIR  = os.environ.get('TA_ARCHIVE_PARQUET_DIR', '')    # default: UPLOAD_FOLDER/ta_archive
+    TA_ARCHIVE_BATCH_SIZE   = int(os.environ.get('TA_ARCHIVE_BATCH_SIZE', '2000'))        # rows per chunk / transaction
+    TA_ARCHIVE_SLEEP_RATIO  = float(os.environ.get('TA_ARCHIVE_SLEEP_RATIO', '0.5'))      # pause = ratio x chunk time
+    TA_ARCHIVE_MAX_SECONDS  = float(os.environ.get('TA_ARCHIVE_MAX_SECONDS', '1800'))     # per run, resumes next run; 0 = no limit
+    ARCHIVE_REPLICA_URLS    = os.environ.get('ARCHIVE_REPLICA_URLS', '')      # comma-separated replica DSNs to watch
+    ARCHIVE_MAX_REPLICA_LAG = float(os.environ.get('ARCHIVE_MAX_REPLICA_LAG', '10'))      # seconds
+
+    # ------------------------------------------------------------------ #
+    # Payroll
+    # ------------------------------------------------------------------ #
+    # Per-period miss punch index (see miss_punch_index.py)
+    MISS_PUNCH_INDEX_DIR = os.environ.get('MISS_PUNCH_INDEX_DIR', '')  # default: UPLOAD_FOLDER/miss_punch_index
+    MISS_PUNCH_INDEX_TTL = int(os.environ.get('MISS_PUNCH_INDEX_TTL', '86400'))   # seconds
+
     # ------------------------------------------------------------------ #
     # Photo verification
     # ------------------------------------------------------------------ #
@@ -91,6 +239,12 @@ class Config:
     FLASK_PORT  = int(os.environ.get('FLASK_PORT', '5000'))
     THREADED    = os.environ.get('THREADED', 'True').lower() == 'true'
 
+    # ------------------------------------------------------------------ #
+    # Startup (see db_migrations.py)
+    # ------------------------------------------------------------------ #
+    # Let `python app.py` apply pending migrations; workers never do
+    DB_MIGRATE_ON_START = os.environ.get('DB_MIGRATE_ON_START', 'true').lower() == 'true'
+
     # ------------------------------------------------------------------ #
     # Default admin (used only on first boot)
     # ------------------------------------------------------------------ #
@@ -0,0 +1,409 @@
+"""
+Dashboard Stats
+===============
+
+Pre-aggregated check-in counters for the dashboard polling APIs.
+
+``/api/dashboard/stats``, ``/api/dashboard/realtime`` and
+``/api/attendance/stats`` used to run their COUNT / COUNT(DISTINCT) queries
+over ``attendance_data`` and ``qr_codes`` on every poll of every open
+dashboard.  They now read a few small summary tables instead:
+
+    dashboard_daily_stats   checkins per (day, project, location, hour)
+    dashboard_day_totals    checkins and unique employees per day
+    dashboard_stats_state   named JSON payloads (QR/project totals, recent
+                            activity, location totals) + refresh timestamps
+
+Each worker runs one daemon thread that wakes every
+``DASHBOARD_STATS_REFRESH_SECONDS``.  Workers compete for the ``refresh``
+row with a compare-and-set UPDATE, so across all gunicorn workers exactly
+one of them recomputes today / yesterday and the small payloads per
+interval.  Every ``DASHBOARD_STATS_SLOW_REFRESH_SECONDS`` the winner also
+recomputes the last 31 days (catching rows written outside the ORM, e.g.
+cascade deletes) and the all-time location totals.  Older days are
+recomputed when an AttendanceData row on that day is committed through
+the ORM.
+
+Readers cache the assembled snapshot in-process for the refresh interval,
+so a dashboard poll is normally a dict lookup.  ``get_dashboard_stats()``
+returns None until the first refresh has completed (or when disabled) and
+the APIs then fall back to their live queries.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import (Column, Date, Double, Integer, MetaData, String, Table, Text,
+                        delete, distinct, event, func, insert, inspect, literal_column,
+                        select, update)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+_metadata = MetaData()
+
+daily_stats_table = Table(
+    'dashboard_daily_stats', _metadata,
+    Column('stat_date', Date, primary_key=True),
+    Column('project_id', Integer, primary_key=True, autoincrement=False),  # 0 = no project
+    Column('location_name', String(100), primary_key=True),
+    Column('checkin_hour', Integer, primary_key=True, autoincrement=False),
+    Column('checkins', Integer, nullable=False),
+)
+
+day_totals_table = Table(
+    'dashboard_day_totals', _metadata,
+    Column('stat_date', Date, primary_key=True),
+    Column('checkins', Integer, nullable=False),
+    Column('unique_employees', Integer, nullable=False),
+)
+
+state_table = Table(
+    'dashboard_stats_state', _metadata,
+    Column('name', String(50), primary_key=True),
+    Column('payload', Text),
+    Column('refreshed_at', Double, nullable=False, default=0),
+)
+
+# Days recomputed per transaction during a rebuild
+_DAY_CHUNK = 31
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    return value if isinstance(value, date) else None
+
+
+class DashboardStatsAggregator:
+    """Keeps the dashboard summary tables fresh and serves snapshots from them."""
+
+    def __init__(self, app=None, db=None, logger_handler=None):
+        self.db = db
+        self.logger_handler = logger_handler
+        self.enabled = False
+        self.refresh_seconds = 5
+        self.slow_refresh_seconds = 600
+        self._tables_ready = False
+        self._dirty = set()              # older days touched by ORM commits in this process
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._snapshot_at = 0.0
+        self._thread_pid = None
+        if app is not None:
+            self.init_app(app, db, logger_handler)
+
+    def init_app(self, app, db=None, logger_handler=None):
+        self.db = db or self.db
+        self.logger_handler = logger_handler or self.logger_handler
+        self.enabled = app.config.get('DASHBOARD_STATS_ENABLED', True)
+        self.refresh_seconds = app.config.get('DASHBOARD_STATS_REFRESH_SECONDS', 5)
+        self.slow_refresh_seconds = app.config.get('DASHBOARD_STATS_SLOW_REFRESH_SECONDS', 600)
+        app.extensions['dashboard_stats'] = self
+        if not self.enabled:
+            return
+
+        from models.attendance import AttendanceData
+        self._attendance_model = AttendanceData
+        event.listen(Session, 'after_flush', self._collect_dates)
+        event.listen(Session, 'after_commit', self._commit_dates)
+        event.listen(Session, 'after_rollback', self._discard_dates)
+
+        # The refresher thread is started lazily in each worker (after fork)
+        @app.before_request
+        def _start_dashboard_stats_refresher():
+            if self._thread_pid != os.getpid():
+                self._start_thread(app)
+
+    # ------------------------------------------------------------------
+    # Storage helpers
+    # ------------------------------------------------------------------
+
+    def _engine(self):
+        engine = self.db.engine
+        if not self._tables_ready:
+            _metadata.create_all(bind=engine, checkfirst=True)
+            self._tables_ready = True
+        return engine
+
+    def _claim(self, name, interval, now):
+        """Compare-and-set the *name* row's timestamp; True for the one worker that wins."""
+        with self._engine().begin() as conn:
+            claimed = conn.execute(
+                update(state_table)
+                .where(state_table.c.name == name,
+                       state_table.c.refreshed_at <= now - interval * 0.8)
+                .values(refreshed_at=now)
+            ).rowcount
+        if claimed:
+            return True
+        try:
+            with self._engine().begin() as conn:
+                conn.execute(insert(state_table).values(name=name, refreshed_at=now))
+            return True
+        except IntegrityError:
+            return False
+
+    def _put_state(self, conn, name, payload, now):
+        data = json.dumps(payload, default=str)
+        if not conn.execute(
+            update(state_table).where(state_table.c.name == name)
+            .values(payload=data, refreshed_at=now)
+        ).rowcount:
+            conn.execute(insert(state_table).values(name=name, payload=data, refreshed_at=now))
+
+    @staticmethod
+    def _recent_days(count):
+        """The last *count* days by both the local and the UTC calendar."""
+        days = set()
+        for today in (date.today(), datetime.utcnow().date()):
+            days.update(today - timedelta(days=i) for i in range(count))
+        return days
+
+    # ------------------------------------------------------------------
+    # Aggregation
+    # ------------------------------------------------------------------
+
+    def recompute_days(self, days):
+        """Rebuild the summary rows of *days* from attendance_data."""
+        from models.qrcode import QRCode
+
+        ad = self._attendance_model.__table__
+        qc = QRCode.__table__
+        project = func.coalesce(qc.c.project_id, literal_column('0'))
+        location = func.coalesce(ad.c.location_name, literal_column("''"))
+        hour = func.extract('hour', ad.c.check_in_time)
+
+        days = sorted(d for d in days if d is not None)
+        for start in range(0, len(days), _DAY_CHUNK):
+            chunk = days[start:start + _DAY_CHUNK]
+            with self._engine().begin() as conn:
+                conn.execute(delete(daily_stats_table).where(daily_stats_table.c.stat_date.in_(chunk)))
+                conn.execute(delete(day_totals_table).where(day_totals_table.c.stat_date.in_(chunk)))
+                conn.execute(insert(daily_stats_table).from_select(
+                    ['stat_date', 'project_id', 'location_name', 'checkin_hour', 'checkins'],
+                    select(ad.c.check_in_date, project, location, hour, func.count())
+                    .select_from(ad.outerjoin(qc, ad.c.qr_code_id == qc.c.id))
+                    .where(ad.c.check_in_date.in_(chunk))
+                    .group_by(ad.c.check_in_date, project, location, hour)
+                ))
+                conn.execute(insert(day_totals_table).from_select(
+                    ['stat_date', 'checkins', 'unique_employees'],
+                    select(ad.c.check_in_date, func.count(), func.count(distinct(ad.c.employee_id)))
+                    .where(ad.c.check_in_date.in_(chunk))
+                    .group_by(ad.c.check_in_date)
+                ))
+        with self._lock:
+            self._snapshot_at = 0.0
+
+    def rebuild(self):
+        """Recompute every day that has check-ins (first run, or on demand)."""
+        ad = self._attendance_model.__table__
+        with self._engine().connect() as conn:
+            days = [row[0] for row in conn.execute(select(distinct(ad.c.check_in_date)))]
+        with self._engine().begin() as conn:
+            conn.execute(delete(daily_stats_table).where(daily_stats_table.c.stat_date.notin_(days)))
+            conn.execute(delete(day_totals_table).where(day_totals_table.c.stat_date.notin_(days)))
+        self.recompute_days(days)
+        return len(days)
+
+    def _refresh_payloads(self, now):
+        """QR / project totals and the recent activity feed (cheap, every interval)."""
+        from models.project import Project
+        from models.qrcode import QRCode
+
+        ad = self._attendance_model.__table__
+        qc = QRCode.__table__
+        last_month = datetime.utcnow() - timedelta(days=30)
+        with self._engine().begin() as conn:
+            totals = {
+                'total_qr_codes': conn.execute(
+                    select(func.count()).select_from(qc).where(qc.c.active_status == True)
+                ).scalar(),
+                'old_qr_codes': conn.execute(
+                    select(func.count()).select_from(qc)
+                    .where(qc.c.active_status == True, qc.c.created_date <= last_month)
+                ).scalar(),
+                'active_projects': conn.execute(
+                    select(func.count()).select_from(Project.__table__)
+                    .where(Project.__table__.c.active_status == True)
+                ).scalar(),
+            }
+            recent = conn.execute(
+                select(ad.c.employee_id, ad.c.location_name, ad.c.check_in_time, ad.c.check_in_date)
+                .order_by(ad.c.check_in_date.desc(), ad.c.check_in_time.desc())
+                .limit(10)
+            ).fetchall()
+            self._put_state(conn, 'totals', totals, now)
+            self._put_state(conn, 'recent_activity', [
+                {
+                    'employee_id': row.employee_id,
+                    'location': row.location_name,
+                    'time': row.check_in_time.strftime('%H:%M'),
+                    'date': row.check_in_date.strftime('%Y-%m-%d')
+                }
+                for row in recent
+            ], now)
+
+    def _refresh_locations(self, now):
+        """All-time location totals (distinct counts are not additive, so kept separately)."""
+        ad = self._attendance_model.__table__
+        with self._engine().begin() as conn:
+            unique_locations = conn.execute(
+                select(func.count(distinct(ad.c.location_name)))
+            ).scalar()
+            top = conn.execute(
+                select(ad.c.location_name, func.count().label('checkins'),
+                       func.count(distinct(ad.c.employee_id)).label('employees'))
+                .group_by(ad.c.location_name)
+                .order_by(func.count().desc())
+                .limit(10)
+            ).fetchall()
+            self._put_state(conn, 'locations', {
+                'unique_locations': unique_locations,
+                'top': [{'location': row[0], 'checkins': row[1], 'employees': row[2]} for row in top]
+            }, now)
+
+    def tick(self):
+        """One refresh round; the global part runs in one worker per interval."""
+        now = time.time()
+        with self._lock:
+            days, self._dirty = self._dirty, set()
+
+        if self._claim('refresh', self.refresh_seconds, now):
+            if self._claim('slow_refresh', self.slow_refresh_seconds, now):
+                with self._engine().connect() as conn:
+                    bootstrapped = conn.execute(
+                        select(state_table.c.name).where(state_table.c.name == 'locations')
+                    ).first() is not None
+                if not bootstrapped:
+                    count = self.rebuild()
+                    if self.logger_handler:
+                        self.logger_handler.logger.info(f"Dashboard stats rebuilt for {count} day(s)")
+                days |= self._recent_days(31)
+                self._refresh_locations(now)
+            days |= self._recent_days(2)
+            self._refresh_payloads(now)
+
+        if days:
+            self.recompute_days(days)
+
+    def _start_thread(self, app):
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+        threading.Thread(target=self._run, args=(app,), name='dashboard-stats', daemon=True).start()
+
+    def _run(self, app):
+        while True:
+            try:
+                with app.app_context():
+                    self.tick()
+            except Exception as e:
+                if self.logger_handler:
+                    self.logger_handler.logger.warning(f"Dashboard stats refresh failed: {e}")
+            time.sleep(self.refresh_seconds)
+
+    # ------------------------------------------------------------------
+    # ORM change tracking (older days only; recent days refresh anyway)
+    # ------------------------------------------------------------------
+
+    def _collect_dates(self, session, flush_context):
+        dates = session.info.setdefault('dashboard_stats_dates', set())
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, self._attendance_model):
+                dates.add(_as_date(obj.check_in_date))
+                dates.update(_as_date(d) for d in inspect(obj).attrs.check_in_date.history.deleted)
+
+    def _commit_dates(self, session):
+        dates = session.info.pop('dashboard_stats_dates', None)
+        if dates:
+            with self._lock:
+                self._dirty |= dates - self._recent_days(2) - {None}
+
+    def _discard_dates(self, session):
+        session.info.pop('dashboard_stats_dates', None)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def snapshot(self):
+        """Assembled stats for the dashboard APIs, or None before the first refresh."""
+        now = time.time()
+        with self._lock:
+            if self._snapshot is not None and now - self._snapshot_at < self.refresh_seconds:
+                return self._snapshot
+
+        today = datetime.utcnow().date()
+        with self._engine().connect() as conn:
+            state = {
+                row.name: (json.loads(row.payload), row.refreshed_at)
+                for row in conn.execute(select(state_table).where(state_table.c.payload.isnot(None)))
+            }
+            if not {'totals', 'recent_activity', 'locations'} <= set(state):
+                return None
+            day_totals = conn.execute(
+                select(day_totals_table)
+                .where(day_totals_table.c.stat_date >= today - timedelta(days=7))
+                .order_by(day_totals_table.c.stat_date.desc())
+            ).fetchall()
+            hourly = conn.execute(
+                select(daily_stats_table.c.checkin_hour, func.sum(daily_stats_table.c.checkins))
+                .where(daily_stats_table.c.stat_date >= today - timedelta(days=30))
+                .group_by(daily_stats_table.c.checkin_hour)
+                .order_by(daily_stats_table.c.checkin_hour)
+            ).fetchall()
+
+        checkins_by_day = {_as_date(row.stat_date): row.checkins for row in day_totals}
+        totals = state['totals'][0]
+        today_checkins = checkins_by_day.get(today, 0)
+        yesterday_checkins = checkins_by_day.get(today - timedelta(days=1), 0)
+        snapshot = {
+            'refreshed_at': datetime.utcfromtimestamp(state['totals'][1]).isoformat(),
+            'dashboard': {
+                'total_qr_codes': totals['total_qr_codes'],
+                'today_checkins': today_checkins,
+                'active_projects': totals['active_projects'],
+                'unique_locations': state['locations'][0]['unique_locations'],
+                'qr_change': round(
+                    (totals['total_qr_codes'] - totals['old_qr_codes']) / max(totals['old_qr_codes'], 1) * 100, 1
+                ),
+                'checkin_change': round(
+                    (today_checkins - yesterday_checkins) / max(yesterday_checkins, 1) * 100, 1
+                ),
+            },
+            'recent_activity': state['recent_activity'][0],
+            'daily_stats': [
+                {'date': str(row.stat_date), 'checkins': row.checkins, 'employees': row.unique_employees}
+                for row in day_totals
+            ],
+            'location_stats': state['locations'][0]['top'],
+            'hourly_stats': [{'hour': int(row[0]), 'checkins': int(row[1])} for row in hourly],
+        }
+        with self._lock:
+            self._snapshot, self._snapshot_at = snapshot, now
+        return snapshot
+
+    def invalidate_snapshot(self):
+        """Drop this process's cached snapshot so the next read hits the tables."""
+        with self._lock:
+            self._snapshot, self._snapshot_at = None, 0.0
+
+
+def get_dashboard_stats():
+    """The current stats snapshot, or None when the aggregator is off or not ready."""
+    from flask import current_app
+
+    aggregator = current_app.extensions.get('dashboard_stats')
+    if aggregator is None or not aggregator.enabled:
+        return None
+    try:
+        return aggregator.snapshot()
+    except Exception as e:
+        if aggregator.logger_handler:
+            aggregator.logger_handler.logger.warning(f"Dashboard stats snapshot unavailable: {e}")
+        return None
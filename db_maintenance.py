@@ -18,29 +18,30 @@ def cleanup_data(dry_run=False):
     """Clean up old data from maintenance tables - FIXED VERSION"""
     try:
         from app import app, db
+        from utils.chunked_purge import ChunkedPurge
         
         print("Data Cleanup - Fixed Version")
         print("=" * 35)
         
         with app.app_context():
             # Define cleanup operations
-            # (table_name, date_column, retention_days, description)
+            # (table_name, date_column, retention_days, description, key column)
             tables_to_clean = [
-                ('attendance_audit', 'change_timestamp', 90, 'Audit trail records'),
-                ('attendance_statistics_cache', 'expires_at', 1, 'Expired cache entries'),
-                ('log_events', 'created_timestamp', 180, 'Old system logs')
+                ('attendance_audit', 'change_timestamp', 90, 'Audit trail records', 'audit_id'),
+                ('attendance_statistics_cache', 'expires_at', 1, 'Expired cache entries', 'cache_key'),
+                ('log_events', 'created_timestamp', 180, 'Old system logs', 'id')
             ]
             
             total_records_to_clean = 0
             total_records_cleaned = 0
             
             print(f"Retention policy:")
-            for table, col, days, desc in tables_to_clean:
+            for table, col, days, desc, _ in tables_to_clean:
                 print(f"  - {desc}: {days} days")
             
             print("\nAnalyzing tables...\n")
             
-            for table_name, date_column, retention_days, description in tables_to_clean:
+            for table_name, date_column, retention_days, description, key_column in tables_to_clean:
                 try:
                     # Check if table exists
                     table_check = db.session.execute(text(f"SHOW TABLES LIKE '{table_name}'")).fetchone()
@@ -82,16 +83,20 @@ def cleanup_data(dry_run=False):
                         if dry_run:
                             print(f"  [DRY RUN] Would delete {records_to_clean:,} records")
                         else:
-                            # Perform cleanup - Fixed SQL syntax
-                            delete_query = f"""
-                                DELETE FROM {table_name} 
-                                WHERE {date_column} < :cutoff_date
-                            """
-                            result = db.session.execute(
-                                text(delete_query), 
-                                {'cutoff_date': cutoff_str}
-                            )
-                            actual_deleted = result.rowcount
+                            # Perform cleanup in key-range chunks (one short
+                            # transaction each) instead of one huge DELETE
+                            db.session.commit()
+                            purge = ChunkedPurge(
+                                db, table_name,
+                                where=f"{date_column} < :cutoff_date",
+                                params={'cutoff_date': cutoff_str},
+                                key=key_column,
+                                name=f"maintenance_{table_name}",
+                                batch_size=app.config.get('PURGE_BATCH_SIZE', 5000),
+                                sleep_seconds=app.config.get('PURGE_SLEEP_SECONDS', 0.05),
+                                progress=lambda p: print(f"  ... {p['deleted']:,} deleted (key {p['last_key']} of {p['high_key']})")
+                            ).run()
+                            actual_deleted = purge['deleted']
                             print(f"  [CLEANED] Deleted {actual_deleted:,} records")
                             total_records_cleaned += actual_deleted
                         
@@ -121,8 +126,7 @@ def cleanup_data(dry_run=False):
                     print(f"No records need cleaning")
             else:
                 if total_records_cleaned > 0:
-                    # Commit changes
-                    db.session.commit()
+                    # Each chunk was committed as it went
                     print(f"[CLEANUP COMPLETED]")
                     print(f"Successfully cleaned {total_records_cleaned:,} total records")
                 else:
@@ -0,0 +1,267 @@
+"""
+Database Migrations
+===================
+
+One-shot schema and data maintenance that used to run on every
+``python app.py`` start (``create_tables()``, ``update_existing_qr_codes()``
+and the index DDL / ``SET SESSION`` statements of
+``initialize_performance_optimizations``).
+
+Steps are numbered and recorded in ``schema_migrations`` once they
+succeed, so each runs exactly once per database:
+
+    flask --app app db-upgrade            # apply pending steps
+    flask --app app db-upgrade --status   # list applied / pending steps
+    flask --app app db-upgrade --rerun 0003_backfill_qr_codes
+
+Web workers never run them.  The dev server (``python app.py``) applies
+pending steps when ``DB_MIGRATE_ON_START`` is on, which after the first
+run costs a single SELECT on ``schema_migrations``.
+
+The other standalone scripts in tools/ (migration_*.py) are still run by
+hand; tools/migration_employee_keys.py is step 0007.
+"""
+
+import os
+import time
+from datetime import datetime
+
+import click
+from sqlalchemy import Column, DateTime, Float, MetaData, String, Table, inspect, select
+
+from logger_handler import log_database_operations
+
+_metadata = MetaData()
+
+schema_migrations_table = Table(
+    'schema_migrations', _metadata,
+    Column('version', String(100), primary_key=True),
+    Column('description', String(255)),
+    Column('applied_at', DateTime, nullable=False),
+    Column('duration', Float),
+)
+
+
+# ---------------------------------------------------------------------------
+# Database initialization helpers
+# ---------------------------------------------------------------------------
+
+@log_database_operations('database_initialization')
+def create_tables():
+    """Create database tables and default admin user with logging"""
+    from extensions import db as _db, logger_handler as lh
+    try:
+        _db.create_all()
+        from flask import current_app
+        from models.user import User
+        admin = User.query.filter_by(username='admin').first()
+        if not admin:
+            from config import Config as _Cfg
+            default_password = _Cfg.DEFAULT_ADMIN_PASSWORD
+            admin = User(
+                full_name='System Administrator',
+                email='admin@example.com',
+                username='admin',
+                role='admin'
+            )
+            admin.set_password(default_password)
+            _db.session.add(admin)
+            _db.session.commit()
+            if default_password == 'admin123':
+                print("⚠️  WARNING: Default admin password 'admin123' is in use. "
+                      "Set DEFAULT_ADMIN_PASSWORD in your .env file before going to production.")
+                lh.logger.warning(
+                    "Default admin user created with insecure default password. "
+                    "Set DEFAULT_ADMIN_PASSWORD environment variable."
+                )
+            else:
+                lh.logger.info("Default admin user created during initialization")
+        lh._create_log_table()
+    except Exception as e:
+        lh.log_database_error('database_initialization', e)
+        raise
+
+
+def update_existing_qr_codes():
+    """Update existing QR codes with missing URLs or images (migration 0003).
+
+    Regenerates qr_url slugs without needing a request context.
+    For qr_code_image, constructs the base URL from FLASK_HOST/FLASK_PORT
+    config so this can run safely outside any HTTP request.
+    """
+    from extensions import db as _db, logger_handler as lh
+    from utils.helpers import generate_qr_code, get_qr_styling, generate_qr_url
+    from config import Config as _Cfg
+    try:
+        from sqlalchemy import or_
+        from models.qrcode import QRCode
+        # Only rows that need work; never load every QR image
+        qr_codes = QRCode.query.filter(
+            QRCode.active_status == True,
+            or_(QRCode.qr_url.is_(None), QRCode.qr_url == '',
+                QRCode.qr_code_image.is_(None), QRCode.qr_code_image == '')
+        ).all()
+        if not qr_codes:
+            return
+
+        # Build a base URL that does not require an active request context.
+        host = os.environ.get('FLASK_HOST', '0.0.0.0')
+        # 0.0.0.0 is a bind address, not a reachable hostname — default to localhost
+        if host in ('0.0.0.0', ''):
+            host = 'localhost'
+        port = os.environ.get('FLASK_PORT', '5000')
+        scheme = 'https' if _Cfg.SESSION_COOKIE_SECURE else 'http'
+        base_url = f"{scheme}://{host}:{port}/"
+
+        updated_count = 0
+        for qr_code in qr_codes:
+            if not qr_code.qr_url or not qr_code.qr_code_image:
+                try:
+                    if not qr_code.qr_url:
+                        qr_code.qr_url = generate_qr_url(qr_code.name, qr_code.id)
+                    if not qr_code.qr_code_image:
+                        qr_data = f"{base_url}qr/{qr_code.qr_url}"
+                        styling = get_qr_styling(qr_code)
+                        qr_code.qr_code_image = generate_qr_code(
+                            data=qr_data,
+                            fill_color=styling['fill_color'],
+                            back_color=styling['back_color'],
+                            box_size=styling['box_size'],
+                            border=styling['border'],
+                            error_correction=styling['error_correction']
+                        )
+                    updated_count += 1
+                except Exception as e:
+                    lh.log_flask_error('qr_code_update_error', f"Failed to update QR code {qr_code.id}: {str(e)}")
+                    continue
+        if updated_count > 0:
+            _db.session.commit()
+            lh.logger.info(f"Startup: updated {updated_count} QR codes with missing URLs/images")
+    except Exception as e:
+        lh.log_database_error('update_existing_qr_codes', e)
+
+
+# ---------------------------------------------------------------------------
+# Steps
+# ---------------------------------------------------------------------------
+
+def _create_tables(app, db, logger_handler):
+    create_tables()
+
+
+def _performance_indexes(app, db, logger_handler):
+    from db_performance_optimization import create_advanced_performance_indexes
+    if not create_advanced_performance_indexes(db, logger_handler):
+        raise RuntimeError('performance index creation failed (see log)')
+
+
+def _backfill_qr_codes(app, db, logger_handler):
+    update_existing_qr_codes()
+
+
+def _partition_log_events(app, db, logger_handler):
+    # Off by default; after enabling LOG_PARTITIONING rerun this step
+    if not app.config.get('LOG_PARTITIONING') or db.engine.dialect.name != 'mysql':
+        logger_handler.logger.info("log_events partitioning not enabled (LOG_PARTITIONING / MySQL), skipped")
+        return
+    from log_partitions import convert_table
+    convert_table(db, app.config.get('LOG_PARTITION_MONTHS_AHEAD', 3), logger=logger_handler.logger)
+
+
+def _log_search_index(app, db, logger_handler):
+    from log_search import create_index
+    create_index(db, logger=logger_handler.logger)
+
+
+def _employee_keys(app, db, logger_handler):
+    # The models map base_employee_id / work_type, so ORM queries on
+    # attendance_data and time_attendance fail until this has run
+    from tools.migration_employee_keys import migrate
+    migrate()
+
+
+MIGRATIONS = [
+    ('0001_create_tables', 'Create tables, default admin and log_events', _create_tables),
+    ('0002_performance_indexes', 'Composite indexes for attendance, QR, user and project queries', _performance_indexes),
+    ('0003_backfill_qr_codes', 'Generate missing QR URLs and images', _backfill_qr_codes),
+    ('0005_partition_log_events', 'Partition log_events by month (LOG_PARTITIONING)', _partition_log_events),
+    ('0006_log_search_index', 'FULLTEXT / FTS5 index for the log viewer search', _log_search_index),
+    ('0007_employee_keys', 'Add and backfill base_employee_id / work_type', _employee_keys),
+]
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def applied_versions(db):
+    """{version: applied_at} of recorded steps ({} before the first upgrade)."""
+    if not inspect(db.engine).has_table('schema_migrations'):
+        return {}
+    with db.engine.connect() as conn:
+        return {row.version: row.applied_at for row in conn.execute(select(schema_migrations_table))}
+
+
+def pending_migrations(db):
+    applied = applied_versions(db)
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def run_migrations(app, db, logger_handler, rerun=()):
+    """Apply pending steps (plus *rerun* versions) in order; returns the versions run."""
+    _metadata.create_all(bind=db.engine, checkfirst=True)
+    applied = applied_versions(db)
+    ran = []
+    for version, description, step in MIGRATIONS:
+        if version in applied and version not in rerun:
+            continue
+        logger_handler.logger.info(f"Applying migration {version}: {description}")
+        started = time.perf_counter()
+        step(app, db, logger_handler)
+        duration = round(time.perf_counter() - started, 3)
+        with db.engine.begin() as conn:
+            conn.execute(schema_migrations_table.delete().where(schema_migrations_table.c.version == version))
+            conn.execute(schema_migrations_table.insert().values(
+                version=version, description=description,
+                applied_at=datetime.utcnow(), duration=duration
+            ))
+        logger_handler.logger.info(f"Migration {version} applied in {duration}s")
+        ran.append(version)
+    return ran
+
+
+def register_cli(app, db, logger_handler):
+    """Register ``flask db-upgrade``, ``flask db-maintenance`` and ``flask log-partitions``."""
+    from db_performance_optimization import create_database_maintenance_routine
+    import log_partitions
+
+    @app.cli.command('db-upgrade')
+    @click.option('--status', is_flag=True, help='List applied and pending steps without running anything.')
+    @click.option('--rerun', multiple=True, help='Run an already applied step again (repeatable).')
+    def db_upgrade(status, rerun):
+        """Apply pending database migrations"""
+        known = {m[0] for m in MIGRATIONS}
+        unknown = [v for v in rerun if v not in known]
+        if unknown:
+            raise click.BadParameter(f"unknown migration(s): {', '.join(unknown)}", param_hint='--rerun')
+
+        if status:
+            applied = applied_versions(db)
+            for version, description, _ in MIGRATIONS:
+                mark = f"✅ {applied[version]:%Y-%m-%d %H:%M}" if version in applied else '⏳ pending'
+                click.echo(f"{version:<28} {mark:<22} {description}")
+            return
+
+        try:
+            ran = run_migrations(app, db, logger_handler, rerun=set(rerun))
+        except Exception as e:
+            logger_handler.log_database_error('db_upgrade', e)
+            click.echo(f"❌ Migration failed: {e}")
+            raise SystemExit(1)
+        if ran:
+            click.echo(f"✅ Applied {len(ran)} migration(s): {', '.join(ran)}")
+        else:
+            click.echo("ℹ️  Database is up to date.")
+
+    create_database_maintenance_routine(app, db, logger_handler)
+    log_partitions.register_cli(app, db)
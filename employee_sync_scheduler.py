@@ -5,6 +5,9 @@ Employee Synchronization Scheduler
 
 This script provides automated scheduling for employee synchronization.
 Can be run via cron or as a standalone scheduler with configurable intervals.
+
+The web app can run the same sync itself (see job_scheduler.py, enabled with
+EMPLOYEE_SYNC_INTERVAL_MINUTES); don't run both against the same database.
 """
 
 import os
@@ -52,9 +55,13 @@ class EmployeeSyncScheduler:
             if stats['errors_encountered'] == 0:
                 self.logger.info("Scheduled synchronization completed successfully", {
                     'duration_seconds': (stats['end_time'] - stats['start_time']).total_seconds() if stats['end_time'] and stats['start_time'] else 0,
+                    'sync_mode': stats['sync_mode'],
                     'records_processed': stats['total_remote_records'],
                     'records_inserted': stats['records_inserted'],
-                    'records_deleted': stats['records_deleted']
+                    'records_updated': stats['records_updated'],
+                    'records_deleted': stats['records_deleted'],
+                    'records_unchanged': stats['records_unchanged'],
+                    'timings': stats['timings']
                 })
             else:
                 self.logger.error("Scheduled synchronization completed with errors", None, {
@@ -8,6 +8,12 @@ It replicates data from the remote server to the local application database.
 
 Features:
 - Complete data synchronization from remote to local
+- Remote rows are streamed off a server-side cursor in batches that are
+  written while the next batch is fetched (flat memory)
+- Delta mode (default): diff remote against local by employee id and apply
+  only the inserted, changed and removed rows in batches
+- Swap mode: bulk-load employee_staging, verify row count and checksum,
+  then RENAME TABLE it over employee so readers never see it empty
 - Comprehensive logging for all operations
 - Error handling and rollback mechanisms
 - Configurable connection parameters
@@ -18,11 +24,15 @@ import os
 import sys
 import json
 import time
+import queue
+import itertools
+import threading
+import zlib
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 import pymysql
-from sqlalchemy import create_engine, text, MetaData, Table
+from sqlalchemy import bindparam, create_engine, text, MetaData, Table
 from sqlalchemy.exc import SQLAlchemyError
 import logging
 
@@ -97,21 +107,35 @@ class EmployeeSyncLogger:
             log_entry['data'] = self._serialize_data(data)
         self.logger.warning(json.dumps(log_entry))
 
+class _DuplicateRemoteEmployeeIds(Exception):
+    """Remote ids are not unique, so the delta cannot be keyed by id"""
+
+# Columns compared (and copied) per employee id in delta mode
+SYNC_COLUMNS = ('index', 'firstName', 'lastName', 'title', 'contractId')
+SYNC_BATCH_SIZE = 1000
+# Swap mode loads into STAGING_TABLE, then renames employee -> PREVIOUS_TABLE
+STAGING_TABLE = 'employee_staging'
+PREVIOUS_TABLE = 'employee_previous'
+
 class EmployeeSynchronizer:
     """
     Employee data synchronization service for replicating remote employee data
     """
     
-    def __init__(self, remote_config: Dict, local_config: Dict):
+    def __init__(self, remote_config: Dict, local_config: Dict, sync_mode: str = None):
         """
         Initialize synchronizer with database configurations
         
         Args:
             remote_config: Remote MySQL database configuration
             local_config: Local MySQL database configuration
+            sync_mode: 'delta' (apply only changes), 'full' (replace the
+                table in place) or 'swap' (load a staging table and rename
+                it over employee); defaults to EMPLOYEE_SYNC_MODE, then 'delta'
         """
         self.remote_config = remote_config
         self.local_config = local_config
+        self.sync_mode = (sync_mode or os.getenv('EMPLOYEE_SYNC_MODE', 'delta')).lower()
         self.logger = EmployeeSyncLogger()
         self.remote_engine = None
         self.local_engine = None
@@ -125,7 +149,10 @@ class EmployeeSynchronizer:
             'records_inserted': 0,
             'records_updated': 0,
             'records_deleted': 0,
-            'errors_encountered': 0
+            'records_unchanged': 0,
+            'errors_encountered': 0,
+            'sync_mode': self.sync_mode,
+            'timings': {}
         }
     
     def _create_connection_string(self, config: Dict) -> str:
@@ -198,42 +225,124 @@ class EmployeeSynchronizer:
             self.logger.error("Failed to establish database connections", e)
             return False
     
-    def fetch_remote_employees(self) -> List[Dict]:
+    @staticmethod
+    def _row_to_employee(row) -> Dict:
+        return {
+            'index': row.index,
+            'id': row.id,
+            'firstName': row.firstName,
+            'lastName': row.lastName,
+            'title': row.title,
+            'contractId': row.contractId
+        }
+
+    def iter_remote_employee_batches(self, batch_size: int = SYNC_BATCH_SIZE) -> Iterator[List[Dict]]:
         """
-        Fetch all employee records from remote database
+        Stream remote employee records in batches off a server-side cursor
         
-        Returns:
-            List[Dict]: List of employee records
+        Only one batch is materialized at a time, so memory stays flat
+        regardless of remote headcount.
+        
+        Yields:
+            List[Dict]: Up to batch_size employee records
         """
+        timings = self.sync_stats['timings']
+        timings.setdefault('fetch_remote_seconds', 0.0)
+        self.sync_stats['total_remote_records'] = 0
         try:
             with self.remote_engine.connect() as conn:
-                result = conn.execute(text("""
+                started = time.perf_counter()
+                result = conn.execution_options(stream_results=True, max_row_buffer=batch_size).execute(text("""
                     SELECT `index`, id, firstName, lastName, title, contractId
                     FROM employee
                     ORDER BY `index`
                 """))
+                for partition in result.partitions(batch_size):
+                    batch = [self._row_to_employee(row) for row in partition]
+                    self.sync_stats['total_remote_records'] += len(batch)
+                    timings['fetch_remote_seconds'] = round(
+                        timings['fetch_remote_seconds'] + time.perf_counter() - started, 3
+                    )
+                    yield batch
+                    started = time.perf_counter()
                 
-                employees = []
-                for row in result:
-                    employee = {
-                        'index': row.index,
-                        'id': row.id,
-                        'firstName': row.firstName,
-                        'lastName': row.lastName,
-                        'title': row.title,
-                        'contractId': row.contractId
-                    }
-                    employees.append(employee)
-                
-                self.sync_stats['total_remote_records'] = len(employees)
-                self.logger.info(f"Fetched {len(employees)} employees from remote database")
-                
-                return employees
+            self.logger.info(f"Fetched {self.sync_stats['total_remote_records']} employees from remote database")
                 
         except Exception as e:
             self.logger.error("Failed to fetch remote employee data", e)
+            raise
+
+    def fetch_remote_employees(self) -> List[Dict]:
+        """
+        Fetch all employee records from remote database
+        
+        Returns:
+            List[Dict]: List of employee records
+        """
+        try:
+            return [employee for batch in self.iter_remote_employee_batches() for employee in batch]
+        except Exception:
             self.sync_stats['errors_encountered'] += 1
             return []
+
+    @staticmethod
+    def _prefetch(batches: Iterable[List[Dict]], depth: int = 2) -> Iterator[List[Dict]]:
+        """
+        Pull *batches* on a background thread, buffering up to *depth* of them,
+        so the remote fetch overlaps with the local writes
+        """
+        buffer = queue.Queue(maxsize=depth)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    buffer.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for batch in batches:
+                    if not put(batch):
+                        break
+                else:
+                    put(done)
+            except Exception as e:
+                put(e)
+            finally:
+                if hasattr(batches, 'close'):
+                    batches.close()
+
+        threading.Thread(target=produce, name='employee-sync-fetch', daemon=True).start()
+        try:
+            while True:
+                item = buffer.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    @staticmethod
+    def _as_batches(employees) -> Iterator[List[Dict]]:
+        """Accept either a list of employee dicts or an iterator of batches"""
+        if isinstance(employees, list):
+            return iter([employees[i:i + SYNC_BATCH_SIZE] for i in range(0, len(employees), SYNC_BATCH_SIZE)])
+        return iter(employees)
+
+    @staticmethod
+    def _peek(batches: Iterator[List[Dict]]) -> Optional[Iterator[List[Dict]]]:
+        """None when *batches* is empty, otherwise an equivalent iterator"""
+        first = next(batches, None)
+        if not first:
+            return None
+        return itertools.chain([first], batches)
     
     def get_local_employee_count(self) -> int:
         """Get current count of local employee records"""
@@ -291,21 +400,24 @@ class EmployeeSynchronizer:
             self.logger.error("Failed to create employee table", e)
             return False
     
-    def synchronize_employees(self, employees: List[Dict]) -> bool:
+    def synchronize_employees(self, employees) -> bool:
         """
-        Synchronize employee data to local database
+        Synchronize employee data to local database (full replacement)
         
         Args:
-            employees: List of employee records from remote database
+            employees: List of employee records from remote database, or an
+                iterator of record batches (see iter_remote_employee_batches)
             
         Returns:
             bool: True if synchronization successful, False otherwise
         """
-        if not employees:
-            self.logger.warning("No employee data to synchronize")
-            return True
-        
+        started = time.perf_counter()
         try:
+            batches = self._peek(self._as_batches(employees))
+            if batches is None:
+                self.logger.warning("No employee data to synchronize")
+                return True
+        
             with self.local_engine.begin() as conn:  # Use transaction
                 # Get current local employee count
                 self.sync_stats['total_local_records_before'] = self.get_local_employee_count()
@@ -317,27 +429,12 @@ class EmployeeSynchronizer:
                 
                 self.logger.info(f"Cleared {deleted_count} existing employee records")
                 
-                # Insert new data
+                # Insert new data batch by batch as it arrives; a failing batch
+                # is retried row by row so one bad record doesn't drop the batch
                 insert_count = 0
-                for employee in employees:
-                    try:
-                        conn.execute(text("""
-                            INSERT INTO employee (`index`, id, firstName, lastName, title, contractId)
-                            VALUES (:index, :id, :firstName, :lastName, :title, :contractId)
-                        """), {
-                            'index': employee['index'],
-                            'id': employee['id'],
-                            'firstName': employee['firstName'],
-                            'lastName': employee['lastName'],
-                            'title': employee['title'],
-                            'contractId': employee['contractId']
-                        })
-                        insert_count += 1
-                        
-                    except Exception as e:
-                        self.logger.error(f"Failed to insert employee {employee['id']}", e, employee)
-                        self.sync_stats['errors_encountered'] += 1
-                        continue
+                for employee_batch in batches:
+                    failed = self._write_rows(conn, self._insert_sql(), employee_batch, 'insert')
+                    insert_count += len(employee_batch) - len(failed)
                 
                 self.sync_stats['records_inserted'] = insert_count
                 
@@ -345,6 +442,7 @@ class EmployeeSynchronizer:
                 result = conn.execute(text("SELECT COUNT(*) as count FROM employee"))
                 self.sync_stats['total_local_records_after'] = result.fetchone().count
                 
+                self.sync_stats['timings']['apply_seconds'] = round(time.perf_counter() - started, 3)
                 self.logger.info(f"Successfully synchronized {insert_count} employee records")
                 
                 return True
@@ -354,6 +452,401 @@ class EmployeeSynchronizer:
             self.sync_stats['errors_encountered'] += 1
             return False
     
+    # ------------------------------------------------------------------
+    # Delta synchronization
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _insert_sql(table: str = 'employee'):
+        return text(f"""
+            INSERT INTO {table} (`index`, id, firstName, lastName, title, contractId)
+            VALUES (:index, :id, :firstName, :lastName, :title, :contractId)
+        """)
+
+    @staticmethod
+    def _update_sql():
+        return text("""
+            UPDATE employee
+            SET `index` = :index, firstName = :firstName, lastName = :lastName,
+                title = :title, contractId = :contractId
+            WHERE id = :id
+        """)
+
+    @staticmethod
+    def _employee_params(employee: Dict) -> Dict:
+        return {
+            'index': employee['index'],
+            'id': employee['id'],
+            'firstName': employee['firstName'],
+            'lastName': employee['lastName'],
+            'title': employee['title'],
+            'contractId': employee['contractId']
+        }
+
+    @staticmethod
+    def _landed_rows(conn, rows: List[Dict], table: str = 'employee') -> set:
+        """(index, id) pairs of *rows* already present in *table*"""
+        result = conn.execute(
+            text(f"SELECT `index`, id FROM {table} WHERE `index` IN :indexes")
+            .bindparams(bindparam('indexes', expanding=True)),
+            {'indexes': [row['index'] for row in rows]}
+        )
+        return {(int(row.index), int(row.id)) for row in result}
+
+    def _write_rows(self, conn, sql, employees: List[Dict], action: str,
+                    table: str = 'employee') -> List[Dict]:
+        """
+        Execute *sql* for *employees* as one batch, retrying row by row when
+        the batch fails; returns the rows that could not be written
+        
+        The savepoint only undoes a failed batch on transactional engines.
+        The local table is MyISAM, which keeps the rows written before the
+        error, so an insert retry skips rows that already landed.
+        """
+        batch = [self._employee_params(e) for e in employees]
+        if not batch:
+            return []
+        try:
+            with conn.begin_nested():
+                conn.execute(sql, batch)
+            return []
+        except Exception:
+            pass
+        landed = self._landed_rows(conn, batch, table) if action == 'insert' else set()
+        failed = []
+        for employee in batch:
+            if (int(employee['index']), int(employee['id'])) in landed:
+                continue
+            try:
+                conn.execute(sql, employee)
+            except Exception as e:
+                self.logger.error(f"Failed to {action} employee {employee['id']}", e, employee)
+                self.sync_stats['errors_encountered'] += 1
+                failed.append(employee)
+        return failed
+
+    @staticmethod
+    def _latin1_text(value: str) -> str:
+        """
+        *value* as the latin1 employee table returns it
+        
+        MySQL's latin1 is cp1252; characters it can't hold are stored as '?'.
+        """
+        if value.isascii():
+            return value
+        return ''.join(
+            ch if 0xA0 <= ord(ch) < 0x100 or ch.encode('cp1252', 'ignore') else '?' for ch in value
+        )
+
+    @staticmethod
+    def _row_signature(employee: Dict) -> Tuple:
+        """Comparable form of an employee row (ints as int, strings stripped and as stored)."""
+        return tuple(
+            int(employee[col]) if col in ('index', 'contractId') and employee[col] is not None
+            else (EmployeeSynchronizer._latin1_text(employee[col].strip()) if isinstance(employee[col], str)
+                  else employee[col])
+            for col in SYNC_COLUMNS
+        )
+
+    def fetch_local_signatures(self) -> Optional[Dict[int, Tuple]]:
+        """
+        {employee id: row signature} of the local employee table
+        
+        Returns None when local ids are not unique (only a full sync can
+        mirror such a table).
+        """
+        signatures = {}
+        with self.local_engine.connect() as conn:
+            result = conn.execute(text("""
+                SELECT `index`, id, firstName, lastName, title, contractId
+                FROM employee
+            """))
+            for row in result:
+                emp_id = int(row.id)
+                if emp_id in signatures:
+                    return None
+                signatures[emp_id] = self._row_signature(row._mapping)
+        return signatures
+
+    def _apply_rows(self, conn, inserts: List[Dict], updates: List[Dict]):
+        failed = self._write_rows(conn, self._update_sql(), updates, 'update')
+        self.sync_stats['records_updated'] += len(updates) - len(failed)
+        failed = self._write_rows(conn, self._insert_sql(), inserts, 'insert')
+        self.sync_stats['records_inserted'] += len(inserts) - len(failed)
+
+    def _park_indexes(self, conn, updates: List[Dict]):
+        """
+        Move the rows in *updates* to temporary (negative) `index` values
+        
+        Frees their current indexes for each other, so ids swapping indexes
+        can then be updated in place; a row is never deleted and re-inserted,
+        which on MyISAM could leave it missing if the insert failed.
+        """
+        self._write_rows(conn, text("UPDATE employee SET `index` = :index WHERE id = :id"), [
+            {**e, 'index': -1 - int(e['id'])} for e in updates
+        ], 'move the index of')
+
+    @staticmethod
+    def _delete_ids(conn, ids: List[int]):
+        for start in range(0, len(ids), SYNC_BATCH_SIZE):
+            conn.execute(
+                text("DELETE FROM employee WHERE id IN :ids").bindparams(bindparam('ids', expanding=True)),
+                {'ids': ids[start:start + SYNC_BATCH_SIZE]}
+            )
+
+    def synchronize_employees_delta(self, employees) -> bool:
+        """
+        Apply only the differences between remote and local employee data
+        
+        Readers keep seeing the full table throughout; cost scales with the
+        number of changed rows instead of total headcount.  Remote batches
+        are diffed and written as they arrive; only the local id -> row
+        signature map is held in memory.
+        
+        Args:
+            employees: List of employee records from remote database, or an
+                iterator of record batches (see iter_remote_employee_batches)
+            
+        Returns:
+            bool: True if synchronization successful, False otherwise
+        """
+        timings = self.sync_stats['timings']
+        try:
+            batches = self._peek(self._as_batches(employees))
+            if batches is None:
+                self.logger.warning("No employee data to synchronize")
+                return True
+
+            started = time.perf_counter()
+            local = self.fetch_local_signatures()
+            timings['fetch_local_seconds'] = round(time.perf_counter() - started, 3)
+            if local is None:
+                self.logger.warning("Duplicate local employee ids found; falling back to full synchronization")
+                self.sync_stats['sync_mode'] = 'full'
+                return self.synchronize_employees(batches)
+            self.sync_stats['total_local_records_before'] = len(local)
+
+            # `index` is unique: a row taking over another id's index waits
+            # until that id has been deleted or moved
+            index_owner = {signature[0]: emp_id for emp_id, signature in local.items()}
+
+            started = time.perf_counter()
+            seen, deferred = set(), {'inserts': [], 'updates': []}
+            with self.local_engine.begin() as conn:
+                for batch in batches:
+                    inserts, updates = [], []
+                    for employee in batch:
+                        emp_id = int(employee['id'])
+                        if emp_id in seen:
+                            raise _DuplicateRemoteEmployeeIds(emp_id)
+                        seen.add(emp_id)
+                        signature = self._row_signature(employee)
+                        current = local.get(emp_id)
+                        if current == signature:
+                            self.sync_stats['records_unchanged'] += 1
+                            continue
+                        kind = 'inserts' if current is None else 'updates'
+                        if index_owner.get(signature[0], emp_id) != emp_id:
+                            deferred[kind].append(employee)
+                        else:
+                            (inserts if kind == 'inserts' else updates).append(employee)
+                    self._apply_rows(conn, inserts, updates)
+
+                deletes = [emp_id for emp_id in local if emp_id not in seen]
+                self._delete_ids(conn, deletes)
+                self.sync_stats['records_deleted'] = len(deletes)
+
+                # Deferred updates first step aside to temporary indexes, which
+                # also resolves ids swapping their `index` values
+                self._park_indexes(conn, deferred['updates'])
+                failed = self._write_rows(conn, self._update_sql(), deferred['updates'], 'update')
+                if failed:
+                    # Don't leave a row on its temporary index
+                    self._write_rows(conn, text("UPDATE employee SET `index` = :index WHERE id = :id"), [
+                        {**e, 'index': local[int(e['id'])][0]} for e in failed
+                    ], 'restore the index of')
+                self._apply_rows(conn, deferred['inserts'], [])
+                self.sync_stats['records_updated'] += len(deferred['updates']) - len(failed)
+
+                result = conn.execute(text("SELECT COUNT(*) as count FROM employee"))
+                self.sync_stats['total_local_records_after'] = result.fetchone().count
+            timings['apply_seconds'] = round(time.perf_counter() - started, 3)
+
+            self.logger.info("Successfully applied employee delta", {
+                'statistics': {k: self.sync_stats[k] for k in (
+                    'records_inserted', 'records_updated', 'records_deleted', 'records_unchanged')},
+                'timings': timings
+            })
+            return True
+
+        except _DuplicateRemoteEmployeeIds as e:
+            # The local table is MyISAM, so batches applied before the
+            # duplicate are already written; the full sync replaces them
+            self.logger.warning(f"Duplicate remote employee id {e}; falling back to full synchronization")
+            for key in ('records_inserted', 'records_updated', 'records_unchanged'):
+                self.sync_stats[key] = 0
+            self.sync_stats['sync_mode'] = 'full'
+            source = employees if isinstance(employees, list) else self._prefetch(self.iter_remote_employee_batches())
+            return self.synchronize_employees(source)
+
+        except Exception as e:
+            self.logger.error("Failed to apply employee delta", e)
+            self.sync_stats['errors_encountered'] += 1
+            return False
+    
+    # ------------------------------------------------------------------
+    # Shadow-table (swap) synchronization
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _checksum(total: int, employee) -> int:
+        """Order-independent running checksum over id + compared columns"""
+        signature = (int(employee['id']),) + EmployeeSynchronizer._row_signature(employee)
+        return (total + zlib.crc32(repr(signature).encode('utf-8'))) & 0xFFFFFFFFFFFFFFFF
+
+    @staticmethod
+    def _row_key(employee) -> Tuple[int, int]:
+        return int(employee['index']), int(employee['id'])
+
+    def _stored_differently(self, conn, employees: List[Dict]) -> set:
+        """(index, id) of *employees* whose staged row doesn't read back as written"""
+        result = conn.execute(
+            text(f"SELECT `index`, id, firstName, lastName, title, contractId FROM {STAGING_TABLE} "
+                 "WHERE `index` IN :indexes").bindparams(bindparam('indexes', expanding=True)),
+            {'indexes': [int(e['index']) for e in employees]}
+        )
+        staged = {int(row.index): (int(row.id),) + self._row_signature(row._mapping) for row in result}
+        return {
+            self._row_key(e) for e in employees
+            if staged.get(int(e['index'])) != (int(e['id']),) + self._row_signature(e)
+        }
+
+    def _create_staging_table(self, conn):
+        """(Re)create an empty copy of the employee table's structure"""
+        conn.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+        if conn.dialect.name == 'mysql':
+            conn.execute(text(f"CREATE TABLE {STAGING_TABLE} LIKE employee"))
+        else:
+            # SQLite (benchmarks): copy the table definition
+            ddl = conn.execute(text(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'employee'"
+            )).scalar()
+            conn.execute(text(ddl.replace('employee', STAGING_TABLE, 1)))
+
+    def _swap_staging_table(self):
+        """Put the staging table in place of employee in one step"""
+        with self.local_engine.connect() as conn:
+            if conn.dialect.name == 'mysql':
+                conn.execute(text(f"DROP TABLE IF EXISTS {PREVIOUS_TABLE}"))
+                # Atomic: readers see either the old or the new table, never neither
+                conn.execute(text(f"RENAME TABLE employee TO {PREVIOUS_TABLE}, {STAGING_TABLE} TO employee"))
+                conn.execute(text(f"DROP TABLE {PREVIOUS_TABLE}"))
+            else:
+                # SQLite (benchmarks): the driver only wraps DDL in a
+                # transaction when it is begun explicitly
+                conn.connection.driver_connection.executescript(f"""
+                    BEGIN;
+                    ALTER TABLE employee RENAME TO {PREVIOUS_TABLE};
+                    ALTER TABLE {STAGING_TABLE} RENAME TO employee;
+                    DROP TABLE {PREVIOUS_TABLE};
+                    COMMIT;
+                """)
+            conn.commit()
+
+    def synchronize_employees_swap(self, employees) -> bool:
+        """
+        Load remote data into a staging table and swap it in (full replacement)
+        
+        employee stays fully populated and unlocked while the staging table
+        is loaded and verified (row count and checksum against the remote
+        stream); the only lock taken on it is the brief RENAME.  Rows that
+        fail to insert, or that the latin1 table stores differently than
+        read, are logged by id and left out of the check.  On any other
+        mismatch or error the staging table is dropped and employee is left
+        untouched.
+        
+        Args:
+            employees: List of employee records from remote database, or an
+                iterator of record batches (see iter_remote_employee_batches)
+            
+        Returns:
+            bool: True if synchronization successful, False otherwise
+        """
+        timings = self.sync_stats['timings']
+        try:
+            batches = self._peek(self._as_batches(employees))
+            if batches is None:
+                self.logger.warning("No employee data to synchronize")
+                return True
+
+            self.sync_stats['total_local_records_before'] = self.get_local_employee_count()
+
+            # Step 1: Bulk-load the staging table
+            started = time.perf_counter()
+            with self.local_engine.begin() as conn:
+                self._create_staging_table(conn)
+            expected_count, expected_checksum, altered = 0, 0, set()
+            for batch in batches:
+                # Rows that fail to insert are logged and left out, as in a full sync
+                with self.local_engine.begin() as conn:
+                    failed = {self._row_key(e) for e in self._write_rows(
+                        conn, self._insert_sql(STAGING_TABLE), batch, 'insert', STAGING_TABLE
+                    )}
+                    written = [e for e in batch if self._row_key(e) not in failed]
+                    # Values the column coerced (truncated, unmappable characters)
+                    # would fail the checksum on every run; report them instead
+                    differs = self._stored_differently(conn, written) if written else set()
+                altered |= differs
+                expected_count += len(written)
+                for employee in written:
+                    if self._row_key(employee) not in differs:
+                        expected_checksum = self._checksum(expected_checksum, employee)
+            timings['load_seconds'] = round(time.perf_counter() - started, 3)
+            if altered:
+                self.sync_stats['errors_encountered'] += len(altered)
+                self.logger.warning(f"{len(altered)} employees were stored differently than read from remote",
+                                    {'employee_ids': sorted(emp_id for _, emp_id in altered)[:100]})
+
+            # Step 2: Verify what landed matches what was read
+            started = time.perf_counter()
+            staged_count, staged_checksum = 0, 0
+            with self.local_engine.connect() as conn:
+                result = conn.execution_options(stream_results=True).execute(text(f"""
+                    SELECT `index`, id, firstName, lastName, title, contractId
+                    FROM {STAGING_TABLE}
+                """))
+                for row in result:
+                    staged_count += 1
+                    if self._row_key(row._mapping) not in altered:
+                        staged_checksum = self._checksum(staged_checksum, row._mapping)
+            timings['verify_seconds'] = round(time.perf_counter() - started, 3)
+            if (staged_count, staged_checksum) != (expected_count, expected_checksum):
+                raise ValueError(
+                    f"Staging verification failed: {staged_count} rows staged, {expected_count} expected"
+                    + ("" if staged_count != expected_count else " (checksum mismatch)")
+                )
+
+            # Step 3: Swap
+            started = time.perf_counter()
+            self._swap_staging_table()
+            timings['swap_seconds'] = round(time.perf_counter() - started, 3)
+
+            self.sync_stats['records_deleted'] = self.sync_stats['total_local_records_before']
+            self.sync_stats['records_inserted'] = staged_count
+            self.sync_stats['total_local_records_after'] = staged_count
+            self.logger.info(f"Successfully swapped in {staged_count} employee records", {'timings': timings})
+            return True
+
+        except Exception as e:
+            self.logger.error("Failed to synchronize employee data via staging table", e)
+            self.sync_stats['errors_encountered'] += 1
+            try:
+                with self.local_engine.begin() as conn:
+                    conn.execute(text(f"DROP TABLE IF EXISTS {STAGING_TABLE}"))
+            except Exception as cleanup_error:
+                self.logger.warning(f"Could not drop {STAGING_TABLE}: {cleanup_error}")
+            return False
+    
     def run_synchronization(self) -> Dict:
         """
         Execute complete employee synchronization process
@@ -376,14 +869,17 @@ class EmployeeSynchronizer:
                 self.sync_stats['end_time'] = datetime.now()
                 return self.sync_stats
             
-            # Step 3: Fetch remote data
-            employees = self.fetch_remote_employees()
-            if not employees and self.sync_stats['errors_encountered'] > 0:
-                self.sync_stats['end_time'] = datetime.now()
-                return self.sync_stats
+            # Step 3: Stream remote data into the local writer (the fetch
+            # runs ahead on a background thread, a few batches at most)
+            employees = self._prefetch(self.iter_remote_employee_batches())
             
             # Step 4: Synchronize data
-            success = self.synchronize_employees(employees)
+            if self.sync_mode == 'full':
+                success = self.synchronize_employees(employees)
+            elif self.sync_mode == 'swap':
+                success = self.synchronize_employees_swap(employees)
+            else:
+                success = self.synchronize_employees_delta(employees)
             
             # Step 5: Log final results
             self.sync_stats['end_time'] = datetime.now()
@@ -464,6 +960,14 @@ def load_configuration() -> Tuple[Dict, Dict]:
 
 def main():
     """Main execution function"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Employee Synchronization Script')
+    parser.add_argument('--mode', choices=['delta', 'full', 'swap'], default=None,
+                        help='delta: apply only changes (default); full: replace the table; '
+                             'swap: load employee_staging, verify and rename it over employee')
+    args = parser.parse_args()
+
     print("🔄 Employee Synchronization Script")
     print("=" * 50)
     
@@ -476,7 +980,7 @@ def main():
         print()
         
         # Initialize synchronizer
-        synchronizer = EmployeeSynchronizer(remote_config, local_config)
+        synchronizer = EmployeeSynchronizer(remote_config, local_config, sync_mode=args.mode)
         
         # Run synchronization
         stats = synchronizer.run_synchronization()
@@ -488,8 +992,11 @@ def main():
         print(f"📡 Remote Records: {stats['total_remote_records']}")
         print(f"💾 Local Records (Before): {stats['total_local_records_before']}")
         print(f"💾 Local Records (After): {stats['total_local_records_after']}")
+        print(f"🔁 Mode: {stats['sync_mode']}")
         print(f"➕ Records Inserted: {stats['records_inserted']}")
+        print(f"✏️  Records Updated: {stats['records_updated']}")
         print(f"🗑️  Records Deleted: {stats['records_deleted']}")
+        print(f"➖ Records Unchanged: {stats['records_unchanged']}")
         print(f"❌ Errors: {stats['errors_encountered']}")
         
         if stats['errors_encountered'] == 0:
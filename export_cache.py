@@ -0,0 +1,272 @@
+"""
+Export Result Cache
+===================
+
+Caches the bytes of finished Excel exports so repeated downloads of the
+same project/date-range report skip the query, hours calculation and
+workbook build.
+
+Cache key = sha256 of:
+    - export type (e.g. 'time_attendance', 'payroll_excel')
+    - every request parameter (filters, column selection, report type)
+    - permission scope (session role)
+    - a data-version fingerprint of the rows the export reads
+
+The fingerprint is one cheap aggregate query per source table restricted to
+the export's date range — COUNT(*), MAX(id) and MAX(<updated column>) —
+plus the most recent TA import batch id and the employee headcount (names
+are looked up from ``employee``).  Any insert, edit or delete inside the
+range changes the fingerprint, so stale entries are never served; they
+simply age out after ``EXPORT_CACHE_TTL`` seconds.
+
+Entries live on disk (``EXPORT_CACHE_DIR``) so every gunicorn worker and
+the background export jobs share them.
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, request, send_file, session
+from sqlalchemy import text
+from werkzeug.http import parse_options_header
+
+from extensions import db, logger_handler
+
+# Source table per fingerprint kind: (table, date column, updated column)
+_FINGERPRINT_SOURCES = {
+    'attendance_data': ('attendance_data', 'check_in_date', 'updated_timestamp'),
+    'time_attendance': ('time_attendance', 'attendance_date', 'updated_date'),
+}
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def data_fingerprint(source, start_date=None, end_date=None):
+    """
+    Return a JSON-serialisable data-version fingerprint for *source* rows
+    with date between start_date and end_date (either bound optional).
+    """
+    table, date_col, updated_col = _FINGERPRINT_SOURCES[source]
+    clauses, params = [], {}
+    if start_date:
+        clauses.append(f"{date_col} >= :start_date")
+        params['start_date'] = start_date
+    if end_date:
+        clauses.append(f"{date_col} <= :end_date")
+        params['end_date'] = end_date
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+    row = db.session.execute(text(f"""
+        SELECT COUNT(*), MAX(id), MAX({updated_col})
+        FROM {table} {where}
+    """), params).fetchone()
+    fingerprint = [source, row[0], row[1], str(row[2])]
+
+    if source == 'time_attendance':
+        batch = db.session.execute(text("""
+            SELECT import_batch_id FROM time_attendance
+            WHERE import_batch_id IS NOT NULL
+            ORDER BY id DESC LIMIT 1
+        """)).scalar()
+        fingerprint.append(batch)
+
+    employee_count = db.session.execute(text("SELECT COUNT(*) FROM employee")).scalar()
+    fingerprint.append(employee_count)
+    return fingerprint
+
+
+class ExportCache:
+    """On-disk export byte cache: ``<key>.bin`` + ``<key>.json`` metadata."""
+
+    def __init__(self, cache_dir, ttl=86400, max_entries=200):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_entries = max_entries
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return f"{base}.bin", f"{base}.json"
+
+    def get(self, key):
+        """Return (path, meta) for a live entry, else None."""
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - meta.get('created', 0) > self.ttl or not os.path.exists(data_path):
+            return None
+        return data_path, meta
+
+    def put(self, key, response):
+        """Copy an attachment response's body into the cache; return (path, meta)."""
+        data_path, meta_path = self._paths(key)
+        _, options = parse_options_header(response.headers.get('Content-Disposition', ''))
+        meta = {
+            'created': time.time(),
+            'download_name': options.get('filename'),
+            'mimetype': response.mimetype,
+        }
+        tmp = f"{data_path}.{os.getpid()}.tmp"
+        response.direct_passthrough = False
+        with open(tmp, 'wb') as out:
+            for chunk in response.iter_encoded():
+                out.write(chunk)
+        os.replace(tmp, data_path)
+        with open(f"{meta_path}.{os.getpid()}.tmp", 'w') as f:
+            json.dump(meta, f)
+        os.replace(f"{meta_path}.{os.getpid()}.tmp", meta_path)
+        self.prune()
+        return data_path, meta
+
+    def clear(self):
+        """Drop every entry; returns how many were removed."""
+        try:
+            keys = [n[:-len('.json')] for n in os.listdir(self.cache_dir) if n.endswith('.json')]
+        except OSError:
+            return 0
+        for key in keys:
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return len(keys)
+
+    def prune(self):
+        """Drop expired entries and keep at most max_entries (oldest first)."""
+        try:
+            metas = [n for n in os.listdir(self.cache_dir) if n.endswith('.json')]
+        except OSError:
+            return
+        entries = []
+        for name in metas:
+            path = os.path.join(self.cache_dir, name)
+            try:
+                entries.append((os.path.getmtime(path), name[:-len('.json')]))
+            except OSError:
+                continue
+        entries.sort(reverse=True)
+        cutoff = time.time() - self.ttl
+        for index, (mtime, key) in enumerate(entries):
+            if index >= self.max_entries or mtime < cutoff:
+                for path in self._paths(key):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+
+def _get_cache():
+    app = current_app._get_current_object()
+    cache = app.extensions.get('export_cache')
+    if cache is None:
+        cache_dir = app.config.get('EXPORT_CACHE_DIR') or os.path.join(
+            app.config.get('UPLOAD_FOLDER', '/tmp'), 'export_cache'
+        )
+        cache = app.extensions['export_cache'] = ExportCache(
+            cache_dir,
+            ttl=app.config.get('EXPORT_CACHE_TTL', 86400),
+            max_entries=app.config.get('EXPORT_CACHE_MAX_ENTRIES', 200),
+        )
+    return cache
+
+
+def clear_export_cache():
+    """Drop all cached exports (e.g. after an employee sync renames people)."""
+    return _get_cache().clear()
+
+
+def _cacheable(response):
+    """
+    Only plain files are stored: not generator bodies (no Content-Length,
+    unlike a send_file'd file) and not Content-Encoding'd bodies, which
+    the cache would serve without their encoding to any client.
+    """
+    if response.is_streamed and response.content_length is None:
+        return False
+    return 'Content-Encoding' not in response.headers
+
+
+def cached_export(export_type, source, date_params, end_padding_days=0):
+    """
+    Decorator for export views returning a ``send_file`` attachment.
+
+    Args:
+        export_type: Stable name for the export (part of the key).
+        source: Fingerprint source — 'attendance_data' or 'time_attendance'.
+        date_params: (start_param, end_param) request field names.
+        end_padding_days: Extra days the view reads past the end date
+            (TA exports read end_date + 1 for overnight pairing).
+
+    Place it directly above the view function (below login/audit
+    decorators) so auth and activity logging still run on cache hits.
+    Only 200 attachment responses are stored; redirects/flash errors pass
+    through untouched, and so do streamed bodies (the CSV exports): caching
+    one would drain the whole stream to disk before the first byte is sent,
+    and a gzipped one would be replayed without its Content-Encoding.  The
+    session role is part of the key, so a cached file is never served to a
+    role the view itself would have refused.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_app.config.get('EXPORT_CACHE_ENABLED', True):
+                return f(*args, **kwargs)
+
+            try:
+                start = _parse_date(request.values.get(date_params[0]))
+                end = _parse_date(request.values.get(date_params[1]))
+                if end and end_padding_days:
+                    end += timedelta(days=end_padding_days)
+                params = sorted(
+                    (k, v) for k, v in request.values.items(multi=True)
+                    if k not in ('csrf_token', 'export')
+                )
+                key_material = json.dumps(
+                    [export_type, params, session.get('role'),
+                     data_fingerprint(source, start, end)],
+                    sort_keys=True, default=str
+                )
+                key = hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+                cache = _get_cache()
+            except Exception as e:
+                logger_handler.logger.warning(f"Export cache unavailable for {export_type}: {e}")
+                return f(*args, **kwargs)
+
+            hit = cache.get(key)
+            if hit is None:
+                response = current_app.make_response(f(*args, **kwargs))
+                disposition = response.headers.get('Content-Disposition', '')
+                if response.status_code != 200 or 'attachment' not in disposition or not _cacheable(response):
+                    return response
+                try:
+                    hit = cache.put(key, response)
+                finally:
+                    response.close()
+                cache_status = 'MISS'
+            else:
+                cache_status = 'HIT'
+
+            path, meta = hit
+            cached_response = send_file(
+                path,
+                mimetype=meta.get('mimetype'),
+                as_attachment=True,
+                download_name=meta.get('download_name') or os.path.basename(path)
+            )
+            cached_response.headers['X-Export-Cache'] = cache_status
+            return cached_response
+        return decorated_function
+    return decorator
@@ -0,0 +1,298 @@
+"""
+Export Job Manager
+==================
+
+Runs the heavy Excel exports (attendance column export, TA exports and
+payroll export) outside the HTTP request that asked for them.
+
+Flow:
+    1. ``submit()`` snapshots the request (endpoint, args, form, session),
+       derives a dedupe key from it and returns a job_id immediately.
+    2. A per-process ThreadPoolExecutor replays the snapshot against the
+       original view function inside ``app.test_request_context()`` and
+       writes the resulting file into ``EXPORT_JOB_DIR/<job_id>/``.
+    3. ``/api/exports/<job_id>`` reports status and
+       ``/api/exports/<job_id>/download`` streams the artifact.
+
+Job state lives in small JSON files next to the artifacts (same approach as
+the TA import progress files), so any gunicorn worker can answer status and
+download requests.  Identical submissions within ``EXPORT_JOB_DEDUPE_TTL``
+seconds return the existing job instead of building the file again.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import get_flashed_messages, session
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_options_header
+
+import metrics
+
+# Export name -> view endpoint.  Only these endpoints may be queued.
+EXPORT_ENDPOINTS = {
+    'attendance_excel':            'attendance.generate_excel_export',
+    'time_attendance':             'time_attendance.export_time_attendance',
+    'time_attendance_by_building': 'time_attendance.export_time_attendance_by_building',
+    'payroll_excel':               'payroll.export_payroll_excel',
+}
+
+# Session keys copied into the replayed request (permission scope + audit)
+_SESSION_KEYS = ('user_id', 'username', 'role', 'full_name')
+
+# Request fields that never change the produced file
+_IGNORED_FIELDS = ('csrf_token', 'export')
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+class ExportJobManager:
+    """Disk-backed export job store with a per-process worker pool."""
+
+    def __init__(self, app=None, logger_handler=None):
+        self.app = None
+        self.logger_handler = logger_handler
+        self.job_dir = None
+        self.dedupe_ttl = 600
+        self.retention = 3600
+        self.stale_after = 1800
+        self._executor = None
+        if app:
+            self.init_app(app, logger_handler)
+
+    def init_app(self, app, logger_handler=None):
+        """Read EXPORT_JOB_* config and create the artifact directory."""
+        self.app = app
+        self.logger_handler = logger_handler or self.logger_handler
+        self.job_dir = app.config.get('EXPORT_JOB_DIR') or os.path.join(
+            app.config.get('UPLOAD_FOLDER', '/tmp'), 'export_jobs'
+        )
+        self.dedupe_ttl = app.config.get('EXPORT_JOB_DEDUPE_TTL', 600)
+        self.retention = max(app.config.get('EXPORT_JOB_RETENTION', 3600), self.dedupe_ttl)
+        self.stale_after = app.config.get('EXPORT_JOB_TIMEOUT', 1800)
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config.get('EXPORT_JOB_WORKERS', 2),
+            thread_name_prefix='export-job'
+        )
+        os.makedirs(self.job_dir, exist_ok=True)
+        app.extensions['export_jobs'] = self
+
+    # ------------------------------------------------------------------
+    # On-disk job state
+    # ------------------------------------------------------------------
+
+    def _meta_path(self, job_id):
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def _artifact_dir(self, job_id):
+        return os.path.join(self.job_dir, job_id)
+
+    def _dedupe_path(self, dedupe_key):
+        return os.path.join(self.job_dir, f"dedupe_{dedupe_key}.json")
+
+    @staticmethod
+    def _write_json(path, data):
+        """Atomically replace *path* with *data* (tmp file + os.replace)."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _read_json(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _update(self, job_id, **fields):
+        meta = self._read_json(self._meta_path(job_id)) or {'job_id': job_id}
+        meta.update(fields)
+        self._write_json(self._meta_path(job_id), meta)
+        return meta
+
+    def get_job(self, job_id):
+        """Return the job's metadata dict, or None when unknown/expired."""
+        if not job_id or not all(c in '0123456789abcdef-' for c in job_id):
+            return None
+        meta = self._read_json(self._meta_path(job_id))
+        if meta is None:
+            return None
+        # A worker that died mid-build leaves the job 'running' forever
+        if (meta.get('status') in (STATUS_QUEUED, STATUS_RUNNING)
+                and time.time() - meta.get('created', 0) > self.stale_after):
+            meta = self._update(job_id, status=STATUS_FAILED,
+                                error='Export did not finish in time. Please try again.')
+        return meta
+
+    def artifact_path(self, meta):
+        """Absolute path of a finished job's file, or None."""
+        if not meta or meta.get('status') != STATUS_DONE or not meta.get('artifact'):
+            return None
+        path = os.path.join(self._artifact_dir(meta['job_id']), meta['artifact'])
+        return path if os.path.exists(path) else None
+
+    # ------------------------------------------------------------------
+    # Submission
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def build_spec(export_name, request, session_data):
+        """Snapshot everything the export view reads from the request."""
+        endpoint = EXPORT_ENDPOINTS[export_name]
+        method = 'GET' if export_name.startswith('time_attendance') else 'POST'
+        # TA exports are GET views but their filters may be posted as form fields
+        source = request.values if method == 'GET' else request.form
+        params = sorted(
+            (key, value) for key, value in source.items(multi=True)
+            if key not in _IGNORED_FIELDS
+        )
+        return {
+            'export': export_name,
+            'endpoint': endpoint,
+            'method': method,
+            'params': params,
+            'session': {k: session_data.get(k) for k in _SESSION_KEYS if k in session_data},
+        }
+
+    @staticmethod
+    def dedupe_key(spec):
+        """Hash of (export, params, permission scope) — user-independent within a role."""
+        payload = json.dumps(
+            [spec['export'], spec['params'], spec['session'].get('role')],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def submit(self, spec):
+        """
+        Queue *spec* (from ``build_spec``) and return ``(job_meta, reused)``.
+
+        ``reused`` is True when an identical job submitted within the dedupe
+        TTL is still queued/running or has a downloadable artifact.
+        """
+        self.cleanup_expired()
+        key = self.dedupe_key(spec)
+        dedupe_path = self._dedupe_path(key)
+
+        existing = self._read_json(dedupe_path)
+        if existing and time.time() - existing.get('created', 0) < self.dedupe_ttl:
+            meta = self.get_job(existing.get('job_id'))
+            if meta and (meta['status'] in (STATUS_QUEUED, STATUS_RUNNING)
+                         or self.artifact_path(meta)):
+                return meta, True
+
+        job_id = str(uuid.uuid4())
+        now = time.time()
+        meta = {
+            'job_id': job_id,
+            'export': spec['export'],
+            'status': STATUS_QUEUED,
+            'created': now,
+            'dedupe_key': key,
+            'user_id': spec['session'].get('user_id'),
+            'role': spec['session'].get('role'),
+            'username': spec['session'].get('username'),
+        }
+        os.makedirs(self._artifact_dir(job_id), exist_ok=True)
+        self._write_json(self._meta_path(job_id), meta)
+        self._write_json(dedupe_path, {'job_id': job_id, 'created': now})
+
+        self._executor.submit(self._run, job_id, spec)
+        if self.logger_handler:
+            self.logger_handler.logger.info(
+                f"Export job {job_id} ({spec['export']}) queued by {meta['username']}"
+            )
+        return meta, False
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _run(self, job_id, spec):
+        started = time.time()
+        self._update(job_id, status=STATUS_RUNNING, started=started)
+        try:
+            with self.app.test_request_context(
+                method=spec['method'],
+                query_string=spec['params'] if spec['method'] == 'GET' else None,
+                data=MultiDict(spec['params']) if spec['method'] == 'POST' else None,
+            ):
+                session.update(spec['session'])
+                view = self.app.view_functions[spec['endpoint']]
+                response = self.app.make_response(view())
+                try:
+                    filename = self._store_artifact(job_id, response)
+                    if filename is None:
+                        flashed = [m for _, m in get_flashed_messages(with_categories=True)]
+                        raise RuntimeError(flashed[-1] if flashed else
+                                           f"Export returned HTTP {response.status_code}")
+                finally:
+                    response.close()
+
+            duration = time.time() - started
+            self._update(job_id, status=STATUS_DONE, artifact=filename,
+                         finished=time.time(), duration=round(duration, 3))
+            metrics.observe('qr_job_duration_seconds', duration,
+                            {'job': f"export_{spec['export']}", 'outcome': 'success'})
+            if self.logger_handler:
+                self.logger_handler.logger.info(
+                    f"Export job {job_id} ({spec['export']}) finished in {duration:.2f}s: {filename}"
+                )
+        except Exception as e:
+            self._update(job_id, status=STATUS_FAILED, error=str(e), finished=time.time())
+            metrics.observe('qr_job_duration_seconds', time.time() - started,
+                            {'job': f"export_{spec['export']}", 'outcome': 'failed'})
+            if self.logger_handler:
+                self.logger_handler.logger.error(f"Export job {job_id} ({spec['export']}) failed: {e}")
+
+    def _store_artifact(self, job_id, response):
+        """Write an attachment response into the job's directory; None if not a file."""
+        disposition = response.headers.get('Content-Disposition', '')
+        if response.status_code != 200 or 'attachment' not in disposition:
+            return None
+        _, options = parse_options_header(disposition)
+        filename = os.path.basename(options.get('filename') or f"{job_id}.xlsx")
+
+        path = os.path.join(self._artifact_dir(job_id), filename)
+        response.direct_passthrough = False
+        with open(path, 'wb') as out:
+            for chunk in response.iter_encoded():
+                out.write(chunk)
+        return filename
+
+    # ------------------------------------------------------------------
+    # Retention
+    # ------------------------------------------------------------------
+
+    def cleanup_expired(self):
+        """Remove jobs and dedupe markers older than the retention window."""
+        cutoff = time.time() - self.retention
+        try:
+            entries = os.listdir(self.job_dir)
+        except OSError:
+            return
+        for name in entries:
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.job_dir, name)
+            try:
+                if os.path.getmtime(path) >= cutoff:
+                    continue
+                os.remove(path)
+                if not name.startswith('dedupe_'):
+                    shutil.rmtree(self._artifact_dir(name[:-len('.json')]), ignore_errors=True)
+            except OSError:
+                continue
+
+
+export_job_manager = ExportJobManager()
@@ -0,0 +1,367 @@
+"""
+Job Scheduler
+=============
+
+Runs the periodic maintenance jobs inside the web app, replacing the
+separate ``employee_sync_scheduler.py`` process (``schedule`` loop with
+``time.sleep(60)``) and hand-run cron scripts:
+
+    employee_sync    EmployeeSynchronizer          EMPLOYEE_SYNC_INTERVAL_MINUTES
+    log_retention    logger_handler.cleanup_old_logs   LOG_RETENTION_INTERVAL_HOURS
+    log_partitions   log_partitions.maintain_partitions   LOG_PARTITION_MAINTENANCE_HOURS
+    log_stats        log_stats.rollup               LOG_STATS_ROLLUP_MINUTES
+    ta_archive       TimeAttendanceOptimizer.archive_old_records   TA_ARCHIVE_INTERVAL_HOURS
+    stats_rebuild    DashboardStatsAggregator.rebuild   DASHBOARD_STATS_REBUILD_HOURS
+
+An interval of 0 disables a job (employee_sync and ta_archive are off by
+default, log_partitions unless LOG_PARTITIONING is on).  A newly enabled job first runs one interval later; use
+``flask jobs --run <job>`` to run it right away.
+
+Leadership: one worker per host holds an ``flock`` on
+``SCHEDULER_LOCK_FILE`` and runs the jobs; the other workers retry the
+lock every ``SCHEDULER_POLL_SECONDS``, so a recycled leader is replaced
+within one poll.  Across hosts every due run is claimed with a
+compare-and-set UPDATE on ``scheduler_jobs.next_run_at`` (the
+dashboard_stats pattern), so each run happens once.
+
+Timing: a job's next run is its previous due time + interval + up to
+``SCHEDULER_JITTER_SECONDS`` of random jitter, so hosts and jobs don't fire
+in lockstep.  Runs missed while no leader was up (deploys, restarts) are
+caught up with a single run on the next poll rather than replayed, and
+counted in ``qr_scheduler_missed_runs_total``.
+
+Each run's duration is observed in
+``qr_scheduler_job_duration_seconds{job,outcome}`` and its outcome is kept
+in ``scheduler_jobs``.  When a job succeeds the caches that depend on its
+data are invalidated (export cache after employee sync / TA archive,
+dashboard snapshot after a stats rebuild).
+
+    flask --app app jobs                      # schedule and last outcome per job
+    flask --app app jobs --run employee_sync  # run one job now
+"""
+
+import os
+import random
+import threading
+import time
+
+import click
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:  # Windows dev boxes: every worker may lead, the DB claim still dedupes runs
+    HAS_FCNTL = False
+
+from sqlalchemy import Column, Double, MetaData, String, Table, Text, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+import metrics
+
+_metadata = MetaData()
+
+scheduler_jobs_table = Table(
+    'scheduler_jobs', _metadata,
+    Column('name', String(50), primary_key=True),
+    Column('next_run_at', Double, nullable=False),
+    Column('last_started_at', Double),
+    Column('last_duration', Double),
+    Column('last_status', String(20)),
+    Column('last_error', Text),
+)
+
+
+# ---------------------------------------------------------------------------
+# Jobs: (app, db, logger_handler) -> dict; {'success': False} marks a failure
+# ---------------------------------------------------------------------------
+
+def _employee_sync(app, db, logger_handler):
+    from employee_table_sync import EmployeeSynchronizer, load_configuration
+    remote_config, local_config = load_configuration()
+    stats = EmployeeSynchronizer(remote_config, local_config).run_synchronization()
+    return {
+        'success': stats['errors_encountered'] == 0,
+        'error': f"{stats['errors_encountered']} error(s), see logs/employee_sync.log",
+        'records_inserted': stats['records_inserted'],
+        'records_updated': stats['records_updated'],
+        'records_deleted': stats['records_deleted'],
+    }
+
+
+def _log_retention(app, db, logger_handler):
+    deleted = logger_handler.cleanup_old_logs(days_to_keep=app.config.get('LOG_RETENTION_DAYS', 90))
+    return {'success': True, 'deleted': deleted}
+
+
+def _log_partitions(app, db, logger_handler):
+    from log_partitions import maintain_partitions
+    return {'success': True, **maintain_partitions(
+        db,
+        months_ahead=app.config.get('LOG_PARTITION_MONTHS_AHEAD', 3),
+        retention_months=app.config.get('LOG_PARTITION_RETENTION_MONTHS', 12),
+        logger=logger_handler.logger
+    )}
+
+
+def _log_stats(app, db, logger_handler):
+    from log_stats import rollup
+    result = rollup(db, retention_days=app.config.get('LOG_RETENTION_DAYS', 90), logger=logger_handler.logger)
+    return {'success': True, 'rows': result['rows']}
+
+
+def _ta_archive(app, db, logger_handler):
+    days = app.config.get('TA_ARCHIVE_DAYS')
+    if not days:
+        return {'success': False, 'error': 'TA_ARCHIVE_DAYS is not set'}
+    from tools.optimize_time_attendance_db import TimeAttendanceOptimizer
+    return TimeAttendanceOptimizer(verbose=False).archive_old_records(days=days, execute=True)
+
+
+def _stats_rebuild(app, db, logger_handler):
+    aggregator = app.extensions.get('dashboard_stats')
+    if aggregator is None or not aggregator.enabled:
+        return {'success': True, 'skipped': True}
+    return {'success': True, 'days': aggregator.rebuild()}
+
+
+def _clear_export_cache(app):
+    from export_cache import clear_export_cache
+    clear_export_cache()
+
+
+def _invalidate_dashboard_snapshot(app):
+    aggregator = app.extensions.get('dashboard_stats')
+    if aggregator is not None:
+        aggregator.invalidate_snapshot()
+
+
+# name -> (job, config key, seconds per config unit, caches invalidated on success)
+JOBS = {
+    'employee_sync': (_employee_sync, 'EMPLOYEE_SYNC_INTERVAL_MINUTES', 60, (_clear_export_cache,)),
+    'log_retention': (_log_retention, 'LOG_RETENTION_INTERVAL_HOURS', 3600, ()),
+    'log_partitions': (_log_partitions, 'LOG_PARTITION_MAINTENANCE_HOURS', 3600, ()),
+    'log_stats': (_log_stats, 'LOG_STATS_ROLLUP_MINUTES', 60, ()),
+    'ta_archive': (_ta_archive, 'TA_ARCHIVE_INTERVAL_HOURS', 3600, (_clear_export_cache,)),
+    'stats_rebuild': (_stats_rebuild, 'DASHBOARD_STATS_REBUILD_HOURS', 3600, (_invalidate_dashboard_snapshot,)),
+}
+
+
+class JobScheduler:
+    """Leader-elected in-process scheduler for the periodic maintenance jobs."""
+
+    def __init__(self, app=None, db=None, logger_handler=None):
+        self.db = db
+        self.logger_handler = logger_handler
+        self.enabled = False
+        self.poll_seconds = 30
+        self.jitter_seconds = 60
+        self.intervals = {}
+        self._table_ready = False
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._lock_pid = None
+        self._thread_pid = None
+        if app is not None:
+            self.init_app(app, db, logger_handler)
+
+    def init_app(self, app, db=None, logger_handler=None):
+        self.db = db or self.db
+        self.logger_handler = logger_handler or self.logger_handler
+        self.enabled = app.config.get('SCHEDULER_ENABLED', True)
+        self.poll_seconds = app.config.get('SCHEDULER_POLL_SECONDS', 30)
+        self.jitter_seconds = app.config.get('SCHEDULER_JITTER_SECONDS', 60)
+        self.lock_path = app.config.get('SCHEDULER_LOCK_FILE') or os.path.join(
+            app.config.get('UPLOAD_FOLDER', '/tmp'), 'scheduler.lock'
+        )
+        self.intervals = {
+            name: float(app.config.get(key) or 0) * unit
+            for name, (_, key, unit, _) in JOBS.items()
+        }
+        if not app.config.get('TA_ARCHIVE_DAYS'):
+            self.intervals['ta_archive'] = 0
+        if not app.config.get('LOG_PARTITIONING'):
+            self.intervals['log_partitions'] = 0
+        self.app = app
+        app.extensions['job_scheduler'] = self
+        self._register_cli(app)
+        if not self.enabled:
+            return
+
+        # The scheduler thread is started lazily in each worker (after fork)
+        @app.before_request
+        def _start_job_scheduler():
+            if self._thread_pid != os.getpid():
+                self._start_thread(app)
+
+    def _engine(self):
+        engine = self.db.engine
+        if not self._table_ready:
+            _metadata.create_all(bind=engine, checkfirst=True)
+            self._table_ready = True
+        return engine
+
+    def _log_warning(self, message):
+        if self.logger_handler:
+            self.logger_handler.logger.warning(message)
+
+    # ------------------------------------------------------------------
+    # Leadership (one worker per host)
+    # ------------------------------------------------------------------
+
+    def _is_leader(self):
+        """Take (or keep) the host-wide scheduler lock without blocking."""
+        if not HAS_FCNTL:
+            return True
+        if self._lock_pid != os.getpid():
+            # A forked child shares its parent's lock; open our own file
+            self._lock_file, self._lock_pid = None, os.getpid()
+        if self._lock_file is None:
+            os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+            self._lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def _claim(self, name, interval, now):
+        """
+        Claim *name*'s due run for this process; returns the number of runs
+        missed before it, or None when it isn't due (or another host won).
+        """
+        table = scheduler_jobs_table
+        with self._engine().connect() as conn:
+            due = conn.execute(select(table.c.next_run_at).where(table.c.name == name)).scalar()
+        if due is None:
+            # First sighting: first run one interval from now
+            try:
+                with self._engine().begin() as conn:
+                    conn.execute(insert(table).values(
+                        name=name, next_run_at=now + interval + random.uniform(0, self.jitter_seconds)
+                    ))
+            except IntegrityError:
+                pass
+            return None
+        if due > now:
+            return None
+
+        missed = int((now - due) // interval)
+        next_run = (now if missed else due) + interval + random.uniform(0, self.jitter_seconds)
+        with self._engine().begin() as conn:
+            claimed = conn.execute(
+                update(table)
+                .where(table.c.name == name, table.c.next_run_at == due)
+                .values(next_run_at=next_run, last_started_at=now, last_status='running')
+            ).rowcount
+        return missed if claimed else None
+
+    def run_pending(self):
+        """Run every job that is due; returns the names that ran."""
+        ran = []
+        for name, interval in self.intervals.items():
+            if interval <= 0:
+                continue
+            missed = self._claim(name, interval, time.time())
+            if missed is None:
+                continue
+            if missed:
+                metrics.inc('qr_scheduler_missed_runs_total', {'job': name}, missed)
+                if self.logger_handler:
+                    self.logger_handler.logger.info(f"Scheduler: catching up {name} ({missed} missed run(s))")
+            self.run_job(name)
+            ran.append(name)
+        return ran
+
+    def run_job(self, name):
+        """Run one job now, record its outcome and invalidate dependent caches."""
+        job, _, _, invalidates = JOBS[name]
+        started = time.perf_counter()
+        outcome, error = 'success', None
+        try:
+            result = job(self.app, self.db, self.logger_handler)
+            if isinstance(result, dict) and result.get('success') is False:
+                outcome, error = 'failed', str(result.get('error') or 'job reported failure')
+        except Exception as e:
+            outcome, error = 'failed', str(e)
+            if self.logger_handler:
+                self.logger_handler.logger.error(f"Scheduled job {name} failed: {e}", exc_info=True)
+        finally:
+            self.db.session.remove()
+        duration = time.perf_counter() - started
+
+        metrics.observe('qr_scheduler_job_duration_seconds', duration, {'job': name, 'outcome': outcome})
+        metrics.flush(force=True)
+        try:
+            with self._engine().begin() as conn:
+                conn.execute(
+                    update(scheduler_jobs_table).where(scheduler_jobs_table.c.name == name)
+                    .values(last_duration=round(duration, 3), last_status=outcome, last_error=error)
+                )
+        except Exception as e:
+            self._log_warning(f"Scheduler: could not record {name} outcome: {e}")
+
+        if outcome == 'success':
+            for invalidate in invalidates:
+                try:
+                    invalidate(self.app)
+                except Exception as e:
+                    self._log_warning(f"Scheduler: cache invalidation after {name} failed: {e}")
+        if self.logger_handler:
+            self.logger_handler.logger.info(f"Scheduled job {name} finished: {outcome} in {duration:.1f}s")
+        return outcome == 'success'
+
+    def status(self):
+        """{name: row dict} of recorded runs (``flask jobs``)."""
+        with self._engine().connect() as conn:
+            return {row.name: dict(row._mapping) for row in conn.execute(select(scheduler_jobs_table))}
+
+    def _register_cli(self, app):
+        @app.cli.command('jobs')
+        @click.option('--run', 'run_name', type=click.Choice(sorted(JOBS)),
+                      help='Run one job now, outside its schedule.')
+        def jobs_command(run_name):
+            """Show scheduled job status, or run one job"""
+            if run_name:
+                ok = self.run_job(run_name)
+                click.echo(f"{'✅' if ok else '❌'} {run_name} {'succeeded' if ok else 'failed (see log)'}")
+                raise SystemExit(0 if ok else 1)
+            rows = self.status()
+            for name, interval in self.intervals.items():
+                row = rows.get(name) or {}
+                if interval <= 0:
+                    schedule = 'disabled'
+                elif interval < 3600:
+                    schedule = f"every {interval / 60:g}m"
+                else:
+                    schedule = f"every {interval / 3600:g}h"
+                last = row.get('last_status') or 'never run'
+                if row.get('last_duration') is not None:
+                    last += f" ({row['last_duration']}s)"
+                next_run = (time.strftime('%Y-%m-%d %H:%M', time.localtime(row['next_run_at']))
+                            if interval > 0 and row.get('next_run_at') else '-')
+                click.echo(f"{name:<15} {schedule:<14} next {next_run:<17} last {last}")
+
+    # ------------------------------------------------------------------
+    # Thread
+    # ------------------------------------------------------------------
+
+    def _start_thread(self, app):
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+        threading.Thread(target=self._run, args=(app,), name='job-scheduler', daemon=True).start()
+
+    def _run(self, app):
+        while True:
+            try:
+                if self._is_leader():
+                    with app.app_context():
+                        self.run_pending()
+            except Exception as e:
+                self._log_warning(f"Job scheduler poll failed: {e}")
+            time.sleep(self.poll_seconds)
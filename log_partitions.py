@@ -0,0 +1,224 @@
+"""
+Log Partitions
+==============
+
+Optional monthly RANGE partitioning of ``log_events`` (MySQL only).
+
+Every request path inserts into ``log_events`` and retention used to be a
+DELETE over its ``created_timestamp`` index.  With ``LOG_PARTITIONING`` on
+the table is partitioned by month:
+
+    PARTITION BY RANGE (TO_DAYS(created_timestamp))
+        p202609  VALUES LESS THAN (TO_DAYS('2026-10-01'))   -- and older rows
+        p202610  VALUES LESS THAN (TO_DAYS('2026-11-01'))
+        ...
+        pmax     VALUES LESS THAN MAXVALUE                  -- normally empty
+
+so that
+
+  - the ``log_partitions`` job (``LOG_PARTITION_MAINTENANCE_HOURS``) keeps
+    ``LOG_PARTITION_MONTHS_AHEAD`` future months split off the empty
+    ``pmax`` and drops months older than ``LOG_PARTITION_RETENTION_MONTHS``
+    with ``ALTER TABLE ... DROP PARTITION`` (a metadata operation, whatever
+    the row count);
+  - the ``created_timestamp >= :cutoff`` range of ``get_recent_logs`` /
+    ``get_log_statistics`` only opens the partitions of those months.
+
+Dropping a month removes every row in it, including the ERROR / CRITICAL /
+HIGH events the row purge (``log_retention``) keeps, so the partition
+retention is normally longer than ``LOG_RETENTION_DAYS``.
+
+MySQL requires the partitioning column in every unique key, so a
+partitioned ``log_events`` has ``PRIMARY KEY (id, created_timestamp)`` and
+``UNIQUE (event_id, created_timestamp)``.  New tables are created that way
+by ``AppLogger._create_log_table``; an existing table is converted by
+migration ``0005_partition_log_events`` (a full table rebuild, so run it in
+a maintenance window).  MySQL cannot partition a table with a FULLTEXT
+index, so the conversion drops the log search index and search falls back
+to LIKE over the partitions of its day window (see log_search.py):
+
+    LOG_PARTITIONING=true flask --app app db-upgrade --rerun 0005_partition_log_events
+    flask --app app log-partitions        # partitions, row estimates, pruning check
+"""
+
+from datetime import date, datetime, timedelta
+
+import click
+from sqlalchemy import text
+
+TABLE = 'log_events'
+MAX_PARTITION = 'pmax'
+
+
+# ---------------------------------------------------------------------------
+# Month helpers
+# ---------------------------------------------------------------------------
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"p{month:%Y%m}"
+
+
+def partition_month(name):
+    """Month held by partition *name* (None for pmax / foreign names)."""
+    try:
+        return datetime.strptime(name, 'p%Y%m').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _partition_definition(month):
+    return (f"PARTITION {partition_name(month)} "
+            f"VALUES LESS THAN (TO_DAYS('{add_months(month, 1):%Y-%m-%d}'))")
+
+
+def partition_clause(first_month, last_month):
+    """``PARTITION BY`` clause with one partition per month plus ``pmax``."""
+    definitions = []
+    month = month_start(first_month)
+    while month <= last_month:
+        definitions.append(_partition_definition(month))
+        month = add_months(month, 1)
+    definitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+    return "PARTITION BY RANGE (TO_DAYS(created_timestamp)) (\n    " + ",\n    ".join(definitions) + "\n)"
+
+
+# ---------------------------------------------------------------------------
+# Inspection
+# ---------------------------------------------------------------------------
+
+def is_supported(db):
+    return db.engine.dialect.name == 'mysql'
+
+
+def list_partitions(conn):
+    """[(name, estimated rows)] of log_events in order ([] if unpartitioned)."""
+    rows = conn.execute(text("""
+        SELECT PARTITION_NAME AS name, TABLE_ROWS AS table_rows
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """), {'table': TABLE}).fetchall()
+    return [(row.name, row.table_rows or 0) for row in rows]
+
+
+def pruned_partitions(conn, since):
+    """Partitions MySQL opens for ``created_timestamp >= since`` (EXPLAIN)."""
+    row = conn.execute(
+        text(f"EXPLAIN SELECT COUNT(*) FROM {TABLE} WHERE created_timestamp >= :since"), {'since': since}
+    ).mappings().first()
+    return (row or {}).get('partitions')
+
+
+# ---------------------------------------------------------------------------
+# Conversion and maintenance
+# ---------------------------------------------------------------------------
+
+def convert_table(db, months_ahead, logger=None):
+    """
+    Rebuild an existing, unpartitioned log_events as a partitioned table.
+
+    Returns:
+        bool: True if the table was converted
+    """
+    with db.engine.begin() as conn:
+        if list_partitions(conn):
+            return False
+        oldest = conn.execute(text(f"SELECT MIN(created_timestamp) FROM {TABLE}")).scalar()
+        # MySQL can't partition a table with a FULLTEXT index (see log_search.py)
+        has_fulltext = conn.execute(text("""
+            SELECT 1 FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND INDEX_TYPE = 'FULLTEXT'
+            LIMIT 1
+        """), {'table': TABLE}).first() is not None
+        # Rows without a timestamp cannot be placed in a month
+        conn.execute(text(f"UPDATE {TABLE} SET created_timestamp = NOW() WHERE created_timestamp IS NULL"))
+
+    this_month = month_start(date.today())
+    first_month = month_start(oldest) if oldest else this_month
+    if logger:
+        logger.info(f"Partitioning {TABLE} by month from {first_month:%Y-%m} (table rebuild)")
+    with db.engine.begin() as conn:
+        conn.execute(text(f"""
+            ALTER TABLE {TABLE}
+                MODIFY created_timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_timestamp),
+                DROP INDEX event_id, ADD UNIQUE KEY uq_event_id (event_id, created_timestamp)
+                {', DROP INDEX ft_log_search' if has_fulltext else ''}
+            {partition_clause(first_month, add_months(this_month, months_ahead))}
+        """))
+    return True
+
+
+def maintain_partitions(db, months_ahead=3, retention_months=12, logger=None, today=None):
+    """
+    Pre-create the next *months_ahead* months and drop months older than
+    *retention_months* (0 keeps every month).
+
+    Returns:
+        dict: created / dropped partition names (skipped when unpartitioned)
+    """
+    this_month = month_start(today or date.today())
+    with db.engine.connect() as conn:
+        partitions = [name for name, _ in list_partitions(conn)]
+    if not partitions:
+        return {'skipped': True, 'created': [], 'dropped': []}
+
+    months = [m for m in map(partition_month, partitions) if m]
+    newest = max(months) if months else add_months(this_month, -1)
+    created = []
+    month = add_months(newest, 1)
+    while month <= add_months(this_month, months_ahead):
+        created.append(month)
+        month = add_months(month, 1)
+
+    dropped = []
+    if retention_months:
+        oldest_kept = add_months(this_month, -retention_months)
+        dropped = [partition_name(m) for m in months if m < oldest_kept]
+
+    with db.engine.begin() as conn:
+        if created:
+            # pmax is empty while future months exist, so the split moves no rows
+            definitions = [_partition_definition(m) for m in created]
+            definitions.append(f"PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE")
+            conn.execute(text(
+                f"ALTER TABLE {TABLE} REORGANIZE PARTITION {MAX_PARTITION} INTO ({', '.join(definitions)})"
+            ))
+        if dropped:
+            conn.execute(text(f"ALTER TABLE {TABLE} DROP PARTITION {', '.join(dropped)}"))
+
+    created = [partition_name(m) for m in created]
+    if logger and (created or dropped):
+        logger.info(f"{TABLE} partitions: created {created or 'none'}, dropped {dropped or 'none'}")
+    return {'skipped': False, 'created': created, 'dropped': dropped}
+
+
+def register_cli(app, db):
+    """Register ``flask log-partitions``."""
+
+    @app.cli.command('log-partitions')
+    @click.option('--days', default=7, show_default=True, help='Window used for the pruning check.')
+    def log_partitions_command(days):
+        """Show log_events partitions and which ones a recent-logs query reads"""
+        if not is_supported(db):
+            click.echo(f"ℹ️  {TABLE} partitioning needs MySQL (dialect: {db.engine.dialect.name}).")
+            return
+        with db.engine.connect() as conn:
+            partitions = list_partitions(conn)
+            if not partitions:
+                click.echo(f"ℹ️  {TABLE} is not partitioned (LOG_PARTITIONING="
+                           f"{app.config.get('LOG_PARTITIONING')}).")
+                return
+            for name, rows in partitions:
+                click.echo(f"{name:<10} ~{rows:,} rows")
+            since = datetime.now() - timedelta(days=days)
+            click.echo(f"Last {days} day(s) read: {pruned_partitions(conn, since)}")
@@ -0,0 +1,269 @@
+"""
+Log Search
+==========
+
+Indexed full-text search over ``log_events`` for the admin log viewer.
+
+The viewer's search box used to add ``event_description LIKE '%term%' OR
+event_type LIKE ... OR username LIKE ...`` to a COUNT(*) and an
+OFFSET-paginated SELECT, a scan of the TEXT column on every keystroke.
+``search_logs()`` uses a word index instead:
+
+    MySQL    FULLTEXT KEY ft_log_search (event_type, event_description, username)
+             queried with MATCH ... AGAINST (... IN BOOLEAN MODE)
+    SQLite   FTS5 table log_events_fts (external content, kept in sync by
+             triggers), queried with MATCH and ranked by bm25()
+
+Every word of the query must match as a word prefix, so typing ``fail
+pass`` finds "failed password".  Words shorter than ``MIN_TERM_LENGTH``
+(InnoDB's default ``innodb_ft_min_token_size``) are not indexed; a query
+without longer words falls back to LIKE within the day window.
+
+Results are ranked by relevance (or ``sort='recent'``: newest first) and
+paged with an opaque keyset cursor (last score + id) instead of OFFSET, so
+every page is a bounded read and there is no COUNT(*).
+
+New tables get the index from ``AppLogger._create_log_table``; existing
+ones from migration ``0006_log_search_index`` (on MySQL the first
+FULLTEXT index rebuilds the table, so run it in a maintenance window).  MySQL cannot FULLTEXT-index a
+partitioned table, so with ``LOG_PARTITIONING`` search uses the LIKE
+fallback over the partitions of the day window.
+"""
+
+import base64
+import json
+import re
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import inspect, text
+
+FT_INDEX = 'ft_log_search'
+FTS_TABLE = 'log_events_fts'
+SEARCH_COLUMNS = 'event_type, event_description, username'
+MIN_TERM_LENGTH = 3
+MAX_TERMS = 8
+BACKEND_TTL = 300   # seconds between index existence checks
+
+SELECT_COLUMNS = """
+    e.id, e.event_id, e.event_type, e.event_category, e.event_description, e.event_data,
+    e.severity_level, e.created_timestamp, e.username, e.user_id, e.ip_address
+"""
+
+FTS5_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        event_type, event_description, username, content='log_events', content_rowid='id'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON log_events BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, event_type, event_description, username)
+        VALUES (new.id, new.event_type, new.event_description, new.username);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON log_events BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, event_type, event_description, username)
+        VALUES ('delete', old.id, old.event_type, old.event_description, old.username);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON log_events BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, event_type, event_description, username)
+        VALUES ('delete', old.id, old.event_type, old.event_description, old.username);
+        INSERT INTO {FTS_TABLE}(rowid, event_type, event_description, username)
+        VALUES (new.id, new.event_type, new.event_description, new.username);
+    END""",
+]
+
+_backends = {}   # engine url -> (backend, checked at)
+
+
+# ---------------------------------------------------------------------------
+# Index
+# ---------------------------------------------------------------------------
+
+def create_index(db, logger=None):
+    """
+    Add the word index to an existing log_events table.
+
+    Returns:
+        str: 'fulltext', 'fts5', or None when unsupported (partitioned
+             MySQL table, other dialects, no log_events)
+    """
+    engine = db.engine
+    if not inspect(engine).has_table('log_events'):
+        return None
+    _backends.pop(engine.url, None)
+
+    if engine.dialect.name == 'sqlite':
+        with engine.begin() as conn:
+            for statement in FTS5_DDL:
+                conn.exec_driver_sql(statement)
+            conn.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        return 'fts5'
+
+    if engine.dialect.name != 'mysql':
+        return None
+    if search_backend(db) == 'fulltext':
+        return 'fulltext'
+    with engine.begin() as conn:
+        from log_partitions import list_partitions
+        if list_partitions(conn):
+            if logger:
+                logger.warning("log_events is partitioned; MySQL cannot add a FULLTEXT index, "
+                               "log search keeps the LIKE fallback")
+            return None
+        if logger:
+            logger.info(f"Adding FULLTEXT index {FT_INDEX} to log_events")
+        conn.exec_driver_sql(f"ALTER TABLE log_events ADD FULLTEXT KEY {FT_INDEX} ({SEARCH_COLUMNS})")
+    _backends.pop(engine.url, None)
+    return 'fulltext'
+
+
+def search_backend(db):
+    """'fulltext', 'fts5' or None (LIKE fallback) for this database."""
+    engine = db.engine
+    cached = _backends.get(engine.url)
+    if cached and time.time() - cached[1] < BACKEND_TTL:
+        return cached[0]
+
+    backend = None
+    try:
+        if engine.dialect.name == 'mysql':
+            with engine.connect() as conn:
+                if conn.execute(text("""
+                    SELECT 1 FROM information_schema.STATISTICS
+                    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'log_events' AND INDEX_NAME = :name
+                    LIMIT 1
+                """), {'name': FT_INDEX}).first():
+                    backend = 'fulltext'
+        elif engine.dialect.name == 'sqlite' and inspect(engine).has_table(FTS_TABLE):
+            backend = 'fts5'
+    except Exception:
+        backend = None
+    _backends[engine.url] = (backend, time.time())
+    return backend
+
+
+# ---------------------------------------------------------------------------
+# Query
+# ---------------------------------------------------------------------------
+
+def search_terms(query):
+    """Indexable words of *query* (at most MAX_TERMS)."""
+    words = re.findall(r'\w+', query or '')
+    return [w for w in words if len(w) >= MIN_TERM_LENGTH][:MAX_TERMS]
+
+
+def encode_cursor(score, row_id):
+    return base64.urlsafe_b64encode(json.dumps([score, row_id]).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(score, id) from a cursor; ValueError when malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        score, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (None if score is None else float(score)), int(row_id)
+    except Exception:
+        raise ValueError('invalid cursor')
+
+
+def _row_to_log(row):
+    event_data = row.event_data
+    if isinstance(event_data, str):
+        try:
+            event_data = json.loads(event_data)
+        except (json.JSONDecodeError, TypeError):
+            pass
+    timestamp = row.created_timestamp
+    return {
+        'event_id': row.event_id,
+        'event_type': row.event_type,
+        'event_category': row.event_category,
+        'description': row.event_description,
+        'event_data': event_data,
+        'severity': row.severity_level,
+        'timestamp': timestamp.isoformat() if hasattr(timestamp, 'isoformat') else str(timestamp),
+        'username': row.username or 'System',
+        'user_id': row.user_id,
+        'ip_address': row.ip_address or '-',
+        'score': round(row.score, 4) if row.score is not None else None,
+    }
+
+
+def search_logs(db, query, days=7, category=None, severity=None, limit=50, cursor=None, sort='relevance'):
+    """
+    One page of log events matching *query* within the last *days* days.
+
+    Args:
+        cursor: ``next_cursor`` of the previous page (None for the first)
+        sort: 'relevance' (best match first) or 'recent' (newest first)
+
+    Returns:
+        dict: logs, next_cursor (None on the last page), backend
+
+    Raises:
+        ValueError: malformed cursor
+    """
+    terms = search_terms(query)
+    backend = search_backend(db) if terms else None
+    after_score, after_id = decode_cursor(cursor) if cursor else (None, None)
+    # LIKE results have no relevance, so they always come newest first
+    ranked = sort == 'relevance' and backend is not None
+
+    params = {'cutoff_date': datetime.now() - timedelta(days=days), 'limit': limit + 1}
+    filters = ["e.created_timestamp >= :cutoff_date"]
+    if category:
+        filters.append("e.event_category = :category")
+        params['category'] = category
+    if severity:
+        filters.append("e.severity_level = :severity")
+        params['severity'] = severity
+
+    if backend == 'fulltext':
+        # Every word required, as a prefix (search-as-you-type)
+        params['match'] = ' '.join(f"+{t}*" for t in terms)
+        score_sql = f"MATCH ({SEARCH_COLUMNS}) AGAINST (:match IN BOOLEAN MODE)"
+        source = "log_events e"
+        filters.insert(0, score_sql)
+    elif backend == 'fts5':
+        params['match'] = ' '.join(f'"{t}"*' for t in terms)
+        score_sql = f"-bm25({FTS_TABLE})"
+        source = f"{FTS_TABLE} JOIN log_events e ON e.id = {FTS_TABLE}.rowid"
+        filters.insert(0, f"{FTS_TABLE} MATCH :match")
+    else:
+        score_sql = "NULL"
+        source = "log_events e"
+        if query:
+            filters.append("(e.event_type LIKE :like OR e.event_description LIKE :like OR e.username LIKE :like)")
+            params['like'] = f"%{query}%"
+
+    page_sql = ""
+    if after_id is not None:
+        params['after_id'] = after_id
+        if ranked and after_score is not None:
+            params['after_score'] = after_score
+            page_sql = "WHERE score < :after_score OR (score = :after_score AND id < :after_id)"
+        else:
+            page_sql = "WHERE id < :after_id"
+    order_sql = "score DESC, id DESC" if ranked else "id DESC"
+
+    sql = f"""
+        SELECT * FROM (
+            SELECT {SELECT_COLUMNS}, {score_sql} AS score
+            FROM {source}
+            WHERE {' AND '.join(filters)}
+        ) matches
+        {page_sql}
+        ORDER BY {order_sql}
+        LIMIT :limit
+    """
+    rows = db.session.execute(text(sql), params).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.score if ranked else None, last.id)
+    return {
+        'logs': [_row_to_log(row) for row in rows],
+        'next_cursor': next_cursor,
+        'backend': backend or 'like',
+        'sort': 'relevance' if ranked else 'recent',
+    }
@@ -0,0 +1,197 @@
+"""
+Log Stats
+=========
+
+Hourly rollups of ``log_events`` for the admin log statistics.
+
+``get_log_statistics`` (the /admin/logs page and ``/api/logs/stats``) ran
+COUNT(*) ... GROUP BY event_category over every event of the last N days on
+each page load.  The ``log_stats`` job (``LOG_STATS_ROLLUP_MINUTES``)
+instead keeps
+
+    log_stats_hourly   events per (hour, category, severity, event_type)
+
+and ``rollup_counts()`` sums those rows - a few hundred per day - plus a
+live count of the events logged since the last rollup.
+
+Each run recounts the hours from one hour before the previous run's
+``rolled_up_to`` up to now, so rows committed late or deleted by a purge
+in that span are picked up; older hours are final.  The first run
+backfills ``LOG_RETENTION_DAYS`` one day per transaction, and hours older
+than that are pruned.  ``/api/logs/clear-old`` drops the rollup hours it
+purged with ``forget_before()``; ``/api/logs/clear`` drops the rollup with
+``reset()`` and the next run backfills from what is left.
+
+Counts are per whole hour: a window starting at 14:20 includes the events
+from 14:00.  Until the first rollup (or with the job disabled) readers get
+None and count ``log_events`` directly.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, delete, func, insert, select, text, update
+
+_metadata = MetaData()
+
+hourly_table = Table(
+    'log_stats_hourly', _metadata,
+    Column('stat_hour', DateTime, primary_key=True),
+    Column('event_category', String(30), primary_key=True),
+    Column('severity_level', String(20), primary_key=True),
+    Column('event_type', String(50), primary_key=True),
+    Column('events', Integer, nullable=False),
+)
+
+state_table = Table(
+    'log_stats_state', _metadata,
+    Column('name', String(50), primary_key=True),
+    Column('rolled_up_to', DateTime, nullable=False),
+)
+
+STATE_NAME = 'hourly'
+GROUP_COLUMNS = ('event_category', 'severity_level', 'event_type')
+
+_tables_ready = set()
+
+
+def _engine(db):
+    engine = db.engine
+    if engine.url not in _tables_ready:
+        _metadata.create_all(bind=engine, checkfirst=True)
+        _tables_ready.add(engine.url)
+    return engine
+
+
+def floor_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _hour_sql(dialect):
+    """SQL for the hour of created_timestamp (decoded by _parse_hour)."""
+    if dialect == 'sqlite':
+        return "strftime('%Y-%m-%d %H', created_timestamp)"
+    return "TO_DAYS(created_timestamp) * 24 + HOUR(created_timestamp)"
+
+
+def _parse_hour(value):
+    if isinstance(value, str):
+        return datetime.strptime(value, '%Y-%m-%d %H')
+    day, hour = divmod(int(value), 24)
+    # MySQL TO_DAYS counts from year 0, Python ordinals from year 1
+    return datetime.fromordinal(day - 365).replace(hour=hour)
+
+
+def rolled_up_to(db):
+    """End of the rolled-up range (datetime), or None before the first rollup."""
+    with _engine(db).connect() as conn:
+        return conn.execute(
+            select(state_table.c.rolled_up_to).where(state_table.c.name == STATE_NAME)
+        ).scalar()
+
+
+# ---------------------------------------------------------------------------
+# Writer (log_stats job)
+# ---------------------------------------------------------------------------
+
+def _recount(conn, dialect, start, end):
+    """Replace the rollup rows of [start, end) with a fresh count."""
+    rows = conn.execute(text(f"""
+        SELECT {_hour_sql(dialect)} AS stat_hour, event_category, severity_level, event_type,
+               COUNT(*) AS events
+        FROM log_events
+        WHERE created_timestamp >= :start AND created_timestamp < :end
+        GROUP BY 1, 2, 3, 4
+    """), {'start': start, 'end': end}).fetchall()
+    conn.execute(delete(hourly_table).where(hourly_table.c.stat_hour >= start, hourly_table.c.stat_hour < end))
+    if rows:
+        conn.execute(insert(hourly_table), [{
+            'stat_hour': _parse_hour(row.stat_hour),
+            'event_category': row.event_category or '',
+            'severity_level': row.severity_level or '',
+            'event_type': row.event_type or '',
+            'events': row.events,
+        } for row in rows])
+    return len(rows)
+
+
+def rollup(db, retention_days=90, now=None, logger=None):
+    """
+    Bring log_stats_hourly up to *now* and prune hours older than
+    *retention_days*.
+
+    Returns:
+        dict: start, rolled_up_to, rows (rollup rows written)
+    """
+    engine = _engine(db)
+    dialect = engine.dialect.name
+    now = now or datetime.now()
+    previous = rolled_up_to(db)
+    oldest = floor_hour(now - timedelta(days=retention_days))
+    start = max(floor_hour(previous) - timedelta(hours=1), oldest) if previous else oldest
+    if previous is None and logger:
+        logger.info(f"Backfilling log_stats_hourly from {start}")
+
+    written = 0
+    day_start = start
+    while day_start < now:
+        # One day per transaction during the backfill; normally a single step
+        day_end = min(day_start + timedelta(days=1), now)
+        with engine.begin() as conn:
+            written += _recount(conn, dialect, day_start, day_end)
+        day_start = day_end
+
+    with engine.begin() as conn:
+        conn.execute(delete(hourly_table).where(hourly_table.c.stat_hour < oldest))
+        values = {'rolled_up_to': now}
+        if not conn.execute(update(state_table).where(state_table.c.name == STATE_NAME).values(**values)).rowcount:
+            conn.execute(insert(state_table).values(name=STATE_NAME, **values))
+    return {'start': start, 'rolled_up_to': now, 'rows': written}
+
+
+def forget_before(db, cutoff):
+    """Drop rollup hours that ended before *cutoff* (after a range purge)."""
+    with _engine(db).begin() as conn:
+        conn.execute(delete(hourly_table).where(hourly_table.c.stat_hour < floor_hour(cutoff)))
+
+
+def reset(db):
+    """Forget every rollup (after clearing log_events); readers count live until the next run."""
+    with _engine(db).begin() as conn:
+        conn.execute(delete(state_table))
+        conn.execute(delete(hourly_table))
+
+
+# ---------------------------------------------------------------------------
+# Reader
+# ---------------------------------------------------------------------------
+
+def rollup_counts(db, since, group_by='event_category'):
+    """
+    {value: events} of log events since *since* (hour granularity), or
+    None when there is no rollup yet.
+    """
+    if group_by not in GROUP_COLUMNS:
+        raise ValueError(f"cannot group log stats by {group_by!r}")
+    column = hourly_table.c[group_by]
+    counts = {}
+    # One transaction, so the state and the rollup rows are read from the same snapshot
+    with _engine(db).connect() as conn:
+        upto = conn.execute(
+            select(state_table.c.rolled_up_to).where(state_table.c.name == STATE_NAME)
+        ).scalar()
+        if upto is None:
+            return None
+        for value, events in conn.execute(
+            select(column, func.sum(hourly_table.c.events))
+            .where(hourly_table.c.stat_hour >= floor_hour(since))
+            .group_by(column)
+        ):
+            counts[value] = int(events)
+        # Events logged since the last rollup
+        for value, events in conn.execute(text(f"""
+            SELECT {group_by}, COUNT(*) FROM log_events
+            WHERE created_timestamp >= :upto
+            GROUP BY {group_by}
+        """), {'upto': max(upto, since)}):
+            counts[value or ''] = counts.get(value or '', 0) + events
+    return counts
@@ -140,11 +140,39 @@ class AppLogger:
         """Create database table for storing critical log events"""
         try:
             with self.app.app_context():
+                if self.db.engine.dialect.name == 'sqlite':
+                    self._create_sqlite_log_table()
+                    return
+                
                 # Create log_events table if it doesn't exist
-                create_table_sql = """
-                CREATE TABLE IF NOT EXISTS log_events (
+                # Monthly partitions need the timestamp in every unique key (see log_partitions.py)
+                partitioned = (self.app.config.get('LOG_PARTITIONING')
+                               and self.db.engine.dialect.name == 'mysql')
+                if partitioned:
+                    from log_partitions import add_months, month_start, partition_clause
+                    this_month = month_start(date.today())
+                    keys_sql = """
+                    id INT AUTO_INCREMENT,
+                    event_id VARCHAR(36) NOT NULL,"""
+                    timestamp_sql = "created_timestamp DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,"
+                    extra_keys_sql = """
+                    PRIMARY KEY (id, created_timestamp),
+                    UNIQUE KEY uq_event_id (event_id, created_timestamp),"""
+                    partition_sql = partition_clause(
+                        this_month, add_months(this_month, self.app.config.get('LOG_PARTITION_MONTHS_AHEAD', 3))
+                    )
+                else:
+                    keys_sql = """
                     id INT AUTO_INCREMENT PRIMARY KEY,
-                    event_id VARCHAR(36) UNIQUE NOT NULL,
+                    event_id VARCHAR(36) UNIQUE NOT NULL,"""
+                    timestamp_sql = "created_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,"
+                    # Partitioned tables can't have one (see log_search.py)
+                    extra_keys_sql = """
+                    FULLTEXT KEY ft_log_search (event_type, event_description, username),"""
+                    partition_sql = ""
+                
+                create_table_sql = f"""
+                CREATE TABLE IF NOT EXISTS log_events ({keys_sql}
                     event_type VARCHAR(50) NOT NULL,
                     event_category VARCHAR(30) NOT NULL,
                     user_id INT NULL,
@@ -156,13 +184,14 @@ class AppLogger:
                     request_path VARCHAR(500) NULL,
                     session_id VARCHAR(100) NULL,
                     severity_level VARCHAR(20) DEFAULT 'INFO',
-                    created_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    {timestamp_sql}{extra_keys_sql}
                     INDEX idx_event_type (event_type),
                     INDEX idx_event_category (event_category),
                     INDEX idx_user_id (user_id),
                     INDEX idx_created_timestamp (created_timestamp),
                     INDEX idx_severity_level (severity_level)
-                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+                {partition_sql};
                 """
                 
                 self.db.session.execute(text(create_table_sql))
@@ -171,6 +200,33 @@ class AppLogger:
         except Exception as e:
             logging.getLogger('qr_attendance_app').warning(f"Could not create log_events table: {e}")
     
+    def _create_sqlite_log_table(self):
+        """SQLite (local / testing) log_events with an FTS5 search index"""
+        from log_search import FTS5_DDL
+        with self.db.engine.begin() as conn:
+            conn.exec_driver_sql("""
+            CREATE TABLE IF NOT EXISTS log_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                event_id VARCHAR(36) UNIQUE NOT NULL,
+                event_type VARCHAR(50) NOT NULL,
+                event_category VARCHAR(30) NOT NULL,
+                user_id INT NULL,
+                username VARCHAR(80) NULL,
+                event_description TEXT NOT NULL,
+                event_data JSON NULL,
+                ip_address VARCHAR(45) NULL,
+                user_agent TEXT NULL,
+                request_path VARCHAR(500) NULL,
+                session_id VARCHAR(100) NULL,
+                severity_level VARCHAR(20) DEFAULT 'INFO',
+                created_timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+            for column in ('event_type', 'event_category', 'user_id', 'created_timestamp', 'severity_level'):
+                conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS idx_log_events_{column} ON log_events ({column})")
+            for statement in FTS5_DDL:
+                conn.exec_driver_sql(statement)
+    
     def _register_error_handlers(self):
         """Register Flask error handlers for automatic logging"""
         
@@ -616,45 +672,40 @@ class AppLogger:
             
             # Check if table exists first
             try:
-                table_check = self.db.session.execute(text("SHOW TABLES LIKE 'log_events'")).fetchone()
-                if not table_check:
+                from sqlalchemy import inspect
+                if not inspect(self.db.engine).has_table('log_events'):
                     self.logger.warning("get_log_statistics: log_events table does not exist")
                     return stats
             except Exception as table_error:
                 self.logger.warning(f"get_log_statistics: cannot check table existence: {table_error}")
                 return stats
             
-            # Get total events count
+            # Events per category; the total is their sum
             try:
-                total_sql = """
-                SELECT COUNT(*) as total_events
-                FROM log_events 
-                WHERE created_timestamp >= :cutoff_date
-                """
-                
-                total_result = self.db.session.execute(text(total_sql), {'cutoff_date': cutoff_date}).fetchone()
-                if total_result:
-                    stats['total_events'] = total_result.total_events
-                    self.logger.debug(f"get_log_statistics: {stats['total_events']} total events in last {days} days")
-            except Exception as total_error:
-                self.logger.warning(f"get_log_statistics: error getting total events: {total_error}")
-            
-            # Get events by category
-            try:
-                category_sql = """
-                SELECT 
-                    event_category,
-                    COUNT(*) as event_count
-                FROM log_events 
-                WHERE created_timestamp >= :cutoff_date
-                GROUP BY event_category
-                """
+                # Hourly rollups (see log_stats.py), or None before the first rollup
+                try:
+                    from log_stats import rollup_counts
+                    category_counts = rollup_counts(self.db, cutoff_date, group_by='event_category')
+                except Exception as rollup_error:
+                    self.logger.warning(f"get_log_statistics: rollup unavailable: {rollup_error}")
+                    category_counts = None
                 
-                category_result = self.db.session.execute(text(category_sql), {'cutoff_date': cutoff_date}).fetchall()
+                if category_counts is None:
+                    # One range scan on created_timestamp (only the matching
+                    # partitions when log_events is partitioned)
+                    category_sql = """
+                    SELECT 
+                        event_category,
+                        COUNT(*) as event_count
+                    FROM log_events 
+                    WHERE created_timestamp >= :cutoff_date
+                    GROUP BY event_category
+                    """
+                    category_result = self.db.session.execute(text(category_sql), {'cutoff_date': cutoff_date}).fetchall()
+                    category_counts = {row.event_category: row.event_count for row in category_result}
                 
-                for row in category_result:
-                    category = row.event_category
-                    count = row.event_count
+                for category, count in category_counts.items():
+                    stats['total_events'] += count
                     self.logger.debug(f"get_log_statistics: {count} events in category: {category}")
                     
                     # Map categories to stats keys
@@ -670,6 +721,8 @@ class AppLogger:
                         stats['application_events'] = count
                     elif category == 'system':
                         stats['system_events'] = count
+                
+                self.logger.debug(f"get_log_statistics: {stats['total_events']} total events in last {days} days")
                         
             except Exception as category_error:
                 self.logger.warning(f"get_log_statistics: error getting category stats: {category_error}")
@@ -690,68 +743,57 @@ class AppLogger:
                 'system_events': 0
             }
     
-    def cleanup_old_logs(self, days_to_keep=90):
-        """Clean up old log entries from database"""
+    def purge_log_events(self, name, where='1=1', params=None, max_seconds=None):
+        """
+        Delete log_events rows matching *where* in small key-range chunks
+        (see utils/chunked_purge.py); resumable under *name*.
+        
+        Returns:
+            dict: ChunkedPurge.run() result
+        """
+        from utils.chunked_purge import ChunkedPurge
+        config = self.app.config if self.app else {}
+        return ChunkedPurge(
+            self.db, 'log_events', where=where, params=params, name=name,
+            batch_size=config.get('PURGE_BATCH_SIZE', 5000),
+            sleep_seconds=config.get('PURGE_SLEEP_SECONDS', 0.05),
+            max_seconds=max_seconds,
+            logger=self.logger
+        ).run()
+    
+    def purge_old_logs(self, days_to_keep=90, max_seconds=None):
+        """
+        Delete non-critical log entries older than *days_to_keep* days
+        
+        The cutoff is midnight, so repeated calls on one day continue the
+        same (resumable) purge.
+        
+        Returns:
+            dict: ChunkedPurge.run() result (+ cutoff_date)
+        """
+        cutoff_date = datetime.combine(date.today() - timedelta(days=days_to_keep), datetime.min.time())
+        self.logger.info(f"Starting log cleanup: removing entries older than {cutoff_date}")
+        result = self.purge_log_events(
+            'log_retention',
+            where="created_timestamp < :cutoff_date AND severity_level NOT IN ('ERROR', 'CRITICAL', 'HIGH')",
+            params={'cutoff_date': cutoff_date},
+            max_seconds=max_seconds
+        )
+        result['cutoff_date'] = cutoff_date
+        self.logger.info(
+            f"Log cleanup {'completed' if result['complete'] else 'paused'}: {result['deleted']} entries removed "
+            f"(keeping entries newer than {days_to_keep} days)"
+        )
+        return result
+    
+    def cleanup_old_logs(self, days_to_keep=90, max_seconds=None):
+        """Clean up old log entries from database; returns the number deleted"""
         try:
-            from datetime import datetime, timedelta  # Import here as backup
-            cutoff_date = datetime.now() - timedelta(days=days_to_keep)
-            self.logger.info(f"Starting log cleanup: removing entries older than {cutoff_date}")
-            
-            # Check if table exists first
-            try:
-                table_check = self.db.session.execute(text("SHOW TABLES LIKE 'log_events'")).fetchone()
-                if not table_check:
-                    self.logger.warning("cleanup_old_logs: log_events table does not exist")
-                    return 0
-            except Exception as table_error:
-                self.logger.warning(f"cleanup_old_logs: cannot check table existence: {table_error}")
-                return 0
-            
-            # First, count how many records will be deleted
-            try:
-                count_sql = """
-                SELECT COUNT(*) as count_to_delete
-                FROM log_events 
-                WHERE created_timestamp < :cutoff_date 
-                AND severity_level NOT IN ('ERROR', 'CRITICAL', 'HIGH')
-                """
-                
-                count_result = self.db.session.execute(text(count_sql), {'cutoff_date': cutoff_date}).fetchone()
-                count_to_delete = count_result.count_to_delete if count_result else 0
-                
-                self.logger.debug(f"cleanup_old_logs: {count_to_delete} records to delete")
-                
-                if count_to_delete == 0:
-                    self.logger.info("cleanup_old_logs: no old records found to cleanup")
-                    return 0
-                    
-            except Exception as count_error:
-                self.logger.warning(f"cleanup_old_logs: error counting records: {count_error}")
-                return 0
-            
-            # Perform the cleanup - exclude critical logs
-            try:
-                cleanup_sql = """
-                DELETE FROM log_events 
-                WHERE created_timestamp < :cutoff_date 
-                AND severity_level NOT IN ('ERROR', 'CRITICAL', 'HIGH')
-                """
-                
-                result = self.db.session.execute(text(cleanup_sql), {'cutoff_date': cutoff_date})
-                deleted_count = result.rowcount
-                self.db.session.commit()
-                
-                self.logger.info(f"cleanup_old_logs: deleted {deleted_count} old log entries")
-                
-                # Log the cleanup operation
-                self.logger.info(f"Log cleanup completed: {deleted_count} entries removed (keeping entries newer than {days_to_keep} days)")
-                
-                return deleted_count
-                
-            except Exception as delete_error:
-                self.logger.error(f"cleanup_old_logs: error during deletion: {delete_error}", exc_info=True)
-                self.db.session.rollback()
+            from sqlalchemy import inspect
+            if not inspect(self.db.engine).has_table('log_events'):
+                self.logger.warning("cleanup_old_logs: log_events table does not exist")
                 return 0
+            return self.purge_old_logs(days_to_keep, max_seconds=max_seconds)['deleted']
             
         except Exception as e:
             self.logger.error(f"Error in cleanup_old_logs: {e}", exc_info=True)
@@ -762,9 +804,16 @@ class AppLogger:
     def get_recent_logs(self, days=7, limit=100, category_filter=None, severity_filter=None, search_term=None):
         """Enhanced method to get recent logs with filtering options"""
         try:
+            if search_term:
+                # Word index instead of LIKE '%term%' (see log_search.py)
+                from log_search import search_logs
+                return search_logs(self.db, search_term, days=days, category=category_filter,
+                                   severity=severity_filter, limit=limit, sort='recent')['logs']
+            
             cutoff_date = datetime.now() - timedelta(days=days)
             
-            # Build the base query
+            # Build the base query; keep the created_timestamp range on the
+            # bare column so a partitioned log_events only opens those months
             base_sql = """
             SELECT 
                 event_id,
@@ -791,10 +840,6 @@ class AppLogger:
                 base_sql += " AND severity_level = :severity_filter" 
                 params['severity_filter'] = severity_filter
             
-            if search_term:
-                base_sql += " AND (event_description LIKE :search_term OR event_type LIKE :search_term OR username LIKE :search_term)"
-                params['search_term'] = f"%{search_term}%"
-            
             # Add ordering and limit
             base_sql += " ORDER BY created_timestamp DESC LIMIT :limit"
             params['limit'] = limit
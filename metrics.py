@@ -0,0 +1,484 @@
+"""
+Metrics
+=======
+
+Process-safe request, database, geocoder and job metrics exposed in
+Prometheus text format on ``/metrics``.
+
+Each process records into the module-level ``registry`` (plain dicts under
+a lock: one counter value or one bucket array per label set).  Every
+``METRICS_FLUSH_INTERVAL`` seconds — and at exit — a process writes its
+snapshot to ``METRICS_DIR/live_<pid>.json``.  ``/metrics`` merges every
+live file, so any gunicorn worker returns the whole host's numbers:
+
+    - counters and histogram buckets are summed across files;
+    - files of processes that have exited are folded into
+      ``archive.json`` (under an flock), so totals survive worker
+      recycling and restarts;
+    - a forked child drops whatever it inherited from its parent.
+
+Histograms use fixed cumulative buckets, so p99 is
+``histogram_quantile(0.99, rate(qr_http_request_duration_seconds_bucket[5m]))``.
+
+Recording helpers:
+    inc(name, labels)                    - counter
+    observe(name, seconds, labels)       - histogram
+    track_geocoder(provider, operation)  - context manager around an API call
+    track_job(job)                       - decorator for import/export jobs
+"""
+
+import atexit
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import wraps
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:  # Windows dev boxes: archive folding is skipped
+    HAS_FCNTL = False
+
+from flask import Response, current_app, g, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+JOB_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+INSPECTION_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05)
+
+# name -> (type, help, buckets)
+METRICS = {
+    'qr_http_requests_total': (
+        'counter', 'HTTP requests by endpoint, method and status.', None),
+    'qr_http_request_duration_seconds': (
+        'histogram', 'HTTP request latency by endpoint.', LATENCY_BUCKETS),
+    'qr_db_queries_total': (
+        'counter', 'SQL statements executed, by operation.', None),
+    'qr_db_query_duration_seconds': (
+        'histogram', 'SQL statement execution time, by operation.', DB_BUCKETS),
+    'qr_request_inspection_seconds': (
+        'histogram', 'Time spent scanning request fields for attack patterns, by endpoint.', INSPECTION_BUCKETS),
+    'qr_db_n_plus_one_total': (
+        'counter', 'Requests that repeated one statement fingerprint past DB_N_PLUS_ONE_THRESHOLD.', None),
+    'qr_geocoder_requests_total': (
+        'counter', 'External geocoder API calls by provider, operation and outcome.', None),
+    'qr_geocoder_request_duration_seconds': (
+        'histogram', 'External geocoder API call latency by provider.', LATENCY_BUCKETS),
+    'qr_job_duration_seconds': (
+        'histogram', 'Import/export job duration by job and outcome.', JOB_BUCKETS),
+    'qr_scheduler_job_duration_seconds': (
+        'histogram', 'In-app scheduled job duration by job and outcome.', JOB_BUCKETS),
+    'qr_scheduler_missed_runs_total': (
+        'counter', 'Scheduled runs missed while no scheduler was up (caught up with one run), by job.', None),
+}
+
+_DB_OPERATIONS = frozenset(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE', 'WITH'))
+
+
+class MetricsRegistry:
+    """In-process metric values keyed by (metric name, sorted label pairs)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.token = uuid.uuid4().hex
+        self.counters = {}     # (name, labels) -> value
+        self.histograms = {}   # (name, labels) -> [bucket counts..., +Inf count, sum]
+
+    def _check_fork(self):
+        if os.getpid() != self.pid:
+            self._reset()
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._check_fork()
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=None):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._check_fork()
+            values = self.histograms.get(key)
+            if values is None:
+                values = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    values[i] += 1
+                    break
+            else:
+                values[len(buckets)] += 1
+            values[-1] += value
+
+    def snapshot(self):
+        """JSON-serialisable copy of this process's values."""
+        with self._lock:
+            self._check_fork()
+            return {
+                'pid': self.pid,
+                'token': self.token,
+                'counters': [[n, list(map(list, l)), v] for (n, l), v in self.counters.items()],
+                'histograms': [[n, list(map(list, l)), list(v)] for (n, l), v in self.histograms.items()],
+            }
+
+
+def merge_snapshots(snapshots):
+    """Sum several snapshots into {'counters': {...}, 'histograms': {...}} keyed by (name, labels)."""
+    counters, histograms = {}, {}
+    for snap in snapshots:
+        for name, labels, value in snap.get('counters', []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, values in snap.get('histograms', []):
+            if name not in METRICS or len(values) != len(METRICS[name][2]) + 2:
+                continue   # bucket layout changed since the file was written
+            key = (name, tuple(tuple(pair) for pair in labels))
+            current = histograms.get(key)
+            histograms[key] = list(values) if current is None else [a + b for a, b in zip(current, values)]
+    return {'counters': counters, 'histograms': histograms}
+
+
+def _to_snapshot(merged):
+    return {
+        'counters': [[n, list(map(list, l)), v] for (n, l), v in merged['counters'].items()],
+        'histograms': [[n, list(map(list, l)), v] for (n, l), v in merged['histograms'].items()],
+    }
+
+
+def histogram_quantile(q, values, buckets):
+    """Estimate quantile *q* from non-cumulative bucket counts (Prometheus-style interpolation)."""
+    total = sum(values[:len(buckets) + 1])
+    if not total:
+        return None
+    rank = q * total
+    seen, lower = 0, 0.0
+    for count, upper in zip(values, buckets):
+        if seen + count >= rank and count:
+            return lower + (upper - lower) * (rank - seen) / count
+        seen += count
+        lower = upper
+    return buckets[-1]
+
+
+class MultiprocessStore:
+    """Per-process snapshot files in one directory, merged on read."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _live_path(self, pid):
+        return os.path.join(self.directory, f"live_{pid}.json")
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write(path, data):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _alive(pid):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def flush(self, snapshot):
+        path = self._live_path(snapshot['pid'])
+        previous = self._read(path)
+        if previous and previous.get('token') != snapshot['token']:
+            # pid reused by a new process: keep the old process's totals
+            self._fold([path])
+        self._write(path, snapshot)
+
+    def _fold(self, paths):
+        """Add the given live files to archive.json and remove them."""
+        if not HAS_FCNTL:
+            return
+        archive_path = os.path.join(self.directory, 'archive.json')
+        with open(os.path.join(self.directory, '.lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            snapshots = [self._read(archive_path) or {}]
+            folded = []
+            for path in paths:
+                snap = self._read(path)
+                if snap is not None:
+                    snapshots.append(snap)
+                    folded.append(path)
+            if not folded:
+                return
+            self._write(archive_path, _to_snapshot(merge_snapshots(snapshots)))
+            for path in folded:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def collect(self, own_snapshot):
+        """Merged view of the archive, every live file and *own_snapshot*."""
+        dead, snapshots = [], [own_snapshot]
+        for name in os.listdir(self.directory):
+            if not (name.startswith('live_') and name.endswith('.json')):
+                continue
+            try:
+                pid = int(name[5:-5])
+            except ValueError:
+                continue
+            if pid == own_snapshot['pid']:
+                continue
+            path = os.path.join(self.directory, name)
+            if not self._alive(pid):
+                dead.append(path)
+                continue
+            snap = self._read(path)
+            if snap:
+                snapshots.append(snap)
+        if dead:
+            self._fold(dead)
+        snapshots.append(self._read(os.path.join(self.directory, 'archive.json')) or {})
+        return merge_snapshots(snapshots)
+
+
+registry = MetricsRegistry()
+_state = {'store': None, 'flush_interval': 5.0, 'next_flush': 0.0}
+
+
+# ----------------------------------------------------------------------
+# Recording helpers
+# ----------------------------------------------------------------------
+
+def inc(name, labels=None, value=1):
+    registry.inc(name, labels, value)
+
+
+def observe(name, value, labels=None):
+    registry.observe(name, value, labels)
+
+
+@contextmanager
+def track_geocoder(provider, operation):
+    """
+    Count and time one external geocoder call.  Exceptions count as
+    ``error``; the caller may set ``call['outcome']`` (e.g. ``http_error``).
+    """
+    started = time.perf_counter()
+    call = {'outcome': 'ok'}
+    try:
+        yield call
+    except Exception:
+        call['outcome'] = 'error'
+        raise
+    finally:
+        inc('qr_geocoder_requests_total', {'provider': provider, 'operation': operation, 'outcome': call['outcome']})
+        observe('qr_geocoder_request_duration_seconds', time.perf_counter() - started, {'provider': provider})
+
+
+def track_job(job):
+    """Record a job's duration; raising or returning {'success': False} counts as failed."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            outcome = 'failed'
+            try:
+                result = func(*args, **kwargs)
+                if not (isinstance(result, dict) and result.get('success') is False):
+                    outcome = 'success'
+                return result
+            finally:
+                observe('qr_job_duration_seconds', time.perf_counter() - started,
+                        {'job': job, 'outcome': outcome})
+        return wrapper
+    return decorator
+
+
+def flush(force=False):
+    """Write this process's snapshot when the flush interval has passed."""
+    store = _state['store']
+    now = time.time()
+    if store is None or (not force and now < _state['next_flush']):
+        return
+    _state['next_flush'] = now + _state['flush_interval']
+    store.flush(registry.snapshot())
+
+
+def collect():
+    """Host-wide merged values (this process only when no store is configured)."""
+    own = registry.snapshot()
+    store = _state['store']
+    if store is None:
+        return merge_snapshots([own])
+    store.flush(own)
+    return store.collect(own)
+
+
+# ----------------------------------------------------------------------
+# Prometheus text exposition
+# ----------------------------------------------------------------------
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_str(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _fmt(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(merged):
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        if kind == 'counter':
+            for (metric, labels), value in sorted(merged['counters'].items()):
+                if metric == name:
+                    lines.append(f"{name}{_label_str(labels)} {_fmt(value)}")
+            continue
+        for (metric, labels), values in sorted(merged['histograms'].items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, values):
+                cumulative += count
+                lines.append(f"{name}_bucket{_label_str(labels, [('le', _fmt(float(bound)))])} {cumulative}")
+            cumulative += values[len(buckets)]
+            lines.append(f"{name}_bucket{_label_str(labels, [('le', '+Inf')])} {cumulative}")
+            lines.append(f"{name}_sum{_label_str(labels)} {_fmt(float(values[-1]))}")
+            lines.append(f"{name}_count{_label_str(labels)} {cumulative}")
+    return '\n'.join(lines) + '\n'
+
+
+def endpoint_summary(merged):
+    """{endpoint: {requests, avg_response_time, p99}} from the merged request histogram."""
+    summary = {}
+    for (metric, labels), values in merged['histograms'].items():
+        if metric != 'qr_http_request_duration_seconds':
+            continue
+        endpoint = dict(labels).get('endpoint', 'unknown')
+        count = sum(values[:-1])
+        p99 = histogram_quantile(0.99, values, LATENCY_BUCKETS)
+        summary[endpoint] = {
+            'requests': count,
+            'avg_response_time': round(values[-1] / count, 4) if count else 0,
+            'p99': round(p99, 4) if p99 is not None else None,
+        }
+    return summary
+
+
+# ----------------------------------------------------------------------
+# Flask / SQLAlchemy wiring
+# ----------------------------------------------------------------------
+
+def _statement_operation(statement):
+    word = statement.lstrip()[:8].split(None, 1)
+    operation = word[0].upper() if word else ''
+    return operation if operation in _DB_OPERATIONS else 'OTHER'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    labels = {'operation': _statement_operation(statement)}
+    inc('qr_db_queries_total', labels)
+    observe('qr_db_query_duration_seconds', elapsed, labels)
+
+
+_LOOPBACK_ADDRS = frozenset({'127.0.0.1', '::1'})
+
+
+def _scrape_allowed():
+    """Token when one is configured; otherwise only a direct loopback scrape.
+
+    A proxied request arrives from loopback too, so any forwarding header
+    means it came from outside.
+    """
+    token = current_app.config.get('METRICS_TOKEN')
+    if token:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")
+    if request.headers.get('X-Forwarded-For') or request.headers.get('X-Real-IP'):
+        return False
+    return request.remote_addr in _LOOPBACK_ADDRS
+
+
+def init_metrics(app, db):
+    """Register request timing, SQL listeners and the /metrics route."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    directory = app.config.get('METRICS_DIR') or os.path.join(
+        app.config.get('UPLOAD_FOLDER', '/tmp'), 'metrics'
+    )
+    try:
+        _state['store'] = MultiprocessStore(directory)
+    except OSError as e:
+        app.logger.warning(f"Metrics directory {directory} unavailable, serving per-process metrics: {e}")
+    _state['flush_interval'] = float(app.config.get('METRICS_FLUSH_INTERVAL', 5))
+    atexit.register(flush, True)
+
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def metrics_start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def metrics_record_request(response):
+        started = g.pop('metrics_start', None)
+        if started is not None:
+            # Unmatched URLs share one label so scanners can't explode cardinality
+            endpoint = request.endpoint or 'unmatched'
+            inc('qr_http_requests_total',
+                {'endpoint': endpoint, 'method': request.method, 'status': str(response.status_code)})
+            observe('qr_http_request_duration_seconds', time.perf_counter() - started, {'endpoint': endpoint})
+        try:
+            flush()
+        except Exception as e:
+            current_app.logger.warning(f"Metrics flush failed: {e}")
+        return response
+
+    @app.route('/metrics')
+    def prometheus_metrics():
+        """Prometheus scrape endpoint (bearer token, or loopback when METRICS_TOKEN is unset)."""
+        if not _scrape_allowed():
+            return Response('Unauthorized\n', status=401, mimetype='text/plain')
+        return Response(render_prometheus(collect()), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    app.extensions['metrics'] = registry
@@ -0,0 +1,164 @@
+"""
+Miss Punch Index
+================
+
+Per-period index of miss punches, built once from the payroll hours
+calculation and shared by the payroll dashboard and the miss punch
+details API.
+
+``WorkingHoursCalculator.calculate_employee_hours`` already records each
+miss punch day together with that day's punches (``miss_punches``).
+``build_miss_punch_index()`` turns a whole ``calculate_all_employees_hours``
+result into::
+
+    {base_employee_id: {'miss_punch_count': n, 'miss_punch_days': [...]}}
+
+and ``MissPunchIndex`` stores it on disk keyed by
+(date_from, date_to, project_filter, data fingerprint), so any gunicorn
+worker answers ``/api/employee/<id>/miss-punch-details`` with a dict lookup
+instead of re-querying and recalculating the employee's hours.  The
+fingerprint is ``export_cache.data_fingerprint('attendance_data', ...)``:
+any check-in added, edited or deleted in the period makes the old index
+unreachable.
+"""
+
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+from flask import current_app
+
+from export_cache import data_fingerprint
+from extensions import logger_handler
+
+
+def _miss_punch_reason(records_count):
+    if records_count % 2 != 0:
+        return 'Incomplete punch pairs - missing check-in or check-out'
+    return 'Invalid work period duration'
+
+
+def build_miss_punch_index(working_hours_data, gps_record_ids=()):
+    """
+    Build the per-employee miss punch index from a
+    ``calculate_all_employees_hours`` result.
+
+    Args:
+        working_hours_data: Calculator output ({'employees': {...}}).
+        gps_record_ids: attendance_data ids that have latitude/longitude.
+    """
+    gps_record_ids = set(gps_record_ids)
+    index = {}
+    for employee_id, emp_data in (working_hours_data or {}).get('employees', {}).items():
+        days = []
+        for day in emp_data.get('miss_punches', []):
+            days.append({
+                'date': day['date'],
+                'date_formatted': datetime.strptime(day['date'], '%Y-%m-%d').strftime('%B %d, %Y (%A)'),
+                'records_count': day['records_count'],
+                'records': [
+                    {
+                        'time': record['time'],
+                        # Punches alternate check-in / check-out within a day
+                        'event_type': 'Check In' if i % 2 == 0 else 'Check Out',
+                        'location': record['location'] or 'Unknown Location',
+                        'has_gps': record['id'] in gps_record_ids,
+                    }
+                    for i, record in enumerate(day['records'])
+                ],
+                'reason': _miss_punch_reason(len(day['records'])),
+            })
+        index[str(employee_id)] = {'miss_punch_count': len(days), 'miss_punch_days': days}
+    return index
+
+
+class MissPunchIndex:
+    """On-disk store of miss punch indexes: one ``<key>.json`` per period."""
+
+    def __init__(self, index_dir, ttl=86400):
+        self.index_dir = index_dir
+        self.ttl = ttl
+        os.makedirs(index_dir, exist_ok=True)
+
+    @staticmethod
+    def period_key(date_from, date_to, project_filter=''):
+        """Key for a payroll period, including the attendance data fingerprint."""
+        start = datetime.strptime(date_from, '%Y-%m-%d').date()
+        end = datetime.strptime(date_to, '%Y-%m-%d').date()
+        material = json.dumps(
+            [date_from, date_to, str(project_filter or ''),
+             data_fingerprint('attendance_data', start, end)],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.index_dir, f"{key}.json")
+
+    def get(self, key):
+        """Return the stored {employee_id: entry} index, or None."""
+        try:
+            with open(self._path(key)) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if time.time() - payload.get('created', 0) > self.ttl:
+            return None
+        return payload.get('employees')
+
+    def put(self, key, index):
+        """Atomically store *index* under *key* and drop expired entries."""
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'created': time.time(), 'employees': index}, f)
+        os.replace(tmp, path)
+        self.prune()
+
+    def prune(self):
+        cutoff = time.time() - self.ttl
+        try:
+            names = os.listdir(self.index_dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.index_dir, name)
+            try:
+                if name.endswith('.json') and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                continue
+
+
+def get_miss_punch_index():
+    """The app's MissPunchIndex (created on first use)."""
+    app = current_app._get_current_object()
+    store = app.extensions.get('miss_punch_index')
+    if store is None:
+        index_dir = app.config.get('MISS_PUNCH_INDEX_DIR') or os.path.join(
+            app.config.get('UPLOAD_FOLDER', '/tmp'), 'miss_punch_index'
+        )
+        store = app.extensions['miss_punch_index'] = MissPunchIndex(
+            index_dir, ttl=app.config.get('MISS_PUNCH_INDEX_TTL', 86400)
+        )
+    return store
+
+
+def store_miss_punch_index(date_from, date_to, project_filter, working_hours_data, attendance_records):
+    """
+    Build and persist the index for a period whose hours were just
+    calculated.  Returns the index (also when persisting fails).
+    """
+    gps_ids = [
+        r.id for r in attendance_records
+        if getattr(r, 'latitude', None) is not None and getattr(r, 'longitude', None) is not None
+    ]
+    index = build_miss_punch_index(working_hours_data, gps_ids)
+    try:
+        store = get_miss_punch_index()
+        store.put(store.period_key(date_from, date_to, project_filter), index)
+    except Exception as e:
+        logger_handler.logger.warning(f"Could not store miss punch index for {date_from}..{date_to}: {e}")
+    return index
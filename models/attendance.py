@@ -7,6 +7,8 @@ Extracted from app.py for better code organization.
 """
 
 from datetime import datetime
+from sqlalchemy.orm import validates
+from utils.employee_keys import employee_key_columns
 from . import base
 
 class AttendanceData(base.db.Model):
@@ -17,6 +19,9 @@ class AttendanceData(base.db.Model):
     id = base.db.Column(base.db.Integer, primary_key=True)
     qr_code_id = base.db.Column(base.db.Integer, base.db.ForeignKey('qr_codes.id', ondelete='CASCADE'), nullable=False)
     employee_id = base.db.Column(base.db.String(50), nullable=False)
+    # Parsed from employee_id on write (see utils/employee_keys.py); joins employee.id
+    base_employee_id = base.db.Column(base.db.BigInteger, nullable=True)
+    work_type = base.db.Column(base.db.String(10), nullable=True)  # 'regular', 'SP', 'PW', 'PT'
     check_in_date = base.db.Column(base.db.Date, nullable=False, default=datetime.today)
     check_in_time = base.db.Column(base.db.Time, nullable=False, default=lambda: datetime.now().time())
     device_info = base.db.Column(base.db.String(200))
@@ -45,6 +50,16 @@ class AttendanceData(base.db.Model):
     # Relationships
     qr_code = base.db.relationship('QRCode', backref=base.db.backref('attendance_records', lazy='dynamic'))
     
+    __table_args__ = (
+        base.db.Index('idx_attendance_base_employee_date', 'base_employee_id', 'check_in_date'),
+    )
+    
+    @validates('employee_id')
+    def _set_employee_key(self, key, value):
+        """Keep base_employee_id / work_type in step with employee_id"""
+        self.base_employee_id, self.work_type = employee_key_columns(value)
+        return value
+    
     def __repr__(self):
         return f'<AttendanceData {self.employee_id} at {self.location_name} on {self.check_in_date}>'
     
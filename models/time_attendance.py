@@ -7,6 +7,8 @@ This model is designed to store attendance data imported from external sources.
 """
 
 from datetime import datetime
+from sqlalchemy.orm import validates
+from utils.employee_keys import employee_key_columns
 from . import base
 
 class TimeAttendance(base.db.Model):
@@ -20,6 +22,9 @@ class TimeAttendance(base.db.Model):
     
     # Employee identification
     employee_id = base.db.Column(base.db.String(50), nullable=False, index=True)
+    # Parsed from employee_id on write (see utils/employee_keys.py); joins employee.id
+    base_employee_id = base.db.Column(base.db.BigInteger, nullable=True)
+    work_type = base.db.Column(base.db.String(10), nullable=True)  # 'regular', 'SP', 'PW', 'PT'
     employee_name = base.db.Column(base.db.String(200), nullable=False)
     
     # Platform and device information
@@ -53,6 +58,16 @@ class TimeAttendance(base.db.Model):
     # Relationship
     project = base.db.relationship('Project', backref='time_attendance_records')
     
+    __table_args__ = (
+        base.db.Index('idx_time_attendance_base_employee_date', 'base_employee_id', 'attendance_date'),
+    )
+    
+    @validates('employee_id')
+    def _set_employee_key(self, key, value):
+        """Keep base_employee_id / work_type in step with employee_id"""
+        self.base_employee_id, self.work_type = employee_key_columns(value)
+        return value
+    
     def __repr__(self):
         return f'<TimeAttendance {self.employee_id} - {self.employee_name} at {self.location_name} on {self.attendance_date}>'
     
@@ -111,12 +111,9 @@ class PayrollExcelExporter:
         return {}  # Return empty dict - names should be provided by the route
     
     def _get_employee_names(self, attendance_records: List[Dict]) -> Dict[str, str]:
-        """Get employee names using the same CAST method as attendance report"""
+        """Get employee names by primary key on the employee table"""
         employee_names = {}
         try:
-            from flask import current_app
-            from sqlalchemy import text
-            
             # Get unique employee IDs from attendance records
             employee_ids = []
             for record in attendance_records:
@@ -129,27 +126,11 @@ class PayrollExcelExporter:
                     employee_ids.append(emp_id)
             
             if employee_ids:
-                # Use the same SQL approach as attendance report - JOIN with CAST
-                placeholders = ','.join([f"'{emp_id}'" for emp_id in employee_ids])
-                
-                # Import db from current app context
-                from app import db
-                
-                employee_query = db.session.execute(text(f"""
-                    SELECT 
-                        ad.employee_id,
-                        CONCAT(e.firstName, ' ', e.lastName) as full_name 
-                    FROM attendance_data ad
-                    LEFT JOIN employee e ON CAST(ad.employee_id AS UNSIGNED) = e.id
-                    WHERE ad.employee_id IN ({placeholders})
-                    GROUP BY ad.employee_id, e.firstName, e.lastName
-                """))
-                
-                for row in employee_query:
-                    if row[1]:  # Only add if we got a name
-                        employee_names[str(row[0])] = row[1]
+                # Primary-key lookup on employee by the parsed base ID
+                from utils.employee_keys import lookup_employee_names
+                employee_names = lookup_employee_names(employee_ids)
             
-            print(f"📊 Excel exporter retrieved names for {len(employee_names)} employees using CAST method")
+            print(f"📊 Excel exporter retrieved names for {len(employee_names)} employees")
                 
         except Exception as e:
             print(f"⚠️ Excel exporter could not load employee names: {e}")
@@ -16,6 +16,8 @@ from sqlalchemy.exc import SQLAlchemyError
 from typing import Dict, List, Any, Optional, Tuple
 import traceback
 
+from metrics import track_job
+
 
 class QRCodeImportService:
     """Service for bulk QR code import from Excel files"""
@@ -155,6 +157,7 @@ class QRCodeImportService:
                 'warnings': []
             }
 
+    @track_job('qr_code_import')
     def import_from_excel(
         self,
         file_path: str,
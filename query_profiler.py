@@ -0,0 +1,204 @@
+"""
+Query Profiler
+==============
+
+Per-request SQL instrumentation built on SQLAlchemy's
+``before_cursor_execute`` / ``after_cursor_execute`` engine events.
+
+For every request it records the statement count, total DB time and a
+count per normalized statement fingerprint (literals, numbers and IN lists
+replaced by ``?``), then after the response:
+
+    - statements slower than ``DB_SLOW_QUERY_MS`` land in the slow query
+      log;
+    - a fingerprint executed more than ``DB_N_PLUS_ONE_THRESHOLD`` times in
+      one request is flagged as an N+1 pattern (per-row lookups such as
+      ``_get_employee_name`` or per-employee queries in a report loop),
+      logged once per request and counted in
+      ``qr_db_n_plus_one_total{endpoint}``;
+    - in debug mode (or with ``DB_QUERY_HEADERS``) the response carries
+      ``X-DB-Queries`` and ``X-DB-Time``.
+
+``/api/performance/slow-queries`` (admin) returns this worker's recent slow
+statements and flagged requests.  Statements outside a request (background
+threads, CLI) are timed by metrics.py only.
+"""
+
+import os
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from functools import lru_cache
+
+from flask import current_app, g, has_request_context, jsonify, request
+from sqlalchemy import event
+
+import metrics
+from utils.helpers import admin_required
+
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PARAM_LIST_RE = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_PLACEHOLDER_RE = re.compile(r"%\(\w+\)s|%s|:\w+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(statement):
+    """Normalize *statement* so executions that differ only in values compare equal."""
+    text = _STRING_RE.sub('?', statement)
+    text = _NUMBER_RE.sub('?', text)
+    text = _PLACEHOLDER_RE.sub('?', text)
+    text = _PARAM_LIST_RE.sub('(?+)', text)
+    return _SPACE_RE.sub(' ', text).strip()[:500]
+
+
+class QueryProfiler:
+    """Collects per-request query stats; keeps recent findings per process."""
+
+    def __init__(self, app=None, db=None, logger_handler=None):
+        self.logger_handler = logger_handler
+        self.slow_query_seconds = 0.2
+        self.n_plus_one_threshold = 10
+        self.emit_headers = False
+        self.slow_queries = deque(maxlen=100)
+        self.n_plus_one = deque(maxlen=50)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app, db, logger_handler)
+
+    def init_app(self, app, db, logger_handler=None):
+        self.logger_handler = logger_handler or self.logger_handler
+        self.slow_query_seconds = app.config.get('DB_SLOW_QUERY_MS', 200) / 1000.0
+        self.n_plus_one_threshold = app.config.get('DB_N_PLUS_ONE_THRESHOLD', 10)
+        self.emit_headers = app.debug or app.config.get('DB_QUERY_HEADERS', False)
+        self.slow_queries = deque(maxlen=app.config.get('DB_SLOW_QUERY_LOG_SIZE', 100))
+
+        with app.app_context():
+            engine = db.engine
+        if not event.contains(engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+        app.before_request(self.start_request)
+        app.after_request(self.finish_request)
+        self.register_routes(app)
+        app.extensions['query_profiler'] = self
+
+    # ------------------------------------------------------------------
+    # Engine events
+    # ------------------------------------------------------------------
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profiler_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('profiler_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if not has_request_context():
+            return
+        stats = g.get('db_stats')
+        if stats is None:
+            return
+
+        stats['count'] += 1
+        stats['time'] += elapsed
+        fp = fingerprint(statement)
+        entry = stats['fingerprints'].get(fp)
+        if entry is None:
+            stats['fingerprints'][fp] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+        if elapsed >= self.slow_query_seconds:
+            with self._lock:
+                self.slow_queries.append({
+                    'endpoint': request.endpoint,
+                    'method': request.method,
+                    'time': round(elapsed, 4),
+                    'fingerprint': fp,
+                    'timestamp': datetime.utcnow().isoformat()
+                })
+
+    # ------------------------------------------------------------------
+    # Request hooks
+    # ------------------------------------------------------------------
+
+    def start_request(self):
+        g.db_stats = {'count': 0, 'time': 0.0, 'fingerprints': {}}
+
+    def finish_request(self, response):
+        stats = g.pop('db_stats', None)
+        if stats is None:
+            return response
+
+        repeated = [
+            {'fingerprint': fp, 'count': count, 'time': round(total, 4)}
+            for fp, (count, total) in stats['fingerprints'].items()
+            if count > self.n_plus_one_threshold
+        ]
+        if repeated:
+            repeated.sort(key=lambda item: item['count'], reverse=True)
+            endpoint = request.endpoint or 'unmatched'
+            with self._lock:
+                self.n_plus_one.append({
+                    'endpoint': endpoint,
+                    'method': request.method,
+                    'path': request.path,
+                    'total_queries': stats['count'],
+                    'db_time': round(stats['time'], 4),
+                    'repeated': repeated[:5],
+                    'timestamp': datetime.utcnow().isoformat()
+                })
+            metrics.inc('qr_db_n_plus_one_total', {'endpoint': endpoint})
+            if self.logger_handler:
+                top = repeated[0]
+                self.logger_handler.logger.warning(
+                    f"N+1 query pattern in {request.method} {endpoint}: "
+                    f"{top['count']}x {top['fingerprint'][:120]} "
+                    f"({stats['count']} queries, {stats['time'] * 1000:.1f}ms DB)"
+                )
+
+        if self.emit_headers:
+            response.headers['X-DB-Queries'] = str(stats['count'])
+            response.headers['X-DB-Time'] = f"{stats['time'] * 1000:.1f}ms"
+        return response
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def register_routes(self, app):
+
+        @app.route('/api/performance/slow-queries')
+        @admin_required
+        def slow_queries():
+            """Recent slow statements and N+1 requests seen by this worker"""
+            try:
+                limit = min(request.args.get('limit', 20, type=int), 100)
+                with self._lock:
+                    slow = list(self.slow_queries)[-limit:]
+                    flagged = list(self.n_plus_one)[-limit:]
+                return jsonify({
+                    'worker_pid': os.getpid(),
+                    'slow_query_threshold_ms': round(self.slow_query_seconds * 1000),
+                    'n_plus_one_threshold': self.n_plus_one_threshold,
+                    'slow_queries': slow[::-1],
+                    'n_plus_one': flagged[::-1]
+                })
+            except Exception as e:
+                current_app.logger.error(f"Slow queries API error: {e}")
+                return jsonify({'error': 'Failed to get slow queries'}), 500
+
+
+def current_request_query_count():
+    """Statements executed so far in this request (0 outside a profiled request)."""
+    if not has_request_context():
+        return 0
+    stats = g.get('db_stats')
+    return stats['count'] if stats else 0
@@ -0,0 +1,307 @@
+"""
+Rate Limiter
+============
+
+Pluggable request rate limiting shared by PerformanceMonitor (per-request
+budgets, registered in create_app) and the login route (failed attempts).
+
+Backends (``RATE_LIMIT_BACKEND``):
+    sqlite  - (default) one small SQLite file (``RATE_LIMIT_SQLITE_PATH``,
+              WAL mode) shared by every worker on the host, using a
+              sliding-window counter per key.
+    memory  - in-process token buckets.  Only for a single worker: with N
+              gunicorn workers every worker keeps its own buckets, so each
+              budget is effectively N times larger.
+
+Both are O(1) per hit: one bucket/row per key, no per-request timestamp
+lists.  Keys expire on their own once idle for a full window (plus any
+block), so there is no separate cleanup pass.
+
+Budgets are named ``"<limit>/<window seconds>"`` strings in ``RATE_LIMITS``.
+A client IP that exceeds a per-IP budget (``BLOCKING_BUDGETS``) is blocked
+for ``RATE_LIMIT_BLOCK_SECONDS``.  Budgets keyed on a shared or
+caller-chosen identifier (``scan_qr``: a site's qr_url, ``scan_employee``:
+the posted employee_id) only throttle to their window: blocking them would
+let any client lock a site or a named employee out of check-in.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# allowed, remaining budget, seconds until the key may retry
+RateLimitResult = namedtuple('RateLimitResult', 'allowed remaining retry_after')
+
+DEFAULT_RATE_LIMITS = {
+    'default':      '100/60',   # any other request, per IP
+    'admin':        '300/60',   # admin pages / APIs, per IP
+    'scan_ip':      '60/60',    # QR scan + check-in, per IP
+    'scan_employee': '10/60',   # QR check-in, per employee_id
+    'scan_qr':      '600/60',   # QR scan + check-in, per qr_url (shared by a site)
+    'auth':         '5/900',    # failed logins, per IP
+}
+
+# Per-IP budgets that block an offending key for RATE_LIMIT_BLOCK_SECONDS
+# ('auth' is per IP too, but its 15-minute window already is the lockout)
+BLOCKING_BUDGETS = frozenset({'default', 'admin', 'scan_ip'})
+
+
+class RateLimitBudget:
+    """``limit`` hits per ``window`` seconds, then blocked for ``block_seconds``."""
+
+    __slots__ = ('name', 'limit', 'window', 'block_seconds')
+
+    def __init__(self, name, limit, window, block_seconds=0):
+        self.name = name
+        self.limit = int(limit)
+        self.window = float(window)
+        self.block_seconds = float(block_seconds)
+
+    @classmethod
+    def parse(cls, name, spec, block_seconds=0):
+        """Build a budget from a ``"100/60"`` spec."""
+        limit, _, window = str(spec).partition('/')
+        return cls(name, limit, window or 60, block_seconds)
+
+    @property
+    def ttl(self):
+        """Seconds after the last hit when a key's state can be dropped."""
+        return self.window * 2 + self.block_seconds
+
+
+class MemoryRateLimiter:
+    """
+    In-process token buckets.
+
+    Buckets live in an OrderedDict kept in last-hit order, so expiring idle
+    keys only ever inspects the oldest entries (amortised O(1) per hit).
+    """
+
+    backend = 'memory'
+
+    def __init__(self):
+        self._buckets = OrderedDict()   # key -> [tokens, last_ts, blocked_until, expires_at]
+        self._lock = threading.Lock()
+
+    def hit(self, key, budget, cost=1):
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(budget.limit), now, 0.0, 0.0]
+                self._buckets[key] = bucket
+            else:
+                self._buckets.move_to_end(key)
+            bucket[3] = now + budget.ttl
+
+            if bucket[2] > now:
+                return RateLimitResult(False, 0, bucket[2] - now)
+
+            rate = budget.limit / budget.window
+            bucket[0] = min(budget.limit, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return RateLimitResult(True, int(bucket[0]), 0.0)
+
+            if budget.block_seconds:
+                bucket[2] = now + budget.block_seconds
+                bucket[3] = bucket[2] + budget.window
+                return RateLimitResult(False, 0, budget.block_seconds)
+            return RateLimitResult(False, 0, (cost - bucket[0]) / rate)
+
+    def is_blocked(self, key, budget):
+        """True when *key* is blocked or has no budget left (does not consume)."""
+        now = time.time()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                return False
+            if bucket[2] > now:
+                return True
+            tokens = min(budget.limit, bucket[0] + (now - bucket[1]) * budget.limit / budget.window)
+            return tokens < 1
+
+    def reset(self, key=None):
+        with self._lock:
+            if key is None:
+                self._buckets.clear()
+            else:
+                self._buckets.pop(key, None)
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            blocked = sum(1 for b in self._buckets.values() if b[2] > now)
+            return {'backend': self.backend, 'tracked_keys': len(self._buckets), 'blocked_keys': blocked}
+
+    def _expire(self, now):
+        while self._buckets:
+            key, bucket = next(iter(self._buckets.items()))
+            if bucket[3] > now:
+                break
+            del self._buckets[key]
+
+
+class SQLiteRateLimiter:
+    """
+    Host-wide limiter backed by a SQLite file shared by all workers.
+
+    Each key is one row holding a sliding-window counter: the counts of the
+    current and previous fixed windows, weighted by how far into the
+    current window we are.  A hit is one short IMMEDIATE transaction.
+    Expired rows are deleted at most once per ``sweep_interval`` seconds
+    per process via the expires_at index.
+    """
+
+    backend = 'sqlite'
+
+    def __init__(self, path, sweep_interval=60):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._local = threading.local()
+        self._next_sweep = 0.0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                key TEXT PRIMARY KEY,
+                window_start REAL NOT NULL,
+                prev_count INTEGER NOT NULL,
+                curr_count INTEGER NOT NULL,
+                blocked_until REAL NOT NULL DEFAULT 0,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_rate_limits_expires ON rate_limits (expires_at)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _slide(row, now, window):
+        """Roll (window_start, prev, curr) forward to the window containing *now*."""
+        window_start, prev_count, curr_count = row
+        elapsed_windows = int((now - window_start) // window)
+        if elapsed_windows >= 2:
+            return now - (now - window_start) % window, 0, 0
+        if elapsed_windows == 1:
+            return window_start + window, curr_count, 0
+        return window_start, prev_count, curr_count
+
+    def hit(self, key, budget, cost=1):
+        now = time.time()
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT window_start, prev_count, curr_count, blocked_until FROM rate_limits WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                window_start, prev_count, curr_count, blocked_until = now, 0, 0, 0.0
+            else:
+                window_start, prev_count, curr_count = self._slide(row[:3], now, budget.window)
+                blocked_until = row[3]
+
+            if blocked_until > now:
+                result = RateLimitResult(False, 0, blocked_until - now)
+            else:
+                weight = 1 - (now - window_start) / budget.window
+                used = prev_count * weight + curr_count
+                if used + cost <= budget.limit:
+                    curr_count += cost
+                    result = RateLimitResult(True, int(budget.limit - used - cost), 0.0)
+                elif budget.block_seconds:
+                    blocked_until = now + budget.block_seconds
+                    result = RateLimitResult(False, 0, budget.block_seconds)
+                else:
+                    result = RateLimitResult(False, 0, window_start + budget.window - now)
+
+            conn.execute("""
+                INSERT OR REPLACE INTO rate_limits
+                    (key, window_start, prev_count, curr_count, blocked_until, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (key, window_start, prev_count, curr_count, blocked_until,
+                  max(now + budget.ttl, blocked_until + budget.window)))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        if now >= self._next_sweep:
+            self._next_sweep = now + self.sweep_interval
+            conn.execute("DELETE FROM rate_limits WHERE expires_at < ?", (now,))
+        return result
+
+    def is_blocked(self, key, budget):
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT window_start, prev_count, curr_count, blocked_until FROM rate_limits WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return False
+        if row[3] > now:
+            return True
+        window_start, prev_count, curr_count = self._slide(row[:3], now, budget.window)
+        used = prev_count * (1 - (now - window_start) / budget.window) + curr_count
+        return used + 1 > budget.limit
+
+    def reset(self, key=None):
+        conn = self._conn()
+        if key is None:
+            conn.execute("DELETE FROM rate_limits")
+        else:
+            conn.execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+    def stats(self):
+        now = time.time()
+        tracked, blocked = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(blocked_until > ?), 0) FROM rate_limits WHERE expires_at >= ?",
+            (now, now)
+        ).fetchone()
+        return {'backend': self.backend, 'tracked_keys': tracked, 'blocked_keys': blocked}
+
+
+def create_rate_limiter(config):
+    """Build the limiter selected by RATE_LIMIT_BACKEND in *config*."""
+    backend = (config.get('RATE_LIMIT_BACKEND') or 'sqlite').lower()
+    if backend == 'sqlite':
+        path = config.get('RATE_LIMIT_SQLITE_PATH') or os.path.join(
+            config.get('UPLOAD_FOLDER', '/tmp'), 'rate_limits.sqlite3'
+        )
+        return SQLiteRateLimiter(path)
+    return MemoryRateLimiter()
+
+
+def load_budgets(config):
+    """Budget name -> RateLimitBudget from RATE_LIMITS (falling back to the defaults)."""
+    block_seconds = config.get('RATE_LIMIT_BLOCK_SECONDS', 300)
+    specs = dict(DEFAULT_RATE_LIMITS)
+    specs.update(config.get('RATE_LIMITS') or {})
+    return {
+        name: RateLimitBudget.parse(name, spec, block_seconds if name in BLOCKING_BUDGETS else 0)
+        for name, spec in specs.items()
+    }
+
+
+def get_rate_limiter(app):
+    """The app's shared (limiter, budgets) pair, created on first use."""
+    state = app.extensions.get('rate_limiter')
+    if state is None:
+        state = app.extensions['rate_limiter'] = (
+            create_rate_limiter(app.config), load_budgets(app.config)
+        )
+    return state
@@ -0,0 +1,269 @@
+"""
+Realtime Feed
+=============
+
+Publish/subscribe channel that pushes check-in events to open dashboards
+over Server-Sent Events (``/api/dashboard/stream``), so dashboard load
+scales with check-ins instead of viewers x poll rate.
+
+    publish()     ``qr_checkin`` inserts one compact event row into
+                  ``dashboard_events`` after the attendance commit.  The
+                  table is the cross-worker fan-out: any gunicorn worker
+                  may hold the viewer's stream.
+    broadcaster   One daemon thread per worker (started with its first
+                  subscriber) reads new rows every
+                  ``REALTIME_POLL_INTERVAL`` seconds — one indexed
+                  ``id > last_id`` query per worker, however many viewers —
+                  and copies them into each subscriber's queue.  The query
+                  also re-reads the last ``REALTIME_REORDER_WINDOW``
+                  seconds, because a slower transaction can commit a lower
+                  id after a higher one was read; each subscriber remembers
+                  the recent ids it was sent and skips repeats.
+    stream        Each SSE connection owns a bounded queue.  Events carry
+                  the row id as the SSE ``id:``, so an EventSource that
+                  reconnects (after ``REALTIME_STREAM_MAX_SECONDS``, or a
+                  dropped connection) sends ``Last-Event-ID`` and is
+                  replayed what it missed from the table.
+
+Rows older than ``REALTIME_EVENT_RETENTION`` seconds are deleted by
+publishers at most once a minute.  A stream ties up a worker thread while
+open, hence the bounded lifetime; with sync workers size
+``--threads`` accordingly.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+from sqlalchemy import (BigInteger, Column, Double, Index, Integer, MetaData, Table, Text, and_, delete, func, insert,
+                        or_, select)
+
+_metadata = MetaData()
+
+dashboard_events_table = Table(
+    'dashboard_events', _metadata,
+    Column('id', BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True),
+    Column('created_at', Double, nullable=False),
+    Column('payload', Text, nullable=False),
+    Index('idx_dashboard_events_created', 'created_at'),
+)
+
+
+def format_sse(data, event_id=None):
+    """One SSE message; data is JSON-encoded like the import progress stream."""
+    prefix = f"id: {event_id}\n" if event_id is not None else ''
+    return f"{prefix}data: {json.dumps(data, default=str)}\n\n"
+
+
+class RealtimeFeed:
+    """Check-in event bus: DB table across workers, queues within a worker."""
+
+    def __init__(self, app=None, db=None, logger_handler=None):
+        self.db = db
+        self.logger_handler = logger_handler
+        self.enabled = False
+        self.poll_interval = 0.5
+        self.retention = 3600
+        self.max_stream_seconds = 300
+        self.heartbeat_seconds = 15
+        self.queue_size = 100
+        self.reorder_window = 5
+        self._table_ready = False
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread_pid = None
+        self._last_id = None
+        self._window_rows = 0
+        self._next_prune = 0.0
+        if app is not None:
+            self.init_app(app, db, logger_handler)
+
+    def init_app(self, app, db=None, logger_handler=None):
+        self.db = db or self.db
+        self.logger_handler = logger_handler or self.logger_handler
+        self.enabled = app.config.get('REALTIME_FEED_ENABLED', True)
+        self.poll_interval = app.config.get('REALTIME_POLL_INTERVAL', 0.5)
+        self.retention = app.config.get('REALTIME_EVENT_RETENTION', 3600)
+        self.max_stream_seconds = app.config.get('REALTIME_STREAM_MAX_SECONDS', 300)
+        self.heartbeat_seconds = app.config.get('REALTIME_HEARTBEAT_SECONDS', 15)
+        self.queue_size = app.config.get('REALTIME_QUEUE_SIZE', 100)
+        self.reorder_window = app.config.get('REALTIME_REORDER_WINDOW', 5)
+        self.app = app
+        app.extensions['realtime_feed'] = self
+
+    def _engine(self):
+        engine = self.db.engine
+        if not self._table_ready:
+            dashboard_events_table.create(bind=engine, checkfirst=True)
+            self._table_ready = True
+        return engine
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+
+    def publish(self, event):
+        """Store *event* (a JSON-serialisable dict) for every worker's subscribers."""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._engine().begin() as conn:
+            conn.execute(insert(dashboard_events_table).values(
+                created_at=now, payload=json.dumps(event, default=str)
+            ))
+            if now >= self._next_prune:
+                self._next_prune = now + 60
+                conn.execute(delete(dashboard_events_table)
+                             .where(dashboard_events_table.c.created_at < now - self.retention))
+
+    # ------------------------------------------------------------------
+    # Broadcasting
+    # ------------------------------------------------------------------
+
+    def _read_since(self, last_id, limit=500, recent_since=None):
+        """Rows after *last_id*, plus any created since *recent_since* (late commits)."""
+        table = dashboard_events_table
+        condition = table.c.id > last_id
+        if recent_since is not None:
+            condition = or_(condition, table.c.created_at >= recent_since)
+        with self._engine().connect() as conn:
+            return conn.execute(
+                select(table.c.id, table.c.created_at, table.c.payload)
+                .where(condition)
+                .order_by(table.c.id)
+                .limit(limit)
+            ).fetchall()
+
+    def _recent_ids(self, up_to_id, since):
+        """{id: created_at} of the rows a new subscriber's snapshot already covers."""
+        table = dashboard_events_table
+        with self._engine().connect() as conn:
+            return dict(conn.execute(
+                select(table.c.id, table.c.created_at)
+                .where(and_(table.c.id <= up_to_id, table.c.created_at >= since))
+            ).fetchall())
+
+    def latest_id(self):
+        with self._engine().connect() as conn:
+            return conn.execute(select(func.max(dashboard_events_table.c.id))).scalar() or 0
+
+    def _ensure_broadcaster(self):
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+            self._subscribers = set()
+            self._last_id = None
+            self._window_rows = 0
+        threading.Thread(target=self._run, name='realtime-feed', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.poll_interval)
+            self._poll()
+
+    def _poll(self):
+        """Copy new (and late-committed) rows into the subscriber queues."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            self._last_id = None   # resume from "now" when someone subscribes again
+            return
+        cutoff = time.time() - self.reorder_window
+        try:
+            with self.app.app_context():
+                if self._last_id is None:
+                    self._last_id = min(q.start_id for q in subscribers)
+                # The re-read window rows come first (lowest ids); leave room for new ones
+                rows = self._read_since(self._last_id, limit=500 + self._window_rows, recent_since=cutoff)
+        except Exception as e:
+            if self.logger_handler:
+                self.logger_handler.logger.warning(f"Realtime feed read failed: {e}")
+            return
+        self._window_rows = sum(1 for row in rows if row[1] >= cutoff)
+        for event_id, created_at, payload in rows:
+            self._last_id = max(self._last_id, event_id)
+            for q in subscribers:
+                if event_id in q.seen or (event_id <= q.start_id and created_at < q.since):
+                    continue
+                q.seen[event_id] = created_at
+                try:
+                    q.put_nowait((event_id, payload))
+                except queue.Full:
+                    q.overflowed = True
+        for q in subscribers:
+            # Older rows are never re-read, so their ids need not be remembered
+            q.seen = {event_id: created_at for event_id, created_at in q.seen.items() if created_at >= cutoff}
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber queue starting after *last_event_id* (or now)."""
+        self._ensure_broadcaster()
+        q = queue.Queue(maxsize=self.queue_size)
+        q.overflowed = False
+        q.start_id = self.latest_id()
+        # Rows at or below start_id still committing belong to this stream;
+        # the ones already visible are part of the caller's snapshot
+        q.since = time.time() - self.reorder_window
+        q.seen = self._recent_ids(q.start_id, q.since)
+        q.backlog = []
+        if last_event_id is not None and last_event_id < q.start_id:
+            q.backlog = [(row[0], row[2]) for row in self._read_since(last_event_id, limit=self.queue_size)
+                         if row[0] <= q.start_id]
+            # Missed more than one queue's worth: tell the client to resync
+            q.overflowed = len(q.backlog) >= self.queue_size and q.backlog[-1][0] < q.start_id
+        with self._lock:
+            self._subscribers.add(q)
+            if self._last_id is not None:
+                self._last_id = min(self._last_id, q.start_id)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def stream(self, q, initial=None):
+        """SSE generator for subscriber *q*; ends after max_stream_seconds."""
+        try:
+            yield f"retry: {int(self.poll_interval * 2000)}\n\n"
+            if initial is not None:
+                yield format_sse(initial)
+            for event_id, payload in q.backlog:
+                yield format_sse({'type': 'checkin', **json.loads(payload)}, event_id)
+            deadline = time.time() + self.max_stream_seconds
+            while time.time() < deadline:
+                if q.overflowed:
+                    # Events were dropped: the client reloads the snapshot
+                    yield format_sse({'type': 'resync'})
+                    return
+                try:
+                    event_id, payload = q.get(timeout=self.heartbeat_seconds)
+                except queue.Empty:
+                    yield format_sse({'type': 'heartbeat'})
+                    continue
+                yield format_sse({'type': 'checkin', **json.loads(payload)}, event_id)
+        finally:
+            self.unsubscribe(q)
+
+
+def publish_checkin(attendance, qr_code, location_event=None):
+    """Publish a committed check-in to the dashboard feed (never raises)."""
+    from flask import current_app
+
+    feed = current_app.extensions.get('realtime_feed')
+    if feed is None or not feed.enabled:
+        return
+    try:
+        feed.publish({
+            'employee_id': attendance.employee_id,
+            'location': attendance.location_name,
+            'time': attendance.check_in_time.strftime('%H:%M'),
+            'date': attendance.check_in_date.strftime('%Y-%m-%d'),
+            'qr_code_id': qr_code.id,
+            'project_id': qr_code.project_id,
+            'event': location_event or qr_code.location_event,
+        })
+    except Exception as e:
+        if feed.logger_handler:
+            feed.logger_handler.logger.warning(f"Could not publish check-in event: {e}")
@@ -0,0 +1,246 @@
+"""
+Request Profiler
+================
+
+Opt-in sampling profiler for chosen endpoints.
+
+With ``PROFILING_ENABLED`` on, a ``PROFILING_SAMPLE_RATE`` fraction of the
+requests to endpoints listed in ``PROFILING_ENDPOINTS`` is profiled.  A
+single daemon thread samples the stacks of the profiled request threads
+every ``PROFILING_INTERVAL_MS`` via ``sys._current_frames()`` — the request
+itself runs untouched, so overhead is one stack walk per interval and
+nothing at all for requests that are not sampled.
+
+Profiles longer than ``PROFILING_MIN_DURATION_MS`` are written to
+``PROFILING_DIR`` as:
+
+    <id>.folded  - collapsed stacks ("root;caller;callee <samples>"), ready
+                   for flamegraph.pl, speedscope or inferno
+    <id>.json    - endpoint, method, path, duration, sample count and error
+
+Only the newest ``PROFILING_KEEP`` profiles are kept.  Admins list them at
+``/api/performance/profiles`` and download one at
+``/api/performance/profiles/<id>``.  The slow request row written by
+app.py carries the profile id when one was taken.
+
+Sampling sees OS threads, so profiles are meaningful with sync/gthread
+gunicorn workers, not gevent.
+"""
+
+import glob
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+from flask import current_app, g, jsonify, request, send_file
+
+from utils.helpers import admin_required
+
+_PROFILE_ID_CHARS = frozenset('abcdefghijklmnopqrstuvwxyz0123456789_-.')
+
+
+@lru_cache(maxsize=4096)
+def _short_filename(filename):
+    """Path relative to the longest matching sys.path entry (e.g. flask/app.py)."""
+    best = ''
+    for entry in sys.path:
+        entry = os.path.abspath(entry or '.') + os.sep
+        if filename.startswith(entry) and len(entry) > len(best):
+            best = entry
+    return filename[len(best):]
+
+
+class StackSampler:
+    """One background thread sampling the stacks of registered threads."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self._targets = {}        # thread id -> Counter of collapsed stacks
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id):
+        with self._lock:
+            self._targets[thread_id] = Counter()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def stop(self, thread_id):
+        """Stop sampling *thread_id* and return its Counter of stacks."""
+        with self._lock:
+            return self._targets.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            if not self._targets:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, stacks in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[self._collapse(frame)] += 1
+
+    def _collapse(self, frame):
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            labels.append(f"{code.co_name} ({_short_filename(code.co_filename)})")
+            frame = frame.f_back
+        return ';'.join(reversed(labels))
+
+
+class RequestProfiler:
+    """Samples allowlisted endpoints and keeps the newest profiles on disk."""
+
+    def __init__(self, app=None, logger_handler=None):
+        self.logger_handler = logger_handler
+        self.enabled = False
+        self.endpoints = frozenset()
+        self.sample_rate = 0.0
+        self.min_duration = 0.0
+        self.keep = 50
+        self.profile_dir = None
+        self.sampler = None
+        if app is not None:
+            self.init_app(app, logger_handler)
+
+    def init_app(self, app, logger_handler=None):
+        self.logger_handler = logger_handler or self.logger_handler
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.endpoints = frozenset(app.config.get('PROFILING_ENDPOINTS') or ())
+        self.sample_rate = app.config.get('PROFILING_SAMPLE_RATE', 0.1)
+        self.min_duration = app.config.get('PROFILING_MIN_DURATION_MS', 0) / 1000.0
+        self.keep = app.config.get('PROFILING_KEEP', 50)
+        self.profile_dir = app.config.get('PROFILING_DIR') or os.path.join(
+            app.config.get('UPLOAD_FOLDER', '/tmp'), 'profiles'
+        )
+        self.sampler = StackSampler(app.config.get('PROFILING_INTERVAL_MS', 5) / 1000.0)
+
+        if self.enabled:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            app.before_request(self.start_profile)
+            app.teardown_request(self.finish_profile)
+        self.register_routes(app)
+        app.extensions['request_profiler'] = self
+
+    # ------------------------------------------------------------------
+    # Request hooks
+    # ------------------------------------------------------------------
+
+    def start_profile(self):
+        if request.endpoint not in self.endpoints or random.random() >= self.sample_rate:
+            return
+        g.profile_id = (
+            f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}_{request.endpoint}_{os.getpid()}"
+        ).lower()
+        g.profile_thread = threading.get_ident()
+        g.profile_started = time.perf_counter()
+        self.sampler.start(g.profile_thread)
+
+    def finish_profile(self, exc=None):
+        profile_id = g.pop('profile_id', None)
+        if profile_id is None:
+            return
+        stacks = self.sampler.stop(g.pop('profile_thread'))
+        duration = time.perf_counter() - g.pop('profile_started')
+        if not stacks or duration < self.min_duration:
+            return
+        try:
+            self._write_profile(profile_id, stacks, {
+                'id': profile_id,
+                'endpoint': request.endpoint,
+                'method': request.method,
+                'path': request.path,
+                'error': repr(exc) if exc else None,
+                'duration': round(duration, 4),
+                'samples': sum(stacks.values()),
+                'interval_ms': round(self.sampler.interval * 1000, 3),
+                'pid': os.getpid(),
+                'created': datetime.utcnow().isoformat()
+            })
+        except Exception as e:
+            if self.logger_handler:
+                self.logger_handler.logger.warning(f"Could not store profile {profile_id}: {e}")
+
+    # ------------------------------------------------------------------
+    # Storage
+    # ------------------------------------------------------------------
+
+    def _write_profile(self, profile_id, stacks, meta):
+        base = os.path.join(self.profile_dir, profile_id)
+        for suffix, content in (
+            ('.folded', ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())),
+            ('.json', json.dumps(meta)),
+        ):
+            tmp = f"{base}{suffix}.tmp"
+            with open(tmp, 'w') as f:
+                f.write(content)
+            os.replace(tmp, base + suffix)
+        self._prune()
+
+    def _prune(self):
+        metas = sorted(glob.glob(os.path.join(self.profile_dir, '*.json')))
+        for path in metas[:-self.keep] if self.keep else metas:
+            for stale in (path, path[:-5] + '.folded'):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+    def list_profiles(self, limit=20):
+        """Newest-first metadata of stored profiles."""
+        profiles = []
+        for path in sorted(glob.glob(os.path.join(self.profile_dir, '*.json')), reverse=True)[:limit]:
+            try:
+                with open(path) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def register_routes(self, app):
+
+        @app.route('/api/performance/profiles')
+        @admin_required
+        def list_request_profiles():
+            """Newest stored request profiles (metadata only)"""
+            try:
+                limit = min(request.args.get('limit', 20, type=int), 200)
+                return jsonify({
+                    'enabled': self.enabled,
+                    'endpoints': sorted(self.endpoints),
+                    'sample_rate': self.sample_rate,
+                    'profiles': self.list_profiles(limit)
+                })
+            except Exception as e:
+                current_app.logger.error(f"Profile list error: {e}")
+                return jsonify({'error': 'Failed to list profiles'}), 500
+
+        @app.route('/api/performance/profiles/<profile_id>')
+        @admin_required
+        def download_request_profile(profile_id):
+            """Collapsed stacks of one profile (flamegraph.pl / speedscope input)"""
+            if not set(profile_id) <= _PROFILE_ID_CHARS:
+                return jsonify({'error': 'Invalid profile id'}), 400
+            path = os.path.join(self.profile_dir, f"{profile_id}.folded")
+            if not os.path.exists(path):
+                return jsonify({'error': 'Profile not found'}), 404
+            return send_file(path, mimetype='text/plain', as_attachment=True,
+                             download_name=f"{profile_id}.folded")
@@ -5,7 +5,7 @@ Admin panel and log management routes.
 
 Routes: /admin/logs, /admin/health/google-maps, /api/logs/*
 """
-from flask import Blueprint, render_template, request, redirect, flash, session, jsonify, url_for
+from flask import Blueprint, render_template, request, redirect, flash, session, jsonify, url_for, current_app
 from datetime import datetime, timedelta
 import json, math
 
@@ -68,7 +68,13 @@ def google_maps_health():
 @bp.route('/api/logs/recent', endpoint='api_recent_logs')
 @admin_required
 def api_recent_logs():
-    """API endpoint to get recent log entries with full details and pagination support"""
+    """API endpoint to get recent log entries with full details and pagination support
+
+    With ``search`` the results come from the word index (log_search.py),
+    newest first and paged by ``cursor`` / ``next_cursor`` instead of
+    ``page``; there is no total count.  New callers should use
+    /api/logs/search.
+    """
     try:
         days = request.args.get('days', 1, type=int)
         limit = request.args.get('limit', 50, type=int)
@@ -82,6 +88,25 @@ def api_recent_logs():
             f"category={category!r}, severity={severity!r}, search={search!r}"
         )
 
+        if search:
+            from log_search import search_logs
+            cursor = request.args.get('cursor') or None
+            try:
+                result = search_logs(db, search, days=days, category=category or None,
+                                     severity=severity or None, limit=max(1, min(limit, 200)),
+                                     cursor=cursor, sort='recent')
+            except ValueError as e:
+                return jsonify({'success': False, 'error': str(e)}), 400
+            return jsonify({
+                'success': True,
+                'logs': result['logs'],
+                'next_cursor': result['next_cursor'],
+                'has_next': result['next_cursor'] is not None,
+                'has_prev': cursor is not None,
+                'limit': limit,
+                'backend': result['backend']
+            })
+
         cutoff_date = datetime.now() - timedelta(days=days)
 
         # Calculate offset for pagination
@@ -124,13 +149,6 @@ def api_recent_logs():
             count_sql += " AND severity_level = :severity"
             params['severity'] = severity
 
-        # Add search filter
-        if search:
-            search_condition = " AND (event_type LIKE :search OR event_description LIKE :search OR username LIKE :search)"
-            base_sql += search_condition
-            count_sql += search_condition
-            params['search'] = f'%{search}%'
-
         # Get total count first
         count_result = db.session.execute(text(count_sql), params).fetchone()
         total_count = count_result.total_count if count_result else 0
@@ -186,6 +204,46 @@ def api_recent_logs():
             'error': f'Failed to fetch recent logs: {str(e)}'
         }), 500
 
+@bp.route('/api/logs/search', endpoint='api_search_logs')
+@admin_required
+def api_search_logs():
+    """API endpoint for the log search box: indexed, ranked, keyset-paginated"""
+    from log_search import search_logs
+    try:
+        query = request.args.get('q', '') or request.args.get('search', '')
+        days = request.args.get('days', 7, type=int)
+        limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+        sort = request.args.get('sort', 'relevance')
+        if sort not in ('relevance', 'recent'):
+            return jsonify({'success': False, 'error': 'sort must be relevance or recent'}), 400
+
+        try:
+            result = search_logs(
+                db, query, days=days,
+                category=request.args.get('category') or None,
+                severity=request.args.get('severity') or None,
+                limit=limit, cursor=request.args.get('cursor') or None, sort=sort
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        return jsonify({
+            'success': True,
+            'logs': result['logs'],
+            'next_cursor': result['next_cursor'],
+            'has_next': result['next_cursor'] is not None,
+            'limit': limit,
+            'sort': result['sort'],
+            'backend': result['backend']
+        })
+
+    except Exception as e:
+        logger_handler.log_database_error('api_search_logs', e)
+        return jsonify({
+            'success': False,
+            'error': f'Failed to search logs: {str(e)}'
+        }), 500
+
 @bp.route('/api/logs/stats', endpoint='api_log_stats')
 @admin_required
 def api_log_stats():
@@ -260,8 +318,13 @@ def api_cleanup_logs():
                 'error': 'days_to_keep cannot exceed 365 days'
             }), 400
 
-        # Perform cleanup using logger handler
-        deleted_count = logger_handler.cleanup_old_logs(days_to_keep=days_to_keep)
+        # Perform cleanup using logger handler (chunked; a large backlog is
+        # finished by the next call or the scheduled log_retention job)
+        purge = logger_handler.purge_old_logs(
+            days_to_keep=days_to_keep,
+            max_seconds=current_app.config.get('PURGE_REQUEST_MAX_SECONDS', 20)
+        )
+        deleted_count = purge['deleted']
 
         admin_username = session.get('username', 'unknown')
         logger_handler.logger.info(
@@ -285,8 +348,11 @@ def api_cleanup_logs():
         return jsonify({
             'success': True,
             'deleted_count': deleted_count,
+            'complete': purge['complete'],
             'days_to_keep': days_to_keep,
-            'message': f'Successfully cleaned up {deleted_count} old log entries (keeping last {days_to_keep} days)',
+            'message': (f'Successfully cleaned up {deleted_count} old log entries (keeping last {days_to_keep} days)'
+                        if purge['complete'] else
+                        f'Cleaned up {deleted_count} old log entries so far; run cleanup again to continue'),
             'performed_by': admin_username,
             'performed_at': datetime.now().isoformat()
         })
@@ -323,12 +389,16 @@ def api_clear_logs():
             logger_handler.logger.warning(f"Error counting logs before clear: {count_error}")
             total_logs = 0
 
-        # Perform the clear operation
+        # Perform the clear operation in key-range chunks; rows logged after
+        # the clear started (including its own audit event) are kept
         try:
-            clear_sql = "DELETE FROM log_events"
-            result = db.session.execute(text(clear_sql))
-            deleted_count = result.rowcount
-            db.session.commit()
+            purge = logger_handler.purge_log_events(
+                'log_clear_all', max_seconds=current_app.config.get('PURGE_REQUEST_MAX_SECONDS', 20)
+            )
+            deleted_count = purge['deleted']
+            if purge['complete']:
+                import log_stats
+                log_stats.reset(db)
 
             logger_handler.logger.info(
                 f"Admin {admin_username} cleared all log entries: {deleted_count} records deleted"
@@ -349,7 +419,9 @@ def api_clear_logs():
             return jsonify({
                 'success': True,
                 'deleted_count': deleted_count,
-                'message': f'Successfully cleared {deleted_count} log entries',
+                'complete': purge['complete'],
+                'message': (f'Successfully cleared {deleted_count} log entries' if purge['complete'] else
+                            f'Cleared {deleted_count} log entries so far; clear again to continue'),
                 'performed_by': admin_username,
                 'performed_at': datetime.now().isoformat()
             })
@@ -392,8 +464,8 @@ def api_clear_old_logs():
                 'error': 'days_threshold must be 30, 60, or 90'
             }), 400
 
-        # Calculate cutoff date
-        cutoff_date = datetime.now() - timedelta(days=days_threshold)
+        # Calculate cutoff date (midnight, so a repeated call resumes the same purge)
+        cutoff_date = datetime.combine(datetime.now().date() - timedelta(days=days_threshold), datetime.min.time())
 
         # Count existing logs before deletion
         try:
@@ -414,10 +486,14 @@ def api_clear_old_logs():
 
         # Perform the clear operation
         try:
-            clear_sql = "DELETE FROM log_events WHERE created_timestamp < :cutoff_date"
-            result = db.session.execute(text(clear_sql), {'cutoff_date': cutoff_date})
-            deleted_count = result.rowcount
-            db.session.commit()
+            purge = logger_handler.purge_log_events(
+                'log_clear_old', where="created_timestamp < :cutoff_date", params={'cutoff_date': cutoff_date},
+                max_seconds=current_app.config.get('PURGE_REQUEST_MAX_SECONDS', 20)
+            )
+            deleted_count = purge['deleted']
+            if purge['complete']:
+                import log_stats
+                log_stats.forget_before(db, cutoff_date)
 
             logger_handler.logger.info(
                 f"Admin {admin_username} cleared {deleted_count} log entries older than {days_threshold} days"
@@ -440,8 +516,11 @@ def api_clear_old_logs():
             return jsonify({
                 'success': True,
                 'deleted_count': deleted_count,
+                'complete': purge['complete'],
                 'days_threshold': days_threshold,
-                'message': f'Successfully cleared {deleted_count} log entries older than {days_threshold} days',
+                'message': (f'Successfully cleared {deleted_count} log entries older than {days_threshold} days'
+                            if purge['complete'] else
+                            f'Cleared {deleted_count} log entries so far; clear again to continue'),
                 'performed_by': admin_username,
                 'performed_at': datetime.now().isoformat()
             })
@@ -461,15 +540,108 @@ def api_clear_old_logs():
             'error': f'Failed to clear old logs: {str(e)}'
         }), 500
 
+LOG_EXPORT_FORMATS = ('csv', 'ndjson')
+
+LOG_EXPORT_COLUMNS = [
+    ('Timestamp', 'string'), ('Event ID', 'string'), ('Event Type', 'string'), ('Category', 'string'),
+    ('Description', 'string'), ('Severity', 'string'), ('Username', 'string'), ('User ID', 'int64'),
+    ('IP Address', 'string'), ('Event Data', 'string'),
+]
+
+
+def _log_export_record(row):
+    """One exported log entry (the shape of the JSON export)."""
+    event_data = row.event_data
+    if isinstance(event_data, str):
+        try:
+            event_data = json.loads(event_data)
+        except (json.JSONDecodeError, TypeError):
+            pass
+    timestamp = row.created_timestamp
+    return {
+        'event_id': row.event_id,
+        'event_type': row.event_type,
+        'event_category': row.event_category,
+        'description': row.event_description,
+        'event_data': event_data,
+        'severity': row.severity_level,
+        'timestamp': timestamp.isoformat() if hasattr(timestamp, 'isoformat') else timestamp,
+        'username': row.username or 'System',
+        'user_id': row.user_id,
+        'ip_address': row.ip_address or '-'
+    }
+
+
+def _log_export_csv_row(row):
+    timestamp = row.created_timestamp
+    event_data = row.event_data
+    if event_data is not None and not isinstance(event_data, str):
+        event_data = json.dumps(event_data, default=str)
+    return [
+        timestamp.isoformat() if hasattr(timestamp, 'isoformat') else timestamp,
+        row.event_id, row.event_type, row.event_category, row.event_description,
+        row.severity_level, row.username or 'System', row.user_id, row.ip_address or '',
+        event_data or '',
+    ]
+
+
+def _stream_log_export(sql, params, export_format, admin_username, filters):
+    """Stream the export query as CSV or NDJSON in constant memory."""
+    from utils.flat_export import CSV_MIMETYPE, NDJSON_MIMETYPE, iter_csv, iter_ndjson, iter_row_chunks, stream_download
+
+    # Audit before streaming: the row count is only known at the end
+    logger_handler.log_security_event(
+        event_type="admin_log_export",
+        description=f"Admin {admin_username} started a streamed {export_format} log export "
+                    f"(last {filters['days']} days)",
+        severity="MEDIUM",
+        additional_data={
+            'admin_user': admin_username,
+            'format': export_format,
+            'days_exported': filters['days'],
+            'filters': {k: v for k, v in filters.items() if k != 'days'},
+            'ip_address': request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
+        }
+    )
+
+    chunks = iter_row_chunks(text(sql), params)
+    exported = {'rows': 0}
+
+    def counted(source):
+        for chunk in source:
+            exported['rows'] += len(chunk)
+            yield chunk
+        logger_handler.logger.info(f"Admin {admin_username} exported {exported['rows']} log entries as {export_format}")
+
+    filename_base = f"system_logs_{datetime.now():%Y-%m-%d}"
+    if export_format == 'ndjson':
+        return stream_download(iter_ndjson(counted(chunks), _log_export_record),
+                               f"{filename_base}.ndjson", NDJSON_MIMETYPE)
+    return stream_download(iter_csv(LOG_EXPORT_COLUMNS, counted(chunks), _log_export_csv_row),
+                           f"{filename_base}.csv", CSV_MIMETYPE)
+
+
 @bp.route('/api/logs/export', endpoint='api_export_logs')
 @admin_required
 def api_export_logs():
-    """API endpoint to export log entries"""
+    """
+    API endpoint to export log entries
+    
+    ``format=csv`` / ``format=ndjson`` streams the rows off a server-side
+    cursor (gzipped when the client accepts it); without ``format`` the
+    entries are returned as one JSON document.
+    """
     try:
         days = request.args.get('days', 7, type=int)
         category = request.args.get('category', '')
         severity = request.args.get('severity', '')
         search = request.args.get('search', '')
+        export_format = request.args.get('format', '')
+        if export_format and export_format not in LOG_EXPORT_FORMATS:
+            return jsonify({
+                'success': False,
+                'error': f"format must be one of: {', '.join(LOG_EXPORT_FORMATS)}"
+            }), 400
 
         admin_username = session.get('username', 'unknown')
         logger_handler.logger.info(
@@ -515,31 +687,14 @@ def api_export_logs():
 
         base_sql += " ORDER BY created_timestamp DESC"
 
-        result = db.session.execute(text(base_sql), params).fetchall()
-
-        logs = []
-        for row in result:
-            # Parse event_data if it's JSON
-            event_data = None
-            if row.event_data:
-                try:
-                    event_data = json.loads(row.event_data) if isinstance(row.event_data, str) else row.event_data
-                except (json.JSONDecodeError, TypeError):
-                    event_data = row.event_data
-
-            logs.append({
-                'event_id': row.event_id,
-                'event_type': row.event_type,
-                'event_category': row.event_category,
-                'description': row.event_description,
-                'event_data': event_data,
-                'severity': row.severity_level,
-                'timestamp': row.created_timestamp.isoformat(),
-                'username': row.username or 'System',
-                'user_id': row.user_id,
-                'ip_address': row.ip_address or '-'
+        if export_format:
+            return _stream_log_export(base_sql, params, export_format, admin_username, {
+                'days': days, 'category': category, 'severity': severity, 'search': search
             })
 
+        result = db.session.execute(text(base_sql), params).fetchall()
+        logs = [_log_export_record(row) for row in result]
+
         # Log the export operation
         logger_handler.log_security_event(
             event_type="admin_log_export",
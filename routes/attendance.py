@@ -2,7 +2,7 @@
 routes/attendance.py
 ====================
 Attendance check-in records, manual entry, verification review,
-export configuration, and Excel export routes.
+export configuration, and Excel / CSV / Parquet export routes.
 
 Routes: /attendance, /attendance/<id>/edit, /attendance/add,
         /attendance/save_manual, /api/attendance/*, /api/search_employees,
@@ -31,6 +31,9 @@ from utils.helpers import (
                            staff_or_admin_required)
 from utils.geocoding import (calculate_location_accuracy_enhanced, process_location_data_enhanced,
                              check_location_accuracy_column_exists)
+from export_cache import cached_export
+from dashboard_stats import get_dashboard_stats
+from utils.flat_export import FLAT_FORMATS, PARQUET_AVAILABLE, flat_export_response, iter_row_chunks
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
@@ -184,7 +187,7 @@ def attendance_report():
                     COALESCE(ad.is_dynamic_qr, 0) as is_dynamic_qr
                 FROM attendance_data ad
                 LEFT JOIN qr_codes qc ON ad.qr_code_id = qc.id
-                LEFT JOIN employee e ON CAST(ad.employee_id AS UNSIGNED) = e.id
+                LEFT JOIN employee e ON ad.base_employee_id = e.id
                 WHERE 1=1
             """
         else:
@@ -213,7 +216,7 @@ def attendance_report():
                     COALESCE(ad.is_dynamic_qr, 0) as is_dynamic_qr
                 FROM attendance_data ad
                 LEFT JOIN qr_codes qc ON ad.qr_code_id = qc.id
-                LEFT JOIN employee e ON CAST(ad.employee_id AS UNSIGNED) = e.id
+                LEFT JOIN employee e ON ad.base_employee_id = e.id
                 WHERE 1=1
             """
 
@@ -991,7 +994,7 @@ def search_employees_api():
                     text("""
                         SELECT DISTINCT ad.employee_id
                         FROM attendance_data ad
-                        LEFT JOIN employee e ON CAST(ad.employee_id AS UNSIGNED) = e.id
+                        LEFT JOIN employee e ON ad.base_employee_id = e.id
                         WHERE e.id IS NULL
                           AND ad.employee_id LIKE :pattern
                         ORDER BY ad.employee_id
@@ -1465,6 +1468,16 @@ def verification_review_detail(record_id):
 def attendance_stats_api():
     """API endpoint for attendance statistics"""
     try:
+        # Served from the summary tables; live queries below are the fallback
+        stats = get_dashboard_stats()
+        if stats is not None:
+            return jsonify({
+                'daily_stats': stats['daily_stats'],
+                'location_stats': stats['location_stats'],
+                'hourly_stats': stats['hourly_stats'],
+                'stats_refreshed_at': stats['refreshed_at']
+            })
+
         # Daily stats for the last 7 days
         daily_stats = db.session.execute(text("""
             SELECT 
@@ -1610,6 +1623,7 @@ def export_configuration():
 
 @bp.route('/generate-excel-export', methods=['POST'], endpoint='generate_excel_export')
 @login_required
+@cached_export('attendance_excel', 'attendance_data', ('date_from', 'date_to'))
 def generate_excel_export():
     """Generate and download Excel file with selected columns in specified order"""
     try:
@@ -1680,50 +1694,26 @@ def generate_excel_export():
             'column_order': selected_columns  # This is now the ordered list
         }
 
+        # Flat CSV / Parquet extracts stream straight from a server-side cursor
+        export_format = request.form.get('export_format', 'excel').lower()
+        if export_format in FLAT_FORMATS:
+            if export_format == 'parquet' and not PARQUET_AVAILABLE:
+                flash('Parquet export is not available on this server (pyarrow is not installed).', 'error')
+                return redirect(url_for('attendance.export_configuration'))
+            logger_handler.logger.info(
+                f"{export_format.upper()} export with {len(selected_columns)} columns "
+                f"started by user {session.get('username', 'unknown')}"
+            )
+            return create_flat_export_ordered(
+                selected_columns, column_names, filters, export_format,
+                _attendance_export_filename_base(filters)
+            )
+
         # Generate Excel file with ordered columns
         excel_file = create_excel_export_ordered(selected_columns, column_names, filters)
 
         if excel_file:
-            # Get project name if project filter exists
-            project_name_for_filename = ''
-            if filters.get('project_filter'):
-                try:
-                    project = db.session.get(Project, int(filters['project_filter']))
-                    if project:
-                        # Replace spaces and special characters with underscores
-                        project_name_safe = project.name.replace(' ', '_').replace('/', '_').replace('\\', '_')
-                        project_name_for_filename = f"{project_name_safe}_"
-                except Exception as e:
-                    logger_handler.logger.warning(f"Error getting project name for filename: {e}")
-            
-            # Format dates for filename (MMDDYYYY format)
-            date_from_formatted = ''
-            date_to_formatted = ''
-            if filters.get('date_from'):
-                try:
-                    date_obj = datetime.strptime(filters['date_from'], '%Y-%m-%d')
-                    date_from_formatted = date_obj.strftime('%m%d%Y')
-                except ValueError:
-                    pass
-            
-            if filters.get('date_to'):
-                try:
-                    date_obj = datetime.strptime(filters['date_to'], '%Y-%m-%d')
-                    date_to_formatted = date_obj.strftime('%m%d%Y')
-                except ValueError:
-                    pass
-            
-            # Build filename components
-            # Format: [project_name_]attendance_report_[fromdate_todate].xlsx
-            date_range_str = ''
-            if date_from_formatted and date_to_formatted:
-                date_range_str = f"{date_from_formatted}_{date_to_formatted}"
-            elif date_from_formatted:
-                date_range_str = f"{date_from_formatted}"
-            elif date_to_formatted:
-                date_range_str = f"{date_to_formatted}"
-            
-            filename = f'{project_name_for_filename}attendance_report_{date_range_str}.xlsx'
+            filename = f'{_attendance_export_filename_base(filters)}.xlsx'
 
             logger_handler.logger.info(f"Excel export generated successfully: {filename}")
 
@@ -1778,7 +1768,7 @@ def create_excel_export(selected_columns, column_names, filters):
         query = db.session.query(AttendanceData, QRCode, Employee).join(
             QRCode, AttendanceData.qr_code_id == QRCode.id
         ).outerjoin(
-            Employee, text("CAST(attendance_data.employee_id AS UNSIGNED) = employee.id")
+            Employee, AttendanceData.base_employee_id == Employee.id
         )
 
         # Apply date filters
@@ -2076,6 +2066,49 @@ def create_excel_export(selected_columns, column_names, filters):
             
         return None
 
+def _attendance_export_filename_base(filters):
+    """Return '[project_name_]attendance_report_[fromdate_todate]' (no extension)."""
+    # Get project name if project filter exists
+    project_name_for_filename = ''
+    if filters.get('project_filter'):
+        try:
+            project = db.session.get(Project, int(filters['project_filter']))
+            if project:
+                # Replace spaces and special characters with underscores
+                project_name_safe = project.name.replace(' ', '_').replace('/', '_').replace('\\', '_')
+                project_name_for_filename = f"{project_name_safe}_"
+        except Exception as e:
+            logger_handler.logger.warning(f"Error getting project name for filename: {e}")
+
+    # Format dates for filename (MMDDYYYY format)
+    date_from_formatted = ''
+    date_to_formatted = ''
+    if filters.get('date_from'):
+        try:
+            date_obj = datetime.strptime(filters['date_from'], '%Y-%m-%d')
+            date_from_formatted = date_obj.strftime('%m%d%Y')
+        except ValueError:
+            pass
+
+    if filters.get('date_to'):
+        try:
+            date_obj = datetime.strptime(filters['date_to'], '%Y-%m-%d')
+            date_to_formatted = date_obj.strftime('%m%d%Y')
+        except ValueError:
+            pass
+
+    # Build filename components
+    date_range_str = ''
+    if date_from_formatted and date_to_formatted:
+        date_range_str = f"{date_from_formatted}_{date_to_formatted}"
+    elif date_from_formatted:
+        date_range_str = f"{date_from_formatted}"
+    elif date_to_formatted:
+        date_range_str = f"{date_to_formatted}"
+
+    return f'{project_name_for_filename}attendance_report_{date_range_str}'
+
+
 def format_employee_id_for_excel(employee_id):
     if not employee_id:
         return ''
@@ -2085,6 +2118,154 @@ def format_employee_id_for_excel(employee_id):
     else:
         return emp_id_str
     
+# Parquet column types for the flat export; anything not listed is a string
+_FLAT_EXPORT_COLUMN_TYPES = {
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'accuracy': 'float64',
+    'location_accuracy': 'float64',
+}
+
+
+def _flat_attendance_value(column_key, attendance_record, qr_record, employee_record):
+    """Plain cell value for CSV/Parquet — same rules as the Excel export, minus formulas and fills"""
+    if column_key == 'employee_id':
+        return str(attendance_record.employee_id or '').strip()
+    if column_key == 'employee_name':
+        if employee_record:
+            return f"{employee_record.lastName}, {employee_record.firstName}"
+        return f"Unknown (ID: {attendance_record.employee_id})"
+    if column_key == 'status':
+        return qr_record.location_event if qr_record and qr_record.location_event else 'Check In'
+    if column_key == 'check_in_date':
+        return attendance_record.check_in_date.strftime('%Y-%m-%d') if attendance_record.check_in_date else ''
+    if column_key == 'check_in_time':
+        return attendance_record.check_in_time.strftime('%H:%M:%S') if attendance_record.check_in_time else ''
+    if column_key == 'qr_address':
+        return (
+            getattr(attendance_record, 'qr_address', None)
+            or (qr_record.location_address if qr_record else '')
+            or ''
+        )
+    if column_key == 'address':
+        # Same accuracy rule as the Excel export: < 0.3 miles uses the QR address
+        try:
+            if attendance_record.location_accuracy is not None and float(attendance_record.location_accuracy) < 0.3:
+                return (
+                    getattr(attendance_record, 'qr_address', None)
+                    or (qr_record.location_address if qr_record else '')
+                    or ''
+                )
+        except (ValueError, TypeError):
+            pass
+        return attendance_record.address or ''
+    if column_key in ('location_name', 'device_info', 'ip_address', 'user_agent',
+                      'latitude', 'longitude', 'accuracy', 'location_accuracy'):
+        return getattr(attendance_record, column_key, None) or ''
+    return ''
+
+
+def create_flat_export_ordered(selected_columns, column_names, filters, export_format, filename_base):
+    """Stream selected attendance columns as CSV or Parquet from a server-side cursor"""
+    columns = [
+        (column_names.get(column_key, column_key), _FLAT_EXPORT_COLUMN_TYPES.get(column_key, 'string'))
+        for column_key in selected_columns
+    ]
+
+    def row_fn(row):
+        attendance_record, qr_record, employee_record = row
+        values = []
+        for column_key in selected_columns:
+            try:
+                values.append(_flat_attendance_value(column_key, attendance_record, qr_record, employee_record))
+            except Exception as cell_error:
+                logger_handler.logger.warning(f"Error setting flat export value for {column_key}: {cell_error}")
+                values.append('')
+        return values
+
+    query = _build_attendance_export_query(filters)
+    return flat_export_response(
+        export_format, columns, iter_row_chunks(query.statement), row_fn, filename_base
+    )
+
+
+def _build_attendance_export_query(filters):
+    """Filtered (AttendanceData, QRCode, Employee) query shared by the Excel and flat exports"""
+    # Build query based on filters - JOIN with QRCode to get location_event and location_address
+    # Now also JOIN with Employee table to get employee names
+    query = db.session.query(AttendanceData, QRCode, Employee).join(
+        QRCode, AttendanceData.qr_code_id == QRCode.id
+    ).outerjoin(
+        Employee, AttendanceData.base_employee_id == Employee.id
+    )
+
+    # Apply date filters
+    if filters.get('date_from'):
+        try:
+            date_from = datetime.strptime(filters['date_from'], '%Y-%m-%d').date()
+            query = query.filter(AttendanceData.check_in_date >= date_from)
+            logger_handler.logger.debug(f"Applied date_from filter: {date_from}")
+        except ValueError as e:
+            logger_handler.logger.warning(f"Invalid date_from format: {e}")
+
+    if filters.get('date_to'):
+        try:
+            date_to = datetime.strptime(filters['date_to'], '%Y-%m-%d').date()
+            query = query.filter(AttendanceData.check_in_date <= date_to)
+            logger_handler.logger.debug(f"Applied date_to filter: {date_to}")
+        except ValueError as e:
+            logger_handler.logger.warning(f"Invalid date_to format: {e}")
+
+    # Apply location filter
+    if filters.get('location_filter'):
+        query = query.filter(AttendanceData.location_name.like(f"%{filters['location_filter']}%"))
+        logger_handler.logger.debug(f"Applied location filter: {filters['location_filter']}")
+
+    # Apply employee filter — supports comma-separated multi-employee values
+    if filters.get('employee_filter'):
+        emp_ids = [e.strip() for e in filters['employee_filter'].split(',') if e.strip()]
+        if len(emp_ids) == 1:
+            query = query.filter(AttendanceData.employee_id == emp_ids[0])
+        elif len(emp_ids) > 1:
+            query = query.filter(AttendanceData.employee_id.in_(emp_ids))
+        logger_handler.logger.debug(f"Applied employee filter: {emp_ids}")
+
+    # Apply project filter
+    if filters.get('project_filter'):
+        try:
+            project_id = int(filters['project_filter'])
+            # For standard QR records: match by the QR code's own project_id.
+            # For dynamic QR records: the dynamic QR may not belong to any project,
+            # but the employee-selected location corresponds to a standard QR in that
+            # project. Include them by matching location_name against standard QRs
+            # in the selected project.
+            query = query.filter(
+                or_(
+                    QRCode.project_id == project_id,
+                    and_(
+                        AttendanceData.is_dynamic_qr == True,
+                        AttendanceData.location_name.in_(
+                            db.session.query(QRCode.location)
+                            .filter(
+                                QRCode.project_id == project_id,
+                                QRCode.qr_type == 'standard',
+                                QRCode.location.isnot(None),
+                                QRCode.location != ''
+                            )
+                            .subquery()
+                        )
+                    )
+                )
+            )
+            logger_handler.logger.debug(f"Applied project filter: {project_id}")
+        except (ValueError, TypeError) as e:
+            logger_handler.logger.warning(f"Invalid project filter: {e}")
+
+    # Order by date and time
+    query = query.order_by(AttendanceData.check_in_date.desc(), AttendanceData.check_in_time.desc())
+    return query
+
+
 def create_excel_export_ordered(selected_columns, column_names, filters):
     """Create Excel file with selected attendance data in specified column order"""
     try:
@@ -2099,78 +2280,7 @@ def create_excel_export_ordered(selected_columns, column_names, filters):
             logger_handler.logger.error(f"openpyxl import error: {e}. Run: pip install openpyxl")
             return None
 
-        # Build query based on filters - JOIN with QRCode to get location_event and location_address
-        # Now also JOIN with Employee table to get employee names
-        query = db.session.query(AttendanceData, QRCode, Employee).join(
-            QRCode, AttendanceData.qr_code_id == QRCode.id
-        ).outerjoin(
-            Employee, text("CAST(attendance_data.employee_id AS UNSIGNED) = employee.id")
-        )
-
-        # Apply date filters
-        if filters.get('date_from'):
-            try:
-                date_from = datetime.strptime(filters['date_from'], '%Y-%m-%d').date()
-                query = query.filter(AttendanceData.check_in_date >= date_from)
-                logger_handler.logger.debug(f"Applied date_from filter: {date_from}")
-            except ValueError as e:
-                logger_handler.logger.warning(f"Invalid date_from format: {e}")
-
-        if filters.get('date_to'):
-            try:
-                date_to = datetime.strptime(filters['date_to'], '%Y-%m-%d').date()
-                query = query.filter(AttendanceData.check_in_date <= date_to)
-                logger_handler.logger.debug(f"Applied date_to filter: {date_to}")
-            except ValueError as e:
-                logger_handler.logger.warning(f"Invalid date_to format: {e}")
-
-        # Apply location filter
-        if filters.get('location_filter'):
-            query = query.filter(AttendanceData.location_name.like(f"%{filters['location_filter']}%"))
-            logger_handler.logger.debug(f"Applied location filter: {filters['location_filter']}")
-
-        # Apply employee filter — supports comma-separated multi-employee values
-        if filters.get('employee_filter'):
-            emp_ids = [e.strip() for e in filters['employee_filter'].split(',') if e.strip()]
-            if len(emp_ids) == 1:
-                query = query.filter(AttendanceData.employee_id == emp_ids[0])
-            elif len(emp_ids) > 1:
-                query = query.filter(AttendanceData.employee_id.in_(emp_ids))
-            logger_handler.logger.debug(f"Applied employee filter: {emp_ids}")
-
-        # Apply project filter
-        if filters.get('project_filter'):
-            try:
-                project_id = int(filters['project_filter'])
-                # For standard QR records: match by the QR code's own project_id.
-                # For dynamic QR records: the dynamic QR may not belong to any project,
-                # but the employee-selected location corresponds to a standard QR in that
-                # project. Include them by matching location_name against standard QRs
-                # in the selected project.
-                query = query.filter(
-                    or_(
-                        QRCode.project_id == project_id,
-                        and_(
-                            AttendanceData.is_dynamic_qr == True,
-                            AttendanceData.location_name.in_(
-                                db.session.query(QRCode.location)
-                                .filter(
-                                    QRCode.project_id == project_id,
-                                    QRCode.qr_type == 'standard',
-                                    QRCode.location.isnot(None),
-                                    QRCode.location != ''
-                                )
-                                .subquery()
-                            )
-                        )
-                    )
-                )
-                logger_handler.logger.debug(f"Applied project filter: {project_id}")
-            except (ValueError, TypeError) as e:
-                logger_handler.logger.warning(f"Invalid project filter: {e}")
-
-        # Order by date and time
-        query = query.order_by(AttendanceData.check_in_date.desc(), AttendanceData.check_in_time.desc())
+        query = _build_attendance_export_query(filters)
 
         # Execute query
         results = query.all()
@@ -5,7 +5,7 @@ Authentication and user-profile routes.
 
 Routes: /, /register, /login, /logout, /profile
 """
-from flask import Blueprint, render_template, request, redirect, flash, session, jsonify, url_for
+from flask import Blueprint, render_template, request, redirect, flash, session, jsonify, url_for, current_app
 from datetime import datetime
 import json
 
@@ -14,10 +14,17 @@ from models.user import User
 from logger_handler import log_user_activity, log_database_operations
 from utils.helpers import admin_required, login_required, staff_or_admin_required
 from turnstile_utils import turnstile_utils
+from rate_limiter import get_rate_limiter
 
 bp = Blueprint('auth', __name__)
 
 
+def _login_budget():
+    """(limiter, 'auth' budget, key) for failed logins from this client, shared by all workers"""
+    limiter, budgets = get_rate_limiter(current_app)
+    return limiter, budgets['auth'], f"auth:ip:{request.remote_addr}"
+
+
 
 @bp.route('/', endpoint='index')
 def index():
@@ -95,6 +102,21 @@ def login():
                 flash('Please complete the security verification.', 'error')
                 return render_template('login.html')
 
+        limiter, budget, key = _login_budget()
+        try:
+            locked_out = limiter.is_blocked(key, budget)
+        except Exception as e:
+            logger_handler.logger.warning(f"Login rate limiter unavailable: {e}")
+            locked_out = False
+        if locked_out:
+            logger_handler.log_security_event(
+                event_type="login_locked_out",
+                description=f"Login refused after repeated failures for username: {username}",
+                severity="HIGH"
+            )
+            flash('Too many failed login attempts. Please try again later.', 'error')
+            return render_template('login.html'), 429
+
         try:
             # Find user (case-insensitive username)
             user = User.query.filter(
@@ -159,6 +181,10 @@ def login():
 
                 flash('Invalid username or password.', 'error')
                 logger_handler.logger.warning(f"Failed login attempt for username: {username}")
+                try:
+                    limiter.hit(key, budget)
+                except Exception as e:
+                    logger_handler.logger.warning(f"Login rate limiter unavailable: {e}")
 
         except Exception as e:
             db.session.rollback()
@@ -4,9 +4,9 @@ routes/dashboard.py
 Dashboard and related API routes.
 
 Routes: /dashboard, /project/<id>/qr-codes, /dashboard/search,
-        /api/dashboard/stats, /api/dashboard/realtime
+        /api/dashboard/stats, /api/dashboard/realtime, /api/dashboard/stream
 """
-from flask import Blueprint, render_template, request, redirect, flash, session, jsonify, url_for
+from flask import Blueprint, render_template, request, redirect, flash, session, jsonify, url_for, Response, current_app, stream_with_context
 from datetime import datetime, timedelta, date, time
 
 from extensions import db, logger_handler
@@ -16,6 +16,7 @@ from models.qrcode import QRCode
 from models.user import User
 from logger_handler import log_user_activity, log_database_operations
 from utils.helpers import login_required
+from dashboard_stats import get_dashboard_stats
 
 bp = Blueprint('dashboard', __name__)
 
@@ -152,6 +153,17 @@ def search_qr_codes():
 def dashboard_stats_api():
     """API endpoint for dashboard statistics"""
     try:
+        # Served from the summary tables; live queries below are the fallback
+        stats = get_dashboard_stats()
+        if stats is not None:
+            return jsonify({
+                'success': True,
+                **stats['dashboard'],
+                'project_change': 0,
+                'location_change': 0,
+                'stats_refreshed_at': stats['refreshed_at']
+            })
+
         # Get current stats
         total_qr_codes = QRCode.query.filter_by(active_status=True).count()
         
@@ -211,6 +223,14 @@ def dashboard_stats_api():
 def dashboard_realtime_api():
     """API endpoint for real-time dashboard data"""
     try:
+        stats = get_dashboard_stats()
+        if stats is not None:
+            return jsonify({
+                'success': True,
+                'recent_activity': stats['recent_activity'],
+                'stats_refreshed_at': stats['refreshed_at']
+            })
+
         # Get recent activity (last 10 check-ins)
         recent_activity = db.session.query(
             AttendanceData.employee_id,
@@ -244,5 +264,51 @@ def dashboard_realtime_api():
             'success': False,
             'error': 'Failed to fetch real-time data'
         }), 500
+
+@bp.route('/api/dashboard/stream', endpoint='dashboard_stream')
+@login_required
+def dashboard_stream():
+    """
+    Server-Sent Events feed of check-ins for open dashboards.
+
+    The first message is a 'snapshot' (the /api/dashboard/stats and
+    /api/dashboard/realtime payloads when the summary tables are ready);
+    every later 'checkin' message is a single new check-in that the client
+    prepends to its activity list and adds to today's count.
+    """
+    feed = current_app.extensions.get('realtime_feed')
+    if feed is None or not feed.enabled:
+        return jsonify({'success': False, 'error': 'Realtime feed is disabled'}), 404
+
+    try:
+        last_event_id = request.headers.get('Last-Event-ID', type=int)
+        initial = None
+        if last_event_id is None:
+            stats = get_dashboard_stats()
+            initial = {'type': 'snapshot'}
+            if stats is not None:
+                initial.update({
+                    'stats': stats['dashboard'],
+                    'recent_activity': stats['recent_activity'],
+                    'stats_refreshed_at': stats['refreshed_at']
+                })
+        subscriber = feed.subscribe(last_event_id)
+    except Exception as e:
+        db.session.rollback()
+        logger_handler.log_database_error('dashboard_stream', e)
+        return jsonify({'success': False, 'error': 'Failed to open realtime feed'}), 500
+    finally:
+        # The stream can stay open for minutes; don't hold a pooled connection
+        db.session.remove()
+
+    logger_handler.logger.debug(f"User {session.get('username')} opened dashboard stream")
+    return Response(
+        stream_with_context(feed.stream(subscriber, initial)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',   # Disable nginx buffering for SSE
+        }
+    )
     
 # USER MANAGEMENT ROUTES
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+routes/exports.py
+=================
+Background export job routes.
+
+Routes: /api/exports (POST submit), /api/exports/<job_id>,
+        /api/exports/<job_id>/download
+
+Submit accepts the same parameters as the synchronous export endpoint it
+wraps (form fields for POST exports, query args for the TA exports) plus
+``export`` naming which one to build — see export_jobs.EXPORT_ENDPOINTS.
+"""
+from flask import Blueprint, request, session, jsonify, send_file, url_for
+
+from extensions import logger_handler
+from export_jobs import export_job_manager, EXPORT_ENDPOINTS, STATUS_DONE
+from utils.helpers import has_admin_privileges, login_required
+
+bp = Blueprint('exports', __name__)
+
+
+def _job_payload(meta):
+    """Public view of a job's metadata."""
+    payload = {
+        'job_id': meta['job_id'],
+        'export': meta.get('export'),
+        'status': meta.get('status'),
+        'created': meta.get('created'),
+        'finished': meta.get('finished'),
+        'duration': meta.get('duration'),
+        'error': meta.get('error'),
+    }
+    if meta.get('status') == STATUS_DONE:
+        payload['filename'] = meta.get('artifact')
+        payload['download_url'] = url_for('exports.download_export_job', job_id=meta['job_id'])
+    return payload
+
+
+def _can_access(meta):
+    """Job owners (or anyone sharing the job's role scope) and admins may read a job."""
+    if has_admin_privileges(session.get('role', '')):
+        return True
+    return meta.get('user_id') == session.get('user_id') or meta.get('role') == session.get('role')
+
+
+@bp.route('/api/exports', methods=['POST'], endpoint='submit_export_job')
+@login_required
+def submit_export_job():
+    """Queue an export and return its job id (202) without building the file."""
+    try:
+        export_name = request.values.get('export', '')
+        if export_name not in EXPORT_ENDPOINTS:
+            return jsonify({
+                'success': False,
+                'error': f"Unknown export '{export_name}'. Expected one of: {', '.join(EXPORT_ENDPOINTS)}"
+            }), 400
+
+        spec = export_job_manager.build_spec(export_name, request, session)
+        meta, reused = export_job_manager.submit(spec)
+
+        payload = _job_payload(meta)
+        payload.update({'success': True, 'reused': reused})
+        return jsonify(payload), 200 if reused else 202
+
+    except Exception as e:
+        logger_handler.logger.error(f"Error submitting export job: {e}")
+        return jsonify({'success': False, 'error': 'Failed to queue export'}), 500
+
+
+@bp.route('/api/exports/<job_id>', endpoint='export_job_status')
+@login_required
+def export_job_status(job_id):
+    """Return the current status of an export job."""
+    meta = export_job_manager.get_job(job_id)
+    if not meta or not _can_access(meta):
+        return jsonify({'success': False, 'error': 'Export job not found'}), 404
+    payload = _job_payload(meta)
+    payload['success'] = True
+    return jsonify(payload)
+
+
+@bp.route('/api/exports/<job_id>/download', endpoint='download_export_job')
+@login_required
+def download_export_job(job_id):
+    """Stream a finished export job's file."""
+    meta = export_job_manager.get_job(job_id)
+    if not meta or not _can_access(meta):
+        return jsonify({'success': False, 'error': 'Export job not found'}), 404
+
+    path = export_job_manager.artifact_path(meta)
+    if not path:
+        return jsonify({
+            'success': False,
+            'status': meta.get('status'),
+            'error': meta.get('error') or 'Export is not ready yet'
+        }), 409
+
+    logger_handler.logger.info(
+        f"User {session.get('username', 'unknown')} downloaded export job {job_id}: {meta['artifact']}"
+    )
+    return send_file(path, as_attachment=True, download_name=meta['artifact'])
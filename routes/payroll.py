@@ -4,7 +4,7 @@ routes/payroll.py
 Payroll dashboard and Excel export routes.
 
 Routes: /payroll, /payroll/export-excel, /api/working-hours/calculate,
-        /api/employee/<id>/miss-punch-details
+        /api/employee/<id>/miss-punch-details, /api/payroll/miss-punch-counts
 """
 from flask import Blueprint, render_template, request, redirect, flash, session, jsonify, send_file, url_for, current_app
 from datetime import datetime, date, timedelta, time
@@ -27,10 +27,54 @@ from utils.helpers import (
 from working_hours_calculator import WorkingHoursCalculator, round_time_to_quarter_hour, convert_minutes_to_base100, round_base100_hours
 from payroll_excel_exporter import PayrollExcelExporter
 from enhanced_payroll_excel_exporter import EnhancedPayrollExcelExporter
+from export_cache import cached_export
+from miss_punch_index import get_miss_punch_index, store_miss_punch_index
+from utils.employee_keys import lookup_employee_names, normalize_employee_key
 
 bp = Blueprint('payroll', __name__)
 
 
+def _load_period_records(start_date, end_date, project_filter=''):
+    """Attendance records for a payroll period, ordered for the hours calculator."""
+    # Query attendance records with optional project filter
+    query = db.session.query(AttendanceData).join(QRCode, AttendanceData.qr_code_id == QRCode.id)
+
+    # Apply date filter
+    query = query.filter(
+        AttendanceData.check_in_date >= start_date.date(),
+        AttendanceData.check_in_date <= end_date.date()
+    )
+
+    # Apply project filter if selected
+    if project_filter and project_filter != '':
+        query = query.filter(QRCode.project_id == int(project_filter))
+        logger_handler.logger.debug(f"Applied project filter: {project_filter}")
+
+    query = query.order_by(AttendanceData.employee_id, AttendanceData.check_in_date, AttendanceData.check_in_time)
+    return query.all()
+
+
+def _period_miss_punch_index(date_from, date_to, project_filter=''):
+    """
+    Miss punch index for a period: stored copy when the period's data is
+    unchanged, otherwise one hours calculation for the whole period (which
+    then serves every other employee in it).
+    """
+    store = get_miss_punch_index()
+    key = store.period_key(date_from, date_to, project_filter)
+    index = store.get(key)
+    if index is not None:
+        return index
+
+    start_date = datetime.strptime(date_from, '%Y-%m-%d')
+    end_date = datetime.strptime(date_to, '%Y-%m-%d')
+    attendance_records = _load_period_records(start_date, end_date, project_filter)
+    working_hours_data = WorkingHoursCalculator().calculate_all_employees_hours(
+        start_date, end_date, attendance_records
+    ) if attendance_records else None
+    return store_miss_punch_index(date_from, date_to, project_filter, working_hours_data, attendance_records)
+
+
 
 @bp.route('/payroll', endpoint='payroll_dashboard')
 @login_required
@@ -72,29 +116,14 @@ def payroll_dashboard():
         # Get attendance records for the period
         attendance_records = []
         working_hours_data = None
+        miss_punch_counts = {}
 
         if date_from and date_to:
             try:
                 start_date = datetime.strptime(date_from, '%Y-%m-%d')
                 end_date = datetime.strptime(date_to, '%Y-%m-%d')
 
-                # Query attendance records with optional project filter
-                query = db.session.query(AttendanceData).join(QRCode, AttendanceData.qr_code_id == QRCode.id)
-
-                # Apply date filter
-                query = query.filter(
-                    AttendanceData.check_in_date >= start_date.date(),
-                    AttendanceData.check_in_date <= end_date.date()
-                )
-
-                # Apply project filter if selected
-                if project_filter and project_filter != '':
-                    query = query.filter(QRCode.project_id == int(project_filter))
-                    logger_handler.logger.debug(f"Applied project filter: {project_filter}")
-
-                query = query.order_by(AttendanceData.employee_id, AttendanceData.check_in_date, AttendanceData.check_in_time)
-
-                attendance_records = query.all()
+                attendance_records = _load_period_records(start_date, end_date, project_filter)
                 logger_handler.logger.debug(f"Found {len(attendance_records)} attendance records for payroll calculation")
 
                 # Calculate working hours if we have records
@@ -105,6 +134,15 @@ def payroll_dashboard():
                     )
                     logger_handler.logger.debug(f"Calculated hours for {working_hours_data['employee_count']} employees")
 
+                    # Miss punches were detected during the calculation; index them
+                    # so the details modal is a lookup, not a recalculation
+                    miss_punch_index = store_miss_punch_index(
+                        date_from, date_to, project_filter, working_hours_data, attendance_records
+                    )
+                    miss_punch_counts = {
+                        emp_id: entry['miss_punch_count'] for emp_id, entry in miss_punch_index.items()
+                    }
+
             except ValueError as e:
                 logger_handler.logger.warning(f"Invalid date format in payroll dashboard: {e}")
                 flash('Invalid date format. Please use YYYY-MM-DD format.', 'error')
@@ -117,24 +155,8 @@ def payroll_dashboard():
         employee_names = {}
         if working_hours_data:
             try:
-                # Use the same SQL approach as attendance report - JOIN with CAST
-                employee_ids = list(working_hours_data['employees'].keys())
-                if employee_ids:
-                    # Build a query similar to attendance report
-                    placeholders = ','.join([f"'{emp_id}'" for emp_id in employee_ids])
-                    employee_query = db.session.execute(text(f"""
-                        SELECT 
-                            ad.employee_id,
-                            CONCAT(e.lastName, ',', e.firstName) as full_name 
-                        FROM attendance_data ad
-                        LEFT JOIN employee e ON CAST(ad.employee_id AS UNSIGNED) = e.id
-                        WHERE ad.employee_id IN ({placeholders})
-                        GROUP BY ad.employee_id, e.firstName, e.lastName
-                    """))
-
-                    for row in employee_query:
-                        if row[1]:  # Only add if we got a name
-                            employee_names[str(row[0])] = row[1]
+                # Calculator keys are base employee IDs, i.e. employee.id
+                employee_names = lookup_employee_names(working_hours_data['employees'].keys(), last_first=True)
 
                 logger_handler.logger.debug(f"Retrieved names for {len(employee_names)} employees")
 
@@ -155,6 +177,7 @@ def payroll_dashboard():
         return render_template('payroll_dashboard.html',
                              working_hours_data=working_hours_data,
                              employee_names=employee_names,
+                             miss_punch_counts=miss_punch_counts,
                              projects=projects,
                              date_from=date_from,
                              date_to=date_to,
@@ -178,6 +201,7 @@ def payroll_dashboard():
 @bp.route('/payroll/export-excel', methods=['POST'], endpoint='export_payroll_excel')
 @login_required
 @log_database_operations('payroll_excel_export')
+@cached_export('payroll_excel', 'attendance_data', ('date_from', 'date_to'))
 def export_payroll_excel():
     """Export payroll report to Excel with working hours calculations including SP/PW support"""
     try:
@@ -243,23 +267,8 @@ def export_payroll_excel():
         # Get employee names using the same method as dashboard
         employee_names = {}
         try:
-            employee_ids = list(set(str(record.employee_id) for record in attendance_records))
-            if employee_ids:
-                # Use the same SQL approach as attendance report - JOIN with CAST
-                placeholders = ','.join([f"'{emp_id}'" for emp_id in employee_ids])
-                employee_query = db.session.execute(text(f"""
-                    SELECT 
-                        ad.employee_id,
-                        CONCAT(e.firstName, ' ', e.lastName) as full_name 
-                    FROM attendance_data ad
-                    LEFT JOIN employee e ON CAST(ad.employee_id AS UNSIGNED) = e.id
-                    WHERE ad.employee_id IN ({placeholders})
-                    GROUP BY ad.employee_id, e.firstName, e.lastName
-                """))
-
-                for row in employee_query:
-                    if row[1]:  # Only add if we got a name
-                        employee_names[str(row[0])] = row[1]
+            employee_ids = set(str(record.employee_id) for record in attendance_records)
+            employee_names = lookup_employee_names(employee_ids)
 
             logger_handler.logger.debug(f"Retrieved names for {len(employee_names)} employees for export")
 
@@ -491,6 +500,53 @@ def calculate_working_hours_api():
             'message': 'Internal server error. Please check the server logs.'
         }), 500
 
+@bp.route('/api/payroll/miss-punch-counts', methods=['GET'], endpoint='get_miss_punch_counts')
+@login_required
+def get_miss_punch_counts():
+    """Miss punch count for every employee in a payroll period, from the miss punch index"""
+    try:
+        if session.get('role') not in ['admin', 'payroll', 'accounting']:
+            return jsonify({
+                'success': False,
+                'message': 'Access denied. Insufficient permissions.'
+            }), 403
+
+        date_from = request.args.get('date_from')
+        date_to = request.args.get('date_to')
+        project_filter = request.args.get('project_filter', '')
+        if not all([date_from, date_to]):
+            return jsonify({
+                'success': False,
+                'message': 'Missing required parameters: date_from, date_to'
+            }), 400
+
+        try:
+            index = _period_miss_punch_index(date_from, date_to, project_filter)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid date format or project filter.'
+            }), 400
+
+        counts = {emp_id: entry['miss_punch_count'] for emp_id, entry in index.items()}
+        return jsonify({
+            'success': True,
+            'data': {
+                'period': f"{date_from} to {date_to}",
+                'employee_count': len(counts),
+                'miss_punch_total': sum(counts.values()),
+                'miss_punch_counts': counts
+            }
+        })
+
+    except Exception as e:
+        db.session.rollback()
+        logger_handler.logger.error(f"Error in get_miss_punch_counts: {e}", exc_info=True)
+        return jsonify({
+            'success': False,
+            'message': 'Internal server error. Please check the server logs.'
+        }), 500
+
 @bp.route('/api/employee/<employee_id>/miss-punch-details', methods=['GET'], endpoint='get_miss_punch_details')
 @login_required
 @log_database_operations('miss_punch_details_api')
@@ -541,88 +597,17 @@ def get_miss_punch_details(employee_id):
             logger_handler.logger.warning(f"Could not load employee name for ID {employee_id}: {e}", exc_info=True)
             employee_name = f"Employee {employee_id}"
 
-        # Get attendance records for the employee within the period
-        query = db.session.query(AttendanceData).filter(
-            AttendanceData.employee_id == str(employee_id),
-            AttendanceData.check_in_date >= start_date.date(),
-            AttendanceData.check_in_date <= end_date.date()
-        )
-
-        # Apply project filter if provided
-        if project_filter:
-            try:
-                project_id = int(project_filter)
-                query = query.join(QRCode, AttendanceData.qr_code_id == QRCode.id) \
-                    .filter(QRCode.project_id == project_id)
-            except ValueError:
-                pass  # Invalid project_id, ignore filter
-
-        attendance_records = query.order_by(
-            AttendanceData.check_in_date,
-            AttendanceData.check_in_time
-        ).all()
-
-        # Convert to the format expected by the calculator
-        converted_records = []
-        for record in records:
-            # Get distance from the TimeAttendance record
-            distance_value = getattr(record, 'distance', None)
-            
-            converted_record = type('Record', (), {
-                'id': record.id,
-                'employee_id': str(record.employee_id),
-                'check_in_date': record.attendance_date,
-                'check_in_time': record.attendance_time,
-                'location_name': record.location_name,
-                'latitude': None,
-                'longitude': None,
-                'distance': distance_value,  # ADD THIS LINE
-                'qr_code': type('QRCode', (), {
-                    'location': record.location_name,
-                    'location_address': record.recorded_address or '',
-                    'project': None
-                })()
-            })()
-            converted_records.append(converted_record)
-
-        # Calculate working hours using the same calculator as the dashboard
-
-        # Calculate hours for this employee
-        hours_data = calculator.calculate_employee_hours(
-            str(employee_id), start_date, end_date, converted_records
-        )
-
-        # Extract miss punch details
-        miss_punch_days = []
-        if 'daily_hours' in hours_data:
-            for date_str, day_data in hours_data['daily_hours'].items():
-                if day_data.get('is_miss_punch', False):
-                    # Get the actual records for this day
-                    date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
-                    day_records = [r for r in converted_records if r.check_in_date == date_obj]
-
-                    # Format the records information with event types
-                    record_details = []
-                    for i, record in enumerate(day_records):
-                        # Determine event type based on position (alternating check-in/check-out)
-                        # First record is always check-in, then alternates
-                        event_type = "Check In" if i % 2 == 0 else "Check Out"
-
-                        record_details.append({
-                            'time': record.check_in_time.strftime('%H:%M:%S'),
-                            'event_type': event_type,
-                            'location': record.location_name or 'Unknown Location',
-                            'has_gps': record.latitude is not None and record.longitude is not None
-                        })
-
-                    miss_punch_days.append({
-                        'date': date_str,
-                        'date_formatted': datetime.strptime(date_str, '%Y-%m-%d').strftime('%B %d, %Y (%A)'),
-                        'records_count': day_data.get('records_count', 0),
-                        'records': record_details,
-                        'reason': 'Incomplete punch pairs - missing check-in or check-out' if len(
-                            day_records) % 2 != 0 else 'Invalid work period duration'
-                    })
+        # Miss punches are indexed per period by the hours calculation
+        base_employee_id, _ = normalize_employee_key(employee_id)
+        try:
+            index = _period_miss_punch_index(date_from, date_to, project_filter)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid project filter.'
+            }), 400
+        entry = index.get(base_employee_id, {})
+        miss_punch_days = entry.get('miss_punch_days', [])
 
         # Log the API access
         logger_handler.logger.info(
@@ -37,6 +37,7 @@ from utils.geocoding import (
     get_coordinates_from_address_enhanced)
 from qr_code_import_service import QRCodeImportService
 from turnstile_utils import turnstile_utils
+from realtime_feed import publish_checkin
 import openpyxl
 
 bp = Blueprint('qr_codes', __name__)
@@ -935,6 +936,9 @@ def qr_checkin(qr_url):
             db.session.add(attendance)
             db.session.commit()
 
+            # Push the check-in to open dashboards
+            publish_checkin(attendance, qr_code, effective_location_event)
+
             # Log verification if required
             if attendance.verification_required:
                 logger_handler.log_photo_verification(
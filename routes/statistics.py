@@ -16,9 +16,20 @@ from models.user import User
 from sqlalchemy import text
 from logger_handler import log_user_activity, log_database_operations
 from utils.helpers import login_required, staff_or_admin_required
+from utils.flat_export import FLAT_FORMATS, PARQUET_AVAILABLE, flat_export_response, iter_row_chunks
 
 bp = Blueprint('statistics', __name__)
 
+# Statistics export layout: (header, Parquet type)
+STATISTICS_EXPORT_COLUMNS = [
+    ('ID', 'int64'), ('Employee ID', 'string'), ('Employee Name', 'string'),
+    ('Date', 'string'), ('Time', 'string'), ('QR Code', 'string'),
+    ('QR Location', 'string'), ('Event', 'string'), ('Project', 'string'),
+    ('Device', 'string'), ('Browser Info', 'string'), ('IP Address', 'string'),
+    ('Latitude', 'float64'), ('Longitude', 'float64'), ('Address', 'string'),
+    ('Location Name', 'string'), ('Timestamp', 'string'),
+]
+
 
 
 @bp.route('/statistics', endpoint='qr_statistics')
@@ -210,7 +221,7 @@ def qr_statistics():
 @bp.route('/api/statistics/export', endpoint='export_statistics')
 @login_required
 def export_statistics():
-    """Export statistics data to CSV/Excel"""
+    """Export statistics data to CSV or Parquet (?format=csv|parquet)"""
     try:
         # Check permissions
         if session.get('role') not in ['admin', 'payroll', 'accounting']:
@@ -222,8 +233,15 @@ def export_statistics():
             f"attempted to export statistics data in {request.args.get('format', 'csv')} format"
         )
         
-        # Get comprehensive statistics for export
-        export_data = db.session.execute(text("""
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in FLAT_FORMATS:
+            return jsonify({'error': f"Unsupported format '{export_format}'. Use csv or parquet."}), 400
+        if export_format == 'parquet' and not PARQUET_AVAILABLE:
+            return jsonify({'error': 'Parquet export requires pyarrow on the server'}), 501
+
+        # Get comprehensive statistics for export, streamed off a server-side
+        # cursor so the whole attendance history is never held in memory
+        export_query = text("""
             SELECT 
                 ad.id,
                 ad.employee_id,
@@ -245,26 +263,12 @@ def export_statistics():
             FROM attendance_data ad
             JOIN qr_codes qc ON ad.qr_code_id = qc.id
             LEFT JOIN projects p ON qc.project_id = p.id
-            LEFT JOIN employee e ON CAST(ad.employee_id AS UNSIGNED) = e.id
+            LEFT JOIN employee e ON ad.base_employee_id = e.id
             ORDER BY ad.created_timestamp DESC
-        """)).fetchall()
-        
-        # Create CSV content
-        import csv
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write headers
-        writer.writerow([
-            'ID', 'Employee ID', 'Employee Name', 'Date', 'Time', 
-            'QR Code', 'QR Location', 'Event', 'Project', 'Device', 
-            'Browser Info', 'IP Address', 'Latitude', 'Longitude', 
-            'Address', 'Location Name', 'Timestamp'
-        ])
-        
-        # Write data
-        for row in export_data:
-            writer.writerow([
+        """)
+
+        def row_fn(row):
+            return [
                 row.id, row.employee_id, row.employee_name, 
                 str(row.check_in_date), str(row.check_in_time),
                 row.qr_code_name, row.qr_location, row.location_event,
@@ -273,25 +277,20 @@ def export_statistics():
                 row.latitude or '', row.longitude or '', 
                 row.address or '', row.location_name or '',
                 str(row.created_timestamp)
-            ])
-        
-        output.seek(0)
-        
-        # Create response with proper file handling
-        csv_data = output.getvalue()
-        
-        # Log successful export
+            ]
+
         logger_handler.logger.info(
-            f"User {session.get('username', 'unknown')} successfully exported "
-            f"{len(export_data)} statistics records"
+            f"User {session.get('username', 'unknown')} started streaming statistics export "
+            f"({export_format.upper()})"
+        )
+
+        return flat_export_response(
+            export_format,
+            STATISTICS_EXPORT_COLUMNS,
+            iter_row_chunks(export_query),
+            row_fn,
+            f"qr_statistics_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
         )
-        
-        # Create response
-        response = make_response(csv_data)
-        response.headers["Content-Disposition"] = f"attachment; filename=qr_statistics_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        response.headers["Content-type"] = "text/csv"
-        
-        return response
         
     except Exception as e:
         db.session.rollback()
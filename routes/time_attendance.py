@@ -1,7 +1,8 @@
 """
 routes/time_attendance.py
 =========================
-Time attendance dashboard, import pipeline, export (Excel / by-building),
+Time attendance dashboard, import pipeline, export (Excel / by-building,
+plus raw CSV / Parquet),
 and records management routes.
 
 Routes: /time-attendance, /time-attendance/import/*,
@@ -20,7 +21,7 @@ from models.project import Project
 from models.qrcode import QRCode
 from models.time_attendance import TimeAttendance
 from models.user import User
-from sqlalchemy import text
+from sqlalchemy import or_, text
 from werkzeug.utils import secure_filename
 from logger_handler import log_user_activity, log_database_operations
 from utils.helpers import (
@@ -32,6 +33,7 @@ from utils.helpers import (
 from utils.geocoding import calculate_location_accuracy_enhanced
 from working_hours_calculator import WorkingHoursCalculator, round_time_to_quarter_hour, convert_minutes_to_base100, round_base100_hours
 from time_attendance_import_service import TimeAttendanceImportService
+from export_cache import cached_export
 import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, numbers
 from openpyxl.utils import get_column_letter
@@ -45,7 +47,59 @@ from routes.time_attendance_export import (
     _qtr,
     export_time_attendance_excel,
     export_time_attendance_by_building_excel,
+    export_time_attendance_flat,
 )
+from utils.flat_export import FLAT_FORMATS, PARQUET_AVAILABLE
+from utils.employee_keys import employee_key_columns
+from ta_archive import archive_dir, iter_archived
+
+
+def _employee_key_lists(employee_ids):
+    """(base_employee_id values, other employee_id values) of an employee filter."""
+    base_ids, other_ids = [], []
+    for eid in employee_ids:
+        base_id, _ = employee_key_columns(eid)
+        if base_id is not None:
+            base_ids.append(base_id)
+        else:
+            other_ids.append(str(eid).strip().upper())
+    return base_ids, other_ids
+
+
+def _filter_by_base_employee_ids(query, employee_ids):
+    """
+    Restrict a TimeAttendance query to the given employees, including all of
+    their SP/PW/PT work-type variants, via the indexed base_employee_id column.
+    """
+    base_ids, other_ids = _employee_key_lists(employee_ids)
+    conditions = []
+    if base_ids:
+        conditions.append(TimeAttendance.base_employee_id.in_(base_ids))
+    if other_ids:
+        conditions.append(TimeAttendance.employee_id.in_(other_ids))
+    return query.filter(or_(*conditions)) if conditions else query
+
+
+def _iter_archived_ta(employee_filter, location_filter, start_date, end_date, import_batch, project_filter):
+    """Rows of the Parquet TA archive (see ta_archive.py) matching an export's filters."""
+    base_ids, other_ids = _employee_key_lists(
+        [e.strip() for e in employee_filter.split(',') if e.strip()] if employee_filter else []
+    )
+    return iter_archived(
+        db, archive_dir(current_app), start_date=start_date, end_date=end_date,
+        base_employee_ids=base_ids, employee_ids=other_ids, location_name=location_filter,
+        import_batch_id=import_batch, project_id=project_filter
+    )
+
+
+def _with_archived_ta(records, archived):
+    """*records* plus the archived rows as TimeAttendance objects, newest first."""
+    extra = [TimeAttendance(**row) for rows in archived for row in rows]
+    if not extra:
+        return records
+    records = records + extra
+    records.sort(key=lambda r: (r.attendance_date, r.attendance_time), reverse=True)
+    return records
 
 
 @bp.route('/time-attendance', endpoint='time_attendance_dashboard')
@@ -1134,6 +1188,7 @@ def download_import_template():
 @bp.route('/time-attendance/export', endpoint='export_time_attendance')
 @login_required
 @log_user_activity('time_attendance_export')
+@cached_export('time_attendance', 'time_attendance', ('start_date', 'end_date'), end_padding_days=1)
 def export_time_attendance():
     """Export time attendance records to CSV or Excel"""
     try:
@@ -1155,20 +1210,7 @@ def export_time_attendance():
         # Apply filters — employee_id supports comma-separated multi-employee values
         if employee_filter:
             employee_ids_export = [e.strip() for e in employee_filter.split(',') if e.strip()]
-            from working_hours_calculator import parse_employee_id_for_work_type as _parse_wt
-            all_variants = []
-            for eid in employee_ids_export:
-                _base_emp_id, _ = _parse_wt(str(eid))
-                all_variants += [
-                    _base_emp_id,
-                    f"{_base_emp_id} SP", f"{_base_emp_id}SP",
-                    f"SP {_base_emp_id}", f"SP{_base_emp_id}",
-                    f"{_base_emp_id} PW", f"{_base_emp_id}PW",
-                    f"PW {_base_emp_id}", f"PW{_base_emp_id}",
-                    f"{_base_emp_id} PT", f"{_base_emp_id}PT",
-                    f"PT {_base_emp_id}", f"PT{_base_emp_id}",
-                ]
-            query = query.filter(TimeAttendance.employee_id.in_(all_variants))
+            query = _filter_by_base_employee_ids(query, employee_ids_export)
 
         if location_filter:
             query = query.filter(TimeAttendance.location_name == location_filter)
@@ -1201,11 +1243,42 @@ def export_time_attendance():
         if project_filter:
             query = query.filter(TimeAttendance.project_id == project_filter)
 
+        # CSV / Parquet: raw punches off a server-side cursor.  There is no
+        # overnight pairing, so the end date is not padded by a day here.
+        if export_format in FLAT_FORMATS:
+            if export_format == 'parquet' and not PARQUET_AVAILABLE:
+                flash('Parquet export is not available on this server (pyarrow is not installed).', 'error')
+                return redirect(url_for('time_attendance.time_attendance_records'))
+            if end_date:
+                query = query.filter(TimeAttendance.attendance_date <= end_date_obj)
+            date_part = '_'.join(d.replace('-', '') for d in (start_date, end_date) if d) or 'all'
+            logger_handler.logger.info(
+                f"User {session['username']} exported time attendance records "
+                f"in {export_format.upper()} format"
+            )
+            return export_time_attendance_flat(
+                query.order_by(
+                    TimeAttendance.attendance_date.desc(),
+                    TimeAttendance.attendance_time.desc()
+                ),
+                export_format,
+                f"time_attendance_{date_part}",
+                archived=_iter_archived_ta(
+                    employee_filter, location_filter, start_date and start_date_obj,
+                    end_date and end_date_obj, import_batch, project_filter
+                )
+            )
+
         # Order by date and time (most recent first)
         records = query.order_by(
             TimeAttendance.attendance_date.desc(),
             TimeAttendance.attendance_time.desc()
         ).all()
+        # Historical ranges may have been moved to the Parquet archive
+        records = _with_archived_ta(records, _iter_archived_ta(
+            employee_filter, location_filter, start_date and start_date_obj,
+            end_date and end_date_obj + timedelta(days=1), import_batch, project_filter
+        ))
 
         if not records:
             flash('No records found to export.', 'warning')
@@ -1283,9 +1356,12 @@ def excel_export_time_attendance():
 @bp.route('/time-attendance/export-by-building', endpoint='export_time_attendance_by_building')
 @login_required
 @log_user_activity('time_attendance_export_by_building')
+@cached_export('time_attendance_by_building', 'time_attendance', ('start_date', 'end_date'), end_padding_days=1)
 def export_time_attendance_by_building():
     """Export time attendance records grouped by building/location to Excel"""
     try:
+        export_format = request.args.get('format', 'excel').lower()
+
         # Get filter parameters (same as records page)
         employee_filter = request.args.get('employee_id')
         location_filter = request.args.get('location_name')
@@ -1302,20 +1378,7 @@ def export_time_attendance_by_building():
         # Apply filters — employee_id supports comma-separated multi-employee values
         if employee_filter:
             employee_ids_export = [e.strip() for e in employee_filter.split(',') if e.strip()]
-            from working_hours_calculator import parse_employee_id_for_work_type as _parse_wt
-            all_variants = []
-            for eid in employee_ids_export:
-                _base_emp_id, _ = _parse_wt(str(eid))
-                all_variants += [
-                    _base_emp_id,
-                    f"{_base_emp_id} SP", f"{_base_emp_id}SP",
-                    f"SP {_base_emp_id}", f"SP{_base_emp_id}",
-                    f"{_base_emp_id} PW", f"{_base_emp_id}PW",
-                    f"PW {_base_emp_id}", f"PW{_base_emp_id}",
-                    f"{_base_emp_id} PT", f"{_base_emp_id}PT",
-                    f"PT {_base_emp_id}", f"PT{_base_emp_id}",
-                ]
-            query = query.filter(TimeAttendance.employee_id.in_(all_variants))
+            query = _filter_by_base_employee_ids(query, employee_ids_export)
 
         if location_filter:
             query = query.filter(TimeAttendance.location_name == location_filter)
@@ -1345,12 +1408,53 @@ def export_time_attendance_by_building():
         if project_filter:
             query = query.filter(TimeAttendance.project_id == project_filter)
 
+        # CSV / Parquet: raw punches off a server-side cursor.  There is no
+        # overnight pairing, so the end date is not padded by a day here.
+        if export_format in FLAT_FORMATS:
+            if export_format == 'parquet' and not PARQUET_AVAILABLE:
+                flash('Parquet export is not available on this server (pyarrow is not installed).', 'error')
+                return redirect(url_for('time_attendance.time_attendance_records'))
+            # start_date is only applied above when a location is chosen
+            if start_date:
+                query = query.filter(
+                    TimeAttendance.attendance_date >= datetime.strptime(start_date, '%Y-%m-%d').date()
+                )
+            if end_date:
+                query = query.filter(TimeAttendance.attendance_date <= end_date_obj)
+            date_part = '_'.join(d.replace('-', '') for d in (start_date, end_date) if d) or 'all'
+            logger_handler.logger.info(
+                f"User {session['username']} exported time attendance records "
+                f"in {export_format.upper()} format"
+            )
+            return export_time_attendance_flat(
+                query.order_by(
+                    TimeAttendance.location_name,
+                    TimeAttendance.attendance_date.desc(),
+                    TimeAttendance.attendance_time.desc()
+                ),
+                export_format,
+                f"time_attendance_by_building_{date_part}",
+                archived=_iter_archived_ta(
+                    employee_filter, location_filter,
+                    start_date and datetime.strptime(start_date, '%Y-%m-%d').date(),
+                    end_date and end_date_obj, import_batch, project_filter
+                )
+            )
+
         # Order by location, date, and time
         records = query.order_by(
             TimeAttendance.location_name,
             TimeAttendance.attendance_date.desc(),
             TimeAttendance.attendance_time.desc()
         ).all()
+        # Historical ranges may have been moved to the Parquet archive
+        # (start_date is only applied above when a location is chosen)
+        archived_records = _with_archived_ta([], _iter_archived_ta(
+            employee_filter, location_filter, location_filter and start_date and start_date_obj,
+            end_date and end_date_obj + timedelta(days=1), import_batch, project_filter
+        ))
+        if archived_records:
+            records = sorted(records + archived_records, key=lambda r: r.location_name)
 
         if not records:
             flash('No records found to export.', 'warning')
@@ -1451,20 +1555,7 @@ def time_attendance_records():
         if employee_ids:
             # Expand each base ID to include all SP/PW/PT work-type variants so that
             # cross-type pairs are included in results and exports.
-            from working_hours_calculator import parse_employee_id_for_work_type as _parse_wt
-            all_variants = []
-            for eid in employee_ids:
-                _base_emp_id, _ = _parse_wt(str(eid))
-                all_variants += [
-                    _base_emp_id,
-                    f"{_base_emp_id} SP", f"{_base_emp_id}SP",
-                    f"SP {_base_emp_id}", f"SP{_base_emp_id}",
-                    f"{_base_emp_id} PW", f"{_base_emp_id}PW",
-                    f"PW {_base_emp_id}", f"PW{_base_emp_id}",
-                    f"{_base_emp_id} PT", f"{_base_emp_id}PT",
-                    f"PT {_base_emp_id}", f"PT{_base_emp_id}",
-                ]
-            query = query.filter(TimeAttendance.employee_id.in_(all_variants))
+            query = _filter_by_base_employee_ids(query, employee_ids)
             logger_handler.logger.info(
                 f"Time attendance records filtered by employee IDs: {employee_ids} "
                 f"by user {session.get('username', 'unknown')}"
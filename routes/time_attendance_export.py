@@ -10,10 +10,15 @@ Contains:
   - _qtr()
   - export_time_attendance_excel()          (single-employee / all-employees)
   - export_time_attendance_by_building_excel()
+  - export_time_attendance_flat()           (raw CSV / Parquet rows)
+
+Both exports render into a write-only StreamingSheet (utils/excel_stream.py)
+by default so row memory stays flat; set EXCEL_EXPORT_STREAMING=false to
+fall back to the in-memory openpyxl Workbook.
 """
 from flask import send_file, g, current_app
 from datetime import datetime, date, timedelta, time
-import io, os, json, re
+import io, os, json, re, itertools
 import time as _time
 
 from extensions import db, logger_handler
@@ -27,6 +32,11 @@ import openpyxl
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, numbers
 from openpyxl.utils import get_column_letter
 import openpyxl.cell.cell
+from utils.excel_stream import (
+    StreamingSheet, XLSX_MIMETYPE, autosize_columns, save_to_temp_file, send_workbook_file
+)
+from utils.flat_export import flat_export_response, iter_row_chunks
+from utils.employee_keys import record_employee_key
 
 # Export helpers — no Blueprint needed, these are plain functions
 # called from routes in time_attendance.py
@@ -152,8 +162,6 @@ def _convert_ta_records(records):
 
     Returns a list of converted record objects.
     """
-    from working_hours_calculator import parse_employee_id_for_work_type
-
     converted = []
     for record in records:
         distance_value = getattr(record, 'distance', None)
@@ -164,7 +172,7 @@ def _convert_ta_records(records):
             if 'out' in action_lower or 'checkout' in action_lower:
                 record_type = 'check_out'
 
-        _, work_type = parse_employee_id_for_work_type(str(record.employee_id))
+        _, work_type = record_employee_key(record)
 
         base_location_name = record.location_name
         if work_type and work_type in ('PT', 'SP', 'PW'):
@@ -175,6 +183,7 @@ def _convert_ta_records(records):
         converted_record = type('Record', (), {
             'id':                   record.id,
             'employee_id':          str(record.employee_id),
+            'base_employee_id':     getattr(record, 'base_employee_id', None),
             'employee_name':        getattr(record, 'employee_name', ''),
             'check_in_date':        record.attendance_date,
             'check_in_time':        record.attendance_time,
@@ -207,11 +216,9 @@ def _build_employee_name_map(records):
     (e.g. '3937SP') in the stored employee_name column do not pollute labels.
     Falls back to the stored employee_name on lookup failure.
     """
-    from working_hours_calculator import parse_employee_id_for_work_type
-
     employee_names = {}
     for record in records:
-        base_id, _ = parse_employee_id_for_work_type(str(record.employee_id))
+        base_id, _ = record_employee_key(record)
         if base_id not in employee_names:
             try:
                 emp = Employee.query.filter_by(id=int(base_id)).first()
@@ -272,17 +279,82 @@ def _make_export_styles():
     }
 
 
-def export_time_attendance_excel(records, project_name_for_filename, date_range_str, filter_str, start_date_filter=None, end_date_filter=None, unlimited=False):
+def _streaming_enabled(streaming):
+    """Resolve the ``streaming`` argument against EXCEL_EXPORT_STREAMING."""
+    if streaming is not None:
+        return streaming
+    return current_app.config.get('EXCEL_EXPORT_STREAMING', True)
+
+
+def _autosize_columns(ws):
+    """
+    Size columns B–N to their longest value (capped at 50); column A is fixed at 18.
+    Merged cells are skipped so banner rows do not widen the data columns.
+    """
+    for col_idx in range(1, 15):
+        column_letter = get_column_letter(col_idx)
+
+        # Set fixed width for Day column (column A)
+        if col_idx == 1:
+            ws.column_dimensions[column_letter].width = 18
+            continue
+
+        max_length = 0
+        for row in ws.iter_rows(min_col=col_idx, max_col=col_idx):
+            for cell in row:
+                if isinstance(cell, openpyxl.cell.cell.MergedCell):
+                    continue
+                try:
+                    if cell.value and len(str(cell.value)) > max_length:
+                        max_length = len(str(cell.value))
+                except:
+                    pass
+
+        adjusted_width = min(max_length + 2, 50)
+        ws.column_dimensions[column_letter].width = adjusted_width
+
+
+def _finalize_export(wb, ws, filename):
+    """
+    Size columns and return the send_file response for a finished export.
+
+    In-memory workbooks (wb is not None) are saved to a BytesIO as before.
+    StreamingSheets track their column widths while spooling, are written
+    through a write-only workbook to a temp file, and are streamed from disk.
+    """
+    if wb is None:
+        autosize_columns(ws)
+        path = save_to_temp_file(ws)
+        return send_workbook_file(path, filename)
+
+    _autosize_columns(ws)
+    output = io.BytesIO()
+    wb.save(output)
+    output.seek(0)
+    return send_file(
+        output,
+        mimetype=XLSX_MIMETYPE,
+        as_attachment=True,
+        download_name=filename
+    )
+
+
+def export_time_attendance_excel(records, project_name_for_filename, date_range_str, filter_str, start_date_filter=None, end_date_filter=None, unlimited=False, streaming=None):
     """Generate Excel export with template format matching the provided template"""
     from openpyxl import Workbook
     from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
     from openpyxl.utils import get_column_letter
     import io
     
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Sheet0"
+    # Create workbook — write-only streaming sheet unless disabled in config
+    streaming = _streaming_enabled(streaming)
+    if streaming:
+        wb = None
+        ws = StreamingSheet(title="Sheet0")
+    else:
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Sheet0"
     
     # Resolve date range; skip 14-day cap when unlimited=True
     result = _resolve_date_range(start_date_filter, end_date_filter, records, 'TA Excel export', unlimited=unlimited)
@@ -290,9 +362,6 @@ def export_time_attendance_excel(records, project_name_for_filename, date_range_
         return None
     start_date, end_date, records = result
 
-    # Import parse function at the beginning for work type detection
-    from working_hours_calculator import parse_employee_id_for_work_type
-    
     # Convert TimeAttendance records to format expected by calculator
     converted_records = _convert_ta_records(records)
     
@@ -415,13 +484,10 @@ def export_time_attendance_excel(records, project_name_for_filename, date_range_
         
         # Group records by date AND location for separate rows per location
         daily_location_data = {}
-        # Import parse function to match base employee ID with all variants (SP, PW, PT)
-        from working_hours_calculator import parse_employee_id_for_work_type
-        
         # Filter records where the BASE employee ID matches (includes 1234, 1234 SP, 1234 PW, 1234 PT)
         employee_records = []
         for r in converted_records:
-            record_base_id, _ = parse_employee_id_for_work_type(str(r.employee_id))
+            record_base_id, _ = record_employee_key(r)
             if record_base_id == employee_id:
                 employee_records.append(r)
 
@@ -1303,59 +1369,32 @@ def export_time_attendance_excel(records, project_name_for_filename, date_range_
         # Empty row after each employee
         current_row += 1
     
-    # Auto-size columns - handle merged cells properly
-    for col_idx in range(1, 15):
-        column_letter = get_column_letter(col_idx)
-        
-        # Set fixed width for Day column (column A)
-        if col_idx == 1:
-            ws.column_dimensions[column_letter].width = 18
-            continue
-        
-        max_length = 0
-        for row in ws.iter_rows(min_col=col_idx, max_col=col_idx):
-            for cell in row:
-                if isinstance(cell, openpyxl.cell.cell.MergedCell):
-                    continue
-                try:
-                    if cell.value and len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-        
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Save to BytesIO
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
     # Filename
     if date_range_str:
         filename = f'{project_name_for_filename}time_attendance_{date_range_str}.xlsx'
     else:
         filename = f'{project_name_for_filename}time_attendance.xlsx'
-    
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
-    )
+
+    # Auto-size columns, save and send (streaming sheets go via a temp file)
+    return _finalize_export(wb, ws, filename)
 
 
-def export_time_attendance_by_building_excel(records, project_name_for_filename, date_range_str, start_date_filter=None, end_date_filter=None, unlimited=False):
+def export_time_attendance_by_building_excel(records, project_name_for_filename, date_range_str, start_date_filter=None, end_date_filter=None, unlimited=False, streaming=None):
     """Generate Excel export grouped by building/location with template format"""
     from openpyxl import Workbook
     from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
     from openpyxl.utils import get_column_letter
     import io
     
-    # Create workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Sheet0"
+    # Create workbook — write-only streaming sheet unless disabled in config
+    streaming = _streaming_enabled(streaming)
+    if streaming:
+        wb = None
+        ws = StreamingSheet(title="Sheet0")
+    else:
+        wb = Workbook()
+        ws = wb.active
+        ws.title = "Sheet0"
     
     # Resolve date range; skip 14-day cap when unlimited=True
     result = _resolve_date_range(start_date_filter, end_date_filter, records, 'TA by-building Excel export', unlimited=unlimited)
@@ -1363,8 +1402,6 @@ def export_time_attendance_by_building_excel(records, project_name_for_filename,
         return None
     start_date, end_date, records = result
 
-    from working_hours_calculator import parse_employee_id_for_work_type
-    
     # Convert TimeAttendance records to format expected by calculator
     converted_records = _convert_ta_records(records)
     
@@ -1467,7 +1504,7 @@ def export_time_attendance_by_building_excel(records, project_name_for_filename,
         # Get unique employees for this location
         employees_at_location = {}
         for record in location_records:
-            base_id, _ = parse_employee_id_for_work_type(record.employee_id)
+            base_id, _ = record_employee_key(record)
             if base_id not in employees_at_location:
                 employees_at_location[base_id] = []
             employees_at_location[base_id].append(record)
@@ -1974,33 +2011,6 @@ def export_time_attendance_by_building_excel(records, project_name_for_filename,
         # Empty row after each building
         current_row += 1
     
-    # Auto-size columns
-    for col_idx in range(1, 15):
-        column_letter = get_column_letter(col_idx)
-        
-        if col_idx == 1:
-            ws.column_dimensions[column_letter].width = 18
-            continue
-        
-        max_length = 0
-        for row in ws.iter_rows(min_col=col_idx, max_col=col_idx):
-            for cell in row:
-                if isinstance(cell, openpyxl.cell.cell.MergedCell):
-                    continue
-                try:
-                    if cell.value and len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-        
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Save to BytesIO
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
     # Filename
     if date_range_str:
         filename = f'{project_name_for_filename}time_attendance_by_building_{date_range_str}.xlsx'
@@ -2012,9 +2022,55 @@ def export_time_attendance_by_building_excel(records, project_name_for_filename,
         f"Export by Building completed: {filename} with {len(sorted_locations)} buildings"
     )
     
-    return send_file(
-        output,
-        mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-        as_attachment=True,
-        download_name=filename
-    )
\ No newline at end of file
+    # Auto-size columns, save and send (streaming sheets go via a temp file)
+    return _finalize_export(wb, ws, filename)
+
+# Raw record columns for the CSV / Parquet fast path: (header, type, TimeAttendance column)
+TA_FLAT_COLUMNS = [
+    ('Employee ID', 'string', TimeAttendance.employee_id),
+    ('Employee Name', 'string', TimeAttendance.employee_name),
+    ('Date', 'string', TimeAttendance.attendance_date),
+    ('Time', 'string', TimeAttendance.attendance_time),
+    ('Location', 'string', TimeAttendance.location_name),
+    ('Action', 'string', TimeAttendance.action_description),
+    ('Event Description', 'string', TimeAttendance.event_description),
+    ('Recorded Address', 'string', TimeAttendance.recorded_address),
+    ('Distance (miles)', 'float64', TimeAttendance.distance),
+    ('Possible Violation', 'string', TimeAttendance.distance),
+    ('Platform', 'string', TimeAttendance.platform),
+    ('Project ID', 'int64', TimeAttendance.project_id),
+    ('Import Batch', 'string', TimeAttendance.import_batch_id),
+]
+
+
+def _flat_ta_row(row):
+    values = []
+    for (header, _, _), value in zip(TA_FLAT_COLUMNS, row):
+        if header == 'Possible Violation':
+            value = calculate_possible_violation(value)
+        elif header == 'Date':
+            value = value.strftime('%Y-%m-%d') if value else ''
+        elif header == 'Time':
+            value = value.strftime('%H:%M:%S') if value else ''
+        values.append('' if value is None else value)
+    return values
+
+
+def export_time_attendance_flat(query, export_format, filename_base, archived=None):
+    """
+    Stream the filtered TA records as one raw row per punch (CSV or Parquet).
+
+    Unlike the Excel reports there is no pairing or hours calculation, so
+    the rows come straight off a server-side cursor and nothing is held in
+    memory beyond one chunk.  *archived* (``ta_archive.iter_archived``)
+    appends the matching rows of the Parquet archive after the live ones.
+    """
+    columns = [(header, type_name) for header, type_name, _ in TA_FLAT_COLUMNS]
+    statement = query.with_entities(*[column for _, _, column in TA_FLAT_COLUMNS]).statement
+    chunks = iter_row_chunks(statement)
+    if archived is not None:
+        keys = [column.key for _, _, column in TA_FLAT_COLUMNS]
+        chunks = itertools.chain(
+            chunks, ([tuple(row[k] for k in keys) for row in rows] for rows in archived)
+        )
+    return flat_export_response(export_format, columns, chunks, _flat_ta_row, filename_base)
@@ -0,0 +1,156 @@
+"""
+Session Token Store
+===================
+
+Shared storage for SecurityManager's per-user session security tokens.
+
+Tokens used to live in an in-process dict, so under gunicorn a session
+created on one worker failed validation on every other worker (and the
+dict never shrank).  They now live in the ``security_session_tokens``
+table — one row per user, holding a SHA-256 of the token, never the token
+itself — with an in-process LRU in front of it:
+
+    - ``validate()`` accepts a token from the LRU when the entry was read
+      from the database less than ``recheck_seconds`` ago (O(1), no DB
+      round trip); otherwise it re-reads the row, so a logout on another
+      worker is seen within ``recheck_seconds``.  A token the cached entry
+      does not match is checked against a fresh read before it is
+      rejected: it may come from a newer login on another worker.
+    - Rows carry ``expires_at``; expired rows are ignored on read and
+      deleted in bulk at most once per ``sweep_interval`` seconds.
+"""
+
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import Column, Double, Index, Integer, MetaData, String, Table, delete, func, insert, select
+
+_metadata = MetaData()
+
+session_tokens_table = Table(
+    'security_session_tokens', _metadata,
+    Column('user_id', Integer, primary_key=True, autoincrement=False),
+    Column('token_hash', String(64), nullable=False),
+    Column('ip_address', String(45)),
+    Column('user_agent', String(200)),
+    Column('created_at', Double, nullable=False),   # epoch seconds; FLOAT is too coarse
+    Column('expires_at', Double, nullable=False),
+    Index('idx_security_session_tokens_expires', 'expires_at'),
+)
+
+
+def _hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+class SessionTokenStore:
+    """Database-backed session token store with a read-through LRU."""
+
+    def __init__(self, db, ttl=3600, remember_ttl=30 * 86400, cache_size=10000,
+                 recheck_seconds=30, sweep_interval=300):
+        self.db = db
+        self.ttl = ttl
+        self.remember_ttl = remember_ttl
+        self.cache_size = cache_size
+        self.recheck_seconds = recheck_seconds
+        self.sweep_interval = sweep_interval
+        self._cache = OrderedDict()   # user_id -> (entry dict or None, read_at)
+        self._lock = threading.Lock()
+        self._table_ready = False
+        self._next_sweep = 0.0
+
+    # ------------------------------------------------------------------
+    # Storage helpers
+    # ------------------------------------------------------------------
+
+    def _engine(self):
+        engine = self.db.engine
+        if not self._table_ready:
+            session_tokens_table.create(bind=engine, checkfirst=True)
+            self._table_ready = True
+        return engine
+
+    def _cache_put(self, user_id, entry, now):
+        with self._lock:
+            self._cache[user_id] = (entry, now)
+            self._cache.move_to_end(user_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _load(self, user_id, now):
+        with self._engine().connect() as conn:
+            row = conn.execute(
+                select(session_tokens_table).where(session_tokens_table.c.user_id == user_id)
+            ).mappings().fetchone()
+        entry = dict(row) if row and row['expires_at'] > now else None
+        self._cache_put(user_id, entry, now)
+        return entry
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def issue(self, user_id, token, ip_address='', user_agent='', remember_me=False):
+        """Store *token* as the user's current session token (replacing any previous one)."""
+        now = time.time()
+        entry = {
+            'user_id': user_id,
+            'token_hash': _hash_token(token),
+            'ip_address': (ip_address or '')[:45],
+            'user_agent': (user_agent or '')[:200],
+            'created_at': now,
+            'expires_at': now + (self.remember_ttl if remember_me else self.ttl),
+        }
+        with self._engine().begin() as conn:
+            conn.execute(delete(session_tokens_table).where(session_tokens_table.c.user_id == user_id))
+            conn.execute(insert(session_tokens_table).values(**entry))
+            if now >= self._next_sweep:
+                self._next_sweep = now + self.sweep_interval
+                conn.execute(delete(session_tokens_table).where(session_tokens_table.c.expires_at < now))
+        self._cache_put(user_id, entry, now)
+        return entry
+
+    def _lookup(self, user_id):
+        """(entry or None, True if it came from the LRU rather than the DB)."""
+        now = time.time()
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached is not None:
+                self._cache.move_to_end(user_id)
+        if cached is not None and now - cached[1] < self.recheck_seconds:
+            entry = cached[0]
+            return (entry if entry and entry['expires_at'] > now else None), True
+        return self._load(user_id, now), False
+
+    def get(self, user_id):
+        """The user's live token entry (cached up to recheck_seconds), or None."""
+        return self._lookup(user_id)[0]
+
+    def validate(self, user_id, token):
+        """Return the entry if *token* is the user's current token, else None."""
+        if not token:
+            return None
+        token_hash = _hash_token(token)
+        entry, from_cache = self._lookup(user_id)
+        if not (entry and hmac.compare_digest(token_hash, entry['token_hash'])) and from_cache:
+            # The cached entry may predate a newer login on another worker
+            entry = self._load(user_id, time.time())
+        if entry and hmac.compare_digest(token_hash, entry['token_hash']):
+            return entry
+        return None
+
+    def revoke(self, user_id):
+        """Delete the user's token everywhere (other workers notice within recheck_seconds)."""
+        with self._engine().begin() as conn:
+            conn.execute(delete(session_tokens_table).where(session_tokens_table.c.user_id == user_id))
+        self._cache_put(user_id, None, time.time())
+
+    def count_active(self):
+        with self._engine().connect() as conn:
+            return conn.execute(
+                select(func.count()).select_from(session_tokens_table)
+                .where(session_tokens_table.c.expires_at > time.time())
+            ).scalar() or 0
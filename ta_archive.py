@@ -0,0 +1,330 @@
+"""
+TA Archive
+==========
+
+Moves old ``time_attendance`` rows out of the live table.
+
+The old ``archive_old_records`` looped ``INSERT ... SELECT ... LIMIT`` /
+``DELETE ... LIMIT`` without an ORDER BY - nothing guaranteed the two
+statements picked the same rows - and ``cleanup_old_records`` was one
+unbounded DELETE.  ``archive_time_attendance()`` runs the move on
+``ChunkedPurge`` (utils/chunked_purge.py) instead:
+
+  - rows with ``attendance_date < cutoff`` are visited in primary-key
+    ranges of ``TA_ARCHIVE_BATCH_SIZE``; each range is copied and deleted
+    in one short transaction, rolled back if the counts differ;
+  - progress is checkpointed in ``purge_progress`` (name ``ta_archive``),
+    so a run stopped by ``TA_ARCHIVE_MAX_SECONDS``, a replica lag pause or
+    a restart resumes on the next run with the same cutoff;
+  - after each chunk it pauses ``PURGE_SLEEP_SECONDS`` plus
+    ``TA_ARCHIVE_SLEEP_RATIO`` x the chunk's duration, and with
+    ``ARCHIVE_REPLICA_URLS`` it waits while a replica lags more than
+    ``ARCHIVE_MAX_REPLICA_LAG`` seconds.
+
+``TA_ARCHIVE_TARGET`` picks where the rows go:
+
+    table     time_attendance_archive (same columns, created on first run)
+    parquet   zstd-compressed Parquet files under TA_ARCHIVE_PARQUET_DIR,
+              one directory per month of attendance_date:
+                  2025-03/part-0000120001-0000122000.parquet
+
+A Parquet chunk is written as ``*.pending`` before its DELETE and renamed
+once the transaction commits.  A pending file left by a crash is resolved
+on the next run (and ignored row by row by readers): if its rows are still
+in ``time_attendance`` the DELETE was rolled back and the file is dropped,
+otherwise it is kept.
+
+The TA exports read archived Parquet months back in with
+``iter_archived()`` / ``archived_records()``, so historical date ranges
+export the same as before they were archived.  Rows archived to the table
+target are not read back.
+"""
+
+import os
+from datetime import date, datetime
+
+from sqlalchemy import inspect, select, text
+
+from models.time_attendance import TimeAttendance
+from utils.chunked_purge import ChunkedPurge, CopyToTable, ReplicaLagThrottle
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pa = None
+    pc = None
+    pq = None
+    PARQUET_AVAILABLE = False
+
+SOURCE_TABLE = 'time_attendance'
+ARCHIVE_TABLE = 'time_attendance_archive'
+PROGRESS_NAME = 'ta_archive'
+TARGETS = ('table', 'parquet')
+PENDING_SUFFIX = '.pending'
+
+_columns = list(TimeAttendance.__table__.columns)
+
+
+def archive_dir(app):
+    """Root directory of the Parquet archive."""
+    return app.config.get('TA_ARCHIVE_PARQUET_DIR') or os.path.join(
+        app.config.get('UPLOAD_FOLDER', '/tmp'), 'ta_archive'
+    )
+
+
+# ---------------------------------------------------------------------------
+# Table target
+# ---------------------------------------------------------------------------
+
+def ensure_archive_table(db):
+    """Create time_attendance_archive with the columns of time_attendance."""
+    engine = db.engine
+    if inspect(engine).has_table(ARCHIVE_TABLE):
+        return
+    with engine.begin() as conn:
+        if conn.dialect.name == 'mysql':
+            conn.execute(text(f"CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE} LIKE {SOURCE_TABLE}"))
+        else:
+            # SQLite (benchmarks): copy the table definition
+            ddl = conn.execute(text(
+                f"SELECT sql FROM sqlite_master WHERE type = 'table' AND name = '{SOURCE_TABLE}'"
+            )).scalar()
+            conn.execute(text(ddl.replace(SOURCE_TABLE, ARCHIVE_TABLE, 1)))
+
+
+# ---------------------------------------------------------------------------
+# Parquet target
+# ---------------------------------------------------------------------------
+
+def _arrow_type(column):
+    python_type = column.type.python_type
+    if python_type is int:
+        return pa.int64()
+    if python_type is float:
+        return pa.float64()
+    if python_type is datetime:
+        return pa.timestamp('us')
+    if python_type is date:
+        return pa.date32()
+    if python_type.__name__ == 'time':
+        return pa.time64('us')
+    return pa.string()
+
+
+def _arrow_schema():
+    return pa.schema([pa.field(column.name, _arrow_type(column)) for column in _columns])
+
+
+def _month_of(day):
+    return f"{day:%Y-%m}"
+
+
+class ParquetArchiver:
+    """ChunkedPurge archiver writing each chunk to Parquet files by month."""
+
+    def __init__(self, root, compression='zstd'):
+        if not PARQUET_AVAILABLE:
+            raise RuntimeError("The Parquet archive requires pyarrow (pip install pyarrow)")
+        self.root = root
+        self.compression = compression
+        self.target = f"parquet:{os.path.abspath(root)}"
+        self.schema = _arrow_schema()
+        self._pending = []
+
+    def copy(self, conn, source, key, range_sql, params):
+        table = TimeAttendance.__table__
+        rows = conn.execute(
+            select(*_columns).where(text(range_sql)).order_by(table.c[key]), params
+        ).mappings().all()
+        by_month = {}
+        for row in rows:
+            by_month.setdefault(_month_of(row['attendance_date']), []).append(dict(row))
+        for month, month_rows in by_month.items():
+            directory = os.path.join(self.root, month)
+            os.makedirs(directory, exist_ok=True)
+            name = f"part-{month_rows[0]['id']:010d}-{month_rows[-1]['id']:010d}.parquet"
+            path = os.path.join(directory, name + PENDING_SUFFIX)
+            pq.write_table(pa.Table.from_pylist(month_rows, schema=self.schema), path,
+                           compression=self.compression)
+            with open(path, 'rb') as f:
+                os.fsync(f.fileno())
+            self._pending.append(path)
+        return len(rows)
+
+    def committed(self):
+        for path in self._pending:
+            os.replace(path, path[:-len(PENDING_SUFFIX)])
+        self._pending = []
+
+    def rolled_back(self):
+        for path in self._pending:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._pending = []
+
+
+def _archive_files(root, start=None, end=None):
+    """[(path, pending)] of the months overlapping [start, end], newest first."""
+    if not os.path.isdir(root):
+        return []
+    first = _month_of(start) if start else None
+    last = _month_of(end) if end else None
+    files = []
+    for month in sorted(os.listdir(root), reverse=True):
+        if (first and month < first) or (last and month > last):
+            continue
+        directory = os.path.join(root, month)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory), reverse=True):
+            if name.endswith('.parquet'):
+                files.append((os.path.join(directory, name), False))
+            elif name.endswith('.parquet' + PENDING_SUFFIX):
+                files.append((os.path.join(directory, name), True))
+    return files
+
+
+def _ids_still_live(db, ids):
+    """The subset of *ids* still in time_attendance."""
+    if not ids:
+        return set()
+    rows = db.session.execute(
+        text(f"SELECT id FROM {SOURCE_TABLE} WHERE id BETWEEN :low AND :high"),
+        {'low': min(ids), 'high': max(ids)}
+    )
+    return {row.id for row in rows} & set(ids)
+
+
+def recover_pending(db, root, logger=None):
+    """Resolve the pending files of interrupted chunks (see module docstring)."""
+    resolved = 0
+    for path, pending in _archive_files(root):
+        if not pending:
+            continue
+        ids = pq.read_table(path, columns=['id']).column('id').to_pylist()
+        if _ids_still_live(db, ids):
+            os.remove(path)
+        else:
+            os.replace(path, path[:-len(PENDING_SUFFIX)])
+        resolved += 1
+    if resolved and logger:
+        logger.info(f"Resolved {resolved} pending TA archive file(s) in {root}")
+    return resolved
+
+
+def _archive_filter(start_date, end_date, base_employee_ids, employee_ids,
+                    location_name, import_batch_id, project_id):
+    conditions = []
+    if start_date:
+        conditions.append(pc.field('attendance_date') >= start_date)
+    if end_date:
+        conditions.append(pc.field('attendance_date') <= end_date)
+    if location_name:
+        conditions.append(pc.field('location_name') == location_name)
+    if import_batch_id:
+        conditions.append(pc.field('import_batch_id') == import_batch_id)
+    if project_id:
+        conditions.append(pc.field('project_id') == int(project_id))
+    employee_conditions = []
+    if base_employee_ids:
+        employee_conditions.append(pc.field('base_employee_id').isin([int(i) for i in base_employee_ids]))
+    if employee_ids:
+        employee_conditions.append(pc.field('employee_id').isin(list(employee_ids)))
+    if employee_conditions:
+        either = employee_conditions[0]
+        for condition in employee_conditions[1:]:
+            either = either | condition
+        conditions.append(either)
+    if not conditions:
+        return None
+    combined = conditions[0]
+    for condition in conditions[1:]:
+        combined = combined & condition
+    return combined
+
+
+def iter_archived(db, root, start_date=None, end_date=None, base_employee_ids=None, employee_ids=None,
+                  location_name=None, import_batch_id=None, project_id=None):
+    """
+    Yield lists of archived TA rows (dicts) matching the export filters,
+    one list per file, newest month first.  Employees match on
+    ``base_employee_ids`` or ``employee_ids`` like the live query.
+    """
+    files = _archive_files(root, start_date, end_date)
+    if not files:
+        return
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError(f"Archived time attendance in {root} can't be read without pyarrow")
+    row_filter = _archive_filter(start_date, end_date, base_employee_ids, employee_ids,
+                                 location_name, import_batch_id, project_id)
+    for path, pending in files:
+        rows = pq.read_table(path, filters=row_filter).to_pylist()
+        if pending and rows:
+            # Rows of an uncommitted chunk are still read from the live table
+            live = _ids_still_live(db, [row['id'] for row in rows])
+            rows = [row for row in rows if row['id'] not in live]
+        if rows:
+            yield rows
+
+
+def archived_records(db, root, **filters):
+    """Archived rows of ``iter_archived`` as (unsaved) TimeAttendance objects."""
+    records = []
+    for rows in iter_archived(db, root, **filters):
+        records.extend(TimeAttendance(**row) for row in rows)
+    return records
+
+
+# ---------------------------------------------------------------------------
+# Archive run
+# ---------------------------------------------------------------------------
+
+def archive_time_attendance(db, cutoff, target='table', root=None, batch_size=2000, sleep_seconds=0.0,
+                            sleep_ratio=0.0, max_seconds=None, replica_urls=(), max_replica_lag=10.0,
+                            logger=None, progress=None):
+    """
+    Move time_attendance rows with ``attendance_date < cutoff`` to *target*.
+
+    Returns:
+        dict: ChunkedPurge.run() result plus target
+    """
+    if target not in TARGETS:
+        raise ValueError(f"unknown TA archive target {target!r}")
+    if target == 'parquet':
+        archiver = ParquetArchiver(root)
+        recover_pending(db, root, logger)
+    else:
+        ensure_archive_table(db)
+        archiver = CopyToTable(ARCHIVE_TABLE)
+
+    throttle = None
+    if replica_urls:
+        throttle = ReplicaLagThrottle(replica_urls, max_lag=max_replica_lag, logger=logger)
+
+    result = ChunkedPurge(
+        db, SOURCE_TABLE, where="attendance_date < :cutoff", params={'cutoff': cutoff},
+        name=PROGRESS_NAME, batch_size=batch_size, sleep_seconds=sleep_seconds,
+        sleep_ratio=sleep_ratio, max_seconds=max_seconds, logger=logger,
+        progress=progress, archiver=archiver, throttle=throttle
+    ).run()
+    return {**result, 'target': target}
+
+
+def archive_settings(app):
+    """archive_time_attendance() keyword arguments from the app config."""
+    max_seconds = app.config.get('TA_ARCHIVE_MAX_SECONDS', 0)
+    return {
+        'target': app.config.get('TA_ARCHIVE_TARGET', 'table'),
+        'root': archive_dir(app),
+        'batch_size': app.config.get('TA_ARCHIVE_BATCH_SIZE', 2000),
+        'sleep_seconds': app.config.get('PURGE_SLEEP_SECONDS', 0.05),
+        'sleep_ratio': app.config.get('TA_ARCHIVE_SLEEP_RATIO', 0.5),
+        'max_seconds': max_seconds or None,
+        'replica_urls': [u.strip() for u in app.config.get('ARCHIVE_REPLICA_URLS', '').split(',') if u.strip()],
+        'max_replica_lag': app.config.get('ARCHIVE_MAX_REPLICA_LAG', 10.0),
+    }
@@ -0,0 +1,56 @@
+"""
+tests/conftest.py
+=================
+Shared fixtures: the Flask app on a throwaway SQLite database.
+
+The environment has to be set before ``app`` is imported (config.py reads
+it at import time), so both happen here at module level.
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_TMP = tempfile.mkdtemp(prefix='qr_tests_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ['UPLOAD_FOLDER'] = os.path.join(_TMP, 'uploads')
+os.environ['SCHEDULER_ENABLED'] = 'false'
+os.makedirs(os.environ['UPLOAD_FOLDER'], exist_ok=True)
+
+# The models are bound to the db by create_app(), so the app is created
+# before any test module imports them
+import app as app_module  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    from extensions import db
+    flask_app = app_module.app
+    flask_app.config['TESTING'] = True
+    with flask_app.app_context():
+        db.create_all()
+    return flask_app
+
+
+@pytest.fixture
+def db(app):
+    from extensions import db as database
+    with app.app_context():
+        yield database
+        database.session.rollback()
+
+
+@pytest.fixture
+def admin_client(app):
+    """Test client with a logged-in admin session."""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['username'] = 'admin'
+        session['role'] = 'admin'
+    return client
@@ -0,0 +1,37 @@
+"""/api/logs/recent?search= goes through the word index, not LIKE + COUNT(*)."""
+
+import pytest
+
+
+@pytest.fixture
+def log_rows(app):
+    from extensions import logger_handler
+    logger_handler._create_log_table()
+    with app.test_request_context('/'):
+        for i in range(3):
+            logger_handler._log_to_database('recent_search_test', 'system',
+                                            f"Quokkalike reindex number {i}", severity='INFO')
+    return 3
+
+
+def test_recent_logs_search_uses_log_search(admin_client, log_rows, monkeypatch):
+    import log_search
+    calls = []
+    original = log_search.search_logs
+    monkeypatch.setattr(log_search, 'search_logs', lambda *a, **kw: calls.append(kw) or original(*a, **kw))
+
+    first = admin_client.get('/api/logs/recent?search=quokkalike&limit=2&days=1').get_json()
+    assert first['success'] and len(first['logs']) == 2
+    assert 'total' not in first and first['has_next']
+    assert calls[0]['sort'] == 'recent'
+
+    second = admin_client.get(f"/api/logs/recent?search=quokkalike&limit=2&days=1&cursor={first['next_cursor']}")
+    second = second.get_json()
+    assert len(second['logs']) == 1 and not second['has_next'] and second['has_prev']
+    ids = {log['event_id'] for log in first['logs'] + second['logs']}
+    assert len(ids) == 3
+
+
+def test_recent_logs_rejects_bad_cursor(admin_client, log_rows):
+    response = admin_client.get('/api/logs/recent?search=quokkalike&cursor=@@@')
+    assert response.status_code == 400
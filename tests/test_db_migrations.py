@@ -0,0 +1,43 @@
+"""Step 0007 brings a pre-employee-key database up to what the models map."""
+
+from sqlalchemy import inspect, text
+
+import db_migrations
+
+
+def _drop_employee_keys(db):
+    with db.engine.begin() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS idx_time_attendance_base_employee_date"))
+        conn.execute(text("ALTER TABLE time_attendance DROP COLUMN base_employee_id"))
+        conn.execute(text("ALTER TABLE time_attendance DROP COLUMN work_type"))
+
+
+def test_employee_keys_step_adds_and_backfills_columns(app, db):
+    from extensions import logger_handler
+
+    _drop_employee_keys(db)
+    with db.engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO time_attendance (employee_id, employee_name, attendance_date, attendance_time,
+                                         location_name, action_description, import_date)
+            VALUES ('4321SP', 'Legacy Row', '2024-02-01', '08:00:00', 'Old Site', 'Check In', '2024-02-01')
+        """))
+
+    db_migrations._employee_keys(app, db, logger_handler)
+    db_migrations._employee_keys(app, db, logger_handler)   # idempotent
+
+    inspector = inspect(db.engine)
+    assert {'base_employee_id', 'work_type'} <= {c['name'] for c in inspector.get_columns('time_attendance')}
+    assert 'idx_time_attendance_base_employee_date' in {ix['name'] for ix in inspector.get_indexes('time_attendance')}
+    with db.engine.begin() as conn:
+        row = conn.execute(text(
+            "SELECT base_employee_id, work_type FROM time_attendance WHERE employee_name = 'Legacy Row'"
+        )).one()
+        conn.execute(text("DELETE FROM time_attendance WHERE employee_name = 'Legacy Row'"))
+    assert (row.base_employee_id, row.work_type) == (4321, 'SP')
+
+
+def test_employee_keys_is_a_tracked_step():
+    versions = [version for version, _, _ in db_migrations.MIGRATIONS]
+    assert '0007_employee_keys' in versions
+    assert versions == sorted(versions)
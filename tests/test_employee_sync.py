@@ -0,0 +1,112 @@
+"""Delta sync on a local table: bad rows are skipped, never lose employees."""
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from employee_table_sync import EmployeeSynchronizer
+
+
+@pytest.fixture
+def local_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'local.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE employee (
+                `index` BIGINT NOT NULL UNIQUE, id BIGINT NOT NULL, firstName VARCHAR(50) NOT NULL,
+                lastName VARCHAR(50) NOT NULL, title VARCHAR(20), contractId BIGINT NOT NULL DEFAULT 1
+            )
+        """))
+    yield engine
+    engine.dispose()
+
+
+def _employee(index, emp_id, first='First', last='Last', title='Tech', contract=1):
+    return {'index': index, 'id': emp_id, 'firstName': first, 'lastName': last,
+            'title': title, 'contractId': contract}
+
+
+def _seed(engine, employees):
+    with engine.begin() as conn:
+        conn.execute(EmployeeSynchronizer._insert_sql(), employees)
+
+
+def _rows(engine):
+    with engine.connect() as conn:
+        return {row.id: (row.index, row.firstName) for row in conn.execute(text("SELECT * FROM employee"))}
+
+
+def _synchronizer(engine, mode):
+    sync = EmployeeSynchronizer({}, {}, sync_mode=mode)
+    sync.local_engine = engine
+    return sync
+
+
+def test_delta_skips_bad_rows_and_applies_the_rest(local_engine):
+    _seed(local_engine, [_employee(1, 101), _employee(2, 102)])
+    sync = _synchronizer(local_engine, 'delta')
+    assert sync.synchronize_employees_delta([
+        _employee(1, 101, first='Renamed'),
+        _employee(2, 102, first=None),          # NOT NULL violation on update
+        _employee(3, 103),
+        _employee(4, 104, last=None),           # NOT NULL violation on insert
+    ])
+    assert _rows(local_engine) == {101: (1, 'Renamed'), 102: (2, 'First'), 103: (3, 'First')}
+    stats = sync.sync_stats
+    assert (stats['records_updated'], stats['records_inserted'], stats['errors_encountered']) == (1, 1, 2)
+
+
+def test_delta_swaps_indexes_in_place(local_engine):
+    _seed(local_engine, [_employee(1, 101), _employee(2, 102), _employee(3, 103)])
+    sync = _synchronizer(local_engine, 'delta')
+    assert sync.synchronize_employees_delta([
+        _employee(2, 101), _employee(1, 102), _employee(3, 103), _employee(4, 104),
+    ])
+    assert _rows(local_engine) == {101: (2, 'First'), 102: (1, 'First'), 103: (3, 'First'), 104: (4, 'First')}
+    assert sync.sync_stats['records_updated'] == 2
+    assert sync.sync_stats['errors_encountered'] == 0
+
+
+def test_failed_deferred_update_keeps_the_employee(local_engine):
+    _seed(local_engine, [_employee(1, 101), _employee(2, 102)])
+    sync = _synchronizer(local_engine, 'delta')
+    assert sync.synchronize_employees_delta([
+        _employee(2, 101, first=None),          # deferred (takes 102's index), then fails
+        _employee(3, 102),
+    ])
+    assert _rows(local_engine) == {101: (1, 'First'), 102: (3, 'First')}
+    assert sync.sync_stats['errors_encountered'] == 1
+
+
+def test_latin1_normalisation_matches_the_stored_value():
+    stored = EmployeeSynchronizer._latin1_text
+    assert stored('Zoë') == 'Zoë'
+    assert stored('€uro') == '€uro'         # cp1252
+    assert stored('张伟') == '??'
+
+
+def test_swap_skips_bad_rows(local_engine):
+    _seed(local_engine, [_employee(1, 101)])
+    sync = _synchronizer(local_engine, 'swap')
+    assert sync.synchronize_employees_swap([
+        _employee(1, 201, first='张伟'),        # stored as '??' on latin1; equal after normalisation
+        _employee(2, 202, last=None),           # NOT NULL violation
+        _employee(3, 203),
+    ])
+    assert set(_rows(local_engine)) == {201, 203}
+    assert sync.sync_stats['errors_encountered'] == 1
+
+
+def test_swap_reports_coerced_rows_instead_of_failing(local_engine):
+    with local_engine.begin() as conn:
+        # An integer-affinity column turns '007' into 7, as a column can coerce a value
+        conn.execute(text("DROP TABLE employee"))
+        conn.execute(text("""
+            CREATE TABLE employee (
+                `index` BIGINT NOT NULL UNIQUE, id BIGINT NOT NULL, firstName VARCHAR(50) NOT NULL,
+                lastName VARCHAR(50) NOT NULL, title INTEGER, contractId BIGINT NOT NULL DEFAULT 1
+            )
+        """))
+    sync = _synchronizer(local_engine, 'swap')
+    assert sync.synchronize_employees_swap([_employee(1, 301, title='007'), _employee(2, 302)])
+    assert set(_rows(local_engine)) == {301, 302}
+    assert sync.sync_stats['errors_encountered'] == 1
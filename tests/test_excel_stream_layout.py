@@ -0,0 +1,78 @@
+"""Streamed (write-only) TA Excel exports must match the in-memory layout."""
+
+import io
+from datetime import date, time, timedelta
+
+import openpyxl
+import pytest
+from openpyxl.utils import get_column_letter
+
+from models.time_attendance import TimeAttendance
+from routes.time_attendance_export import (
+    export_time_attendance_by_building_excel,
+    export_time_attendance_excel,
+)
+
+START = date(2025, 3, 3)
+END = START + timedelta(days=19)
+
+
+def _fixture_records():
+    """20 days x 4 employees x 2 buildings, check-in / check-out pairs."""
+    records, next_id = [], 1
+    for day_offset in range(20):
+        day = START + timedelta(days=day_offset)
+        for employee in range(4):
+            location = f"Building {employee % 2 + 1}"
+            for action, punch in (('Check In', time(7, 5 * employee)), ('Check Out', time(15, 30))):
+                records.append(TimeAttendance(
+                    id=next_id, employee_id=str(1000 + employee), employee_name=f"Employee {employee}",
+                    attendance_date=day, attendance_time=punch, location_name=location,
+                    action_description=action, event_description='', recorded_address='1 Main St',
+                    distance=0.1 * employee, platform='iOS',
+                ))
+                next_id += 1
+    records.sort(key=lambda r: (r.attendance_date, r.attendance_time), reverse=True)
+    return records
+
+
+def _workbook(response):
+    response.direct_passthrough = False
+    return openpyxl.load_workbook(io.BytesIO(response.get_data()))
+
+
+def _layout(wb):
+    sheets = []
+    for ws in wb.worksheets:
+        sheets.append({
+            'values': [list(row) for row in ws.iter_rows(values_only=True)],
+            'merged': sorted(str(r) for r in ws.merged_cells.ranges),
+            'widths': [ws.column_dimensions[get_column_letter(c)].width for c in range(1, 15)],
+            'bold': [[bool(cell.font and cell.font.b) for cell in row] for row in ws.iter_rows()],
+        })
+    return sheets
+
+
+@pytest.mark.parametrize('export, args', [
+    (export_time_attendance_excel, ('', '03032025_03222025', 'all')),
+    (export_time_attendance_by_building_excel, ('', '03032025_03222025')),
+])
+def test_streamed_export_matches_in_memory_layout(app, export, args):
+    records = _fixture_records()
+    with app.test_request_context('/time-attendance/export'):
+        in_memory = _layout(_workbook(export(
+            records, *args, start_date_filter=START.isoformat(), end_date_filter=END.isoformat(),
+            streaming=False
+        )))
+        streamed = _layout(_workbook(export(
+            records, *args, start_date_filter=START.isoformat(), end_date_filter=END.isoformat(),
+            streaming=True
+        )))
+
+    assert len(streamed) == len(in_memory)
+    for streamed_sheet, memory_sheet in zip(streamed, in_memory):
+        assert streamed_sheet['values'] == memory_sheet['values']
+        assert streamed_sheet['merged'] == memory_sheet['merged']
+        assert streamed_sheet['widths'] == memory_sheet['widths']
+        assert streamed_sheet['bold'] == memory_sheet['bold']
+    assert any(any(v is not None for v in row) for row in streamed[0]['values'])
@@ -0,0 +1,88 @@
+"""cached_export must store file attachments but pass streamed and encoded bodies through."""
+
+import gzip
+import os
+from datetime import date, time
+
+import pytest
+
+from models.time_attendance import TimeAttendance
+
+EXPORT_URL = '/time-attendance/export?start_date=2024-01-01&end_date=2024-01-31'
+
+
+@pytest.fixture
+def ta_rows(db):
+    rows = [
+        TimeAttendance(employee_id=str(200 + i), employee_name=f"Cache Test {i}",
+                       attendance_date=date(2024, 1, 10 + i), attendance_time=time(8, i),
+                       location_name='Cache Building', action_description='Check In', platform='iOS')
+        for i in range(3)
+    ]
+    db.session.add_all(rows)
+    db.session.commit()
+    yield rows
+    for row in rows:
+        db.session.delete(row)
+    db.session.commit()
+
+
+@pytest.fixture
+def cache_dir(app):
+    from export_cache import _get_cache, clear_export_cache
+    with app.app_context():
+        clear_export_cache()
+        yield _get_cache().cache_dir
+        clear_export_cache()
+
+
+def _entries(cache_dir):
+    return [n for n in os.listdir(cache_dir) if n.endswith('.json')] if os.path.isdir(cache_dir) else []
+
+
+def test_excel_export_is_cached(admin_client, ta_rows, cache_dir):
+    first = admin_client.get(f"{EXPORT_URL}&format=excel")
+    second = admin_client.get(f"{EXPORT_URL}&format=excel")
+    assert first.headers['X-Export-Cache'] == 'MISS'
+    assert second.headers['X-Export-Cache'] == 'HIT'
+    assert first.get_data() == second.get_data()
+    assert len(_entries(cache_dir)) == 1
+
+
+def test_streamed_csv_export_bypasses_cache(admin_client, ta_rows, cache_dir):
+    response = admin_client.get(f"{EXPORT_URL}&format=csv")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert 'X-Export-Cache' not in response.headers
+    body = response.get_data(as_text=True)
+    assert body.splitlines()[0].startswith('Employee ID')
+    assert sum('Cache Test' in line for line in body.splitlines()) == 3
+    assert _entries(cache_dir) == []
+
+
+def test_gzipped_csv_export_is_not_cached(admin_client, ta_rows, cache_dir):
+    for _ in range(2):
+        response = admin_client.get(f"{EXPORT_URL}&format=csv", headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'X-Export-Cache' not in response.headers
+        body = gzip.decompress(response.get_data()).decode('utf-8')
+        assert sum('Cache Test' in line for line in body.splitlines()) == 3
+    assert _entries(cache_dir) == []
+
+
+def test_encoded_attachment_is_never_stored(app, cache_dir):
+    from flask import Response
+
+    from export_cache import cached_export
+
+    @cached_export('encoded_test', 'time_attendance', ('start_date', 'end_date'))
+    def view():
+        return Response(gzip.compress(b'a,b\n1,2\n'), mimetype='text/csv', headers={
+            'Content-Disposition': 'attachment; filename=x.csv', 'Content-Encoding': 'gzip',
+        })
+
+    with app.test_request_context('/?start_date=2024-01-01&end_date=2024-01-02'):
+        response = view()
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'X-Export-Cache' not in response.headers
+    assert _entries(cache_dir) == []
@@ -0,0 +1,41 @@
+"""/metrics is closed to remote scrapers unless they present METRICS_TOKEN."""
+
+import pytest
+
+
+@pytest.fixture
+def metrics_token(app):
+    original = app.config.get('METRICS_TOKEN')
+    yield lambda value: app.config.__setitem__('METRICS_TOKEN', value)
+    app.config['METRICS_TOKEN'] = original
+
+
+def _scrape(app, remote_addr, headers=None):
+    return app.test_client().get('/metrics', headers=headers or {},
+                                 environ_base={'REMOTE_ADDR': remote_addr})
+
+
+@pytest.mark.parametrize('remote_addr', ['127.0.0.1', '::1'])
+def test_loopback_scrape_allowed_without_token(app, metrics_token, remote_addr):
+    metrics_token('')
+    response = _scrape(app, remote_addr)
+    assert response.status_code == 200
+    assert 'qr_http_requests_total' in response.get_data(as_text=True)
+
+
+def test_remote_scrape_denied_without_token(app, metrics_token):
+    metrics_token('')
+    assert _scrape(app, '203.0.113.5').status_code == 401
+
+
+def test_proxied_scrape_denied_without_token(app, metrics_token):
+    metrics_token('')
+    response = _scrape(app, '127.0.0.1', {'X-Forwarded-For': '203.0.113.5'})
+    assert response.status_code == 401
+
+
+def test_token_required_when_set(app, metrics_token):
+    metrics_token('s3cret')
+    assert _scrape(app, '127.0.0.1').status_code == 401
+    assert _scrape(app, '203.0.113.5', {'Authorization': 'Bearer wrong'}).status_code == 401
+    assert _scrape(app, '203.0.113.5', {'Authorization': 'Bearer s3cret'}).status_code == 200
@@ -0,0 +1,78 @@
+"""Shared rate limiting: per-IP blocking only, and one budget across every worker."""
+
+import pytest
+
+from rate_limiter import MemoryRateLimiter, SQLiteRateLimiter, load_budgets
+
+CONFIG = {'RATE_LIMIT_BLOCK_SECONDS': 300}
+
+
+def test_only_per_ip_budgets_block():
+    budgets = load_budgets(CONFIG)
+    assert {name for name, b in budgets.items() if b.block_seconds} == {'default', 'admin', 'scan_ip'}
+    assert budgets['scan_qr'].block_seconds == 0
+    assert budgets['scan_employee'].block_seconds == 0
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def limiter(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteRateLimiter(str(tmp_path / 'limits.sqlite3'))
+    return MemoryRateLimiter()
+
+
+def test_flooding_an_employee_id_does_not_lock_it_out(limiter):
+    budget = load_budgets(CONFIG)['scan_employee']
+    results = [limiter.hit('scan_employee:emp:1001', budget) for _ in range(budget.limit + 5)]
+    denied = [r for r in results if not r.allowed]
+    assert denied
+    # Throttled to the window's refill, never the 300s block
+    assert max(r.retry_after for r in denied) <= budget.window
+
+
+def test_flooding_from_one_ip_blocks_that_ip(limiter):
+    budget = load_budgets(CONFIG)['scan_ip']
+    results = [limiter.hit('scan_ip:ip:10.0.0.9', budget) for _ in range(budget.limit + 1)]
+    assert not results[-1].allowed
+    assert results[-1].retry_after > budget.window
+
+
+@pytest.fixture
+def two_workers(app, monkeypatch, tmp_path):
+    """Two app instances on one limiter file, as two gunicorn workers would be."""
+    import app as app_module
+    import extensions
+    from config import get_config
+
+    config = get_config()
+    monkeypatch.setattr(config, 'RATE_LIMIT_BACKEND', 'sqlite')
+    monkeypatch.setattr(config, 'RATE_LIMIT_SQLITE_PATH', str(tmp_path / 'shared.sqlite3'))
+    monkeypatch.setattr(config, 'RATE_LIMITS', {'default': '4/60', 'auth': '2/900'})
+    logger = extensions.logger_handler
+    workers = [app_module.create_app(), app_module.create_app()]
+    extensions.logger_handler = logger
+    return workers
+
+
+def test_workers_share_one_request_budget(two_workers):
+    first, second = (worker.test_client() for worker in two_workers)
+    statuses = [client.get('/login').status_code for client in (first, second, first, second)]
+    assert statuses == [200] * 4
+    assert second.get('/login').status_code == 429
+    assert first.get('/login').status_code == 429
+
+
+def test_failed_logins_lock_out_across_workers(two_workers):
+    first, second = (worker.test_client() for worker in two_workers)
+    for client in (first, second):
+        client.post('/login', data={'username': 'nobody', 'password': 'wrong'})
+    # The third attempt goes to the other worker and is refused before the password check
+    response = first.post('/login', data={'username': 'nobody', 'password': 'wrong'})
+    assert response.status_code == 429
+    assert b'Too many failed login attempts' in response.data
+
+
+def test_performance_stats_are_admin_only(app, admin_client):
+    assert app.test_client().get('/api/performance/stats').status_code == 403
+    stats = admin_client.get('/api/performance/stats').get_json()
+    assert stats['rate_limiter']['backend'] == 'sqlite'
@@ -0,0 +1,70 @@
+"""The broadcaster must deliver rows that commit after a higher id was read."""
+
+import json
+import os
+import time
+
+import pytest
+from sqlalchemy import insert
+
+from realtime_feed import RealtimeFeed, dashboard_events_table
+
+
+@pytest.fixture
+def feed(app, db):
+    previous = app.extensions.get('realtime_feed')
+    realtime = RealtimeFeed(app, db)
+    realtime._thread_pid = os.getpid()   # polled by hand below, no broadcaster thread
+    with realtime._engine().begin() as conn:
+        conn.execute(dashboard_events_table.delete())
+    yield realtime
+    app.extensions['realtime_feed'] = previous
+
+
+def _commit_row(feed, event_id, created_at=None):
+    with feed._engine().begin() as conn:
+        conn.execute(insert(dashboard_events_table).values(
+            id=event_id, created_at=created_at or time.time(), payload=json.dumps({'n': event_id})
+        ))
+
+
+def _drain(q):
+    ids = []
+    while not q.empty():
+        ids.append(q.get_nowait()[0])
+    return ids
+
+
+def test_late_commit_is_delivered_once(feed):
+    _commit_row(feed, 10)
+    q = feed.subscribe()
+    assert q.start_id == 10
+
+    # id 12 commits first, id 11 (allocated earlier) commits after the poll
+    _commit_row(feed, 12)
+    feed._poll()
+    assert _drain(q) == [12]
+    _commit_row(feed, 11)
+    feed._poll()
+    assert _drain(q) == [11]
+
+    feed._poll()
+    assert _drain(q) == []
+
+
+def test_rows_below_start_id_committed_after_subscribe(feed):
+    _commit_row(feed, 20)
+    _commit_row(feed, 22)
+    q = feed.subscribe()          # snapshot already covers 20 and 22
+    _commit_row(feed, 21)
+    feed._poll()
+    assert _drain(q) == [21]
+
+
+def test_rows_older_than_window_are_not_replayed(feed):
+    _commit_row(feed, 30)
+    q = feed.subscribe()
+    _commit_row(feed, 29, created_at=time.time() - feed.reorder_window - 60)
+    _commit_row(feed, 31)
+    feed._poll()
+    assert _drain(q) == [31]
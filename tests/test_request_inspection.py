@@ -0,0 +1,56 @@
+"""inspect_request_fields: data URLs are only skipped when they really are base64 data."""
+
+import base64
+
+import metrics
+from advanced_security_middleware import inspect_request_fields
+
+PHOTO = 'data:image/jpeg;base64,' + base64.b64encode(b'\xff\xd8\xff' + b'<script>' * 50).decode()
+
+
+def test_base64_data_url_is_skipped():
+    assert inspect_request_fields([('notes', PHOTO)]) == (False, False)
+
+
+def test_data_prefix_does_not_bypass_the_scan():
+    assert inspect_request_fields([('notes', 'data:<script>alert(1)</script>')]) == (True, False)
+    assert inspect_request_fields([('q', "data:x' or '1'='1")]) == (False, True)
+    # A valid data URL followed by a payload is not a data URL
+    assert inspect_request_fields([('notes', PHOTO + ' <script>')]) == (True, False)
+
+
+def test_named_binary_fields_are_skipped():
+    assert inspect_request_fields([('photo', '<script>')]) == (False, False)
+
+
+def test_sql_hits_are_reported_separately():
+    assert inspect_request_fields([('f', '../../etc/passwd')]) == (True, False)
+    assert inspect_request_fields([('f', '<script')]) == (True, False)
+    # union select / drop table / insert into belong to both pattern lists
+    assert inspect_request_fields([('q', 'x union select 1')]) == (True, True)
+    assert inspect_request_fields([('q', '<script> 1=1')]) == (True, True)
+    assert inspect_request_fields([], path='/qr/../../etc/passwd') == (True, False)
+
+
+def _checkin(app, data):
+    return app.test_client().post('/qr/no-such-code/checkin', data=data)
+
+
+def test_checkin_with_sql_payload_is_refused(app):
+    response = _checkin(app, {'employee_id': "1' or '1'='1"})
+    assert response.status_code == 403
+
+
+def test_checkin_with_photo_is_scanned_and_timed(app):
+    def inspected():
+        return sum(
+            values[-2] + sum(values[:-2])
+            for (name, labels), values in metrics.registry.histograms.items()
+            if name == 'qr_request_inspection_seconds' and ('endpoint', 'qr_codes.qr_checkin') in labels
+        )
+
+    before = inspected()
+    response = _checkin(app, {'employee_id': '42', 'verification_photo': '<script>' * 1000})
+    # Past the scanner: the route itself answers for the unknown QR code
+    assert response.status_code == 404
+    assert inspected() == before + 1
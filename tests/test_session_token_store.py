@@ -0,0 +1,42 @@
+"""SessionTokenStore shared by two workers (two stores on one database)."""
+
+import pytest
+
+from session_token_store import SessionTokenStore, session_tokens_table
+
+
+@pytest.fixture
+def workers(db):
+    worker_a = SessionTokenStore(db, recheck_seconds=30)
+    worker_b = SessionTokenStore(db, recheck_seconds=30)
+    yield worker_a, worker_b
+    with db.engine.begin() as conn:
+        conn.execute(session_tokens_table.delete())
+
+
+def test_login_on_another_worker_is_accepted_before_recheck(workers):
+    worker_a, worker_b = workers
+    worker_a.issue(42, 'token-from-first-login')
+    assert worker_a.validate(42, 'token-from-first-login')
+
+    # The user logs in again and the new session lands on worker B
+    worker_b.issue(42, 'token-from-second-login')
+
+    # Worker A still caches the first login's hash, but must not reject the new token
+    assert worker_a.validate(42, 'token-from-second-login')
+    assert worker_a.validate(42, 'token-from-first-login') is None
+
+
+def test_first_request_on_other_worker_validates(workers):
+    worker_a, worker_b = workers
+    assert worker_a.validate(7, 'anything') is None      # caches "no token"
+    worker_b.issue(7, 'fresh-token')
+    assert worker_a.validate(7, 'fresh-token')
+
+
+def test_wrong_token_is_rejected(workers):
+    worker_a, worker_b = workers
+    worker_b.issue(9, 'right')
+    assert worker_a.validate(9, 'wrong') is None
+    assert worker_a.validate(9, '') is None
+    assert worker_a.validate(9, 'right')
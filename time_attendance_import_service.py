@@ -11,6 +11,8 @@ from datetime import datetime, time
 from sqlalchemy.exc import SQLAlchemyError
 from typing import Dict, List, Any, Optional, Tuple
 import traceback
+
+from metrics import track_job
 import hashlib
 
 class TimeAttendanceImportService:
@@ -657,6 +659,7 @@ class TimeAttendanceImportService:
         
         return analysis_result
     
+    @track_job('time_attendance_import')
     def import_from_excel(self, file_path: str, created_by: int = None,
                          import_source: str = None, skip_duplicates: bool = True,
                          force_import_hashes: List[str] = None, project_id: int = None,
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+==============================================================================
+Employee Sync Benchmark
+==============================================================================
+
+Compares wall time and peak Python memory of the employee sync writers on
+the same synthetic remote table:
+
+    list-full     - fetch_remote_employees() into one list, then a full
+                    replacement (the pre-streaming path)
+    stream-full   - batches streamed off a server-side cursor into the
+                    full replacement writer while the next batch is fetched
+    stream-delta  - the same stream into the delta writer, with --changes
+                    rows edited on the remote side
+    stream-swap   - the same stream loaded into employee_staging, verified
+                    and renamed over employee
+
+Remote and local are two throwaway SQLite databases, so the benchmark needs
+no MySQL and no credentials.
+
+Usage:
+    python tools/benchmark_employee_sync.py --employees 200000
+    python tools/benchmark_employee_sync.py --employees 50000 --changes 500
+==============================================================================
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+from employee_table_sync import EmployeeSynchronizer
+
+CREATE_EMPLOYEE = text("""
+    CREATE TABLE employee (
+        `index` INTEGER PRIMARY KEY, id BIGINT NOT NULL, firstName TEXT,
+        lastName TEXT, title TEXT, contractId BIGINT
+    )
+""")
+
+INSERT_EMPLOYEE = text("""
+    INSERT INTO employee (`index`, id, firstName, lastName, title, contractId)
+    VALUES (:index, :id, :firstName, :lastName, :title, :contractId)
+""")
+
+
+def build_database(path, employees):
+    """Create an employee table with *employees* synthetic rows."""
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(CREATE_EMPLOYEE)
+        batch = []
+        for i in range(1, employees + 1):
+            batch.append({
+                'index': i, 'id': 100000 + i, 'firstName': f"First{i}",
+                'lastName': f"Last{i % 5000}", 'title': f"Title {i % 40}",
+                'contractId': 1 + i % 3,
+            })
+            if len(batch) == 10000:
+                conn.execute(INSERT_EMPLOYEE, batch)
+                batch = []
+        if batch:
+            conn.execute(INSERT_EMPLOYEE, batch)
+    return engine
+
+
+def synchronizer(remote, local, mode):
+    sync = EmployeeSynchronizer({}, {}, sync_mode=mode)
+    sync.remote_engine, sync.local_engine = remote, local
+    return sync
+
+
+def list_full(remote, local):
+    sync = synchronizer(remote, local, 'full')
+    return sync, sync.synchronize_employees(sync.fetch_remote_employees())
+
+
+def stream_full(remote, local):
+    sync = synchronizer(remote, local, 'full')
+    return sync, sync.synchronize_employees(sync._prefetch(sync.iter_remote_employee_batches()))
+
+
+def stream_delta(remote, local):
+    sync = synchronizer(remote, local, 'delta')
+    return sync, sync.synchronize_employees_delta(sync._prefetch(sync.iter_remote_employee_batches()))
+
+
+def stream_swap(remote, local):
+    sync = synchronizer(remote, local, 'swap')
+    return sync, sync.synchronize_employees_swap(sync._prefetch(sync.iter_remote_employee_batches()))
+
+
+def measure(name, fn, remote, local):
+    tracemalloc.start()
+    started = time.perf_counter()
+    sync, ok = fn(remote, local)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = sync.sync_stats
+    changed = stats['records_inserted'] + stats['records_updated'] + stats['records_deleted']
+    print(f"  {name:<13} {elapsed:>8.2f}s  peak {peak / 1024 / 1024:>7.1f} MB  "
+          f"rows written {changed:>9,}  {'ok' if ok else 'FAILED'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark list vs streaming employee sync')
+    parser.add_argument('--employees', type=int, default=100000, help='Synthetic remote employees')
+    parser.add_argument('--changes', type=int, default=100, help='Remote rows edited before the delta run')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='employee_sync_bench_') as workdir:
+        print(f"Building {args.employees:,} synthetic employees...")
+        remote = build_database(os.path.join(workdir, 'remote.db'), args.employees)
+        local = create_engine(f"sqlite:///{os.path.join(workdir, 'local.db')}")
+        with local.begin() as conn:
+            conn.execute(CREATE_EMPLOYEE)
+
+        print("Synchronizing:")
+        measure('list-full', list_full, remote, local)
+        measure('stream-full', stream_full, remote, local)
+        with remote.begin() as conn:
+            conn.execute(text("UPDATE employee SET title = 'Changed' WHERE `index` <= :n"), {'n': args.changes})
+        measure('stream-delta', stream_delta, remote, local)
+        measure('stream-swap', stream_swap, remote, local)
+        remote.dispose()
+        local.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+==============================================================================
+Export Format Benchmark
+==============================================================================
+
+Compares wall time, peak Python memory and output size of the three
+attendance export formats on the same synthetic rows:
+
+    xlsx     - in-memory openpyxl Workbook (the classic Excel path)
+    csv      - utils.flat_export.iter_csv over a server-side cursor
+    parquet  - utils.flat_export.write_parquet (skipped without pyarrow)
+
+The rows live in a throwaway SQLite database so the benchmark needs no
+MySQL and no running app.
+
+Usage:
+    python tools/benchmark_export_formats.py --rows 200000
+    python tools/benchmark_export_formats.py --rows 50000 --chunk-size 2000
+==============================================================================
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from utils.flat_export import PARQUET_AVAILABLE, iter_csv, iter_row_chunks, write_parquet
+
+COLUMNS = [
+    ('Employee ID', 'string'), ('Employee Name', 'string'), ('Location', 'string'),
+    ('Date', 'string'), ('Time', 'string'), ('Address', 'string'),
+    ('Latitude', 'float64'), ('Longitude', 'float64'), ('Accuracy', 'float64'),
+]
+
+SELECT_ROWS = text("""
+    SELECT employee_id, employee_name, location_name, check_in_date,
+           check_in_time, address, latitude, longitude, accuracy
+    FROM attendance_bench ORDER BY id
+""")
+
+INSERT_ROW = text("""
+    INSERT INTO attendance_bench (employee_id, employee_name, location_name,
+        check_in_date, check_in_time, address, latitude, longitude, accuracy)
+    VALUES (:employee_id, :employee_name, :location_name, :check_in_date,
+        :check_in_time, :address, :latitude, :longitude, :accuracy)
+""")
+
+
+def build_database(path, rows):
+    """Create attendance_bench with *rows* synthetic check-ins."""
+    engine = create_engine(f"sqlite:///{path}")
+    rng = random.Random(42)
+    start = date(2025, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE attendance_bench (
+                id INTEGER PRIMARY KEY, employee_id TEXT, employee_name TEXT,
+                location_name TEXT, check_in_date TEXT, check_in_time TEXT,
+                address TEXT, latitude REAL, longitude REAL, accuracy REAL
+            )
+        """))
+        batch = []
+        for i in range(rows):
+            batch.append({
+                'employee_id': str(1000 + i % 750),
+                'employee_name': f"Employee {i % 750}",
+                'location_name': f"Building {i % 40}",
+                'check_in_date': (start + timedelta(days=i % 365)).isoformat(),
+                'check_in_time': f"{7 + i % 12:02d}:{i % 60:02d}:00",
+                'address': f"{100 + i % 900} Main Street, Springfield",
+                'latitude': 40 + rng.random(),
+                'longitude': -74 - rng.random(),
+                'accuracy': rng.random() * 2,
+            })
+            if len(batch) == 10000:
+                conn.execute(INSERT_ROW, batch)
+                batch = []
+        if batch:
+            conn.execute(INSERT_ROW, batch)
+    return engine
+
+
+def export_xlsx(engine, out_path, chunk_size):
+    with Session(engine) as session:
+        rows = session.execute(SELECT_ROWS).fetchall()
+        wb = Workbook()
+        ws = wb.active
+        ws.append([header for header, _ in COLUMNS])
+        for row in rows:
+            ws.append(list(row))
+        wb.save(out_path)
+
+
+def export_csv(engine, out_path, chunk_size):
+    with Session(engine) as session, open(out_path, 'w', newline='') as out:
+        chunks = iter_row_chunks(SELECT_ROWS, chunk_size=chunk_size, session=session)
+        for piece in iter_csv(COLUMNS, chunks, list):
+            out.write(piece)
+
+
+def export_parquet(engine, out_path, chunk_size):
+    with Session(engine) as session:
+        chunks = iter_row_chunks(SELECT_ROWS, chunk_size=chunk_size, session=session)
+        write_parquet(out_path, COLUMNS, chunks, list)
+
+
+def measure(name, fn, engine, out_path, chunk_size):
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn(engine, out_path, chunk_size)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = os.path.getsize(out_path)
+    print(f"  {name:<8} {elapsed:>8.2f}s  peak {peak / 1024 / 1024:>8.1f} MB  file {size / 1024 / 1024:>7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark xlsx vs CSV vs Parquet exports')
+    parser.add_argument('--rows', type=int, default=100000, help='Synthetic rows to export')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Server-side cursor chunk size')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='export_bench_') as workdir:
+        print(f"Building {args.rows:,} synthetic rows...")
+        engine = build_database(os.path.join(workdir, 'bench.db'), args.rows)
+
+        print(f"Exporting (chunk size {args.chunk_size:,}):")
+        measure('xlsx', export_xlsx, engine, os.path.join(workdir, 'out.xlsx'), args.chunk_size)
+        measure('csv', export_csv, engine, os.path.join(workdir, 'out.csv'), args.chunk_size)
+        if PARQUET_AVAILABLE:
+            measure('parquet', export_parquet, engine, os.path.join(workdir, 'out.parquet'), args.chunk_size)
+        else:
+            print("  parquet  skipped (pip install pyarrow)")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
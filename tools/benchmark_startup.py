@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+==============================================================================
+Startup Benchmark
+==============================================================================
+
+Measures what a process start costs before it can serve requests, against
+a throwaway SQLite database seeded with QR codes (with base64 images) and
+check-ins:
+
+    create_app   - importing app.py (factory, blueprints, hooks)
+    legacy       - the old ``python app.py`` preamble: create_tables(),
+                   loading every active QR code with its image, and
+                   initialize_performance_optimizations() (index DDL,
+                   SET SESSION, cache setup)
+    migrated     - the current preamble once ``flask db-upgrade`` has run:
+                   one SELECT on schema_migrations
+
+Usage:
+    python tools/benchmark_startup.py --qr-codes 5000
+    python tools/benchmark_startup.py --qr-codes 20000 --checkins 200000 --repeat 5
+==============================================================================
+"""
+
+import argparse
+import base64
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def seed(db, qr_codes, checkins):
+    """Insert *qr_codes* QR codes (~3 KB image each) and *checkins* check-ins."""
+    from datetime import date, time as dtime
+    from models.attendance import AttendanceData
+    from models.project import Project
+    from models.qrcode import QRCode
+
+    image = 'data:image/png;base64,' + base64.b64encode(os.urandom(2400)).decode()
+    with db.engine.begin() as conn:
+        # Core inserts on the model tables apply the models' column defaults
+        conn.execute(Project.__table__.insert(), [{'id': 1, 'name': 'Bench', 'active_status': True}])
+        conn.execute(QRCode.__table__.insert(), [
+            {'id': i, 'name': f"QR {i}", 'location': 'Site', 'location_address': 'Address',
+             'location_event': 'Check In', 'qr_code_image': image, 'qr_url': f"qr-{i}",
+             'project_id': 1, 'active_status': True}
+            for i in range(1, qr_codes + 1)
+        ])
+        conn.execute(AttendanceData.__table__.insert(), [
+            {'qr_code_id': 1 + i % qr_codes, 'employee_id': str(1000 + i % 500),
+             'base_employee_id': 1000 + i % 500, 'work_type': 'regular',
+             'check_in_date': date(2025, 1, 15), 'check_in_time': dtime(8, 0),
+             'location_name': 'Site'}
+            for i in range(checkins)
+        ])
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return min(samples), statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark process startup paths')
+    parser.add_argument('--qr-codes', type=int, default=5000)
+    parser.add_argument('--checkins', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='startup_bench_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['UPLOAD_FOLDER'] = workdir
+
+    started = time.perf_counter()
+    import app as app_module
+    create_app_seconds = time.perf_counter() - started
+
+    from db_migrations import pending_migrations, run_migrations
+    from db_performance_optimization import initialize_performance_optimizations
+    from extensions import logger_handler
+
+    app, db = app_module.app, app_module.db
+    with app.app_context():
+        db.create_all()
+        print(f"Seeding {args.qr_codes:,} QR codes and {args.checkins:,} check-ins in {workdir} ...")
+        seed(db, args.qr_codes, args.checkins)
+        run_migrations(app, db, logger_handler)
+
+        def legacy():
+            from models.qrcode import QRCode
+            app_module.create_tables()
+            # The old update_existing_qr_codes() loaded every active QR code
+            for qr_code in QRCode.query.filter_by(active_status=True).all():
+                _ = qr_code.qr_url and qr_code.qr_code_image
+            initialize_performance_optimizations(app, db, logger_handler)
+            db.session.remove()
+
+        def migrated():
+            pending_migrations(db)
+
+        results = [('legacy', timed(legacy, args.repeat)), ('migrated', timed(migrated, args.repeat))]
+
+    print(f"\n{'path':<12} {'min':>10} {'median':>10}")
+    print(f"{'create_app':<12} {create_app_seconds * 1000:>8.1f}ms {'':>10}")
+    for name, (best, median) in results:
+        print(f"{name:<12} {best * 1000:>8.1f}ms {median * 1000:>8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
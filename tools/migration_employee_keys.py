@@ -0,0 +1,147 @@
+"""
+Migration: Numeric Employee Key Columns
+========================================
+Adds the parsed employee key columns used by report joins and the hours
+calculators instead of ``CAST(employee_id AS UNSIGNED)`` / per-record
+regex parsing:
+
+  1. attendance_data.base_employee_id  (BIGINT NULL)  + work_type (VARCHAR 10)
+  2. time_attendance.base_employee_id  (BIGINT NULL)  + work_type (VARCHAR 10)
+  3. Composite indexes (base_employee_id, date) on both tables
+  4. Backfills existing rows in primary-key batches using
+     utils.employee_keys.employee_key_columns (the same parser the models
+     use on write), so it can run on a live database
+  5. Adds the columns to time_attendance_archive when that table exists
+
+``flask --app app db-upgrade`` applies it as step 0007_employee_keys.  To
+run it by hand (e.g. with a smaller batch size), from the project root:
+    python tools/migration_employee_keys.py
+    python tools/migration_employee_keys.py --batch-size 2000
+
+Fully idempotent — safe to run multiple times; an interrupted backfill
+resumes at the first row whose work_type is still NULL.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The Flask app is only imported by run_migration(), so db_migrations can
+# import this module from inside the app
+from extensions import db
+from utils.employee_keys import employee_key_columns
+
+# table -> (date column, index name)
+TABLES = {
+    'attendance_data': ('check_in_date', 'idx_attendance_base_employee_date'),
+    'time_attendance': ('attendance_date', 'idx_time_attendance_base_employee_date'),
+}
+
+
+def add_columns(inspector, table):
+    from sqlalchemy import text
+
+    existing_cols = {c['name'] for c in inspector.get_columns(table)}
+    with db.engine.connect() as conn:
+        if 'base_employee_id' not in existing_cols:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN base_employee_id BIGINT NULL"))
+            print(f"✅  Added column: {table}.base_employee_id")
+        else:
+            print(f"ℹ️   Column {table}.base_employee_id already exists — skipped.")
+        if 'work_type' not in existing_cols:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN work_type VARCHAR(10) NULL"))
+            print(f"✅  Added column: {table}.work_type")
+        else:
+            print(f"ℹ️   Column {table}.work_type already exists — skipped.")
+        conn.commit()
+
+
+def add_index(inspector, table, date_column, index_name):
+    from sqlalchemy import text
+
+    existing_indexes = {ix['name'] for ix in inspector.get_indexes(table)}
+    if index_name in existing_indexes:
+        print(f"ℹ️   Index {index_name} already exists — skipped.")
+        return
+    with db.engine.connect() as conn:
+        conn.execute(text(f"CREATE INDEX {index_name} ON {table} (base_employee_id, {date_column})"))
+        conn.commit()
+    print(f"✅  Created index: {index_name} ON {table} (base_employee_id, {date_column})")
+
+
+def backfill(table, batch_size):
+    """Fill the key columns for rows that do not have them yet, batch by batch."""
+    from sqlalchemy import text
+
+    select_batch = text(f"""
+        SELECT id, employee_id FROM {table}
+        WHERE work_type IS NULL AND id > :last_id
+        ORDER BY id
+        LIMIT :batch_size
+    """)
+    update_row = text(f"""
+        UPDATE {table} SET base_employee_id = :base_employee_id, work_type = :work_type
+        WHERE id = :id
+    """)
+
+    last_id, total, started = 0, 0, time.time()
+    while True:
+        with db.engine.connect() as conn:
+            rows = conn.execute(select_batch, {'last_id': last_id, 'batch_size': batch_size}).fetchall()
+            if not rows:
+                break
+            params = []
+            for row_id, employee_id in rows:
+                base_employee_id, work_type = employee_key_columns(employee_id)
+                params.append({'id': row_id, 'base_employee_id': base_employee_id, 'work_type': work_type})
+            conn.execute(update_row, params)
+            conn.commit()
+        last_id = rows[-1][0]
+        total += len(rows)
+        print(f"   {table}: {total:,} rows backfilled (id <= {last_id}, {time.time() - started:.1f}s)")
+
+    if total:
+        print(f"✅  Backfilled {total:,} {table} row(s)")
+    else:
+        print(f"ℹ️   No {table} rows to backfill.")
+
+
+def migrate(batch_size=5000):
+    """Add, index and backfill the key columns (inside an app context)."""
+    from sqlalchemy import inspect as sa_inspect
+
+    inspector = sa_inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table, (date_column, index_name) in TABLES.items():
+        if table not in existing_tables:
+            print(f"ℹ️   Table {table} does not exist — skipped.")
+            continue
+        print(f"\n— {table} —")
+        add_columns(inspector, table)
+        add_index(sa_inspect(db.engine), table, date_column, index_name)
+        backfill(table, batch_size)
+
+    # Archived rows are copied with SELECT *, so the archive needs the same columns
+    if 'time_attendance_archive' in existing_tables:
+        print("\n— time_attendance_archive —")
+        add_columns(inspector, 'time_attendance_archive')
+        backfill('time_attendance_archive', batch_size)
+
+
+def run_migration(batch_size=5000):
+    from app import app
+
+    with app.app_context():
+        migrate(batch_size)
+        print("\nMigration complete.")
+        print("New and edited rows get base_employee_id / work_type from the models on write.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Add and backfill base_employee_id / work_type columns')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Rows updated per transaction')
+    args = parser.parse_args()
+    run_migration(args.batch_size)
@@ -11,6 +11,7 @@ Usage:
     python optimize_time_attendance_db.py --action optimize
     python optimize_time_attendance_db.py --action analyze
     python optimize_time_attendance_db.py --action archive --days 365
+    python optimize_time_attendance_db.py --action archive --days 365 --target parquet --execute
     python optimize_time_attendance_db.py --action cleanup --days 90
     python optimize_time_attendance_db.py --action report
     python optimize_time_attendance_db.py --action all
@@ -31,16 +32,19 @@ from datetime import datetime, timedelta
 import logging
 
 # Add the application directory to the path
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Import Flask app and database
+# Import database (the Flask app is only imported by main(), so the
+# in-app job scheduler can import this module without re-creating the app;
+# ta_archive needs the models, so it is imported once the app exists)
 try:
-    from app import app, db
-    from models.time_attendance import TimeAttendance
+    from flask import current_app
+    from extensions import db
     from sqlalchemy import text
+    from utils.chunked_purge import ChunkedPurge
 except ImportError as e:
     print(f"❌ Error: Cannot import required modules: {e}")
-    print("   Make sure this script is in the same directory as app.py")
+    print("   Make sure this script is run from the application directory")
     sys.exit(1)
 
 
@@ -268,23 +272,23 @@ class TimeAttendanceOptimizer:
     def create_archive_table(self):
         """Create archive table if it doesn't exist"""
         try:
-            create_query = """
-                CREATE TABLE IF NOT EXISTS time_attendance_archive 
-                LIKE time_attendance
-            """
-            db.session.execute(text(create_query))
-            db.session.commit()
+            from ta_archive import ensure_archive_table
+            ensure_archive_table(db)
             return True
         except Exception as e:
             self.log(f"Error creating archive table: {e}", 'error')
-            db.session.rollback()
             return False
     
-    def archive_old_records(self, days=365, execute=False):
-        """Archive records older than specified days"""
+    def archive_old_records(self, days=365, execute=False, target=None, max_seconds=None):
+        """
+        Archive records older than specified days (see ta_archive.py).
+        
+        Runs in primary-key chunks and resumes an interrupted run; *target*
+        and *max_seconds* override TA_ARCHIVE_TARGET / TA_ARCHIVE_MAX_SECONDS.
+        """
         self.log(f"Archive process for records older than {days} days...", 'info')
         
-        cutoff_date = datetime.now() - timedelta(days=days)
+        cutoff_date = (datetime.now() - timedelta(days=days)).date()
         
         try:
             # Count records to archive
@@ -295,84 +299,58 @@ class TimeAttendanceOptimizer:
             """
             result = db.session.execute(
                 text(count_query),
-                {'cutoff_date': cutoff_date.date()}
+                {'cutoff_date': cutoff_date}
             ).fetchone()
+            db.session.commit()
             
             records_to_archive = result.count if result else 0
+            from ta_archive import archive_settings, archive_time_attendance
+            settings = archive_settings(current_app)
+            if target:
+                settings['target'] = target
+            if max_seconds is not None:
+                settings['max_seconds'] = max_seconds or None
             
             print(f"\n📦 Archive Summary:")
-            print(f"   Cutoff Date:       {cutoff_date.date()}")
+            print(f"   Cutoff Date:       {cutoff_date}")
             print(f"   Records to Archive: {records_to_archive:,}")
+            print(f"   Target:            {settings['target']}"
+                  f"{' (' + settings['root'] + ')' if settings['target'] == 'parquet' else ''}")
             
             if records_to_archive == 0:
                 self.log("No records to archive", 'info')
-                return {'records_archived': 0}
+                return {'records_archived': 0, 'success': True}
             
             if not execute:
                 print(f"\n⚠️  DRY RUN MODE - No records will be archived")
                 print(f"   Use --execute flag to actually archive records\n")
                 return {'records_archived': 0, 'dry_run': True}
             
-            # Create archive table
-            if not self.create_archive_table():
-                return {'success': False, 'error': 'Failed to create archive table'}
-            
-            # Archive records in batches
             self.log("Starting archive process...", 'info')
-            batch_size = 10000
-            total_archived = 0
-            
-            while total_archived < records_to_archive:
-                # Insert to archive
-                archive_query = """
-                    INSERT INTO time_attendance_archive 
-                    SELECT * FROM time_attendance 
-                    WHERE attendance_date < :cutoff_date 
-                    LIMIT :batch_size
-                """
-                
-                db.session.execute(
-                    text(archive_query),
-                    {'cutoff_date': cutoff_date.date(), 'batch_size': batch_size}
-                )
-                
-                # Delete from main table
-                delete_query = """
-                    DELETE FROM time_attendance 
-                    WHERE attendance_date < :cutoff_date 
-                    LIMIT :batch_size
-                """
-                
-                result = db.session.execute(
-                    text(delete_query),
-                    {'cutoff_date': cutoff_date.date(), 'batch_size': batch_size}
-                )
-                
-                rows_affected = result.rowcount
-                
-                if rows_affected == 0:
-                    break
-                
-                db.session.commit()
-                total_archived += rows_affected
-                
-                self.log(f"Archived {total_archived:,} / {records_to_archive:,} records...", 'info')
-                
-                # Safety limit
-                if total_archived >= 100000:
-                    self.log("Reached safety limit of 100,000 records per run", 'warning')
-                    break
+            result = archive_time_attendance(
+                db, cutoff_date, logger=self.logger,
+                progress=lambda p: self.log(f"Archived {p['deleted']:,} / {records_to_archive:,} records...", 'info'),
+                **settings
+            )
             
-            self.log(f"Archive complete: {total_archived:,} records archived", 'success')
-            return {'records_archived': total_archived, 'success': True}
+            if result['complete']:
+                self.log(f"Archive complete: {result['deleted']:,} records archived", 'success')
+            else:
+                self.log(f"Archive paused after {result['deleted']:,} records; "
+                         f"the next run resumes where this one stopped", 'warning')
+            return {
+                'records_archived': result['deleted'], 'total_archived': result['total_deleted'],
+                'complete': result['complete'], 'resumed': result['resumed'],
+                'target': result['target'], 'success': True,
+            }
             
         except Exception as e:
             self.log(f"Error during archive: {e}", 'error')
             db.session.rollback()
             return {'success': False, 'error': str(e)}
     
-    def cleanup_old_records(self, days=90, execute=False):
-        """Delete records older than specified days"""
+    def cleanup_old_records(self, days=90, execute=False, max_seconds=None):
+        """Delete records older than specified days, in resumable key-range chunks"""
         self.log(f"Cleanup process for records older than {days} days...", 'info')
         
         cutoff_date = datetime.now() - timedelta(days=days)
@@ -388,6 +366,7 @@ class TimeAttendanceOptimizer:
                 text(count_query),
                 {'cutoff_date': cutoff_date}
             ).fetchone()
+            db.session.commit()
             
             records_to_delete = result.count if result else 0
             
@@ -404,21 +383,25 @@ class TimeAttendanceOptimizer:
                 print(f"   Use --execute flag to actually delete records\n")
                 return {'records_deleted': 0, 'dry_run': True}
             
-            # Delete records
-            delete_query = """
-                DELETE FROM time_attendance 
-                WHERE import_date < :cutoff_date
-            """
-            
             self.log("Deleting old records...", 'info')
-            db.session.execute(
-                text(delete_query),
-                {'cutoff_date': cutoff_date}
-            )
-            db.session.commit()
-            
-            self.log(f"Cleanup complete: {records_to_delete:,} records deleted", 'success')
-            return {'records_deleted': records_to_delete, 'success': True}
+            from ta_archive import archive_settings
+            settings = archive_settings(current_app)
+            if max_seconds is not None:
+                settings['max_seconds'] = max_seconds or None
+            result = ChunkedPurge(
+                # Whole day: the cutoff (and the resumable signature) stays put during the day
+                db, 'time_attendance', where="import_date < :cutoff", params={'cutoff': cutoff_date.date()},
+                name='ta_cleanup', batch_size=settings['batch_size'],
+                sleep_seconds=settings['sleep_seconds'], sleep_ratio=settings['sleep_ratio'],
+                max_seconds=settings['max_seconds'], logger=self.logger
+            ).run()
+            
+            if result['complete']:
+                self.log(f"Cleanup complete: {result['deleted']:,} records deleted", 'success')
+            else:
+                self.log(f"Cleanup paused after {result['deleted']:,} records; "
+                         f"run it again to continue", 'warning')
+            return {'records_deleted': result['deleted'], 'complete': result['complete'], 'success': True}
             
         except Exception as e:
             self.log(f"Error during cleanup: {e}", 'error')
@@ -511,6 +494,7 @@ Examples:
   %(prog)s --action analyze               # Analyze table statistics
   %(prog)s --action archive --days 365    # Archive records older than 365 days (dry run)
   %(prog)s --action archive --days 365 --execute  # Actually archive records
+  %(prog)s --action archive --days 365 --execute --target parquet --max-seconds 600
   %(prog)s --action cleanup --days 90 --execute   # Delete records older than 90 days
   %(prog)s --action report                # Generate optimization report
   %(prog)s --action all                   # Run full optimization (indexes + analyze + optimize)
@@ -537,6 +521,19 @@ Examples:
         help='Actually execute archive/cleanup (otherwise dry run)'
     )
     
+    parser.add_argument(
+        '--target',
+        choices=['table', 'parquet'],
+        help='Archive destination (default: TA_ARCHIVE_TARGET)'
+    )
+    
+    parser.add_argument(
+        '--max-seconds',
+        type=float,
+        help='Stop archive/cleanup after this many seconds; the next run resumes '
+             '(default: TA_ARCHIVE_MAX_SECONDS, 0 = no limit)'
+    )
+    
     parser.add_argument(
         '--quiet',
         action='store_true',
@@ -545,6 +542,8 @@ Examples:
     
     args = parser.parse_args()
     
+    from app import app
+
     # Create optimizer instance
     optimizer = TimeAttendanceOptimizer(verbose=not args.quiet)
     
@@ -568,10 +567,12 @@ Examples:
                 optimizer.analyze_table()
             
             elif args.action == 'archive':
-                optimizer.archive_old_records(days=args.days, execute=args.execute)
+                optimizer.archive_old_records(days=args.days, execute=args.execute,
+                                              target=args.target, max_seconds=args.max_seconds)
             
             elif args.action == 'cleanup':
-                optimizer.cleanup_old_records(days=args.days, execute=args.execute)
+                optimizer.cleanup_old_records(days=args.days, execute=args.execute,
+                                              max_seconds=args.max_seconds)
             
             elif args.action == 'report':
                 optimizer.generate_report()
@@ -0,0 +1,352 @@
+"""
+utils/chunked_purge.py
+======================
+Retention deletes in small primary-key ranges.
+
+A single ``DELETE FROM log_events WHERE created_timestamp < :cutoff`` on a
+table with tens of millions of rows holds its locks and grows the undo log
+for minutes, stalling every request that writes a log event.
+``ChunkedPurge`` deletes the same rows one key range at a time:
+
+  - the key range to visit is fixed up front (MIN/MAX of the key among
+    matching rows), so rows inserted during the purge are never touched;
+  - each chunk covers at most ``batch_size`` existing keys and is its own
+    short transaction (``DELETE ... WHERE key > :last AND key <= :upper
+    AND <condition>``);
+  - ``sleep_seconds`` between chunks leaves the table to other writers and
+    ``max_seconds`` caps one call, so an HTTP request can do a bounded
+    slice of the work;
+  - with a ``name``, progress (last key, rows deleted) is kept in
+    ``purge_progress`` after every chunk, so a purge interrupted by a time
+    budget, timeout or restart resumes where it stopped when the same
+    purge (same table, condition and parameters) runs again.
+
+An ``archiver`` turns the purge into a move: its ``copy()`` writes the
+chunk's rows elsewhere (``CopyToTable``: ``INSERT ... SELECT`` into an
+archive table) in the same transaction as the DELETE, which is rolled back
+unless both touched the same number of rows.  On MySQL the chunk's rows
+are locked first (``SELECT ... FOR UPDATE``), so nothing changes between
+the copy and the delete.
+
+Throttling: ``sleep_ratio`` adds a pause proportional to how long the
+chunk took, and a ``throttle`` callable (``ReplicaLagThrottle``) is asked
+before every chunk whether to go on or pause.
+"""
+
+import json
+import time
+from datetime import datetime
+
+from sqlalchemy import BigInteger, Column, DateTime, Double, MetaData, String, Table, Text, text
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.pool import NullPool
+
+DEFAULT_BATCH_SIZE = 5000
+
+_metadata = MetaData()
+
+purge_progress_table = Table(
+    'purge_progress', _metadata,
+    Column('name', String(100), primary_key=True),
+    Column('signature', Text, nullable=False),
+    Column('status', String(20), nullable=False),       # running / paused / done
+    Column('low_key', String(255)),
+    Column('high_key', String(255)),
+    Column('last_key', String(255)),
+    Column('deleted', BigInteger, nullable=False, default=0),
+    Column('elapsed_seconds', Double, nullable=False, default=0),
+    Column('updated_at', DateTime, nullable=False),
+)
+
+_tables_ready = set()
+
+
+class ChunkedPurge:
+    """Delete ``table`` rows matching ``where`` in key-range chunks."""
+
+    def __init__(self, db, table, where='1=1', params=None, key='id', name=None,
+                 batch_size=DEFAULT_BATCH_SIZE, sleep_seconds=0.0, max_seconds=None,
+                 logger=None, progress=None, archiver=None, sleep_ratio=0.0, throttle=None):
+        """
+        Args:
+            db: Flask-SQLAlchemy instance (needs an app context)
+            table: Table to purge (trusted identifier, never user input)
+            where: SQL condition selecting the rows to delete
+            params: Bind parameters for ``where``
+            key: Indexed unique key to walk (the primary key)
+            name: Progress name; enables resuming and status reporting
+            batch_size: Keys visited per chunk / transaction
+            sleep_seconds: Pause between chunks
+            max_seconds: Stop (resumable) after this long; None = run to the end
+            logger: Logger for start / finish messages
+            progress: Optional callback(dict) after every chunk
+            archiver: Optional copy target for the rows (see CopyToTable)
+            sleep_ratio: Extra pause, as a multiple of the chunk's duration
+            throttle: Optional callable() -> bool before every chunk;
+                      False pauses the purge (resumable)
+        """
+        self.db = db
+        self.table = table
+        self.where = where
+        self.params = dict(params or {})
+        self.key = key
+        self.name = name
+        self.batch_size = max(int(batch_size), 1)
+        self.sleep_seconds = sleep_seconds
+        self.max_seconds = max_seconds
+        self.logger = logger
+        self.progress = progress
+        self.archiver = archiver
+        self.sleep_ratio = sleep_ratio
+        self.throttle = throttle
+
+    @property
+    def signature(self):
+        parts = [self.table, self.key, self.where, self.params]
+        if self.archiver:
+            parts.append(self.archiver.target)
+        return json.dumps(parts, default=str, sort_keys=True)
+
+    def _engine(self):
+        engine = self.db.engine
+        if engine.url not in _tables_ready:
+            _metadata.create_all(bind=engine, checkfirst=True)
+            _tables_ready.add(engine.url)
+        return engine
+
+    # ------------------------------------------------------------------
+    # Progress state
+    # ------------------------------------------------------------------
+
+    def _load_state(self):
+        if not self.name:
+            return None
+        with self._engine().connect() as conn:
+            row = conn.execute(
+                select(purge_progress_table).where(purge_progress_table.c.name == self.name)
+            ).first()
+        if row is None or row.signature != self.signature or row.status == 'done':
+            return None
+        return row
+
+    def _save_state(self, status, low, high, last, deleted, elapsed):
+        if not self.name:
+            return
+        values = {
+            'signature': self.signature, 'status': status,
+            'low_key': None if low is None else str(low),
+            'high_key': None if high is None else str(high),
+            'last_key': None if last is None else str(last),
+            'deleted': deleted, 'elapsed_seconds': round(elapsed, 3),
+            'updated_at': datetime.now(),
+        }
+        table = purge_progress_table
+        with self._engine().begin() as conn:
+            if not conn.execute(update(table).where(table.c.name == self.name).values(**values)).rowcount:
+                conn.execute(insert(table).values(name=self.name, **values))
+
+    def _key_value(self, stored, reference):
+        """Restore a stored key to the key column's Python type."""
+        if stored is None or isinstance(reference, str):
+            return stored
+        return type(reference)(stored)
+
+    # ------------------------------------------------------------------
+    # Purge
+    # ------------------------------------------------------------------
+
+    def _bounds(self, conn):
+        row = conn.execute(
+            text(f"SELECT MIN({self.key}) AS low, MAX({self.key}) AS high FROM {self.table} WHERE {self.where}"),
+            self.params
+        ).first()
+        return (row.low, row.high) if row else (None, None)
+
+    def _lower_clause(self, last):
+        """Keys after the previous chunk (or from the first matching key)."""
+        return f"{self.key} > :last" if last is not None else f"{self.key} >= :low"
+
+    def _chunk_upper(self, conn, low, last, high):
+        """The batch_size-th key of the next chunk (capped at *high*)."""
+        upper = conn.execute(
+            text(f"SELECT {self.key} FROM {self.table} WHERE {self._lower_clause(last)} "
+                 f"ORDER BY {self.key} LIMIT 1 OFFSET :skip"),
+            {'low': low, 'last': last, 'skip': self.batch_size - 1}
+        ).scalar()
+        return high if upper is None or upper > high else upper
+
+    def _delete_chunk(self, conn, range_sql, params):
+        """Delete (and archive) one chunk; returns the rows deleted."""
+        if self.archiver is None:
+            return conn.execute(text(f"DELETE FROM {self.table} WHERE {range_sql}"), params).rowcount
+        if conn.dialect.name == 'mysql':
+            conn.execute(text(f"SELECT {self.key} FROM {self.table} WHERE {range_sql} FOR UPDATE"), params)
+        copied = self.archiver.copy(conn, self.table, self.key, range_sql, params)
+        deleted = conn.execute(text(f"DELETE FROM {self.table} WHERE {range_sql}"), params).rowcount
+        if copied != deleted:
+            raise RuntimeError(f"{self.table}: archived {copied} row(s) but deleted {deleted}; chunk rolled back")
+        return deleted
+
+    def run(self):
+        """
+        Delete (the next slice of) the matching rows.
+
+        Returns:
+            dict: deleted (this call), total_deleted (including resumed
+                  slices), chunks, complete, resumed, elapsed_seconds
+        """
+        started = time.perf_counter()
+        state = self._load_state()
+        engine = self._engine()
+
+        with engine.connect() as conn:
+            low, high = self._bounds(conn)
+        resumed = state is not None and high is not None
+        previous_deleted, previous_elapsed, last = 0, 0.0, None
+        if resumed:
+            # Keep the original upper bound: later rows are not ours to delete
+            high = self._key_value(state.high_key, high)
+            last = self._key_value(state.last_key, high)
+            previous_deleted, previous_elapsed = state.deleted, state.elapsed_seconds
+        elif high is not None and self.logger:
+            self.logger.info(f"Purging {self.table} ({self.where}) keys {low}..{high}"
+                             f"{f' as {self.name}' if self.name else ''}")
+
+        deleted, chunks, complete = 0, 0, True
+        while high is not None and (last is None or last < high):
+            if self.throttle and not self.throttle():
+                complete = False
+                break
+            chunk_started = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    upper = self._chunk_upper(conn, low, last, high)
+                    deleted += self._delete_chunk(
+                        conn,
+                        f"{self._lower_clause(last)} AND {self.key} <= :upper AND ({self.where})",
+                        {**self.params, 'low': low, 'last': last, 'upper': upper}
+                    )
+            except Exception:
+                if self.archiver:
+                    self.archiver.rolled_back()
+                raise
+            if self.archiver:
+                self.archiver.committed()
+            last, chunks = upper, chunks + 1
+            elapsed = time.perf_counter() - started
+            if last >= high:
+                break
+            if self.max_seconds is not None and elapsed >= self.max_seconds:
+                complete = False
+                break
+            self._save_state('running', low, high, last, previous_deleted + deleted, previous_elapsed + elapsed)
+            if self.progress:
+                self.progress({'table': self.table, 'deleted': previous_deleted + deleted,
+                               'last_key': last, 'high_key': high})
+            pause = self.sleep_seconds + self.sleep_ratio * (time.perf_counter() - chunk_started)
+            if pause:
+                time.sleep(pause)
+
+        elapsed = time.perf_counter() - started
+        self._save_state('done' if complete else 'paused', low, high, last,
+                         previous_deleted + deleted, previous_elapsed + elapsed)
+        result = {
+            'deleted': deleted, 'total_deleted': previous_deleted + deleted, 'chunks': chunks,
+            'complete': complete, 'resumed': resumed, 'elapsed_seconds': round(elapsed, 3),
+        }
+        if self.logger and chunks:
+            self.logger.info(
+                f"Purge of {self.table} {'finished' if complete else 'paused'}: "
+                f"{deleted} row(s) deleted in {chunks} chunk(s), {result['elapsed_seconds']}s"
+            )
+        return result
+
+
+class CopyToTable:
+    """Archiver for ChunkedPurge: copy each chunk into *table* (same columns)."""
+
+    def __init__(self, table):
+        self.table = table
+        self.target = f"table:{table}"
+
+    def copy(self, conn, source, key, range_sql, params):
+        return conn.execute(
+            text(f"INSERT INTO {self.table} SELECT * FROM {source} WHERE {range_sql}"), params
+        ).rowcount
+
+    def committed(self):
+        pass
+
+    def rolled_back(self):
+        pass
+
+
+class ReplicaLagThrottle:
+    """
+    ChunkedPurge throttle: wait while a MySQL replica is more than
+    *max_lag* seconds behind, so large purges don't outrun replication.
+    Gives up (pausing the purge) after *max_wait* seconds.
+    """
+
+    def __init__(self, replica_urls, max_lag=10.0, poll_seconds=2.0, max_wait=300.0, logger=None):
+        self.engines = [create_engine(url, poolclass=NullPool) for url in replica_urls if url]
+        self.max_lag = max_lag
+        self.poll_seconds = poll_seconds
+        self.max_wait = max_wait
+        self.logger = logger
+
+    def _replica_lag(self, engine):
+        """Seconds behind the source; None while replication is stopped."""
+        with engine.connect() as conn:
+            try:
+                row = conn.exec_driver_sql("SHOW REPLICA STATUS").mappings().first()
+                column = 'Seconds_Behind_Source'
+            except Exception:
+                # MySQL < 8.0.22
+                row = conn.exec_driver_sql("SHOW SLAVE STATUS").mappings().first()
+                column = 'Seconds_Behind_Master'
+        if row is None:
+            if self.logger:
+                self.logger.warning(f"{engine.url.host} is not a replica; ignoring it for lag checks")
+            return 0
+        return row[column]
+
+    def lag(self):
+        """Largest lag over the replicas (None if one is stopped or unreachable)."""
+        worst = 0
+        for engine in self.engines:
+            try:
+                lag = self._replica_lag(engine)
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning(f"Replica lag check on {engine.url.host} failed: {e}")
+                return None
+            if lag is None:
+                return None
+            worst = max(worst, lag)
+        return worst
+
+    def __call__(self):
+        waited = 0.0
+        while True:
+            lag = self.lag()
+            if lag is not None and lag <= self.max_lag:
+                return True
+            if waited >= self.max_wait:
+                if self.logger:
+                    self.logger.warning(f"Replica lag {'unknown' if lag is None else f'{lag}s'} "
+                                        f"(limit {self.max_lag}s) after waiting {waited:.1f}s; pausing purge")
+                return False
+            time.sleep(self.poll_seconds)
+            waited += self.poll_seconds
+
+
+def purge_status(db, name):
+    """Stored progress of the purge called *name* (dict), or None."""
+    engine = db.engine
+    if engine.url not in _tables_ready:
+        _metadata.create_all(bind=engine, checkfirst=True)
+        _tables_ready.add(engine.url)
+    with engine.connect() as conn:
+        row = conn.execute(select(purge_progress_table).where(purge_progress_table.c.name == name)).first()
+    return dict(row._mapping) if row else None
@@ -0,0 +1,128 @@
+"""
+utils/employee_keys.py
+======================
+Employee ID parsing shared by the models, calculators and reports.
+
+Check-in and time attendance rows store the raw employee_id string, which
+may carry a work type code ("1234 SP", "PW1234", ...).  The parsed parts
+are persisted on write as ``base_employee_id`` (BIGINT, joins
+``employee.id``) and ``work_type`` so reports join and group on an indexed
+integer instead of ``CAST(employee_id AS UNSIGNED)`` and calculators stop
+re-running the regexes for every record.
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+WORK_TYPES = ('SP', 'PW', 'PT')
+
+# "1234 SP", "1234SP", "SP 1234", "SP1234" (any of SP/PW/PT)
+_SUFFIX_RE = re.compile(r'^(\d+)\s*(SP|PW|PT)$')
+_PREFIX_RE = re.compile(r'^(SP|PW|PT)\s*(\d+)$')
+
+
+@lru_cache(maxsize=65536)
+def parse_employee_id_for_work_type(employee_id: str) -> Tuple[str, str]:
+    """
+    Parse employee ID to extract base ID and work type (supports SP, PW, PT)
+
+    Handles multiple formats:
+    - Suffix with space: "1234 SP", "1234 PW", "1234 PT"
+    - Suffix without space: "1234SP", "1234PW", "1234PT"
+    - Prefix with space: "SP 1234", "PW 1234", "PT 1234"
+    - Prefix without space: "SP1234", "PW1234", "PT1234"
+
+    Args:
+        employee_id: Employee ID string in any of the above formats
+
+    Returns:
+        Tuple of (base_employee_id, work_type)
+        work_type is one of: 'regular', 'SP', 'PW', 'PT'
+    """
+    if not employee_id:
+        return str(employee_id), 'regular'
+
+    employee_id_clean = str(employee_id).strip().upper()
+
+    match = _SUFFIX_RE.match(employee_id_clean)
+    if match:
+        return match.group(1), match.group(2)
+
+    match = _PREFIX_RE.match(employee_id_clean)
+    if match:
+        return match.group(2), match.group(1)
+
+    # Default to regular work
+    return employee_id_clean, 'regular'
+
+
+def employee_key_columns(employee_id) -> Tuple[Optional[int], str]:
+    """
+    (base_employee_id, work_type) column values for a raw employee_id.
+
+    base_employee_id is None when the base part is not numeric (such rows
+    never matched an employee through the old CAST join either).
+    """
+    base_id, work_type = parse_employee_id_for_work_type(employee_id)
+    return (int(base_id) if base_id.isdigit() else None), work_type
+
+
+def record_employee_key(record, employee_id=None) -> Tuple[str, str]:
+    """
+    (base id string, work type) of an attendance/time attendance record.
+
+    Uses the persisted ``base_employee_id`` / ``work_type`` columns when the
+    record has them and falls back to parsing ``employee_id`` (dict records,
+    rows written before the backfill).  Numeric base ids are normalised
+    through int so both paths produce the same key.
+    """
+    base_id = getattr(record, 'base_employee_id', None)
+    work_type = getattr(record, 'work_type', None)
+    if base_id is not None and work_type:
+        return str(base_id), work_type
+    if employee_id is None:
+        employee_id = record.get('employee_id', '') if isinstance(record, dict) else getattr(record, 'employee_id', '')
+    return normalize_employee_key(employee_id)
+
+
+def normalize_employee_key(employee_id) -> Tuple[str, str]:
+    """parse_employee_id_for_work_type() with numeric base ids normalised through int."""
+    base_id, work_type = parse_employee_id_for_work_type(str(employee_id).strip())
+    if base_id.isdigit():
+        base_id = str(int(base_id))
+    return base_id, work_type
+
+
+def lookup_employee_names(employee_ids, last_first=False):
+    """
+    {employee_id: full name} for raw attendance employee IDs ("1234",
+    "1234 SP", ...), looked up by primary key on the employee table.
+
+    Args:
+        employee_ids: Raw or base employee IDs; each is returned as given.
+        last_first: "Last,First" instead of "First Last".
+    """
+    from sqlalchemy import bindparam, text
+    from extensions import db
+
+    ids_by_base = {}
+    for emp_id in employee_ids:
+        base_id, _ = employee_key_columns(emp_id)
+        if base_id is not None:
+            ids_by_base.setdefault(base_id, []).append(str(emp_id))
+    if not ids_by_base:
+        return {}
+
+    name_sql = "CONCAT(lastName, ',', firstName)" if last_first else "CONCAT(firstName, ' ', lastName)"
+    rows = db.session.execute(
+        text(f"SELECT id, {name_sql} AS full_name FROM employee WHERE id IN :ids")
+        .bindparams(bindparam('ids', expanding=True)),
+        {'ids': list(ids_by_base)}
+    )
+    names = {}
+    for base_id, full_name in rows:
+        if full_name:  # Only add if we got a name
+            for emp_id in ids_by_base.get(base_id, ()):
+                names[emp_id] = full_name
+    return names
@@ -0,0 +1,226 @@
+"""
+utils/excel_stream.py
+=====================
+Streaming (write-only) Excel engine for large exports.
+
+The Time Attendance exports address cells as ``ws.cell(row=, column=,
+value=)`` and style them one attribute at a time.  ``StreamingSheet``
+accepts that same subset of the openpyxl Worksheet API but never holds
+more than one row in memory:
+
+  1. Each completed row is spooled to a temporary file as
+     ``(row_idx, [(col, value, style_id), ...])``.  Styles are interned,
+     so a row costs a few integers per cell instead of four style objects.
+  2. Column widths (max cell text length) are tracked while spooling,
+     because a write-only worksheet must receive its column dimensions
+     before the first row.
+  3. ``save()`` replays the spool into ``Workbook(write_only=True)`` with
+     ``WriteOnlyCell`` objects that share one pre-built StyleArray per
+     interned style, then writes the .xlsx to a temp file on disk.
+
+``send_workbook_file()`` streams that file back with ``send_file`` and
+removes it once the response is closed.
+"""
+
+import os
+import pickle
+import tempfile
+from copy import copy
+
+from flask import send_file
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+_STYLE_ATTRS = ('font', 'fill', 'border', 'alignment')
+
+
+class _SpooledCell:
+    """Minimal stand-in for an openpyxl Cell while its row is still open."""
+
+    __slots__ = ('value', 'font', 'fill', 'border', 'alignment')
+
+    def __init__(self, value=None):
+        self.value = value
+        self.font = None
+        self.fill = None
+        self.border = None
+        self.alignment = None
+
+
+class _ColumnDimension:
+    __slots__ = ('width',)
+
+    def __init__(self):
+        self.width = None
+
+
+class StreamingSheet:
+    """
+    Row-at-a-time worksheet writer backed by a disk spool.
+
+    Rows must be written in non-decreasing order (all TA export loops
+    advance ``current_row`` monotonically); writing to a row that has
+    already been flushed raises ``ValueError``.
+    """
+
+    def __init__(self, title='Sheet0'):
+        self.title = title
+        self.merged_ranges = []
+        self.column_dimensions = _KeyedDimensions()
+        self._max_lengths = {}
+        self._styles = {}          # style tuple -> style_id
+        self._row_idx = None
+        self._row_cells = {}
+        self._flushed_row = 0
+        self._spool = tempfile.TemporaryFile()
+
+    # -- Worksheet API subset ------------------------------------------------
+
+    def cell(self, row, column, value=None):
+        """Return the cell at (row, column), flushing earlier rows."""
+        if row != self._row_idx:
+            if row <= self._flushed_row:
+                raise ValueError(
+                    f"StreamingSheet rows are append-only: row {row} was already written"
+                )
+            self._flush_row()
+            self._row_idx = row
+        cell = self._row_cells.get(column)
+        if cell is None:
+            cell = self._row_cells[column] = _SpooledCell()
+        if value is not None:
+            cell.value = value
+        return cell
+
+    def merge_cells(self, range_string):
+        self.merged_ranges.append(range_string)
+
+    def max_length(self, column):
+        """Longest ``str(value)`` written to *column* (0 if none)."""
+        return self._max_lengths.get(column, 0)
+
+    # -- Internals -----------------------------------------------------------
+
+    def _style_id(self, cell):
+        key = tuple(getattr(cell, attr) for attr in _STYLE_ATTRS)
+        if key == (None, None, None, None):
+            return None
+        style_id = self._styles.get(key)
+        if style_id is None:
+            style_id = self._styles[key] = len(self._styles)
+        return style_id
+
+    def _flush_row(self):
+        if self._row_idx is None:
+            return
+        packed = []
+        for col in sorted(self._row_cells):
+            cell = self._row_cells[col]
+            if cell.value:
+                length = len(str(cell.value))
+                if length > self._max_lengths.get(col, 0):
+                    self._max_lengths[col] = length
+            packed.append((col, cell.value, self._style_id(cell)))
+        pickle.dump((self._row_idx, packed), self._spool, pickle.HIGHEST_PROTOCOL)
+        self._flushed_row = self._row_idx
+        self._row_idx = None
+        self._row_cells = {}
+
+    def _iter_spooled_rows(self):
+        self._spool.seek(0)
+        while True:
+            try:
+                yield pickle.load(self._spool)
+            except EOFError:
+                return
+
+    def save(self, path):
+        """Replay the spool into a write-only workbook saved at *path*."""
+        self._flush_row()
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(self.title)
+        for letter, dim in self.column_dimensions.items():
+            if dim.width is not None:
+                ws.column_dimensions[letter].width = dim.width
+        for range_string in self.merged_ranges:
+            ws.merged_cells.add(range_string)
+
+        # One StyleArray per interned style; every cell copies it instead of
+        # re-resolving font/fill/border/alignment against the workbook.
+        shared_styles = {}
+        for key, style_id in self._styles.items():
+            probe = WriteOnlyCell(ws)
+            for attr, style in zip(_STYLE_ATTRS, key):
+                if style is not None:
+                    setattr(probe, attr, style)
+            shared_styles[style_id] = probe._style
+
+        next_row = 1
+        for row_idx, packed in self._iter_spooled_rows():
+            while next_row < row_idx:
+                ws.append([])
+                next_row += 1
+            row = [None] * (packed[-1][0] if packed else 0)
+            for col, value, style_id in packed:
+                out = WriteOnlyCell(ws, value=value)
+                if style_id is not None:
+                    out._style = copy(shared_styles[style_id])
+                row[col - 1] = out
+            ws.append(row)
+            next_row += 1
+
+        wb.save(path)
+        self._spool.close()
+
+
+class _KeyedDimensions(dict):
+    """``ws.column_dimensions['B'].width = n`` without openpyxl's holder."""
+
+    def __missing__(self, key):
+        dim = self[key] = _ColumnDimension()
+        return dim
+
+
+def autosize_columns(ws, max_col=14, first_col_width=18, cap=50):
+    """Apply the TA export column widths from a StreamingSheet's tracked lengths."""
+    for col_idx in range(1, max_col + 1):
+        column_letter = get_column_letter(col_idx)
+        if col_idx == 1:
+            ws.column_dimensions[column_letter].width = first_col_width
+            continue
+        ws.column_dimensions[column_letter].width = min(ws.max_length(col_idx) + 2, cap)
+
+
+def save_to_temp_file(ws, suffix='.xlsx'):
+    """Save *ws* to a new temp file and return its path."""
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix='export_')
+    os.close(fd)
+    try:
+        ws.save(path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def send_workbook_file(path, download_name, mimetype=XLSX_MIMETYPE):
+    """Stream an export file from disk and delete it after the response closes."""
+    response = send_file(
+        path,
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=download_name
+    )
+
+    def _cleanup():
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    response.call_on_close(_cleanup)
+    return response
@@ -0,0 +1,181 @@
+"""
+utils/flat_export.py
+====================
+Streaming CSV, NDJSON and Parquet exports for flat row extracts.
+
+Excel is the right format for the formatted reports people read, but
+payroll integration and bulk extracts only need flat rows.  These helpers
+read the source query through a server-side cursor
+(``stream_results`` + ``yield_per``) and emit it chunk by chunk, so a
+million-row extract runs in memory proportional to ``chunk_size``:
+
+  - CSV and NDJSON are yielded straight into a streaming ``Response``,
+    gzip-compressed on the fly when the client accepts it.
+  - Parquet (optional, needs ``pyarrow``) writes one row group per chunk
+    to a temp file, because the Parquet footer can only be written once
+    all row groups are known; the file is then streamed from disk.
+
+Columns are declared as ``(header, type)`` pairs where type is one of
+'string', 'int64', 'float64' — CSV ignores the type, Parquet uses it as
+the column schema.
+"""
+
+import csv
+import io
+import json
+import os
+import tempfile
+import zlib
+
+from flask import Response, request, stream_with_context
+
+from extensions import db
+from utils.excel_stream import send_workbook_file
+
+DEFAULT_CHUNK_SIZE = 5000
+FLAT_FORMATS = ('csv', 'parquet')
+
+CSV_MIMETYPE = 'text/csv'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    pa = None
+    pq = None
+    PARQUET_AVAILABLE = False
+
+
+def iter_row_chunks(statement, params=None, chunk_size=DEFAULT_CHUNK_SIZE, session=None):
+    """
+    Execute *statement* (``text()`` or ``select()``; pass ``query.statement``
+    for ORM queries) on a server-side cursor and return an iterator over
+    lists of rows.
+
+    The statement runs immediately, so SQL errors surface in the view
+    (where they can still become an error response) rather than halfway
+    through a streamed download.
+    """
+    session = session or db.session
+    result = session.execute(
+        statement.execution_options(stream_results=True, yield_per=chunk_size),
+        params or {}
+    )
+    return _iter_partitions(result, chunk_size)
+
+
+def _iter_partitions(result, chunk_size):
+    try:
+        for partition in result.partitions(chunk_size):
+            yield partition
+    finally:
+        result.close()
+
+
+def iter_csv(columns, chunks, row_fn):
+    """Yield CSV text: the header line, then one string per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in columns])
+    yield buffer.getvalue()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(row_fn(row) for row in chunk)
+        yield buffer.getvalue()
+
+
+def iter_ndjson(chunks, record_fn):
+    """Yield NDJSON text, one string per chunk (one object per line)."""
+    for chunk in chunks:
+        yield ''.join(json.dumps(record_fn(row), default=str) + '\n' for row in chunk)
+
+
+def iter_gzip(pieces, level=6):
+    """Gzip a stream of str / bytes pieces incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for piece in pieces:
+        data = compressor.compress(piece.encode('utf-8') if isinstance(piece, str) else piece)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_download(pieces, filename, mimetype):
+    """
+    Streaming attachment response for *pieces* (an iterator of str).
+
+    The body is gzipped on the fly (``Content-Encoding: gzip``) when the
+    client accepts it; the browser still saves *filename* uncompressed.
+    """
+    headers = {
+        'Content-Disposition': f'attachment; filename={filename}',
+        'X-Accel-Buffering': 'no',   # Let nginx pass chunks through
+        'Vary': 'Accept-Encoding',
+    }
+    if request.accept_encodings['gzip'] > 0:
+        pieces = iter_gzip(pieces)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(pieces), mimetype=mimetype, headers=headers)
+
+
+def _arrow_schema(columns):
+    types = {'string': pa.string(), 'int64': pa.int64(), 'float64': pa.float64()}
+    return pa.schema([(header, types[type_name]) for header, type_name in columns])
+
+
+def _coerce(value, type_name):
+    if value is None or value == '':
+        return None
+    if type_name == 'string':
+        return str(value)
+    try:
+        return int(value) if type_name == 'int64' else float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def write_parquet(path, columns, chunks, row_fn):
+    """Write chunks as Parquet row groups to *path*; return the row count."""
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+    schema = _arrow_schema(columns)
+    type_names = [type_name for _, type_name in columns]
+    total = 0
+    with pq.ParquetWriter(path, schema, compression='snappy') as writer:
+        for chunk in chunks:
+            rows = [row_fn(row) for row in chunk]
+            arrays = [
+                pa.array([_coerce(r[i], type_name) for r in rows], type=schema.field(i).type)
+                for i, type_name in enumerate(type_names)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            total += len(rows)
+    return total
+
+
+def flat_export_response(export_format, columns, chunks, row_fn, filename_base):
+    """
+    Build the download response for a flat export.
+
+    Args:
+        export_format: 'csv' or 'parquet'.
+        columns: [(header, type), ...].
+        chunks: iterable of row lists (usually ``iter_row_chunks(...)``).
+        row_fn: maps one source row to a list of values in column order.
+        filename_base: download name without extension.
+    """
+    if export_format == 'parquet':
+        fd, path = tempfile.mkstemp(suffix='.parquet', prefix='export_')
+        os.close(fd)
+        try:
+            write_parquet(path, columns, chunks, row_fn)
+        except Exception:
+            os.remove(path)
+            raise
+        return send_workbook_file(path, f"{filename_base}.parquet", mimetype=PARQUET_MIMETYPE)
+
+    return stream_download(iter_csv(columns, chunks, row_fn), f"{filename_base}.csv", CSV_MIMETYPE)
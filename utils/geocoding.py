@@ -18,6 +18,7 @@ import googlemaps
 
 from extensions import db, logger_handler
 from address_normalization_fix import normalize_address, addresses_are_similar
+from metrics import track_geocoder
 
 # ---------------------------------------------------------------------------
 # Google Maps client (initialized once at module import)
@@ -44,6 +45,27 @@ def is_gmaps_available():
     """
     return gmaps_client is not None
 
+def _google_geocode(address):
+    """gmaps_client.geocode() with call metrics."""
+    with track_geocoder('google', 'geocode'):
+        return gmaps_client.geocode(address)
+
+
+def _google_reverse_geocode(latitude, longitude):
+    """gmaps_client.reverse_geocode() with call metrics."""
+    with track_geocoder('google', 'reverse'):
+        return gmaps_client.reverse_geocode((latitude, longitude))
+
+
+def _nominatim_get(url, params, headers, operation):
+    """GET a Nominatim endpoint with call metrics."""
+    with track_geocoder('nominatim', operation) as call:
+        response = requests.get(url, params=params, headers=headers, timeout=10)
+        if response.status_code != 200:
+            call['outcome'] = 'http_error'
+        return response
+
+
 # ---------------------------------------------------------------------------
 # Geocoding cache
 # ---------------------------------------------------------------------------
@@ -112,7 +134,7 @@ def get_coordinates_from_address(address):
     try:
         if gmaps_client:
             print("🗺️ Using Google Maps Geocoding API")
-            geocode_result = gmaps_client.geocode(address)
+            geocode_result = _google_geocode(address)
             if geocode_result:
                 location = geocode_result[0]['geometry']['location']
                 lat = location['lat']
@@ -130,7 +152,7 @@ def get_coordinates_from_address(address):
         url = "https://nominatim.openstreetmap.org/search"
         params = {'q': address, 'format': 'json', 'limit': 1, 'addressdetails': 1}
         headers = {'User-Agent': 'QR-Attendance-System/1.0'}
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = _nominatim_get(url, params, headers, 'geocode')
 
         if response.status_code == 200:
             data = response.json()
@@ -185,7 +207,7 @@ def get_coordinates_from_address_enhanced(address):
     try:
         if gmaps_client:
             print("🗺️ Using Google Maps Geocoding API (Enhanced)")
-            geocode_result = gmaps_client.geocode(address)
+            geocode_result = _google_geocode(address)
             if geocode_result:
                 result = geocode_result[0]
                 location = result['geometry']['location']
@@ -228,7 +250,7 @@ def get_coordinates_from_address_enhanced(address):
         nominatim_url = "https://nominatim.openstreetmap.org/search"
         params = {'q': address, 'format': 'json', 'limit': 1, 'addressdetails': 1, 'extratags': 1}
         headers = {'User-Agent': 'QR-Attendance-System/1.0 (Enhanced Location Accuracy)'}
-        response = requests.get(nominatim_url, params=params, headers=headers, timeout=10)
+        response = _nominatim_get(nominatim_url, params, headers, 'geocode')
 
         if response.status_code == 200:
             results = response.json()
@@ -287,7 +309,7 @@ def geocode_address_enhanced(address):
         url = "https://nominatim.openstreetmap.org/search"
         params = {'q': address.strip(), 'format': 'json', 'limit': 1, 'addressdetails': 1}
         headers = {'User-Agent': 'QR-Attendance-System/1.0'}
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = _nominatim_get(url, params, headers, 'geocode')
 
         if response.status_code == 200:
             data = response.json()
@@ -569,7 +591,7 @@ def reverse_geocode_coordinates(latitude, longitude):
 
         if gmaps_client:
             print("🗺️ Using Google Maps Reverse Geocoding API")
-            reverse_geocode_result = gmaps_client.reverse_geocode((latitude, longitude))
+            reverse_geocode_result = _google_reverse_geocode(latitude, longitude)
             if reverse_geocode_result:
                 address = reverse_geocode_result[0]['formatted_address']
                 print(f"✅ Google Maps reverse geocoded address: {address}")
@@ -585,7 +607,7 @@ def reverse_geocode_coordinates(latitude, longitude):
         url = "https://nominatim.openstreetmap.org/reverse"
         params = {'lat': latitude, 'lon': longitude, 'format': 'json', 'addressdetails': 1, 'zoom': 18}
         headers = {'User-Agent': 'QR-Attendance-System/1.0'}
-        response = requests.get(url, params=params, headers=headers, timeout=10)
+        response = _nominatim_get(url, params, headers, 'reverse')
 
         if response.status_code == 200:
             data = response.json()
@@ -22,9 +22,11 @@ from datetime import datetime, timedelta, time
 from typing import List, Dict, Optional, Tuple, Any
 from dataclasses import dataclass
 import math
-import re
 import logging
 from logger_handler import log_database_operations
+from utils.employee_keys import (  # noqa: F401 - parse_employee_id_for_work_type re-exported
+    normalize_employee_key, parse_employee_id_for_work_type, record_employee_key
+)
 
 _calc_logger = logging.getLogger('qr_attendance_app')
 
@@ -120,50 +122,6 @@ def round_base100_hours(base100_hours: float) -> float:
     return round(whole_hours + (rounded_fraction / 100), 2)
 
 
-# ---------------------------------------------------------------------------
-
-def parse_employee_id_for_work_type(employee_id: str) -> Tuple[str, str]:
-    """
-    Parse employee ID to extract base ID and work type (supports SP, PW, PT)
-    
-    Handles multiple formats:
-    - Suffix with space: "1234 SP", "1234 PW", "1234 PT"
-    - Suffix without space: "1234SP", "1234PW", "1234PT"
-    - Prefix with space: "SP 1234", "PW 1234", "PT 1234"
-    - Prefix without space: "SP1234", "PW1234", "PT1234"
-    
-    Args:
-        employee_id: Employee ID string in any of the above formats
-        
-    Returns:
-        Tuple of (base_employee_id, work_type)
-        work_type is one of: 'regular', 'SP', 'PW', 'PT'
-    """
-    if not employee_id:
-        return str(employee_id), 'regular'
-    
-    employee_id_clean = str(employee_id).strip().upper()
-    
-    # Define work type codes
-    work_type_codes = ['SP', 'PW', 'PT']
-    
-    for work_type in work_type_codes:
-        # Pattern 1: Suffix with optional space - "1234 SP" or "1234SP"
-        suffix_pattern = rf'^(\d+)\s*{work_type}$'
-        suffix_match = re.match(suffix_pattern, employee_id_clean)
-        if suffix_match:
-            return suffix_match.group(1), work_type
-        
-        # Pattern 2: Prefix with optional space - "SP 1234" or "SP1234"
-        prefix_pattern = rf'^{work_type}\s*(\d+)$'
-        prefix_match = re.match(prefix_pattern, employee_id_clean)
-        if prefix_match:
-            return prefix_match.group(1), work_type
-    
-    # Default to regular work
-    return employee_id_clean, 'regular'
-
-
 @dataclass
 class AttendanceRecord:
     """Represents a single attendance record"""
@@ -408,7 +366,7 @@ class WorkingHoursCalculator:
             _calc_logger.debug(f"Calculating hours for base employee {employee_id} with SP/PW/PT support")
             
             # Parse base employee ID
-            base_employee_id, _ = parse_employee_id_for_work_type(employee_id)
+            base_employee_id, _ = normalize_employee_key(employee_id)
             
             # Filter and categorize records by work type
             records_by_type = {'regular': [], 'SP': [], 'PW': [], 'PT': []}
@@ -437,8 +395,8 @@ class WorkingHoursCalculator:
                     if not record_emp_id or record_date is None or record_time is None:
                         continue
                     
-                    # Parse work type from record's employee ID
-                    record_base_id, work_type = parse_employee_id_for_work_type(record_emp_id)
+                    # Base ID / work type persisted on the row (parsed only for legacy rows)
+                    record_base_id, work_type = record_employee_key(record, record_emp_id)
                     
                     # Only include records for this base employee
                     if record_base_id == base_employee_id:
@@ -582,6 +540,7 @@ class WorkingHoursCalculator:
 
             # Calculate daily hours for each work type
             daily_hours = {}
+            miss_punches = []
             weekly_hours = []
             current_week_hours = {'regular': 0, 'SP': 0, 'PW': 0, 'PT': 0}
             
@@ -650,6 +609,28 @@ class WorkingHoursCalculator:
                     }
                 }
                 
+                # Record the day's punches once here so miss punch lookups never
+                # have to rescan the employee's records
+                if daily_hours[date_key]['is_miss_punch']:
+                    day_punches = sorted(
+                        (r for wt in ['regular', 'SP', 'PW', 'PT']
+                         for r in daily_records_by_type[wt].get(date_key, [])),
+                        key=lambda r: r.timestamp
+                    )
+                    miss_punches.append({
+                        'date': date_key,
+                        'records_count': total_records_count,
+                        'records': [
+                            {
+                                'id': r.id,
+                                'time': r.check_in_time.strftime('%H:%M:%S'),
+                                'location': r.location_name,
+                                'work_type': parse_employee_id_for_work_type(r.employee_id)[1],
+                            }
+                            for r in day_punches
+                        ],
+                    })
+
                 # Accumulate weekly hours by type
                 for work_type in ['regular', 'SP', 'PW', 'PT']:
                     current_week_hours[work_type] += hours_by_type[work_type]
@@ -718,6 +699,7 @@ class WorkingHoursCalculator:
                 'start_date': start_date.strftime('%Y-%m-%d') if hasattr(start_date, 'strftime') else str(start_date),
                 'end_date': end_date.strftime('%Y-%m-%d') if hasattr(end_date, 'strftime') else str(end_date),
                 'daily_hours': daily_hours,
+                'miss_punches': miss_punches,
                 'weekly_hours': weekly_hours,
                 'grand_totals': {
                     'total_hours':      grand_total_hours,
@@ -758,8 +740,9 @@ class WorkingHoursCalculator:
         try:
             _calc_logger.info("Starting hours calculation for all employees with SP/PW/PT consolidation")
             
-            # Get unique BASE employee IDs (consolidate SP/PW/PT variants)
-            base_employee_ids = set()
+            # Group records by BASE employee ID (consolidate SP/PW/PT variants) in
+            # one pass, so each employee's calculation only walks its own records
+            records_by_base_id = {}
             for record in attendance_records:
                 try:
                     if hasattr(record, '__dict__'):
@@ -768,22 +751,22 @@ class WorkingHoursCalculator:
                         employee_id = str(record.get('employee_id', '')).strip()
                     
                     if employee_id:
-                        base_id, _ = parse_employee_id_for_work_type(employee_id)
+                        base_id, _ = record_employee_key(record, employee_id)
                         if base_id:
-                            base_employee_ids.add(base_id)
+                            records_by_base_id.setdefault(base_id, []).append(record)
                             
                 except Exception as e:
                     _calc_logger.warning(f"Error processing employee ID during consolidation: {e}")
                     continue
             
-            _calc_logger.info(f"Found {len(base_employee_ids)} unique base employees (after SP/PW/PT consolidation)")
+            _calc_logger.info(f"Found {len(records_by_base_id)} unique base employees (after SP/PW/PT consolidation)")
             
             results = {}
-            for base_emp_id in sorted(base_employee_ids):
+            for base_emp_id in sorted(records_by_base_id):
                 try:
                     _calc_logger.debug(f"Processing base employee {base_emp_id}")
                     results[base_emp_id] = self.calculate_employee_hours(
-                        base_emp_id, start_date, end_date, attendance_records
+                        base_emp_id, start_date, end_date, records_by_base_id[base_emp_id]
                     )
                 except Exception as e:
                     _calc_logger.error(f"Error processing employee {base_emp_id}: {e}", exc_info=True)
@@ -794,6 +777,7 @@ class WorkingHoursCalculator:
                         'start_date': start_date.strftime('%Y-%m-%d') if hasattr(start_date, 'strftime') else str(start_date),
                         'end_date': end_date.strftime('%Y-%m-%d') if hasattr(end_date, 'strftime') else str(end_date),
                         'daily_hours': {},
+                        'miss_punches': [],
                         'weekly_hours': [],
                         'grand_totals': {
                             'total_hours': 0.0,
@@ -816,7 +800,7 @@ class WorkingHoursCalculator:
                 'calculation_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 'period_start': start_date.strftime('%Y-%m-%d') if hasattr(start_date, 'strftime') else str(start_date),
                 'period_end': end_date.strftime('%Y-%m-%d') if hasattr(end_date, 'strftime') else str(end_date),
-                'employee_count': len(base_employee_ids),
+                'employee_count': len(records_by_base_id),
                 'employees': results
             }
             